@@ -99,7 +99,8 @@ $PYTHON_EXEC -m pip install --target $PIP_TARGET --no-warn-script-location \
     pillow>=8.2.0 \
     psutil>=5.8.0 \
     babel>=2.14.0 \
-    markupsafe>=2.1.5
+    markupsafe>=2.1.5 \
+    sortedcontainers>=2.4.0
 
 # OCR 依赖
 echo "正在安装 OCR 依赖..."
@@ -1,5 +1,5 @@
 from threading import Thread
-from flask import Flask, request, send_from_directory, redirect, url_for, render_template, flash, Response, jsonify, session
+from flask import Flask, request, send_file, send_from_directory, redirect, url_for, render_template, flash, Response, jsonify, session
 import sys
 import os
 import datetime
@@ -8,24 +8,39 @@ from multiprocessing import Manager, Event
 from babel import Locale
 
 # 导入配置模块
-from memococo.config import appdata_folder, screenshots_path, app_name_cn, app_version, get_settings, save_settings, main_logger
+from memococo.config import appdata_folder, screenshots_path, app_name_cn, app_version, get_settings, save_settings, main_logger, build_arg_parser
 
 # 导入Windows 11检测模块
 from memococo.common.win11_detector import check_windows_11_compatibility
 
 # 导入数据库模块
-from memococo.database import create_db, get_timestamps, get_unique_apps, get_ocr_text, search_entries
+from memococo.database import create_db, get_frames, get_unique_apps, get_ocr_text, search_entries, get_frames_in_range, get_monitor_frames
 
 # 导入功能模块
 from memococo.ollama import extract_keywords_to_json
 from memococo.screenshot import record_screenshots_thread
-from memococo.ocr_processor import start_ocr_processor
-from memococo.utils import human_readable_time, timestamp_to_human_readable, ImageVideoTool, check_port, get_unbacked_up_folders, get_total_size, count_unique_keywords
+from memococo.capture_trigger import get_capture_trigger
+from memococo.motion_detector import get_motion_detector
+from memococo.frame_dedup import get_recent_frame_cache
+from memococo.ocr_processor import start_ocr_workers, request_priority_ocr, wait_for_ocr_text, PRIORITY_WAIT_MAX
+from memococo.ocr_scheduler import get_ocr_scheduler
+from memococo.ocr_cache import get_ocr_cache
+from memococo.scroll_ocr import get_scroll_ocr
+from memococo.ocr_jobs import job_stats
+from memococo.ocr_watchdog import get_ocr_watchdog
+from memococo.ocr_engines import get_engine_manager
+from memococo.ocr_factory import prepare_model_tier
+from memococo.utils import human_readable_time, timestamp_to_human_readable, check_port, count_unique_keywords
 from memococo.app_map import get_app_names_by_app_codes, get_app_code_by_app_name
+from memococo.thumbnail import ensure_thumbnail, build_hour_sprite, get_sprite_image_path
+from memococo.image_variants import parse_variant_params, ensure_variant
+from memococo.frame_store import get_frame_path, read_frame, archive_day, get_archive_mapping, resolve_frame, frame_name, parse_frame_name, query_archived_frame, get_day_folder
+from memococo.storage_catalog import get_unbacked_up_days, get_storage_days, get_storage_summary, format_size, refresh_day, sync_storage_catalog
 
 # 导入错误处理模块
 from memococo.common.error_handler import initialize_error_handler, with_error_handling, MemoCocoError, DatabaseError, FileError, SystemError
 from memococo.common.error_middleware import setup_error_handling
+from memococo.common.lru_cache import ByteLRUCache
 
 # 导入国际化支持模块
 from memococo.i18n import get_translator, set_locale, get_locale, get_available_locales
@@ -105,7 +120,8 @@ def favicon():
 @with_error_handling({"route": "timeline"})
 def timeline():
     # connect to db
-    timestamps = get_timestamps()
+    frames = get_frames()
+    timestamps = [timestamp for timestamp, _ in frames]
     #todo 增加time_nodes,用于计算合适的时间节点，5分钟前，1小时前，3小时前，6小时前，12小时前，24小时前，3天前，7天前，30天前，90天前，180天前，1年前等。
     time_nodes = generate_time_nodes(timestamps)
     # 使用多线程唤醒ollama服务
@@ -113,6 +129,7 @@ def timeline():
     #     Thread(target=query_ollama,args=("你好",get_settings()["model"])).start()
     return render_template("index.html",
         timestamps=timestamps,
+        frames=[frame_name(timestamp, monitor) for timestamp, monitor in frames],
         time_nodes=time_nodes,
         unique_apps=unique_apps,
         app_name=_('app_name'),
@@ -230,7 +247,8 @@ def search():
                 entry.title,
                 text,
                 entry.timestamp,
-                jsontext
+                jsontext,
+                frame_name(entry.timestamp, entry.monitor)
             ])
     main_logger.info(f"Serialized {len(serialized_entries)} entries for search results")
 
@@ -294,29 +312,169 @@ def settings():
     )
 
 
+# 截图保存后可能在短时间内被压缩改写，超过该时长后内容不再变化
+FRAME_SETTLE_SECONDS = 10 * 60
+# 不再变化的截图允许浏览器缓存一年
+FRAME_MAX_AGE = 365 * 24 * 60 * 60
+# 已归档截图需要从视频中提取并编码，缓存编码后的结果避免重复提取
+archived_frame_cache = ByteLRUCache(64 * 1024 * 1024)
+# 发送打包存储的截图时每次从mmap中复制的字节数
+FRAME_STREAM_CHUNK = 64 * 1024
+
+def _iter_frame_data(data):
+    """分块发送mmap上的截图数据，不复制整张截图"""
+    for start in range(0, len(data), FRAME_STREAM_CHUNK):
+        yield bytes(data[start:start + FRAME_STREAM_CHUNK])
+
+def _apply_frame_cache_headers(response, timestamp):
+    """为截图响应设置缓存策略
+
+    较早的截图内容不会再变化，标记为immutable，浏览器无需再次请求；
+    刚保存的截图仍可能被压缩改写，要求浏览器每次通过ETag验证
+    """
+    response.headers.pop("Expires", None)
+    if time.time() - timestamp > FRAME_SETTLE_SECONDS:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = FRAME_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+    return response
+
 @app.route("/pictures/<filename>")
 def serve_image(filename):
-    #解析文件名，获取时间戳
-    timestamp = filename.split('.')[0]
-    #根据时间戳，获取年月日，拼接为文件路径
-    year, month, day = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y'), datetime.datetime.fromtimestamp(int(timestamp)).strftime('%m'), datetime.datetime.fromtimestamp(int(timestamp)).strftime('%d')
-    dir = os.path.join(screenshots_path, year, month, day)
-
-    tool = ImageVideoTool(dir)
-    if tool.is_backed_up():
-        byte_stream = tool.query_image(timestamp)
-        response = Response(byte_stream, mimetype='image/jpeg')
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        return response
-    else:
-        return send_from_directory(dir, filename)
+    #解析文件名（<时间戳>.webp 或 <时间戳>_<显示器编号>.webp），获取截图的键
+    try:
+        timestamp, monitor = parse_frame_name(filename)
+    except ValueError:
+        return jsonify({"error": "Invalid timestamp"}), 400
+    # 引用已有截图的截图（切换回没有变化的窗口）返回被引用的截图，与之共用变体缓存和ETag
+    timestamp, monitor = resolve_frame(timestamp, monitor)
+    name = frame_name(timestamp, monitor)
+
+    # 带有 w/fmt/q 参数时返回缩放或转码后的变体，变体生成后缓存在磁盘上
+    try:
+        variant = parse_variant_params(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid variant parameters"}), 400
+    if variant is not None:
+        variant_path = ensure_variant(timestamp, variant, monitor)
+        if variant_path is None:
+            return jsonify({"error": "Image not found"}), 404
+        # 命中缓存时会刷新文件修改时间，ETag不能依赖修改时间
+        etag = f"{os.path.basename(variant_path)}-{os.path.getsize(variant_path):x}"
+        response = send_file(variant_path, mimetype=variant.mimetype, etag=etag, conditional=True, max_age=0)
+        return _apply_frame_cache_headers(response, timestamp)
+
+    # 单文件存储的截图直接发送文件，send_file负责处理条件请求、Range请求，并在服务器支持时使用零拷贝发送
+    image_path = get_frame_path(timestamp, monitor)
+    stat = None
+    if image_path is not None:
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            stat = None
+    if stat is not None:
+        etag = f"{name}-f-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        response = send_file(image_path, mimetype='image/webp', etag=etag, conditional=True,
+                             last_modified=stat.st_mtime, max_age=0)
+        return _apply_frame_cache_headers(response, timestamp)
+
+    # 打包存储的截图：从mmap中切片读取，ETag由截图在打包文件中的位置决定
+    found = read_frame(timestamp, monitor)
+    if found is not None:
+        data, version = found
+        etag = f"{name}-{version}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return _apply_frame_cache_headers(response, timestamp)
+        response = Response(_iter_frame_data(data), mimetype='image/webp')
+        response.content_length = len(data)
+        response.set_etag(etag)
+        response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+        return _apply_frame_cache_headers(response, timestamp)
+
+    dir = get_day_folder(timestamp)
+    # 已归档的截图：ETag由截图名和该显示器映射文件的修改时间决定
+    mapping_file = get_archive_mapping(dir, monitor)
+    if mapping_file is None:
+        return jsonify({"error": "Image not found"}), 404
+    try:
+        mapping_mtime = os.stat(mapping_file).st_mtime_ns
+    except OSError:
+        return jsonify({"error": "Image not found"}), 404
+    etag = f"{name}-v-{mapping_mtime:x}"
+
+    # 浏览器缓存仍然有效时直接返回304，无需从视频中提取帧
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return _apply_frame_cache_headers(response, timestamp)
+
+    cache_key = (name, etag)
+    data = archived_frame_cache.get(cache_key)
+    if data is None:
+        byte_stream = query_archived_frame(timestamp, monitor)
+        if byte_stream is None:
+            return jsonify({"error": "Image not found"}), 404
+        data = byte_stream.getvalue()
+        archived_frame_cache.put(cache_key, data)
+
+    response = Response(data, mimetype='image/jpeg')
+    response.set_etag(etag)
+    response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    return _apply_frame_cache_headers(response, timestamp)
+
+@app.route("/thumbs/<filename>")
+def serve_thumbnail(filename):
+    """返回截图缩略图，缩略图不存在时从原图懒生成"""
+    try:
+        timestamp, monitor = parse_frame_name(filename)
+    except ValueError:
+        return jsonify({"error": "Invalid timestamp"}), 400
+
+    thumb_path = ensure_thumbnail(*resolve_frame(timestamp, monitor))
+    if thumb_path is None:
+        return jsonify({"error": "Image not found"}), 404
+    response = send_file(thumb_path, mimetype='image/webp', conditional=True, max_age=0)
+    return _apply_frame_cache_headers(response, timestamp)
+
+@app.route("/thumbs/sprite/<hour_key>.webp")
+def serve_sprite(hour_key):
+    """返回指定小时（YYYYMMDDHH）的缩略图雪碧图，参数v为索引中的雪碧图版本"""
+    try:
+        sprite_path = get_sprite_image_path(hour_key, request.args.get("v"))
+    except ValueError:
+        return jsonify({"error": "Invalid hour"}), 400
+    if sprite_path is None:
+        return jsonify({"error": "No screenshots in this hour"}), 404
+    return send_from_directory(os.path.dirname(sprite_path), os.path.basename(sprite_path), mimetype='image/webp')
+
+@app.route("/thumbs/sprite/<hour_key>.json")
+def serve_sprite_index(hour_key):
+    """返回指定小时（YYYYMMDDHH）雪碧图的索引信息"""
+    try:
+        index = build_hour_sprite(hour_key)
+    except ValueError:
+        return jsonify({"error": "Invalid hour"}), 400
+    if index is None:
+        return jsonify({"error": "No screenshots in this hour"}), 404
+    return jsonify(index)
 
 @app.route("/get_ocr_text/<timestamp>")
 def get_ocr_text_by_timestamp(timestamp):
-    #解析文件名，获取时间戳
-    data = get_ocr_text(timestamp)
-    #如果为空，则返回空数组
+    #解析截图名，获取时间戳和显示器编号
+    try:
+        timestamp, monitor = parse_frame_name(timestamp)
+    except ValueError:
+        return jsonify([])
+    data = get_ocr_text(timestamp, monitor)
+    #如果为空，则返回空数组，并把这张截图及其附近的截图加入优先OCR队列
     if not data:
+        request_priority_ocr(timestamp)
         return jsonify([])
 
     try:
@@ -330,11 +488,66 @@ def get_ocr_text_by_timestamp(timestamp):
         # 如果解析失败，返回空数组
         return jsonify([])
 
+@app.route("/api/ocr/<frame>")
+@with_error_handling({"route": "api_ocr_text"})
+def api_ocr_text(frame):
+    """长轮询获取截图（截图名 <时间戳> 或 <时间戳>_<显示器编号>）的OCR文本
+
+    截图尚未OCR时加入优先队列，最多等待 wait 秒（默认0，不等待），识别完成后立即返回。
+    """
+    try:
+        timestamp, monitor = parse_frame_name(frame)
+    except ValueError:
+        return jsonify({"error": "Invalid frame"}), 400
+    if (timestamp, monitor) not in get_frames_in_range(timestamp, timestamp):
+        return jsonify({"error": "Screenshot not found"}), 404
+    wait = max(0.0, min(request.args.get("wait", 0, type=float), PRIORITY_WAIT_MAX))
+    if wait > 0:
+        text = wait_for_ocr_text(timestamp, wait, monitor)
+    else:
+        text = get_ocr_text(timestamp, monitor)
+        if not text:
+            request_priority_ocr(timestamp)
+    return jsonify({
+        "timestamp": timestamp,
+        "monitor": monitor,
+        "status": "done" if text else "pending",
+        "text": text,
+    })
+
+@app.route("/api/ocr/stats")
+@with_error_handling({"route": "api_ocr_stats"})
+def api_ocr_stats():
+    """返回OCR调度、OCR任务队列、OCR引擎、OCR看门狗、OCR缓存和滚动增量OCR的统计信息
+    （各状态任务数、引擎切换和识别耗时、超时次数、缓存命中率、增量识别的截图数等）"""
+    scheduler = get_ocr_scheduler()
+    scheduler.ensure_seeded()
+    cache = get_ocr_cache()
+    return jsonify({
+        "scheduler": scheduler.stats(),
+        "jobs": job_stats(),
+        "engines": get_engine_manager().stats(),
+        "watchdog": get_ocr_watchdog().stats(),
+        "cache": cache.stats() if cache is not None else None,
+        "scroll": get_scroll_ocr().stats(),
+    })
+
+@app.route("/api/capture/stats")
+@with_error_handling({"route": "api_capture_stats"})
+def api_capture_stats():
+    """返回截图触发统计（当前截图间隔、各触发原因次数、最近一小时的截图次数和估计错过的窗口变化次数），
+    以及持续变化统计（跳过的截图数、估计节省的存储和CPU时间）和截图去重统计（保存为引用的截图数）"""
+    stats = get_capture_trigger().stats()
+    stats["motion"] = get_motion_detector().stats()
+    stats["dedup"] = get_recent_frame_cache().stats()
+    return jsonify(stats)
+
 @app.route("/unbacked_up_folders")
 @with_error_handling({"route": "unbacked_up_folders"})
 def unbacked_up_folders():
-    folder_info = get_unbacked_up_folders()
-    total_size = get_total_size()
+    # 从存储目录读取统计信息，无需遍历截图目录
+    folder_info = get_unbacked_up_days(30)
+    total_size = format_size(get_storage_summary()["total_bytes"])
     # 将未备份的文件夹传递给模板
     return render_template(
         "unbacked_up_folders.html",
@@ -345,11 +558,31 @@ def unbacked_up_folders():
         available_locales=get_available_locales()
     )
 
+@app.route("/api/monitors")
+@with_error_handling({"route": "api_monitors"})
+def api_monitors():
+    """返回指定时刻（timestamp 参数，默认当前）每个显示器正在显示的截图时间戳和截图名"""
+    timestamp = request.args.get("timestamp", type=int) or int(time.time())
+    return jsonify([{"monitor": monitor, "timestamp": frame_timestamp, "frame": frame_name(frame_timestamp, monitor)}
+                    for monitor, frame_timestamp in get_monitor_frames(timestamp)])
+
+@app.route("/api/storage")
+@with_error_handling({"route": "api_storage"})
+def api_storage():
+    """返回存储统计信息，可通过 days 参数只返回最近若干天"""
+    days = request.args.get("days", type=int)
+    return jsonify({
+        "summary": get_storage_summary(),
+        "days": get_storage_days(days),
+    })
+
 def compress_folder_thread(folder):
-    # 创建 ImageVideoTool 实例
-    tool = ImageVideoTool(folder)
-    # 调用 compress 方法
-    tool.images_to_video( sort_by="time")
+    try:
+        # 打包存储的截图先导出为独立文件，再按显示器分别编码为视频
+        archive_day(folder)
+    finally:
+        # 归档后文件数量和大小发生变化，重新统计该目录
+        refresh_day(folder)
 
 @app.route("/compress_folder", methods=["POST"])
 @with_error_handling({"route": "compress_folder"})
@@ -445,9 +678,22 @@ def start_background_threads():
         main_logger.error(error_msg)
         raise SystemError(error_msg, {"thread": "screenshot"}, e)
 
-    # 启动OCR处理线程
-    # ocr_thread = start_ocr_processor()
-    # main_logger.info("OCR processor thread started")
+    # 在后台补齐存储目录中尚未统计的日期目录
+    catalog_thread = Thread(target=sync_storage_catalog, name="StorageCatalogThread")
+    catalog_thread.daemon = True
+    catalog_thread.start()
+
+    # 在后台确定OCR模型档位（首次运行时需要基准测试）
+    try:
+        prepare_model_tier()
+    except Exception as e:
+        main_logger.error(f"Failed to start OCR model tier selection: {e}")
+
+    # 启动OCR处理线程，ocr_workers 为0时只由截图线程在空闲时处理OCR积压
+    ocr_workers = get_settings().get("ocr_workers", 0)
+    if ocr_workers > 0:
+        start_ocr_workers(ocr_workers, max_batch_size=get_settings().get("ocr_batch_size", 5))
+        main_logger.info(f"Started {ocr_workers} OCR processor threads")
 
     # 注意：自动清理功能已移除，以确保数据持久保存
 
@@ -466,6 +712,9 @@ def main():
 
     这个函数会被 setup.py 中的 entry_points 调用
     """
+    # 校验命令行参数并处理--help（公共参数已在config模块中解析）
+    build_arg_parser().parse_args()
+
     # 显示应用程序信息
     main_logger.info(f"Starting {app_name_cn} (MemoCoco) v{app_version}")
     
@@ -0,0 +1,231 @@
+"""
+截图触发模块
+
+截图线程不再固定每5秒醒来一次，而是由触发器决定何时截图：
+
+- 焦点或窗口标题变化：通过X11后端轮询活动窗口，切换后立即截图（两次截图至少间隔 capture_min_interval 秒），
+  不会错过停留时间很短的窗口
+- 输入活动：上次截图后有键盘或鼠标输入，且输入停顿 INPUT_DEBOUNCE 秒后截图（连续输入时最多等待两个间隔）
+- 空闲：用户空闲时每个基础间隔醒来一次处理积压的OCR，只在超过 capture_idle_floor 秒后截图
+
+截图间隔在基础间隔的一半到4倍之间调整：最近截图大多与上一张相似时加长，大多被保存时缩短，
+OCR积压较多时不低于基础间隔。X11后端不可用时（Wayland、未安装python-xlib）没有窗口和输入事件，按调整后的间隔定时截图。
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from memococo.config import logger, get_settings
+from memococo.x11_backend import x11_active_window, x11_idle_seconds, X11Unavailable
+
+# 触发原因
+TRIGGER_FOCUS = "focus"
+TRIGGER_INPUT = "input"
+TRIGGER_INTERVAL = "interval"
+TRIGGER_IDLE_FLOOR = "idle_floor"
+# 用户空闲时的定时唤醒，只处理OCR积压，不截图
+TRIGGER_IDLE_TICK = "idle_tick"
+
+# 轮询活动窗口和空闲时间的间隔（秒）
+POLL_INTERVAL = 0.25
+# 输入停顿多久后截图（秒）
+INPUT_DEBOUNCE = 1.0
+# 空闲时间超过该值视为用户空闲（秒），与 is_user_active 一致
+IDLE_THRESHOLD = 5
+# 保存比例的EWMA平滑系数
+CHANGE_ALPHA = 0.2
+# OCR积压超过该数量时截图间隔不低于基础间隔，超过4倍时不低于基础间隔的2倍
+BACKLOG_HIGH = 200
+# 重新统计OCR积压的间隔（秒）
+BACKLOG_REFRESH = 60
+
+
+def _active_window_key() -> Optional[Tuple[int, Optional[str]]]:
+    """活动窗口的 (窗口ID, 标题)，X11后端不可用时返回None"""
+    try:
+        window = x11_active_window()
+    except X11Unavailable:
+        return None
+    return (window.window_id, window.title) if window else (0, None)
+
+
+def _pending_ocr_count() -> int:
+    from memococo.ocr_jobs import count_pending_jobs
+    return count_pending_jobs()
+
+
+class CaptureTrigger:
+    """根据窗口切换、输入活动和截图变化率决定截图时机"""
+
+    def __init__(self, base_interval: float = 5, window_fn: Callable = _active_window_key,
+                 idle_fn: Callable = x11_idle_seconds, backlog_fn: Callable = _pending_ocr_count,
+                 clock: Callable = time.monotonic, sleep: Callable = time.sleep):
+        """初始化
+
+        Args:
+            base_interval: 基础截图间隔（秒）
+            window_fn: 返回活动窗口标识的函数，返回None表示无法获取窗口事件
+            idle_fn: 返回用户空闲时间（秒）的函数，返回None表示无法获取输入事件
+            backlog_fn: 返回待OCR截图数量的函数
+            clock: 单调时钟（测试时替换）
+            sleep: 等待函数（测试时替换）
+        """
+        settings = get_settings()
+        self.base_interval = base_interval
+        self.min_interval = min(settings.get("capture_min_interval", 1), base_interval)
+        self.idle_floor = max(settings.get("capture_idle_floor", 60), base_interval)
+        self.interval = base_interval
+        self.change_rate = 0.5
+        self.backlog = 0
+        self._window_fn = window_fn
+        self._idle_fn = idle_fn
+        self._backlog_fn = backlog_fn
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        now = clock()
+        self._last_capture = now
+        self._last_tick = now
+        self._last_backlog = None
+        self._captured_window = None
+        self._polled_window = None
+        # 上次截图后出现过、但没有被截到的窗口
+        self._passed_windows = set()
+        self._window_events = False
+        self._input_events = False
+        self._capture_times = deque()
+        self._triggers = {}
+        self.saved = 0
+        self.dropped = 0
+        self.missed_changes = 0
+
+    def wait(self) -> str:
+        """等待下一次截图时机
+
+        Returns:
+            触发原因；TRIGGER_IDLE_TICK 表示用户空闲，只处理OCR积压、不截图
+        """
+        while True:
+            now = self._clock()
+            self._refresh_backlog(now)
+            reason = self._check(now)
+            if reason is not None:
+                self._fire(reason, now)
+                return reason
+            self._sleep(POLL_INTERVAL)
+
+    def _check(self, now: float) -> Optional[str]:
+        since = now - self._last_capture
+        window = self._polled_window = self._window_fn()
+        self._window_events = window is not None
+        if window is not None and window != self._captured_window:
+            if since >= self.min_interval:
+                return TRIGGER_FOCUS
+            self._passed_windows.add(window)
+
+        idle = self._idle_fn()
+        self._input_events = idle is not None
+        if idle is None:
+            return TRIGGER_INTERVAL if since >= self.interval else None
+        if idle >= IDLE_THRESHOLD:
+            if since >= self.idle_floor:
+                return TRIGGER_IDLE_FLOOR
+            if now - self._last_tick >= self.base_interval:
+                return TRIGGER_IDLE_TICK
+            return None
+        # 上次截图后有输入，等输入停顿后截图，连续输入时最多等待两个间隔
+        if idle < since and since >= self.interval and (idle >= INPUT_DEBOUNCE or since >= self.interval * 2):
+            return TRIGGER_INPUT
+        if since >= self.idle_floor:
+            return TRIGGER_IDLE_FLOOR
+        return None
+
+    def _fire(self, reason: str, now: float):
+        with self._lock:
+            self._triggers[reason] = self._triggers.get(reason, 0) + 1
+            self._last_tick = now
+            if reason == TRIGGER_IDLE_TICK:
+                return
+            window = self._polled_window
+            # 两次截图之间出现过、截图时已经切走的窗口视为错过的变化
+            self._passed_windows.discard(window)
+            self._passed_windows.discard(self._captured_window)
+            self.missed_changes += len(self._passed_windows)
+            self._passed_windows.clear()
+            self._captured_window = window
+            self._last_capture = now
+            self._capture_times.append(now)
+            while self._capture_times and now - self._capture_times[0] > 3600:
+                self._capture_times.popleft()
+
+    def record_result(self, saved: bool):
+        """记录一次截图是否因为与上一张不同而被保存，据此调整截图间隔"""
+        with self._lock:
+            if saved:
+                self.saved += 1
+            else:
+                self.dropped += 1
+            self.change_rate = CHANGE_ALPHA * (1.0 if saved else 0.0) + (1 - CHANGE_ALPHA) * self.change_rate
+            self._adjust_interval()
+
+    def _refresh_backlog(self, now: float):
+        if self._last_backlog is not None and now - self._last_backlog < BACKLOG_REFRESH:
+            return
+        self._last_backlog = now
+        try:
+            self.backlog = self._backlog_fn()
+        except Exception as e:
+            logger.warning(f"统计OCR积压失败: {e}")
+        with self._lock:
+            self._adjust_interval()
+
+    def _adjust_interval(self):
+        if self.change_rate > 0.7:
+            interval = self.interval * 0.8
+        elif self.change_rate < 0.3:
+            interval = self.interval * 1.25
+        else:
+            interval = self.interval
+        lower = max(self.min_interval, self.base_interval / 2)
+        if self.backlog > BACKLOG_HIGH * 4:
+            lower = self.base_interval * 2
+        elif self.backlog > BACKLOG_HIGH:
+            lower = self.base_interval
+        interval = min(max(interval, lower), self.base_interval * 4)
+        if abs(interval - self.interval) >= 0.5:
+            logger.debug(f"截图间隔调整为 {interval:.1f} 秒（保存比例 {self.change_rate:.2f}，OCR积压 {self.backlog}）")
+        self.interval = interval
+
+    def stats(self) -> dict:
+        """触发统计：最近一小时的截图次数、各触发原因次数、估计错过的窗口变化次数和当前间隔"""
+        with self._lock:
+            return {
+                "interval": round(self.interval, 2),
+                "base_interval": self.base_interval,
+                "change_rate": round(self.change_rate, 3),
+                "backlog": self.backlog,
+                "window_events": self._window_events,
+                "input_events": self._input_events,
+                "captures_per_hour": len(self._capture_times),
+                "saved": self.saved,
+                "dropped": self.dropped,
+                "missed_changes": self.missed_changes,
+                "triggers": dict(self._triggers),
+            }
+
+
+_trigger: Optional[CaptureTrigger] = None
+_trigger_lock = threading.Lock()
+
+
+def get_capture_trigger(base_interval: float = 5) -> CaptureTrigger:
+    """获取全局截图触发器（基础间隔以第一次调用为准）"""
+    global _trigger
+    if _trigger is None:
+        with _trigger_lock:
+            if _trigger is None:
+                _trigger = CaptureTrigger(base_interval)
+    return _trigger
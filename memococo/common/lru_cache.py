@@ -0,0 +1,237 @@
+"""
+LRU缓存模块
+
+提供线程安全、按字节数限制容量的内存LRU缓存和磁盘文件LRU缓存
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ByteLRUCache:
+    """按字节数限制容量的线程安全LRU缓存
+
+    缓存值为bytes（或实现了__len__的对象），总大小超过上限时淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_bytes: int, max_item_bytes: Optional[int] = None):
+        """初始化缓存
+
+        Args:
+            max_bytes: 缓存总容量（字节）
+            max_item_bytes: 单个条目的最大字节数，超过时不缓存，默认为总容量的1/4
+        """
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes if max_item_bytes is not None else max_bytes // 4
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存值
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，未命中时返回None
+        """
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+
+        Returns:
+            是否写入成功（条目过大时不缓存）
+        """
+        size = len(value)
+        if size > self.max_item_bytes:
+            return False
+
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = value
+            self._size += size
+            while self._size > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+        return True
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """删除并返回缓存值
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            被删除的缓存值，不存在时返回None
+        """
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is not None:
+                self._size -= len(value)
+            return value
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            包含条目数、占用字节数和命中率的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "items": len(self._items),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class DiskLRUCache:
+    """按总字节数限制容量的磁盘文件LRU缓存
+
+    只负责记录缓存目录中文件的使用顺序并在超出容量时删除最久未使用的文件，
+    文件本身由调用者写入。文件的修改时间作为使用时间持久化，重启后可以恢复淘汰顺序。
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """初始化缓存
+
+        Args:
+            directory: 缓存目录
+            max_bytes: 缓存总容量（字节）
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # 文件路径 -> 文件大小
+        self._size = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self) -> None:
+        """扫描缓存目录，按修改时间恢复使用顺序（调用者需持有锁）"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, path, stat.st_size))
+        files.sort()
+        for _, path, size in files:
+            self._entries[path] = size
+            self._size += size
+        self._loaded = True
+
+    def get(self, path: str) -> bool:
+        """检查缓存文件是否存在，存在时标记为最近使用
+
+        Args:
+            path: 缓存文件路径
+
+        Returns:
+            缓存文件是否存在
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if path not in self._entries:
+                self.misses += 1
+                return False
+            if not os.path.exists(path):
+                self._size -= self._entries.pop(path)
+                self.misses += 1
+                return False
+            self._entries.move_to_end(path)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def add(self, path: str) -> None:
+        """登记新写入的缓存文件，必要时淘汰最久未使用的文件
+
+        Args:
+            path: 已写入的缓存文件路径
+        """
+        size = os.path.getsize(path)
+        evicted = []
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._size -= old
+            self._entries[path] = size
+            self._size += size
+            # 至少保留刚写入的文件
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old_path, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_path)
+            self.evictions += len(evicted)
+
+        for old_path in evicted:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            包含文件数、占用字节数、命中和淘汰次数的字典
+        """
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -30,7 +30,8 @@ main_app_name = app_name_en
 app_version = "2.2.11"
 
 # 命令行参数解析
-parser = argparse.ArgumentParser(description=main_app_name)
+# 公共参数在导入时解析，不处理--help，主程序和命令行工具以此为父解析器定义完整的命令行
+parser = argparse.ArgumentParser(description=main_app_name, add_help=False)
 
 parser.add_argument(
     "--storage-path",
@@ -51,7 +52,21 @@ parser.add_argument(
     help="Path to the configuration file",
 )
 
-args = parser.parse_args()
+# 使用parse_known_args，允许memococo-pack等命令行工具定义自己的参数
+args, _ = parser.parse_known_args()
+
+
+def build_arg_parser(**kwargs) -> argparse.ArgumentParser:
+    """创建包含公共参数的命令行解析器
+
+    Args:
+        **kwargs: 传给ArgumentParser的参数
+
+    Returns:
+        命令行解析器
+    """
+    kwargs.setdefault("description", main_app_name)
+    return argparse.ArgumentParser(parents=[parser], **kwargs)
 
 # 确定应用数据目录
 if args.storage_path:
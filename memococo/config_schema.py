@@ -31,6 +31,42 @@ CONFIG_SCHEMA = {
         "maximum": 3600,
         "description": "截图间隔时间（秒）"
     },
+    "capture_min_interval": {
+        "type": "number",
+        "default": 1,
+        "minimum": 0.5,
+        "maximum": 60,
+        "description": "切换窗口或有输入时两次截图的最小间隔（秒）"
+    },
+    "capture_idle_floor": {
+        "type": "number",
+        "default": 60,
+        "minimum": 5,
+        "maximum": 3600,
+        "description": "没有输入也没有切换窗口时的截图间隔（秒）"
+    },
+    "motion_capture_interval": {
+        "type": "number",
+        "default": 30,
+        "minimum": 5,
+        "maximum": 3600,
+        "description": "画面持续变化（视频、动画、滚动日志）的显示器两次保存的最小间隔（秒）"
+    },
+    "motion_exempt_apps": {
+        "type": "array",
+        "default": [],
+        "description": "画面持续变化时也不降低保存频率的应用程序列表"
+    },
+    "motion_apps": {
+        "type": "array",
+        "default": [],
+        "description": "在前台时总是按画面持续变化处理的应用程序列表（例如视频播放器）"
+    },
+    "frame_dedup": {
+        "type": "boolean",
+        "default": True,
+        "description": "切换回内容没有变化的窗口时是否只保存对之前截图的引用"
+    },
     "primary_monitor_only": {
         "type": "boolean",
         "default": False,
@@ -56,6 +92,32 @@ CONFIG_SCHEMA = {
         "enum": ["umiocr", "rapidocr"],
         "description": "使用的OCR引擎"
     },
+    "ocr_health_check_interval": {
+        "type": "number",
+        "default": 30,
+        "minimum": 5,
+        "maximum": 3600,
+        "description": "UmiOCR健康检查间隔（秒）"
+    },
+    "ocr_load_balance": {
+        "type": "boolean",
+        "default": False,
+        "description": "是否同时使用UmiOCR和RapidOCR，按吞吐量分配截图"
+    },
+    "ocr_umiocr_concurrency": {
+        "type": "integer",
+        "default": 2,
+        "minimum": 1,
+        "maximum": 32,
+        "description": "同时使用两个引擎时UmiOCR的并发请求数"
+    },
+    "ocr_rapidocr_concurrency": {
+        "type": "integer",
+        "default": 0,
+        "minimum": 0,
+        "maximum": 64,
+        "description": "同时使用两个引擎时RapidOCR的并发数，0表示CPU核心数的一半"
+    },
     "ocr_batch_size": {
         "type": "integer",
         "default": 5,
@@ -63,6 +125,13 @@ CONFIG_SCHEMA = {
         "maximum": 100,
         "description": "每批处理的OCR任务数量"
     },
+    "ocr_workers": {
+        "type": "integer",
+        "default": 0,
+        "minimum": 0,
+        "maximum": 32,
+        "description": "后台OCR处理线程数，0表示只由截图线程在空闲时处理OCR积压"
+    },
     "ocr_min_queue": {
         "type": "integer",
         "default": 5,
@@ -82,14 +151,110 @@ CONFIG_SCHEMA = {
         "default": 70,
         "minimum": 0,
         "maximum": 100,
-        "description": "CPU使用率阈值（百分比），超过此值时暂停OCR处理"
+        "description": "CPU使用率阈值（百分比），平滑后的CPU使用率超过此值时OCR并发数减半直至暂停，截图时也不再即时OCR"
     },
     "ocr_temp_threshold": {
         "type": "integer",
         "default": 70,
         "minimum": 0,
         "maximum": 100,
-        "description": "CPU温度阈值（摄氏度），超过此值时暂停OCR处理"
+        "description": "CPU温度阈值（摄氏度），平滑后的CPU温度超过此值时OCR并发数减半直至暂停，截图时也不再即时OCR"
+    },
+    "ocr_preprocess": {
+        "type": "string",
+        "default": "content",
+        "enum": ["content", "resize"],
+        "description": "OCR预处理方式：content只按原始分辨率裁剪文字区域，resize把整张截图缩小到长边不超过2000像素"
+    },
+    "ocr_profiles": {
+        "type": "object",
+        "default": {},
+        "description": "自定义OCR配置档，键为配置档名称，值可包含 skip、preprocess、line_mode、engine_params"
+    },
+    "ocr_app_profiles": {
+        "type": "object",
+        "default": {},
+        "description": "应用与OCR配置档的对应关系，键为截图时记录的应用名，值为配置档名称"
+    },
+    "ocr_cache_enabled": {
+        "type": "boolean",
+        "default": True,
+        "description": "是否缓存OCR结果，与已识别截图近似的画面直接复用文本"
+    },
+    "ocr_cache_max_entries": {
+        "type": "integer",
+        "default": 5000,
+        "minimum": 100,
+        "maximum": 1000000,
+        "description": "OCR缓存最多保存的截图数，超出后淘汰最久未命中的条目"
+    },
+    "ocr_cache_max_distance": {
+        "type": "integer",
+        "default": 4,
+        "minimum": 0,
+        "maximum": 32,
+        "description": "两张截图的感知哈希（256位）汉明距离不超过此值时视为同一画面"
+    },
+    "scroll_ocr": {
+        "type": "boolean",
+        "default": True,
+        "description": "活动窗口只是滚动时是否只识别新出现的区域，之前识别的文字行平移后复用"
+    },
+    "ocr_max_attempts": {
+        "type": "integer",
+        "default": 5,
+        "minimum": 1,
+        "maximum": 100,
+        "description": "每张截图OCR的最大尝试次数，失败后按指数退避重试，用完后不再自动OCR（截图保留）"
+    },
+    "ocr_timeout": {
+        "type": "number",
+        "default": 20,
+        "minimum": 1,
+        "maximum": 600,
+        "description": "单张截图OCR的时限（秒），超时的调用被放弃，截图稍后重试"
+    },
+    "ocr_model_tier": {
+        "type": "string",
+        "default": "auto",
+        "enum": ["auto", "server", "mobile", "int8"],
+        "description": "OCR模型档位：auto在首次运行时测试本机速度后自动选择，server为服务端模型，mobile为自带的移动端模型，int8为量化后的移动端模型"
+    },
+    "ocr_latency_target": {
+        "type": "number",
+        "default": 3.0,
+        "minimum": 0.1,
+        "maximum": 60,
+        "description": "自动选择模型档位时单张1080p截图的目标识别耗时（秒），选择满足目标的最准确档位"
+    },
+    "ocr_intra_op_threads": {
+        "type": "integer",
+        "default": 0,
+        "minimum": 0,
+        "maximum": 64,
+        "description": "ONNX Runtime单个算子使用的线程数，0表示由ONNX Runtime决定"
+    },
+    "ocr_inter_op_threads": {
+        "type": "integer",
+        "default": 0,
+        "minimum": 0,
+        "maximum": 64,
+        "description": "ONNX Runtime并行执行算子的线程数，0表示由ONNX Runtime决定"
+    },
+    
+    # 存储配置
+    "storage_backend": {
+        "type": "string",
+        "default": "files",
+        "enum": ["files", "pack"],
+        "description": "截图存储方式：files为每张截图一个文件，pack为每天一个只追加的打包文件"
+    },
+    "variant_cache_max_mb": {
+        "type": "integer",
+        "default": 512,
+        "minimum": 16,
+        "maximum": 102400,
+        "description": "图片变体（缩放/转码后的截图）磁盘缓存上限（MB），超出后淘汰最久未使用的变体"
     },
     
     # 界面配置
@@ -6,7 +6,7 @@
 
 import sqlite3
 from collections import namedtuple
-from typing import List, Optional, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any, Callable
 
 from memococo.config import db_path, logger
 from memococo.common.db_manager import DatabaseManager
@@ -16,10 +16,36 @@ from memococo.common.error_handler import DatabaseError, safe_call
 DatabaseManager.initialize(db_path)
 
 # 定义数据结构
-Entry = namedtuple("Entry", ["id", "app", "title", "text", "timestamp", "jsontext"])
+# monitor 为显示器编号，截图以 (timestamp, monitor) 为键（见frame_store模块）
+Entry = namedtuple("Entry", ["id", "app", "title", "text", "timestamp", "jsontext", "monitor"], defaults=(0,))
 
-def create_db() -> None:
-    """创建数据库表和索引"""
+# 条目变化监听器，内存中的索引（如OCR调度器）据此与数据库保持同步
+_entry_listeners: List[Callable[[str, int, Optional[int], bool], None]] = []
+
+
+def add_entry_listener(listener: Callable[[str, int, Optional[int], bool], None]) -> None:
+    """注册条目变化监听器
+
+    Args:
+        listener: 回调函数，参数为 (事件, 条目ID, 时间戳, 是否需要OCR)；
+            事件为 "insert"、"update" 或 "remove"，update 和 remove 时时间戳为None
+    """
+    _entry_listeners.append(listener)
+
+
+def _notify_entry_listeners(event: str, entry_id: int, timestamp: Optional[int] = None, pending: bool = False) -> None:
+    for listener in list(_entry_listeners):
+        try:
+            listener(event, entry_id, timestamp, pending)
+        except Exception as e:
+            logger.warning(f"条目变化监听器执行失败: {e}")
+
+def create_schema() -> None:
+    """创建数据库表、索引和触发器，不执行VACUUM
+
+    与正在运行的应用同时执行的命令（如 memococo-ocr-backfill）使用本函数初始化：
+    VACUUM会重写整个数据库并独占数据库，阻塞截图写入
+    """
     try:
         with DatabaseManager.transaction() as conn:
             c = conn.cursor()
@@ -31,21 +57,179 @@ def create_db() -> None:
                     title TEXT,
                     text TEXT,
                     timestamp INTEGER,
-                    jsontext TEXT)"""
+                    jsontext TEXT,
+                    monitor INTEGER NOT NULL DEFAULT 0)"""
             )
+            # 旧数据库没有显示器编号列，已有的截图为拼接后的整个屏幕（编号0）
+            c.execute("PRAGMA table_info(entries)")
+            if "monitor" not in [row[1] for row in c.fetchall()]:
+                c.execute("ALTER TABLE entries ADD COLUMN monitor INTEGER NOT NULL DEFAULT 0")
 
             # 添加索引以提高查询性能
             c.execute("CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries(timestamp)")
             c.execute("CREATE INDEX IF NOT EXISTS idx_entries_app ON entries(app)")
             c.execute("CREATE INDEX IF NOT EXISTS idx_entries_text ON entries(text)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_entries_monitor ON entries(monitor, timestamp)")
+            # 同一次截图中各显示器的截图使用相同的时间戳，截图以 (时间戳, 显示器编号) 唯一确定
+            try:
+                c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_entries_frame ON entries(timestamp, monitor)")
+            except sqlite3.IntegrityError:
+                logger.warning("数据库中有重复的 (时间戳, 显示器编号) 条目，未创建唯一索引")
 
-            # 执行VACUUM操作优化数据库
-            c.execute("VACUUM")
+            # OCR结果缓存（见ocr_cache模块），以截图感知哈希为键
+            c.execute(
+                """CREATE TABLE IF NOT EXISTS ocr_cache
+                   (hash TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    ocr_seconds REAL NOT NULL DEFAULT 0,
+                    last_used INTEGER,
+                    hits INTEGER NOT NULL DEFAULT 0)"""
+            )
+            c.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache(last_used)")
+
+            # 存储目录和OCR任务表
+            _create_storage_catalog(c)
+            _create_ocr_jobs(c)
     except Exception as e:
         logger.error(f"创建数据库失败: {e}")
         raise DatabaseError(f"创建数据库失败: {e}")
 
 
+def create_db() -> None:
+    """创建数据库表和索引，并执行VACUUM优化数据库"""
+    create_schema()
+    try:
+        with DatabaseManager.transaction() as conn:
+            # VACUUM不能在事务中执行，表结构已在 create_schema 中提交
+            conn.execute("VACUUM")
+    except Exception as e:
+        logger.error(f"优化数据库失败: {e}")
+        raise DatabaseError(f"优化数据库失败: {e}")
+
+
+# 截图日期目录键（与 screenshots/YYYY/MM/DD 目录结构一致），按本地时间计算
+_DAY_KEY_SQL = "strftime('%Y/%m/%d', {0}.timestamp, 'unixepoch', 'localtime')"
+# 判断条目是否待OCR
+_PENDING_SQL = "({0}.text IS NULL OR {0}.text = '')"
+
+
+def _create_storage_catalog(c: sqlite3.Cursor) -> None:
+    """创建存储目录表（storage_days）及维护每天条目数的触发器
+
+    文件数量、占用空间和归档状态由截图、归档代码增量更新（见storage_catalog模块），
+    每天的条目数由entries表上的触发器维护，任何代码路径修改条目都会同步更新。
+    待OCR数在查询时按OCR任务表统计（见storage_catalog.get_storage_days），与OCR任务的状态一致
+    """
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS storage_days
+           (day TEXT PRIMARY KEY,
+            file_count INTEGER NOT NULL DEFAULT 0,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            archived INTEGER NOT NULL DEFAULT 0,
+            scanned INTEGER NOT NULL DEFAULT 0,
+            entry_count INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER)"""
+    )
+
+    c.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_storage_days_insert'")
+    row = c.fetchone()
+    if row is not None:
+        if "ocr_pending" not in row[0]:
+            return
+        # 旧版本的触发器还维护待OCR数（不区分已失败的OCR任务），重新创建
+        for name in ("trg_storage_days_insert", "trg_storage_days_delete", "trg_storage_days_update"):
+            c.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    new_day, old_day = _DAY_KEY_SQL.format("NEW"), _DAY_KEY_SQL.format("OLD")
+    c.execute(
+        f"""CREATE TRIGGER trg_storage_days_insert AFTER INSERT ON entries
+            BEGIN
+                INSERT OR IGNORE INTO storage_days (day) VALUES ({new_day});
+                UPDATE storage_days SET entry_count = entry_count + 1 WHERE day = {new_day};
+            END"""
+    )
+    c.execute(
+        f"""CREATE TRIGGER trg_storage_days_delete AFTER DELETE ON entries
+            BEGIN
+                UPDATE storage_days SET entry_count = entry_count - 1 WHERE day = {old_day};
+            END"""
+    )
+    c.execute(
+        f"""CREATE TRIGGER trg_storage_days_update AFTER UPDATE OF timestamp ON entries
+            BEGIN
+                UPDATE storage_days SET entry_count = entry_count - 1 WHERE day = {old_day};
+                INSERT OR IGNORE INTO storage_days (day) VALUES ({new_day});
+                UPDATE storage_days SET entry_count = entry_count + 1 WHERE day = {new_day};
+            END"""
+    )
+
+    # 首次创建触发器时根据已有条目初始化每天的条目数
+    c.execute(
+        f"""INSERT INTO storage_days (day, entry_count)
+            SELECT {_DAY_KEY_SQL.format("entries")} AS entry_day, COUNT(*)
+            FROM entries WHERE true GROUP BY entry_day
+            ON CONFLICT(day) DO UPDATE SET entry_count = excluded.entry_count"""
+    )
+
+
+def _create_ocr_jobs(c: sqlite3.Cursor) -> None:
+    """创建OCR任务表（ocr_jobs，见ocr_jobs模块）及维护任务的触发器
+
+    插入未OCR的条目时创建任务，写入文本后标记完成，文本被清空时重新创建，删除条目时删除任务
+    """
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS ocr_jobs
+           (entry_id INTEGER PRIMARY KEY,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            lease_expires REAL,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            updated_at INTEGER)"""
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_ocr_jobs_state ON ocr_jobs(state, next_attempt_at)")
+
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_ocr_jobs_insert'")
+    if c.fetchone() is not None:
+        return
+
+    new_pending, old_pending = _PENDING_SQL.format("NEW"), _PENDING_SQL.format("OLD")
+    c.execute(
+        f"""CREATE TRIGGER trg_ocr_jobs_insert AFTER INSERT ON entries WHEN {new_pending}
+            BEGIN
+                INSERT OR REPLACE INTO ocr_jobs (entry_id, updated_at) VALUES (NEW.id, strftime('%s', 'now'));
+            END"""
+    )
+    c.execute(
+        f"""CREATE TRIGGER trg_ocr_jobs_done AFTER UPDATE OF text ON entries WHEN NOT {new_pending}
+            BEGIN
+                UPDATE ocr_jobs SET state = 'done', worker = NULL, lease_expires = NULL,
+                    updated_at = strftime('%s', 'now')
+                WHERE entry_id = NEW.id;
+            END"""
+    )
+    c.execute(
+        f"""CREATE TRIGGER trg_ocr_jobs_reset AFTER UPDATE OF text ON entries
+            WHEN {new_pending} AND NOT {old_pending}
+            BEGIN
+                INSERT OR REPLACE INTO ocr_jobs (entry_id, updated_at) VALUES (NEW.id, strftime('%s', 'now'));
+            END"""
+    )
+    c.execute(
+        """CREATE TRIGGER trg_ocr_jobs_delete AFTER DELETE ON entries
+            BEGIN
+                DELETE FROM ocr_jobs WHERE entry_id = OLD.id;
+            END"""
+    )
+
+    # 首次创建触发器时为已有的未OCR条目创建任务
+    c.execute(
+        f"""INSERT OR IGNORE INTO ocr_jobs (entry_id, updated_at)
+            SELECT id, strftime('%s', 'now') FROM entries WHERE {_PENDING_SQL.format("entries")}"""
+    )
+
+
 def get_all_entries(limit: int = 1000, offset: int = 0) -> List[Entry]:
     """获取所有条目，支持分页
 
@@ -67,7 +251,8 @@ def get_all_entries(limit: int = 1000, offset: int = 0) -> List[Entry]:
             result["title"],
             result["text"],
             result["timestamp"],
-            result["jsontext"]
+            result["jsontext"],
+            result["monitor"]
         ) for result in results]
     except Exception as e:
         logger.error(f"获取条目失败: {e}")
@@ -92,18 +277,101 @@ def get_timestamps() -> List[int]:
         return []
 
 
-def get_ocr_text(timestamp: int) -> str:
-    """获取指定时间戳的OCR文本
+def get_frames() -> List[Tuple[int, int]]:
+    """获取所有截图
+
+    Returns:
+        [(时间戳, 显示器编号)]，按时间降序排序
+    """
+    try:
+        results = DatabaseManager.execute(
+            "SELECT timestamp, monitor FROM entries ORDER BY timestamp DESC, monitor ASC"
+        )
+        return [(result["timestamp"], result["monitor"]) for result in results]
+    except Exception as e:
+        logger.error(f"获取截图列表失败: {e}")
+        return []
+
+
+def get_frames_in_range(start_timestamp: int, end_timestamp: int) -> List[Tuple[int, int]]:
+    """获取指定时间范围内的所有截图
+
+    Args:
+        start_timestamp: 开始时间戳（包含）
+        end_timestamp: 结束时间戳（包含）
+
+    Returns:
+        [(时间戳, 显示器编号)]，按时间升序排序
+    """
+    try:
+        results = DatabaseManager.execute(
+            "SELECT timestamp, monitor FROM entries WHERE timestamp >= ? AND timestamp <= ? "
+            "ORDER BY timestamp ASC, monitor ASC",
+            (start_timestamp, end_timestamp)
+        )
+        return [(result["timestamp"], result["monitor"]) for result in results]
+    except Exception as e:
+        logger.error(f"获取时间范围内的截图失败: {e}")
+        return []
+
+
+def get_timestamps_in_range(start_timestamp: int, end_timestamp: int) -> List[int]:
+    """获取指定时间范围内的所有时间戳
+
+    Args:
+        start_timestamp: 开始时间戳（包含）
+        end_timestamp: 结束时间戳（包含）
+
+    Returns:
+        时间戳列表，按时间升序排序
+    """
+    try:
+        results = DatabaseManager.execute(
+            "SELECT timestamp FROM entries WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp ASC",
+            (start_timestamp, end_timestamp)
+        )
+        return [result["timestamp"] for result in results]
+    except Exception as e:
+        logger.error(f"获取时间范围内的时间戳失败: {e}")
+        return []
+
+
+def get_monitor_frames(timestamp: int) -> List[Tuple[int, int]]:
+    """获取指定时刻每个显示器正在显示的截图
+
+    每个显示器只在画面变化时保存，某一时刻的完整桌面由各显示器在该时刻之前最近的一张截图组成。
+
+    Args:
+        timestamp: 时间戳
+
+    Returns:
+        [(显示器编号, 截图时间戳)]，按显示器编号排序；编号0为拼接后的整个屏幕（旧版本保存的截图）
+    """
+    try:
+        results = DatabaseManager.execute(
+            "SELECT monitor, MAX(timestamp) AS timestamp FROM entries WHERE timestamp <= ? "
+            "GROUP BY monitor ORDER BY monitor",
+            (timestamp,)
+        )
+        return [(result["monitor"], result["timestamp"]) for result in results]
+    except Exception as e:
+        logger.error(f"获取显示器截图失败: {e}")
+        return []
+
+
+def get_ocr_text(timestamp: int, monitor: int = 0) -> str:
+    """获取指定截图的OCR文本
 
     Args:
         timestamp: 时间戳
+        monitor: 显示器编号
 
     Returns:
         OCR文本或JSON文本
     """
     try:
         results = DatabaseManager.execute(
-            "SELECT text, jsontext FROM entries WHERE timestamp = ?", (timestamp,)
+            "SELECT text, jsontext FROM entries WHERE timestamp = ? AND monitor = ?", (timestamp, monitor)
         )
         if not results:
             return ""
@@ -155,7 +423,8 @@ def get_newest_empty_text() -> Optional[Entry]:
             result["title"],
             result["text"],
             result["timestamp"],
-            result["jsontext"]
+            result["jsontext"],
+            result["monitor"]
         )
     except Exception as e:
         logger.error(f"获取最新空文本条目失败: {e}")
@@ -163,14 +432,15 @@ def get_newest_empty_text() -> Optional[Entry]:
 
 
 def get_empty_text_count() -> int:
-    """获取需要OCR的条目总数
+    """获取需要OCR的条目总数（不包括OCR任务已失败的条目）
 
     Returns:
         需要OCR的条目总数
     """
     try:
         results = DatabaseManager.execute(
-            "SELECT COUNT(*) as count FROM entries WHERE text = '' or text IS NULL"
+            "SELECT COUNT(*) as count FROM entries WHERE (text = '' or text IS NULL) "
+            "AND id NOT IN (SELECT entry_id FROM ocr_jobs WHERE state = 'failed')"
         )
         return results[0]["count"] if results else 0
     except Exception as e:
@@ -203,7 +473,8 @@ def get_batch_empty_text(batch_size: int = 5, oldest_first: bool = True) -> List
             result["title"],
             result["text"],
             result["timestamp"],
-            result["jsontext"]
+            result["jsontext"],
+            result["monitor"]
         ) for result in results]
     except Exception as e:
         logger.error(f"批量获取空文本条目失败: {e}")
@@ -257,13 +528,89 @@ def get_empty_text_in_range(start_timestamp: int, end_timestamp: int, limit: int
             result["title"],
             result["text"],
             result["timestamp"],
-            result["jsontext"]
+            result["jsontext"],
+            result["monitor"]
         ) for result in results]
     except Exception as e:
         logger.error(f"获取指定时间范围内的未OCR条目失败: {e}")
         return []
 
 
+def get_pending_ocr_runs() -> List[Tuple[int, int, int]]:
+    """获取所有未OCR条目及其所在的未覆盖区间编号（OCR调度器启动时载入）
+
+    区间编号为该条目之前已OCR条目的数量，编号相同的条目之间没有已OCR的条目。
+    OCR任务已失败的条目不再调度，视为已覆盖。
+
+    Returns:
+        (id, timestamp, 区间编号) 列表，按时间戳升序排序
+    """
+    try:
+        results = DatabaseManager.execute(
+            """SELECT id, timestamp, run FROM (
+                   SELECT id, timestamp, pending,
+                          SUM(1 - pending) OVER (ORDER BY timestamp, id ROWS UNBOUNDED PRECEDING) AS run
+                   FROM (
+                       SELECT e.id, e.timestamp,
+                              ((e.text = '' OR e.text IS NULL) AND IFNULL(j.state, '') != 'failed') AS pending
+                       FROM entries e LEFT JOIN ocr_jobs j ON j.entry_id = e.id
+                   )
+               ) WHERE pending ORDER BY timestamp, id"""
+        )
+        return [(result["id"], result["timestamp"], result["run"]) for result in results]
+    except Exception as e:
+        logger.error(f"获取未OCR区间失败: {e}")
+        return []
+
+
+def get_last_ocr_timestamp() -> Optional[int]:
+    """获取最新的已OCR条目时间戳
+
+    Returns:
+        时间戳，如果没有已OCR条目则返回None
+    """
+    try:
+        results = DatabaseManager.execute(
+            "SELECT MAX(timestamp) AS timestamp FROM entries WHERE text != ''"
+        )
+        return results[0]["timestamp"] if results else None
+    except Exception as e:
+        logger.error(f"获取最新已OCR时间戳失败: {e}")
+        return None
+
+
+def get_entries_by_ids(entry_ids: List[int]) -> List[Entry]:
+    """按ID批量获取条目
+
+    Args:
+        entry_ids: 条目ID列表
+
+    Returns:
+        条目列表，顺序与entry_ids一致，不存在的ID被忽略
+    """
+    if not entry_ids:
+        return []
+    try:
+        placeholders = ",".join("?" * len(entry_ids))
+        results = DatabaseManager.execute(
+            f"SELECT * FROM entries WHERE id IN ({placeholders})",
+            tuple(entry_ids)
+        )
+        by_id = {result["id"]: Entry(
+            result["id"],
+            result["app"],
+            result["title"],
+            result["text"],
+            result["timestamp"],
+            result["jsontext"],
+            result["monitor"]
+        ) for result in results}
+        return [by_id[entry_id] for entry_id in entry_ids if entry_id in by_id]
+    except Exception as e:
+        logger.error(f"按ID获取条目失败: {e}")
+        return []
+
+
 def update_entry_text(entry_id: int, text: str, jsontext: str) -> bool:
     """更新条目文本
 
@@ -280,6 +627,7 @@ def update_entry_text(entry_id: int, text: str, jsontext: str) -> bool:
             "UPDATE entries SET text = ?, jsontext = ? WHERE id = ?",
             (text, jsontext, entry_id)
         )
+        _notify_entry_listeners("update", entry_id, pending=not text)
         return True
     except Exception as e:
         logger.error(f"更新条目文本失败: {e}")
@@ -300,13 +648,14 @@ def remove_entry(entry_id: int) -> bool:
             "DELETE FROM entries WHERE id = ?",
             (entry_id,)
         )
+        _notify_entry_listeners("remove", entry_id)
         return True
     except Exception as e:
         logger.error(f"删除条目失败: {e}")
         return False
 
 
-def insert_entry(jsontext: str, timestamp: int, text: str, app: str, title: str) -> bool:
+def insert_entry(jsontext: str, timestamp: int, text: str, app: str, title: str, monitor: int = 0) -> bool:
     """插入条目
 
     Args:
@@ -315,15 +664,19 @@ def insert_entry(jsontext: str, timestamp: int, text: str, app: str, title: str)
         text: 文本内容
         app: 应用程序名称
         title: 标题
+        monitor: 显示器编号（从1开始），0表示拼接后的整个屏幕
 
     Returns:
         操作是否成功
     """
     try:
-        DatabaseManager.execute(
-            "INSERT INTO entries (jsontext, timestamp, text, app, title) VALUES (?, ?, ?, ?, ?)",
-            (jsontext, timestamp, text, app, title)
-        )
+        with DatabaseManager.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO entries (jsontext, timestamp, text, app, title, monitor) VALUES (?, ?, ?, ?, ?, ?)",
+                (jsontext, timestamp, text, app, title, monitor)
+            )
+            entry_id = cursor.lastrowid
+        _notify_entry_listeners("insert", entry_id, timestamp, not text)
         return True
     except Exception as e:
         logger.error(f"插入条目失败: {e}")
@@ -374,7 +727,8 @@ def search_entries(keywords: List[str], app: str = None, limit: int = 100, offse
             result["title"],
             result["text"],
             result["timestamp"],
-            result["jsontext"]
+            result["jsontext"],
+            result["monitor"]
         ) for result in results]
     except Exception as e:
         logger.error(f"搜索条目失败: {e}")
@@ -401,6 +755,7 @@ def update_entries_text_batch(updates: List[Tuple[int, str, str]]) -> int:
                     "UPDATE entries SET text = ?, jsontext = ? WHERE id = ?",
                     (text, jsontext, entry_id)
                 )
+                _notify_entry_listeners("update", entry_id, pending=not text)
                 success_count += 1
             except Exception as e:
                 logger.error(f"更新条目 {entry_id} 失败: {e}")
@@ -429,6 +784,7 @@ def remove_entries_batch(entry_ids: List[int]) -> int:
         for entry_id in entry_ids:
             try:
                 DatabaseManager.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+                _notify_entry_listeners("remove", entry_id)
                 success_count += 1
             except Exception as e:
                 logger.error(f"删除条目 {entry_id} 失败: {e}")
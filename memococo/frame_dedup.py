@@ -0,0 +1,125 @@
+"""
+截图去重模块
+
+切换回内容没有变化的窗口时，截图线程会因为切换了窗口而强制保存，再写入并OCR一张与几分钟前几乎相同的无损截图。
+本模块按窗口（显示器、应用、标题）记录最近保存的几张截图的签名（monitor_tracker.frame_signature），
+新截图与其中一张几乎相同时，截图线程只写入一条引用（frame_store.save_frame_ref）和数据库记录，
+复用被引用截图的图片和OCR文本。
+
+判断几乎相同时，活动窗口区域的每个格子（motion_detector.cell_differences）都不能有明显差异，
+窗口之外只允许极少数格子不同（例如面板上的时钟）。只闪烁的光标不足以视为差异。
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Hashable, Optional
+
+import numpy as np
+
+from memococo.motion_detector import cell_differences
+
+# 格子平均灰度差超过该值视为不同（闪烁的光标约为2.5，改变一个单词约为7）
+CELL_DIFF = 4.0
+# 窗口之外允许不同的格子数（每个格子为画面上64×64像素，例如面板上的时钟）
+OUTSIDE_CELLS = 4
+# 每个窗口记住的截图数
+FRAMES_PER_WINDOW = 4
+# 记住的窗口数
+MAX_WINDOWS = 64
+
+
+def near_identical(window: np.ndarray, other_window: np.ndarray,
+                   monitor: np.ndarray, other_monitor: np.ndarray) -> bool:
+    """判断两张截图是否几乎相同
+
+    Args:
+        window: 活动窗口画面的签名
+        other_window: 另一张截图的活动窗口签名
+        monitor: 显示器画面的签名
+        other_monitor: 另一张截图的显示器签名
+
+    Returns:
+        窗口内没有不同的格子，且窗口之外不同的格子不超过 OUTSIDE_CELLS 个
+    """
+    if window.shape != other_window.shape or monitor.shape != other_monitor.shape:
+        return False
+    if (cell_differences(other_window, window) > CELL_DIFF).any():
+        return False
+    return int((cell_differences(other_monitor, monitor) > CELL_DIFF).sum()) <= OUTSIDE_CELLS
+
+
+class RecentFrameCache:
+    """按窗口记录最近保存的截图签名"""
+
+    def __init__(self, frames_per_window: int = FRAMES_PER_WINDOW, max_windows: int = MAX_WINDOWS):
+        self.frames_per_window = frames_per_window
+        self.max_windows = max_windows
+        self._windows: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.references = 0
+
+    def find(self, key: Hashable, window: np.ndarray, monitor: np.ndarray) -> Optional[int]:
+        """查找与新截图几乎相同的已保存截图
+
+        Args:
+            key: 窗口标识（显示器、应用、标题）
+            window: 活动窗口画面的签名
+            monitor: 显示器画面的签名
+
+        Returns:
+            已保存截图的时间戳，没有时返回None
+        """
+        with self._lock:
+            self.lookups += 1
+            frames = self._windows.get(key)
+            if not frames:
+                return None
+            self._windows.move_to_end(key)
+            for timestamp, other_window, other_monitor in reversed(frames):
+                if near_identical(window, other_window, monitor, other_monitor):
+                    self.references += 1
+                    return timestamp
+            return None
+
+    def add(self, key: Hashable, window: np.ndarray, monitor: np.ndarray, timestamp: int):
+        """记录新保存的截图
+
+        Args:
+            key: 窗口标识
+            window: 活动窗口画面的签名
+            monitor: 显示器画面的签名
+            timestamp: 截图时间戳
+        """
+        with self._lock:
+            frames = self._windows.get(key)
+            if frames is None:
+                frames = self._windows[key] = deque(maxlen=self.frames_per_window)
+                while len(self._windows) > self.max_windows:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+            frames.append((timestamp, window, monitor))
+
+    def stats(self) -> dict:
+        """去重统计：查找次数、写入的引用数和记住的窗口数"""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "references": self.references,
+                "windows": len(self._windows),
+            }
+
+
+_cache: Optional[RecentFrameCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_recent_frame_cache() -> RecentFrameCache:
+    """获取全局的最近截图缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RecentFrameCache()
+    return _cache
@@ -0,0 +1,120 @@
+"""
+截图抓取模块
+
+截图线程持有一个长期使用的mss句柄，不再每次截图都创建 mss.mss()（Linux上每次都要重新连接X服务器）。
+mss返回的BGRA数据不经过 np.array 复制，直接用 cv2.cvtColor 转换到预先分配的RGB缓冲区中，
+每个显示器轮流使用 RING_SIZE 个缓冲区，取代每次截图都分配一整张新数组的花式索引 [:, :, [2, 1, 0]]。
+
+返回的画面在同一显示器再截取 RING_SIZE - 1 次之后会被覆盖，需要长期保留时调用者应自行复制。
+mss句柄只能在创建它的线程中使用，get_frame_grabber 为每个线程分别创建。
+"""
+
+import threading
+from typing import Callable, Dict, List, Tuple
+
+import cv2
+import mss
+import numpy as np
+
+from memococo.config import logger
+
+# 每个显示器轮流使用的缓冲区数量：当前画面、上一张画面和一个余量
+RING_SIZE = 3
+
+
+class FrameGrabber:
+    """持久的mss截图器，画面写入轮流使用的预分配缓冲区"""
+
+    def __init__(self, ring_size: int = RING_SIZE, sct_factory: Callable = mss.mss):
+        """初始化
+
+        Args:
+            ring_size: 每个显示器轮流使用的缓冲区数量
+            sct_factory: 创建mss句柄的函数（测试时替换）
+        """
+        self.ring_size = ring_size
+        self._sct_factory = sct_factory
+        self._sct = None
+        self._buffers: Dict[int, List[np.ndarray]] = {}
+        self._next: Dict[int, int] = {}
+        self.grabs = 0
+        self.allocations = 0
+
+    def _handle(self):
+        if self._sct is None:
+            self._sct = self._sct_factory()
+        return self._sct
+
+    @property
+    def monitors(self) -> List[dict]:
+        """mss的显示器列表，第0项为拼接后的整个屏幕"""
+        return self._handle().monitors
+
+    def _buffer(self, index: int, height: int, width: int) -> np.ndarray:
+        ring = self._buffers.get(index)
+        if not ring or ring[0].shape[:2] != (height, width):
+            # 第一次截取该显示器或分辨率变化
+            ring = self._buffers[index] = []
+            self._next[index] = 0
+        position = self._next[index]
+        if position == len(ring):
+            ring.append(np.empty((height, width, 3), dtype=np.uint8))
+            self.allocations += 1
+        self._next[index] = (position + 1) % self.ring_size
+        return ring[position]
+
+    def grab(self, index: int) -> np.ndarray:
+        """截取一个显示器
+
+        Args:
+            index: mss显示器序号
+
+        Returns:
+            RGB画面（预分配缓冲区，之后会被覆盖）
+        """
+        try:
+            shot = self._handle().grab(self._handle().monitors[index])
+        except Exception:
+            # 显示器配置变化或与X服务器的连接断开，下次截图时重新创建句柄
+            self.reset()
+            raise
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        frame = self._buffer(index, shot.height, shot.width)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB, dst=frame)
+        self.grabs += 1
+        return frame
+
+    def grab_all(self, primary_only: bool = False) -> Tuple[List[int], List[np.ndarray], List[dict]]:
+        """截取每个显示器（不截取mss第0项拼接后的整个屏幕）或只截取主显示器
+
+        Returns:
+            (显示器编号列表, 画面列表, 对应的显示器区域列表)，显示器编号为mss的显示器序号（从1开始）
+        """
+        monitor_ids, frames, monitors = [], [], []
+        for index, monitor in enumerate(self.monitors):
+            if index == 0 or (primary_only and index != 1):
+                continue
+            monitor_ids.append(index)
+            frames.append(self.grab(index))
+            monitors.append(monitor)
+        return monitor_ids, frames, monitors
+
+    def reset(self):
+        """关闭mss句柄，下次截图时重新创建"""
+        sct, self._sct = self._sct, None
+        if sct is not None:
+            try:
+                sct.close()
+            except Exception as e:
+                logger.debug(f"关闭mss句柄失败: {e}")
+
+
+_local = threading.local()
+
+
+def get_frame_grabber() -> FrameGrabber:
+    """获取当前线程的截图器"""
+    grabber = getattr(_local, "grabber", None)
+    if grabber is None:
+        grabber = _local.grabber = FrameGrabber()
+    return grabber
@@ -0,0 +1,827 @@
+"""
+截图存储模块
+
+统一截图帧的写入和读取，截图线程、OCR加载、图片服务和归档都通过本模块访问截图。
+支持两种存储后端（配置项 storage_backend）：
+
+- files：每张截图一个文件（默认）
+    screenshots/YYYY/MM/DD/<截图名>.webp
+- pack：每天一个只追加的打包文件和定长记录的偏移索引
+    screenshots/YYYY/MM/DD/frames.pack
+    screenshots/YYYY/MM/DD/frames.idx
+  读取时通过mmap直接切片，不需要为每张截图打开文件。写入时先同步打包文件再追加索引记录，
+  崩溃后索引中超出打包文件末尾的记录被忽略，并在下次写入前从索引中删除
+
+截图以 (时间戳, 显示器编号) 为键，同一次截图中多个显示器的截图使用相同的时间戳。截图名（文件名、
+URL中使用）为 <timestamp>_<显示器编号>；显示器编号0为旧版本保存的拼接后的整个屏幕，截图名就是时间戳。
+打包索引和引用文件中的键把显示器编号存放在时间戳的高位（见 _record_key），旧版本写入的记录即编号0。
+
+pack后端同样可以读取目录中遗留的单文件截图，两种格式可以在同一天共存。
+已归档（转为视频）的日期由两种后端共用的视频读取逻辑处理。各显示器的分辨率和方向可能不同，
+每个显示器归档为单独的视频和映射文件（见 utils.archive_record_name）。
+
+与之前保存的截图几乎相同的截图（切换回内容没有变化的窗口）不再写入图片，只在截图所在日期目录的
+frames.ref 中追加一条引用记录（截图的键、被引用截图的键）。所有读取接口先通过 resolve_frame
+解析引用，引用文件不是图片，归档为视频和两种后端之间转换时原样保留，被引用的截图已归档时从视频中读取。
+"""
+
+import io
+import os
+import mmap
+import struct
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from memococo.config import logger, screenshots_path, get_settings
+from memococo.utils import ImageVideoTool, RECORD_NAME, archive_record_name, archive_mapping_files
+
+# 打包文件和索引文件名
+PACK_NAME = "frames.pack"
+INDEX_NAME = "frames.idx"
+# 引用文件名
+REF_NAME = "frames.ref"
+# 索引记录：截图的键(int64)、偏移(uint64)、长度(uint32)
+_INDEX_RECORD = struct.Struct("<qQI")
+INDEX_RECORD_SIZE = _INDEX_RECORD.size
+# 引用记录：截图的键(int64)、被引用截图的键(int64)
+_REF_RECORD = struct.Struct("<qq")
+# 记录中的键：低48位为时间戳，高位为显示器编号
+_MONITOR_SHIFT = 48
+# 同时保持打开的打包文件数量
+_MAX_OPEN_PACKS = 8
+# 截图文件扩展名
+FRAME_EXTENSION = ".webp"
+
+FrameData = Union[bytes, memoryview]
+# 截图的键：(时间戳, 显示器编号)
+FrameKey = Tuple[int, int]
+
+
+def frame_name(timestamp: int, monitor: int = 0) -> str:
+    """获取截图名（文件名和URL中使用）
+
+    Args:
+        timestamp: 截图时间戳
+        monitor: 显示器编号，0表示拼接后的整个屏幕（旧版本保存的截图）
+
+    Returns:
+        截图名，例如 "1713254400_2"，显示器编号为0时为时间戳
+    """
+    return f"{timestamp}_{monitor}" if monitor else str(timestamp)
+
+
+def parse_frame_name(name: str) -> FrameKey:
+    """解析截图名（可以带有扩展名）
+
+    Args:
+        name: 截图名，例如 "1713254400_2" 或 "1713254400.webp"
+
+    Returns:
+        (时间戳, 显示器编号)
+
+    Raises:
+        ValueError: 截图名格式错误时抛出
+    """
+    timestamp, _, monitor = name.split(".")[0].partition("_")
+    key = (int(timestamp), int(monitor) if monitor else 0)
+    if key[0] < 0 or key[1] < 0:
+        raise ValueError(f"Invalid frame name: {name}")
+    return key
+
+
+def _record_key(timestamp: int, monitor: int) -> int:
+    """打包索引和引用记录中的键"""
+    return timestamp | monitor << _MONITOR_SHIFT
+
+
+def _split_record_key(key: int) -> FrameKey:
+    return key & ((1 << _MONITOR_SHIFT) - 1), key >> _MONITOR_SHIFT
+
+
+def get_day_folder(timestamp: int) -> str:
+    """获取时间戳对应的截图日期目录
+
+    Args:
+        timestamp: 时间戳
+
+    Returns:
+        日期目录路径
+    """
+    return os.path.join(screenshots_path, datetime.datetime.fromtimestamp(timestamp).strftime("%Y/%m/%d"))
+
+
+def get_frame_file_path(timestamp: int, monitor: int = 0) -> str:
+    """获取单文件截图的路径
+
+    Args:
+        timestamp: 时间戳
+        monitor: 显示器编号
+
+    Returns:
+        截图文件路径
+    """
+    return os.path.join(get_day_folder(timestamp), f"{frame_name(timestamp, monitor)}{FRAME_EXTENSION}")
+
+
+def is_day_archived(folder: str) -> bool:
+    """判断日期目录是否已归档为视频
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        是否已归档
+    """
+    return bool(archive_mapping_files(folder))
+
+
+def find_webp_quality(image: Image.Image, target_size_kb: float) -> Tuple[int, bytes]:
+    """使用二分法查找使WebP编码结果接近目标大小的质量
+
+    Args:
+        image: PIL图像
+        target_size_kb: 目标大小（KB）
+
+    Returns:
+        (最佳质量, 对应的编码数据)
+    """
+    quality_low, quality_high = 10, 95
+    best_quality, best_data = quality_high, None
+
+    while quality_low <= quality_high:
+        mid_quality = (quality_low + quality_high) // 2
+        # 使用内存流测试压缩效果
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=mid_quality)
+        data = buffer.getvalue()
+        current_size_kb = len(data) / 1024
+
+        if abs(current_size_kb - target_size_kb) < 10:  # 允许10KB的误差
+            return mid_quality, data
+        elif current_size_kb > target_size_kb:
+            quality_high = mid_quality - 1
+        else:
+            quality_low = mid_quality + 1
+            best_quality, best_data = mid_quality, data  # 保存当前最佳质量
+
+    if best_data is None:
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=best_quality)
+        best_data = buffer.getvalue()
+    return best_quality, best_data
+
+
+def encode_frame(image: Image.Image, target_size_kb: Optional[float] = None) -> bytes:
+    """把截图编码为WebP数据
+
+    Args:
+        image: PIL图像
+        target_size_kb: 目标大小（KB），为None时无损编码；无损结果超过目标大小时改为有损压缩
+
+    Returns:
+        编码后的数据
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", lossless=True)
+    data = buffer.getvalue()
+    if target_size_kb is None or len(data) / 1024 <= target_size_kb:
+        return data
+    _, data = find_webp_quality(image, target_size_kb)
+    return data
+
+
+class FrameStore:
+    """截图存储后端基类，默认实现为每张截图一个文件"""
+
+    name = "files"
+
+    def save_frame(self, timestamp: int, data: bytes, monitor: int = 0) -> str:
+        """保存截图
+
+        Args:
+            timestamp: 截图时间戳
+            data: 编码后的WebP数据
+            monitor: 显示器编号
+
+        Returns:
+            截图所在位置的描述（文件路径或打包文件路径）
+        """
+        path = get_frame_file_path(timestamp, monitor)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再重命名，避免读取到写了一半的文件
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def get_frame_path(self, timestamp: int, monitor: int = 0) -> Optional[str]:
+        """获取截图的独立文件路径（可直接用send_file发送）
+
+        Args:
+            timestamp: 截图时间戳
+            monitor: 显示器编号
+
+        Returns:
+            文件路径，截图不是独立文件时返回None
+        """
+        path = get_frame_file_path(timestamp, monitor)
+        return path if os.path.exists(path) else None
+
+    def read_frame(self, timestamp: int, monitor: int = 0) -> Optional[Tuple[FrameData, str]]:
+        """读取未归档的截图数据
+
+        Args:
+            timestamp: 截图时间戳
+            monitor: 显示器编号
+
+        Returns:
+            (截图数据, 版本标识)，版本标识用于生成ETag；截图不存在时返回None
+        """
+        path = self.get_frame_path(timestamp, monitor)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                return f.read(), f"f-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        except OSError:
+            return None
+
+    def has_frame(self, timestamp: int, monitor: int = 0) -> bool:
+        """判断未归档的截图是否存在
+
+        Args:
+            timestamp: 截图时间戳
+            monitor: 显示器编号
+
+        Returns:
+            是否存在
+        """
+        return self.get_frame_path(timestamp, monitor) is not None
+
+    def export_day(self, folder: str) -> int:
+        """把日期目录中的截图全部导出为独立文件（归档前调用）
+
+        Args:
+            folder: 日期目录路径
+
+        Returns:
+            导出的截图数量
+        """
+        return 0
+
+    def discard_day(self, folder: str) -> None:
+        """删除日期目录中已导出的存储数据（归档完成后调用）
+
+        Args:
+            folder: 日期目录路径
+        """
+
+
+class _DayPack:
+    """单个日期目录的打包文件及其内存索引"""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.pack_path = os.path.join(folder, PACK_NAME)
+        self.index_path = os.path.join(folder, INDEX_NAME)
+        self.index: Dict[FrameKey, Tuple[int, int]] = {}
+        self._index_bytes = 0
+        # 索引中是否有超出打包文件末尾的记录（崩溃时打包文件的数据没有落盘）或写入中断留下的半条记录
+        self.dangling = False
+        self._mmap: Optional[mmap.mmap] = None
+
+    def refresh_index(self) -> None:
+        """增量读取索引文件中新追加的记录"""
+        try:
+            size = os.path.getsize(self.index_path)
+        except OSError:
+            return
+        # 只读取完整的记录，写入中断留下的半条记录会被忽略
+        if size % _INDEX_RECORD.size:
+            self.dangling = True
+            size -= size % _INDEX_RECORD.size
+        if size <= self._index_bytes:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_bytes)
+            chunk = f.read(size - self._index_bytes)
+        try:
+            pack_size = os.path.getsize(self.pack_path)
+        except OSError:
+            pack_size = 0
+        skipped = 0
+        for key, offset, length in _INDEX_RECORD.iter_unpack(chunk):
+            if offset + length > pack_size:
+                skipped += 1
+                continue
+            self.index[_split_record_key(key)] = (offset, length)
+        self._index_bytes = size
+        if skipped:
+            self.dangling = True
+            logger.warning(f"打包索引中有 {skipped} 条记录超出打包文件末尾，已忽略: {self.index_path}")
+
+    def rewrite_index(self) -> None:
+        """只保留有效记录重写索引文件
+
+        必须在追加新截图之前调用，否则新截图的数据可能落在被忽略的记录所指的位置上，
+        新的索引记录也会与半条记录错位
+        """
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for (timestamp, monitor), (offset, length) in sorted(self.index.items(), key=lambda item: item[1][0]):
+                f.write(_INDEX_RECORD.pack(_record_key(timestamp, monitor), offset, length))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._index_bytes = len(self.index) * _INDEX_RECORD.size
+        self.dangling = False
+
+    def read(self, offset: int, length: int) -> Optional[memoryview]:
+        """从打包文件中读取一段数据（返回mmap上的切片，不复制数据）"""
+        if self._mmap is None or offset + length > len(self._mmap):
+            self._remap()
+        if self._mmap is None or offset + length > len(self._mmap):
+            return None
+        return memoryview(self._mmap)[offset:offset + length]
+
+    def _remap(self) -> None:
+        """打包文件增长后重新映射"""
+        self.close()
+        try:
+            if os.path.getsize(self.pack_path) == 0:
+                return
+            with open(self.pack_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.warning(f"映射打包文件失败 {self.pack_path}: {e}")
+            self.close()
+
+    def close(self) -> None:
+        """关闭映射"""
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 仍有切片在使用时无法关闭，交给垃圾回收处理
+                pass
+            self._mmap = None
+
+
+class PackFrameStore(FrameStore):
+    """每天一个只追加打包文件的存储后端"""
+
+    name = "pack"
+
+    def __init__(self):
+        self._packs: "OrderedDict[str, _DayPack]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _get_pack(self, folder: str) -> _DayPack:
+        """获取日期目录的打包文件对象（调用者需持有锁）"""
+        pack = self._packs.get(folder)
+        if pack is None:
+            pack = _DayPack(folder)
+            self._packs[folder] = pack
+            while len(self._packs) > _MAX_OPEN_PACKS:
+                _, evicted = self._packs.popitem(last=False)
+                evicted.close()
+        else:
+            self._packs.move_to_end(folder)
+        return pack
+
+    def _lookup(self, timestamp: int, monitor: int) -> Optional[Tuple[_DayPack, int, int]]:
+        """在索引中查找截图位置（调用者需持有锁）"""
+        folder = get_day_folder(timestamp)
+        pack = self._get_pack(folder)
+        location = pack.index.get((timestamp, monitor))
+        if location is None:
+            pack.refresh_index()
+            location = pack.index.get((timestamp, monitor))
+        if location is None:
+            return None
+        return pack, location[0], location[1]
+
+    def save_frame(self, timestamp: int, data: bytes, monitor: int = 0) -> str:
+        folder = get_day_folder(timestamp)
+        os.makedirs(folder, exist_ok=True)
+        with self._lock:
+            pack = self._get_pack(folder)
+            pack.refresh_index()
+            if pack.dangling:
+                pack.rewrite_index()
+            with open(pack.pack_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+                # 数据落盘后再写索引，崩溃后索引不会指向没有写入的数据
+                f.flush()
+                os.fsync(f.fileno())
+            with open(pack.index_path, "ab") as f:
+                f.write(_INDEX_RECORD.pack(_record_key(timestamp, monitor), offset, len(data)))
+        return pack.pack_path
+
+    def read_frame(self, timestamp: int, monitor: int = 0) -> Optional[Tuple[FrameData, str]]:
+        with self._lock:
+            found = self._lookup(timestamp, monitor)
+            if found is not None:
+                pack, offset, length = found
+                data = pack.read(offset, length)
+                if data is not None:
+                    return data, f"p-{offset:x}-{length:x}"
+        # 转换前遗留的单文件截图
+        return super().read_frame(timestamp, monitor)
+
+    def has_frame(self, timestamp: int, monitor: int = 0) -> bool:
+        with self._lock:
+            if self._lookup(timestamp, monitor) is not None:
+                return True
+        return super().has_frame(timestamp, monitor)
+
+    def list_day(self, folder: str) -> List[FrameKey]:
+        """列出打包文件中的全部截图
+
+        Args:
+            folder: 日期目录路径
+
+        Returns:
+            按时间排序的 (时间戳, 显示器编号) 列表
+        """
+        with self._lock:
+            pack = self._get_pack(folder)
+            pack.refresh_index()
+            return sorted(pack.index)
+
+    def export_day(self, folder: str) -> int:
+        count = 0
+        for timestamp, monitor in self.list_day(folder):
+            path = os.path.join(folder, f"{frame_name(timestamp, monitor)}{FRAME_EXTENSION}")
+            if os.path.exists(path):
+                continue
+            found = self.read_frame(timestamp, monitor)
+            if found is None:
+                continue
+            with open(path, "wb") as f:
+                f.write(found[0])
+            # 归档按修改时间排序截图，保持与截图时间一致
+            os.utime(path, (timestamp, timestamp))
+            count += 1
+        return count
+
+    def discard_day(self, folder: str) -> None:
+        with self._lock:
+            pack = self._packs.pop(folder, None)
+            if pack is not None:
+                pack.close()
+            for name in (PACK_NAME, INDEX_NAME):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except FileNotFoundError:
+                    pass
+
+
+class _DayRefs:
+    """单个日期目录的截图引用及其内存索引"""
+
+    def __init__(self, folder: str):
+        self.path = os.path.join(folder, REF_NAME)
+        self.refs: Dict[FrameKey, FrameKey] = {}
+        self._bytes = 0
+
+    def refresh(self) -> None:
+        """增量读取引用文件中新追加的记录"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        size -= size % _REF_RECORD.size
+        if size <= self._bytes:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._bytes)
+            chunk = f.read(size - self._bytes)
+        for key, target in _REF_RECORD.iter_unpack(chunk):
+            self.refs[_split_record_key(key)] = _split_record_key(target)
+        self._bytes = size
+
+
+_day_refs: "OrderedDict[str, _DayRefs]" = OrderedDict()
+_refs_lock = threading.Lock()
+
+
+def _get_day_refs(folder: str) -> _DayRefs:
+    """获取日期目录的引用索引（调用者需持有锁）"""
+    refs = _day_refs.get(folder)
+    if refs is None:
+        refs = _day_refs[folder] = _DayRefs(folder)
+        while len(_day_refs) > _MAX_OPEN_PACKS:
+            _day_refs.popitem(last=False)
+    else:
+        _day_refs.move_to_end(folder)
+    return refs
+
+
+def resolve_frame(timestamp: int, monitor: int = 0) -> FrameKey:
+    """解析截图引用
+
+    Args:
+        timestamp: 截图时间戳
+        monitor: 显示器编号
+
+    Returns:
+        实际保存图片的截图 (时间戳, 显示器编号)，不是引用时返回原截图
+    """
+    key = (timestamp, monitor)
+    with _refs_lock:
+        refs = _get_day_refs(get_day_folder(timestamp))
+        target = refs.refs.get(key)
+        if target is None:
+            refs.refresh()
+            target = refs.refs.get(key)
+    return key if target is None else target
+
+
+def save_frame_ref(timestamp: int, target: int, monitor: int = 0, target_monitor: Optional[int] = None) -> str:
+    """保存对已有截图的引用，不写入图片
+
+    Args:
+        timestamp: 新截图的时间戳
+        target: 被引用截图的时间戳（本身是引用时指向它引用的截图，引用不会形成链）
+        monitor: 新截图的显示器编号
+        target_monitor: 被引用截图的显示器编号，默认与新截图相同
+
+    Returns:
+        引用文件路径
+    """
+    target = resolve_frame(target, monitor if target_monitor is None else target_monitor)
+    folder = get_day_folder(timestamp)
+    os.makedirs(folder, exist_ok=True)
+    with _refs_lock:
+        refs = _get_day_refs(folder)
+        with open(refs.path, "ab") as f:
+            f.write(_REF_RECORD.pack(_record_key(timestamp, monitor), _record_key(*target)))
+        refs.refresh()
+    return refs.path
+
+
+_store: Optional[FrameStore] = None
+_pack_reader: Optional[PackFrameStore] = None
+_store_lock = threading.Lock()
+
+
+def get_frame_store() -> FrameStore:
+    """获取当前配置的截图存储后端
+
+    Returns:
+        截图存储后端
+    """
+    global _store
+    backend = get_settings().get("storage_backend", "files")
+    with _store_lock:
+        if _store is None or _store.name != backend:
+            _store = PackFrameStore() if backend == "pack" else FrameStore()
+        return _store
+
+
+def _get_pack_reader() -> PackFrameStore:
+    """获取用于读取打包文件的存储对象（files后端下也需要读取已转换的日期）"""
+    store = get_frame_store()
+    if isinstance(store, PackFrameStore):
+        return store
+    global _pack_reader
+    with _store_lock:
+        if _pack_reader is None:
+            _pack_reader = PackFrameStore()
+        return _pack_reader
+
+
+def save_frame(timestamp: int, data: bytes, monitor: int = 0) -> str:
+    """使用当前后端保存截图
+
+    Args:
+        timestamp: 截图时间戳
+        data: 编码后的WebP数据
+        monitor: 显示器编号
+
+    Returns:
+        截图所在位置
+    """
+    return get_frame_store().save_frame(timestamp, data, monitor)
+
+
+def read_frame(timestamp: int, monitor: int = 0) -> Optional[Tuple[FrameData, str]]:
+    """读取未归档的截图（单文件或打包文件）
+
+    Args:
+        timestamp: 截图时间戳
+        monitor: 显示器编号
+
+    Returns:
+        (截图数据, 版本标识)，截图不存在时返回None
+    """
+    # pack读取器同时兼容单文件截图，切换后端后历史数据仍可读取
+    return _get_pack_reader().read_frame(*resolve_frame(timestamp, monitor))
+
+
+def get_frame_path(timestamp: int, monitor: int = 0) -> Optional[str]:
+    """获取截图的独立文件路径
+
+    Args:
+        timestamp: 截图时间戳
+        monitor: 显示器编号
+
+    Returns:
+        文件路径，截图不是独立文件时返回None
+    """
+    return get_frame_store().get_frame_path(*resolve_frame(timestamp, monitor))
+
+
+def frame_exists(timestamp: int, monitor: int = 0) -> bool:
+    """判断截图是否可以读取（包括已归档的视频帧）
+
+    Args:
+        timestamp: 截图时间戳
+        monitor: 显示器编号
+
+    Returns:
+        是否存在
+    """
+    timestamp, monitor = resolve_frame(timestamp, monitor)
+    if _get_pack_reader().has_frame(timestamp, monitor):
+        return True
+    return is_day_archived(get_day_folder(timestamp))
+
+
+def query_archived_frame(timestamp: int, monitor: int = 0) -> Optional[io.BytesIO]:
+    """从已归档的视频中提取截图
+
+    Args:
+        timestamp: 截图时间戳（已解析引用）
+        monitor: 显示器编号
+
+    Returns:
+        JPEG数据流，该日期未归档或视频中没有该截图时返回None
+    """
+    folder = get_day_folder(timestamp)
+    mapping_file = get_archive_mapping(folder, monitor)
+    if mapping_file is None:
+        return None
+    record_name = os.path.basename(mapping_file)[:-len(".csv")]
+    # 按完整文件名查询，避免 <timestamp>.webp 匹配到同一时刻其他显示器的 <timestamp>_<编号>.webp
+    return ImageVideoTool(folder, record_name).query_image(f"{frame_name(timestamp, monitor)}{FRAME_EXTENSION}")
+
+
+def get_archive_mapping(folder: str, monitor: int = 0) -> Optional[str]:
+    """获取显示器的截图所在的归档映射文件
+
+    Args:
+        folder: 日期目录路径
+        monitor: 显示器编号
+
+    Returns:
+        映射文件路径，该日期未归档时返回None。按显示器分别归档之前，所有显示器的截图都在 record.mp4 中
+    """
+    for record_name in (archive_record_name(monitor), RECORD_NAME):
+        mapping_file = os.path.join(folder, f"{record_name}.csv")
+        if os.path.exists(mapping_file):
+            return mapping_file
+    return None
+
+
+def load_frame_image(timestamp: int, draft_size: Optional[Tuple[int, int]] = None,
+                     monitor: int = 0) -> Optional[Image.Image]:
+    """加载截图（单文件、打包文件或已归档的视频帧）
+
+    Args:
+        timestamp: 截图时间戳
+        draft_size: 目标尺寸提示，已归档的JPEG帧会据此在解码时直接按1/2、1/4、1/8缩小
+        monitor: 显示器编号
+
+    Returns:
+        PIL图像，截图不存在时返回None
+    """
+    timestamp, monitor = resolve_frame(timestamp, monitor)
+    found = read_frame(timestamp, monitor)
+    if found is not None:
+        with Image.open(io.BytesIO(found[0])) as img:
+            img.load()
+            return img.copy()
+
+    byte_stream = query_archived_frame(timestamp, monitor)
+    if byte_stream is None:
+        return None
+    image = Image.open(byte_stream)
+    if draft_size is not None:
+        image.draft("RGB", draft_size)
+    return image
+
+
+def prepare_day_for_archive(folder: str) -> int:
+    """归档前把打包文件中的截图导出为独立文件，供视频编码使用
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        导出的截图数量
+    """
+    return _get_pack_reader().export_day(folder)
+
+
+def archive_day(folder: str) -> int:
+    """把日期目录中的截图归档为视频，每个显示器一个视频和映射文件
+
+    一个视频只有一种画面尺寸，不同分辨率或方向的显示器的截图放在同一个视频中会被缩放变形
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        生成的视频数量
+    """
+    prepare_day_for_archive(folder)
+    groups: Dict[int, List[str]] = {}
+    for name in os.listdir(folder):
+        if not name.endswith(FRAME_EXTENSION):
+            continue
+        try:
+            _, monitor = parse_frame_name(name)
+        except ValueError:
+            # 不是截图名的图片沿用原来的方式放入 record.mp4
+            monitor = 0
+        groups.setdefault(monitor, []).append(name)
+    if not groups:
+        raise FileNotFoundError("No valid images found in folder")
+
+    for monitor, images in sorted(groups.items()):
+        ImageVideoTool(folder, archive_record_name(monitor)).images_to_video(sort_by="time", images=images)
+    finish_day_archive(folder)
+    return len(groups)
+
+
+def finish_day_archive(folder: str) -> None:
+    """归档完成后删除该日期的打包文件
+
+    Args:
+        folder: 日期目录路径
+    """
+    if is_day_archived(folder):
+        _get_pack_reader().discard_day(folder)
+
+
+def convert_day_to_pack(folder: str) -> int:
+    """把日期目录中的单文件截图转换为打包文件
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        转换的截图数量
+    """
+    if is_day_archived(folder):
+        return 0
+    store = _get_pack_reader()
+    packed = set(store.list_day(folder))
+    frames = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not (entry.is_file() and entry.name.endswith(FRAME_EXTENSION)):
+                continue
+            try:
+                key = parse_frame_name(entry.name[:-len(FRAME_EXTENSION)])
+            except ValueError:
+                continue
+            frames.append((key, entry.path))
+    frames.sort()
+
+    count = 0
+    for key, path in frames:
+        if key not in packed:
+            with open(path, "rb") as f:
+                data = f.read()
+            if not data:
+                continue
+            store.save_frame(key[0], data, key[1])
+        # 写入打包文件后才删除原文件
+        os.remove(path)
+        count += 1
+    return count
+
+
+def convert_day_to_files(folder: str) -> int:
+    """把日期目录中的打包文件还原为单文件截图
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        还原的截图数量
+    """
+    store = _get_pack_reader()
+    count = store.export_day(folder)
+    store.discard_day(folder)
+    return count
@@ -0,0 +1,230 @@
+"""
+图片变体模块
+
+按需生成截图的缩放/转码版本（例如 /pictures/<截图名>.webp?w=800&fmt=jpeg&q=70），
+供移动端、远程访问等带宽受限的客户端使用。
+
+变体在后台工作线程池中生成，结果写入磁盘缓存目录：
+    appdata/cache/variants/YYYY/MM/DD/<截图名>_w<宽度>_q<质量>.<格式>
+缓存按总大小做LRU淘汰，同一变体的重复请求直接以静态文件返回。
+"""
+
+import os
+import datetime
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+from PIL import Image
+
+from memococo.config import logger, appdata_folder, get_settings
+from memococo.common.lru_cache import DiskLRUCache
+from memococo.frame_store import frame_name, load_frame_image
+
+# 变体缓存目录
+VARIANT_CACHE_DIR = os.path.join(appdata_folder, "cache", "variants")
+# 支持的输出格式：参数值 -> (PIL格式名, 文件扩展名, MIME类型)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "jpg": ("JPEG", "jpg", "image/jpeg"),
+    "png": ("PNG", "png", "image/png"),
+}
+# 宽度取值范围，宽度会向上取整到WIDTH_STEP的倍数，避免缓存中出现大量几乎相同的变体
+MIN_WIDTH = 32
+MAX_WIDTH = 7680
+WIDTH_STEP = 16
+# 默认质量
+DEFAULT_QUALITY = 80
+# 生成变体的工作线程数（PIL在缩放和编码时会释放GIL）
+VARIANT_WORKERS = 2
+# 等待变体生成的最长时间（秒）
+VARIANT_TIMEOUT = 30
+
+_executor: Optional[ThreadPoolExecutor] = None
+_disk_cache: Optional[DiskLRUCache] = None
+# 正在生成中的变体，相同变体的并发请求共用同一个任务
+_pending: Dict[str, Future] = {}
+_lock = threading.RLock()
+
+
+class VariantParams:
+    """规范化后的变体参数"""
+
+    __slots__ = ("width", "fmt", "quality")
+
+    def __init__(self, width: Optional[int], fmt: str, quality: int):
+        self.width = width
+        self.fmt = fmt
+        self.quality = quality
+
+    @property
+    def mimetype(self) -> str:
+        return VARIANT_FORMATS[self.fmt][2]
+
+
+def parse_variant_params(args) -> Optional[VariantParams]:
+    """从请求参数中解析变体参数
+
+    Args:
+        args: 请求参数（支持get方法的映射，例如request.args）
+
+    Returns:
+        变体参数，没有任何变体参数时返回None
+
+    Raises:
+        ValueError: 参数格式错误时抛出
+    """
+    width_arg = args.get("w")
+    fmt_arg = args.get("fmt")
+    quality_arg = args.get("q")
+    if width_arg is None and fmt_arg is None and quality_arg is None:
+        return None
+
+    width = None
+    if width_arg is not None:
+        width = int(width_arg)
+        if width <= 0:
+            raise ValueError("width must be positive")
+        width = min(max(width, MIN_WIDTH), MAX_WIDTH)
+        width = -(-width // WIDTH_STEP) * WIDTH_STEP
+
+    fmt = (fmt_arg or "webp").lower()
+    if fmt not in VARIANT_FORMATS:
+        raise ValueError(f"unsupported format: {fmt}")
+    if fmt == "jpg":
+        fmt = "jpeg"
+
+    quality = DEFAULT_QUALITY
+    if quality_arg is not None:
+        quality = min(max(int(quality_arg), 1), 100)
+    if fmt == "png":
+        # PNG为无损格式，质量参数没有意义，统一取值以共用缓存
+        quality = 100
+
+    return VariantParams(width, fmt, quality)
+
+
+def get_variant_path(timestamp: int, params: VariantParams, monitor: int = 0) -> str:
+    """获取变体在缓存目录中的路径
+
+    Args:
+        timestamp: 截图时间戳
+        params: 变体参数
+        monitor: 显示器编号
+
+    Returns:
+        变体文件路径
+    """
+    day = datetime.datetime.fromtimestamp(timestamp).strftime("%Y/%m/%d")
+    width = params.width if params.width is not None else 0
+    ext = VARIANT_FORMATS[params.fmt][1]
+    return os.path.join(VARIANT_CACHE_DIR, day, f"{frame_name(timestamp, monitor)}_w{width}_q{params.quality}.{ext}")
+
+
+def _get_disk_cache() -> DiskLRUCache:
+    """获取变体磁盘缓存（首次使用时根据配置创建）"""
+    global _disk_cache
+    with _lock:
+        if _disk_cache is None:
+            max_mb = get_settings().get("variant_cache_max_mb", 512)
+            _disk_cache = DiskLRUCache(VARIANT_CACHE_DIR, max_mb * 1024 * 1024)
+        return _disk_cache
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """获取变体生成线程池"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=VARIANT_WORKERS, thread_name_prefix="variant")
+        return _executor
+
+
+def render_variant(image: Image.Image, params: VariantParams) -> Image.Image:
+    """按变体参数缩放图像
+
+    Args:
+        image: 原始图像
+        params: 变体参数
+
+    Returns:
+        缩放后的图像（不放大，宽度不小于原图时返回原图）
+    """
+    if params.width is not None and params.width < image.width:
+        height = max(1, round(image.height * params.width / image.width))
+        # reducing_gap先用整数倍快速缩小，再做一次双线性插值，比直接缩放快数倍且质量接近
+        image = image.resize((params.width, height), Image.BILINEAR, reducing_gap=2.0)
+
+    pil_format = VARIANT_FORMATS[params.fmt][0]
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+    return image
+
+
+def _generate_variant(timestamp: int, monitor: int, params: VariantParams, variant_path: str) -> Optional[str]:
+    """生成变体文件（在工作线程中执行）"""
+    draft_size = (params.width, 1) if params.width is not None else None
+    image = load_frame_image(timestamp, draft_size=draft_size, monitor=monitor)
+    if image is None:
+        return None
+
+    image = render_variant(image, params)
+    os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+    # 先写临时文件再重命名，避免并发请求读到写了一半的文件
+    tmp_path = f"{variant_path}.tmp"
+    pil_format = VARIANT_FORMATS[params.fmt][0]
+    if pil_format == "PNG":
+        image.save(tmp_path, format=pil_format, compress_level=1)
+    else:
+        image.save(tmp_path, format=pil_format, quality=params.quality)
+    os.replace(tmp_path, variant_path)
+    _get_disk_cache().add(variant_path)
+    return variant_path
+
+
+def ensure_variant(timestamp: int, params: VariantParams, monitor: int = 0) -> Optional[str]:
+    """确保变体文件存在，不存在时在线程池中生成
+
+    Args:
+        timestamp: 截图时间戳
+        params: 变体参数
+        monitor: 显示器编号
+
+    Returns:
+        变体文件路径，原图不存在或生成失败时返回None
+    """
+    variant_path = get_variant_path(timestamp, params, monitor)
+    if _get_disk_cache().get(variant_path):
+        return variant_path
+
+    with _lock:
+        future = _pending.get(variant_path)
+        if future is None:
+            future = _get_executor().submit(_generate_variant, timestamp, monitor, params, variant_path)
+            _pending[variant_path] = future
+            future.add_done_callback(lambda done: _discard_pending(variant_path, done))
+
+    try:
+        return future.result(timeout=VARIANT_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"生成图片变体失败 {frame_name(timestamp, monitor)}: {e}")
+        return None
+
+
+def _discard_pending(variant_path: str, future: Future) -> None:
+    """从进行中的任务表中移除已完成的任务"""
+    with _lock:
+        if _pending.get(variant_path) is future:
+            del _pending[variant_path]
+
+
+def get_variant_cache_stats() -> Dict[str, Any]:
+    """获取变体缓存统计信息
+
+    Returns:
+        磁盘缓存统计信息
+    """
+    return _get_disk_cache().stats()
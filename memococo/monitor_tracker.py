@@ -0,0 +1,96 @@
+"""
+显示器变化跟踪模块
+
+多显示器时每个显示器分别判断画面是否变化，只编码、OCR和保存有变化的显示器，
+不再因为一个显示器变化就重新保存拼接后的整个屏幕。
+
+每个显示器保存一个签名：画面缩小为1/4后的灰度图。与该显示器上一次保存时的签名比较结构相似度
+（与 screenshot.is_similar 的计算方式相同），低于阈值视为变化。签名只在保存后更新，
+缓慢的变化会累积到超过阈值为止，不需要保留上一张完整画面。
+"""
+
+from typing import Dict, Iterable, List
+
+import cv2
+import numpy as np
+
+# 签名的缩小倍数
+SIGNATURE_SCALE = 4
+# 结构相似度不低于该值视为没有变化
+SIMILARITY_THRESHOLD = 0.9
+# SSIM常数（像素值范围255）
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    """计算画面签名（缩小后的灰度图）
+
+    Args:
+        frame: RGB画面
+
+    Returns:
+        float32灰度图
+    """
+    height, width = frame.shape[:2]
+    if height // SIGNATURE_SCALE >= 10 and width // SIGNATURE_SCALE >= 10:
+        frame = cv2.resize(frame, (width // SIGNATURE_SCALE, height // SIGNATURE_SCALE), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY).astype(np.float32)
+
+
+def signature_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """两个签名的结构相似度，尺寸不同（分辨率变化）时返回0"""
+    if first.shape != second.shape:
+        return 0.0
+    mu1, mu2 = float(first.mean()), float(second.mean())
+    sigma12 = float(np.mean((first - mu1) * (second - mu2)))
+    return ((2 * mu1 * mu2 + _C1) * (2 * sigma12 + _C2)) / (
+        (mu1 ** 2 + mu2 ** 2 + _C1) * (float(first.var()) + float(second.var()) + _C2)
+    )
+
+
+class MonitorTracker:
+    """按显示器编号记录上一次保存的画面签名"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._saved: Dict[int, np.ndarray] = {}
+        # 本次截图各显示器的签名（包括没有变化的显示器）
+        self.signatures: Dict[int, np.ndarray] = {}
+
+    def changed_monitors(self, monitor_ids: List[int], frames: List[np.ndarray],
+                         force: Iterable[int] = ()) -> Dict[int, np.ndarray]:
+        """找出画面有变化的显示器
+
+        与同一次截图中另一个要保存的显示器画面相同的显示器（镜像显示）不重复保存。
+
+        Args:
+            monitor_ids: 显示器编号
+            frames: 对应的画面
+            force: 没有变化也要保存的显示器（例如切换到了该显示器上的窗口）
+
+        Returns:
+            {显示器编号: 新签名}，保存后应调用 mark_saved
+        """
+        force = set(force)
+        # 拔掉的显示器不再跟踪，重新接入时作为新显示器保存
+        for monitor_id in set(self._saved) - set(monitor_ids):
+            del self._saved[monitor_id]
+        changed: Dict[int, np.ndarray] = {}
+        self.signatures = {}
+        for monitor_id, frame in zip(monitor_ids, frames):
+            signature = self.signatures[monitor_id] = frame_signature(frame)
+            previous = self._saved.get(monitor_id)
+            if monitor_id not in force and previous is not None \
+                    and signature_similarity(signature, previous) >= self.threshold:
+                continue
+            if any(signature_similarity(signature, other) >= self.threshold for other in changed.values()):
+                # 镜像显示的画面由另一个显示器保存
+                self._saved[monitor_id] = signature
+                continue
+            changed[monitor_id] = signature
+        return changed
+
+    def mark_saved(self, monitor_id: int, signature: np.ndarray):
+        """记录显示器画面已保存"""
+        self._saved[monitor_id] = signature
@@ -0,0 +1,249 @@
+"""
+持续变化检测模块
+
+播放视频、动画或滚动的构建日志时每次截图都与上一张不同，截图线程会以全速保存并OCR每一张截图，
+而这些截图对回忆几乎没有用处。本模块根据每次截图的画面签名（monitor_tracker.frame_signature）
+找出持续变化的区域：
+
+- 签名划分为 CELL × CELL 的格子，与上一次截图相比平均灰度差超过 CELL_THRESHOLD 的格子视为变化
+- 最近 HISTORY 次截图中至少 SUSTAINED 次变化的格子视为持续变化，持续变化的格子超过 MIN_AREA 时
+  该显示器处于持续变化状态，变化区域为这些格子的外接矩形
+
+处于持续变化状态的显示器每 motion_capture_interval 秒最多保存一张截图（切换窗口、用户输入后的截图不受限制），
+保存的截图OCR时遮盖变化区域，变化区域几乎占满画面时不即时OCR（由OCR任务队列在空闲时识别）。
+motion_exempt_apps 中的应用从不限制，motion_apps 中的应用（例如视频播放器）在前台时总是按持续变化处理。
+跳过的截图按已保存截图的平均大小和耗时估计节省的存储和CPU时间，每段持续变化结束时记录日志。
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from memococo.config import logger, get_settings
+
+# 签名格子的边长（签名像素，签名为画面的1/4，即画面上64像素）
+CELL = 16
+# 格子平均灰度差超过该值视为变化
+CELL_THRESHOLD = 8.0
+# 判断持续变化时参考的截图次数
+HISTORY = 5
+# 最近 HISTORY 次截图中至少变化这么多次的格子视为持续变化
+SUSTAINED = 4
+# 持续变化的格子占画面的比例超过该值时视为处于持续变化状态
+MIN_AREA = 0.05
+# 变化区域占画面的比例超过该值时不即时OCR
+OCR_SKIP_AREA = 0.9
+
+# 变化区域：(左, 上, 右, 下)，为画面宽高的比例
+Region = Tuple[float, float, float, float]
+
+
+def cell_differences(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """两个签名每个格子的平均灰度差
+
+    Args:
+        first: 上一次的签名
+        second: 本次的签名（尺寸相同）
+
+    Returns:
+        每个元素对应一个格子的数组（不足一个格子的边缘并入最后一行/列）
+    """
+    rows, cols = max(first.shape[0] // CELL, 1), max(first.shape[1] // CELL, 1)
+    diff = np.abs(second - first)
+    # 按格子边界求和，最后一行/列包含剩余的边缘像素
+    row_edges = np.arange(rows) * CELL
+    col_edges = np.arange(cols) * CELL
+    sums = np.add.reduceat(np.add.reduceat(diff, row_edges, axis=0), col_edges, axis=1)
+    heights = np.diff(np.append(row_edges, diff.shape[0]))
+    widths = np.diff(np.append(col_edges, diff.shape[1]))
+    return sums / np.outer(heights, widths)
+
+
+def changed_cells(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """两个签名之间变化的格子（平均灰度差超过 CELL_THRESHOLD）"""
+    return cell_differences(first, second) > CELL_THRESHOLD
+
+
+def region_area(region: Region) -> float:
+    """变化区域占画面的比例"""
+    left, top, right, bottom = region
+    return (right - left) * (bottom - top)
+
+
+def mask_region(frame: np.ndarray, region: Region) -> np.ndarray:
+    """返回遮盖了变化区域的画面副本（用于OCR，不修改原画面）"""
+    height, width = frame.shape[:2]
+    left, top, right, bottom = region
+    masked = frame.copy()
+    masked[int(top * height):int(np.ceil(bottom * height)), int(left * width):int(np.ceil(right * width))] = 255
+    return masked
+
+
+class MotionDetector:
+    """按显示器检测持续变化的区域，并限制这些显示器的保存频率"""
+
+    def __init__(self, clock: Callable = time.monotonic):
+        """初始化
+
+        Args:
+            clock: 单调时钟（测试时替换）
+        """
+        settings = get_settings()
+        self.capture_interval = settings.get("motion_capture_interval", 30)
+        self.exempt_apps = set(settings.get("motion_exempt_apps", []))
+        self.motion_apps = set(settings.get("motion_apps", []))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._previous: Dict[int, np.ndarray] = {}
+        self._history: Dict[int, deque] = {}
+        self._regions: Dict[int, Region] = {}
+        self._last_saved: Dict[int, float] = {}
+        # 每个显示器当前这段持续变化的 (开始时间, 跳过的截图数)
+        self._episodes: Dict[int, list] = {}
+        self.skipped = 0
+        self.masked_ocr = 0
+        self.skipped_ocr = 0
+        self._saved_frames = 0
+        self._saved_bytes = 0
+        self._saved_seconds = 0.0
+
+    def update(self, signatures: Dict[int, np.ndarray]):
+        """用本次截图各显示器的签名更新持续变化区域
+
+        Args:
+            signatures: {显示器编号: 签名}，不在其中的显示器（已拔掉）不再跟踪
+        """
+        now = self._clock()
+        with self._lock:
+            for monitor_id in set(self._previous) - set(signatures):
+                self._end_episode(monitor_id, now)
+                self._previous.pop(monitor_id, None)
+                self._history.pop(monitor_id, None)
+                self._last_saved.pop(monitor_id, None)
+            for monitor_id, signature in signatures.items():
+                previous = self._previous.get(monitor_id)
+                self._previous[monitor_id] = signature
+                history = self._history.setdefault(monitor_id, deque(maxlen=HISTORY))
+                if previous is None or previous.shape != signature.shape:
+                    # 第一次截取或分辨率变化
+                    history.clear()
+                    self._end_episode(monitor_id, now)
+                    continue
+                history.append(changed_cells(previous, signature))
+                region = self._sustained_region(history)
+                if region is None:
+                    self._end_episode(monitor_id, now)
+                    continue
+                if monitor_id not in self._regions:
+                    logger.debug(f"显示器{monitor_id}画面持续变化，区域: {region}")
+                    self._episodes[monitor_id] = [now, 0]
+                self._regions[monitor_id] = region
+
+    @staticmethod
+    def _sustained_region(history: deque) -> Optional[Region]:
+        if len(history) < SUSTAINED:
+            return None
+        sustained = np.sum(history, axis=0) >= SUSTAINED
+        if sustained.mean() < MIN_AREA:
+            return None
+        rows = np.flatnonzero(sustained.any(axis=1))
+        cols = np.flatnonzero(sustained.any(axis=0))
+        height, width = sustained.shape
+        return (cols[0] / width, rows[0] / height, (cols[-1] + 1) / width, (rows[-1] + 1) / height)
+
+    def _end_episode(self, monitor_id: int, now: float):
+        if self._regions.pop(monitor_id, None) is None:
+            return
+        started, skipped = self._episodes.pop(monitor_id, (now, 0))
+        if skipped:
+            saved_bytes, saved_seconds = self._estimate(skipped)
+            logger.info(f"显示器{monitor_id}持续变化结束（{now - started:.0f}秒），跳过 {skipped} 张截图，"
+                        f"估计节省 {saved_bytes / 1024 / 1024:.1f}MB 存储和 {saved_seconds:.1f} 秒CPU时间")
+
+    def _estimate(self, skipped: int) -> Tuple[float, float]:
+        if not self._saved_frames:
+            return 0.0, 0.0
+        return (skipped * self._saved_bytes / self._saved_frames,
+                skipped * self._saved_seconds / self._saved_frames)
+
+    def region(self, monitor_id: int, app: Optional[str] = None) -> Optional[Region]:
+        """显示器当前的持续变化区域，没有持续变化或应用不受限制时返回None"""
+        if app in self.exempt_apps:
+            return None
+        with self._lock:
+            return self._regions.get(monitor_id)
+
+    def should_save(self, monitor_id: int, app: Optional[str] = None, forced: bool = False) -> bool:
+        """画面有变化的显示器是否保存本次截图
+
+        Args:
+            monitor_id: 显示器编号
+            app: 显示器上的活动应用（活动窗口不在该显示器上时为None）
+            forced: 切换了窗口或用户输入后的截图，不受限制
+
+        Returns:
+            False 表示该显示器处于持续变化状态且距离上次保存不足 motion_capture_interval 秒
+        """
+        if forced or app in self.exempt_apps:
+            return True
+        now = self._clock()
+        with self._lock:
+            if monitor_id not in self._regions and app not in self.motion_apps:
+                return True
+            if now - self._last_saved.get(monitor_id, float("-inf")) >= self.capture_interval:
+                return True
+            self.skipped += 1
+            if monitor_id in self._episodes:
+                self._episodes[monitor_id][1] += 1
+            return False
+
+    def record_saved(self, monitor_id: int, size: int, seconds: float, ocr: Optional[str] = None):
+        """记录一次保存，用于限制保存频率和估计跳过截图节省的资源
+
+        Args:
+            monitor_id: 显示器编号
+            size: 保存的字节数（截图和缩略图）
+            seconds: OCR、编码和保存的耗时
+            ocr: 变化区域的处理方式，"masked"（遮盖后OCR）或 "skipped"（不即时OCR）
+        """
+        with self._lock:
+            self._last_saved[monitor_id] = self._clock()
+            self._saved_frames += 1
+            self._saved_bytes += size
+            self._saved_seconds += seconds
+            if ocr == "masked":
+                self.masked_ocr += 1
+            elif ocr == "skipped":
+                self.skipped_ocr += 1
+
+    def stats(self) -> dict:
+        """持续变化统计：处于持续变化状态的显示器、跳过的截图数和估计节省的存储与CPU时间"""
+        with self._lock:
+            saved_bytes, saved_seconds = self._estimate(self.skipped)
+            return {
+                "capture_interval": self.capture_interval,
+                "monitors": {str(monitor_id): [round(value, 3) for value in region]
+                             for monitor_id, region in self._regions.items()},
+                "skipped_frames": self.skipped,
+                "masked_ocr": self.masked_ocr,
+                "skipped_ocr": self.skipped_ocr,
+                "saved_bytes_estimate": int(saved_bytes),
+                "saved_cpu_seconds_estimate": round(saved_seconds, 1),
+            }
+
+
+_detector: Optional[MotionDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_motion_detector() -> MotionDetector:
+    """获取全局持续变化检测器"""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = MotionDetector()
+    return _detector
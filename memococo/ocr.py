@@ -1,45 +1,80 @@
 from memococo.config import logger
 import cv2
 import numpy as np
-from typing import List
+from typing import List, Optional
 import time
 
 # 导入OCR工厂模块
 from memococo.ocr_factory import (
     extract_text_from_image as factory_extract_text_from_image,
     extract_text_from_images_batch as factory_extract_text_from_images_batch,
+    recognize_text_lines as factory_recognize_text_lines,
+    TextLine,
     preprocess_image_for_ocr,
     check_umiocr_availability,
     get_ocr_engine,
     perform_ocr
 )
+from memococo.ocr_watchdog import get_ocr_watchdog, ocr_timeout
 
 # 兼容原有接口
-def extract_text_from_image(image: np.ndarray) -> str:
+def extract_text_from_image(image: np.ndarray, app: Optional[str] = None, title: Optional[str] = None) -> str:
     """从图像中提取文本
 
-    根据硬件环境自动选择最合适的OCR引擎
+    根据硬件环境自动选择最合适的OCR引擎，按截图所属应用选择OCR配置档。
+    识别在OCR看门狗的工作线程中执行，卡住的引擎不会阻塞调用者
 
     Args:
         image: 要处理的图像（NumPy数组）
+        app: 截图所属应用
+        title: 窗口标题
 
     Returns:
-        提取的文本，如果提取失败则返回空字符串
+        提取的文本，图像无效或引擎没有识别出文字时为空字符串
+
+    Raises:
+        OCRTimeoutError: 超过 ocr_timeout 秒未完成
+        OCREngineError: 没有可用的OCR引擎或识别出错
     """
-    return factory_extract_text_from_image(image)
+    return get_ocr_watchdog().run(factory_extract_text_from_image, image, app=app, title=title)
+
+def extract_text_lines(image: np.ndarray, app: Optional[str] = None) -> List[TextLine]:
+    """整图识别，返回带位置的文字行 (左, 上, 右, 下, 文本)
+
+    识别在OCR看门狗的工作线程中执行，卡住的引擎不会阻塞调用者
+
+    Args:
+        image: 要处理的图像（NumPy数组）
+        app: 截图所属应用
 
-def extract_text_from_images_batch(images: List[np.ndarray]) -> List[str]:
+    Returns:
+        按从上到下排序的文字行
+
+    Raises:
+        OCRTimeoutError: 超过 ocr_timeout 秒未完成
+    """
+    return get_ocr_watchdog().run(factory_recognize_text_lines, image, app=app)
+
+def extract_text_from_images_batch(images: List[np.ndarray], apps: Optional[List[Optional[str]]] = None,
+                                   titles: Optional[List[Optional[str]]] = None) -> List[str]:
     """批量从多个图像中提取文本
 
-    根据硬件环境自动选择最合适的OCR引擎
+    根据硬件环境自动选择最合适的OCR引擎，按截图所属应用选择OCR配置档
 
     Args:
         images: 要处理的图像列表（NumPy数组列表）
+        apps: 与images对应的应用列表
+        titles: 与images对应的窗口标题列表
 
     Returns:
-        提取的文本列表，如果某个图像提取失败则对应位置为空字符串
+        提取的文本列表，图像无效或引擎没有识别出文字时对应位置为空字符串
+
+    Raises:
+        OCRTimeoutError: 超过 ocr_timeout 秒（按图像数量累计）未完成
+        OCREngineError: 没有可用的OCR引擎或识别出错
     """
-    return factory_extract_text_from_images_batch(images)
+    return get_ocr_watchdog().run(factory_extract_text_from_images_batch, images, apps=apps, titles=titles,
+                                  timeout=ocr_timeout(len(images)))
 
 # 兼容原有接口
 def rapid_ocr(image: np.ndarray) -> List:
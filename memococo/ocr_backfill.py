@@ -0,0 +1,257 @@
+"""
+OCR积压批量补录工具
+
+截图时负载过高或处于省电模式的截图只在空闲时少量OCR，积压可能达到数万张。
+本工具不做负载检查、不在批次之间休眠，用多个工作线程在OCR任务队列（见ocr_jobs模块）中
+领取任务，适合在夜间运行。可以与MemoCoco同时运行，两者不会处理同一张截图。
+
+默认同时使用UmiOCR（可用时）和本地RapidOCR，按两者实际的吞吐量分配截图（见ocr_engines模块），
+默认工作线程数为两个引擎的并发数之和；--single-engine 只使用OCR引擎管理器当前选择的一个引擎。
+
+每张截图的结果识别完成后立即写入数据库，中断（Ctrl+C或进程被杀）后重新运行即可从中断处继续：
+中断时已领取但未处理的任务放回队列，被杀的进程持有的任务在下次启动时回收。
+
+用法：
+    memococo-ocr-backfill                                         # 处理全部积压
+    memococo-ocr-backfill --workers 8
+    memococo-ocr-backfill --since 2025-04-10 --until 2025-04-17   # 只处理指定日期范围
+    memococo-ocr-backfill --app code --app firefox --limit 1000
+    memococo-ocr-backfill --retry-failed                          # 同时重试已失败的截图
+    memococo-ocr-backfill --single-engine                         # 不同时使用UmiOCR和RapidOCR
+"""
+
+import os
+import sys
+import time
+import datetime
+import threading
+from collections import Counter
+
+from memococo.config import logger, build_arg_parser
+from memococo.database import create_schema, get_entries_by_ids
+from memococo.ocr_jobs import (
+    worker_id, claim_next_jobs, release_job, fail_job, count_pending_jobs,
+    reset_failed_jobs, reclaim_dead_workers, requeue_expired
+)
+from memococo.ocr_processor import process_ocr_task, store_ocr_result
+from memococo.ocr_engines import get_engine_manager, OCR_ENGINE_UMIOCR, OCR_ENGINE_RAPIDOCR
+
+# 进度输出间隔（秒）
+PROGRESS_INTERVAL = 10
+# 每个工作线程每次领取的任务数
+CLAIM_BATCH = 4
+
+
+class BackfillProgress:
+    """补录进度和吞吐量统计（多个工作线程共享）"""
+
+    def __init__(self, total, limit=None):
+        self.lock = threading.Lock()
+        self.total = total
+        self.limit = limit
+        self.reserved = 0
+        self.results = Counter()
+        self.per_worker = Counter()
+        self.ocr_seconds = 0.0
+        self.start_time = time.time()
+
+    def reserve(self, count):
+        """预留本次领取的数量（受 --limit 限制）
+
+        Returns:
+            可以领取的数量
+        """
+        with self.lock:
+            if self.limit is not None:
+                count = max(0, min(count, self.limit - self.reserved))
+            self.reserved += count
+            return count
+
+    def unreserve(self, count):
+        with self.lock:
+            self.reserved -= count
+
+    def record(self, worker, outcome, seconds):
+        """记录一张截图的处理结果
+
+        Args:
+            worker: 工作线程名
+            outcome: recognized、empty、deleted、timeout 或 failed
+            seconds: 处理耗时
+        """
+        with self.lock:
+            self.results[outcome] += 1
+            self.per_worker[worker] += 1
+            self.ocr_seconds += seconds
+
+    @property
+    def finished(self):
+        return sum(self.results.values())
+
+    def line(self):
+        """一行进度：已处理数、百分比、吞吐量和预计剩余时间"""
+        elapsed = time.time() - self.start_time
+        finished = self.finished
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total - finished)
+        eta = _format_duration(remaining / rate) if rate > 0 else "-"
+        percent = finished / self.total if self.total else 1.0
+        return (f"{finished}/{self.total} ({percent:.1%})  {rate:.2f} 张/秒  "
+                f"已用 {_format_duration(elapsed)}  预计剩余 {eta}")
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _parse_date(value):
+    """把YYYY-MM-DD（本地时间）转换为当天0点的时间戳"""
+    return int(datetime.datetime.strptime(value, "%Y-%m-%d").timestamp())
+
+
+def _outcome(result):
+    if result == "EMPTY":
+        return "empty"
+    if result == "DELETED":
+        return "deleted"
+    if result == "TIMEOUT":
+        return "timeout"
+    return "recognized" if result else "failed"
+
+
+def backfill_worker(name, progress, stop, start=None, end=None, apps=None, batch=CLAIM_BATCH):
+    """工作线程：领取任务、OCR并保存结果，直到没有可处理的任务或收到停止信号
+
+    Args:
+        name: 工作线程名
+        progress: 共享的进度统计
+        stop: 停止事件
+        start: 只处理该时间戳（包含）之后的截图
+        end: 只处理该时间戳（不包含）之前的截图
+        apps: 只处理这些应用的截图
+        batch: 每次领取的任务数
+    """
+    worker = worker_id(name)
+    while not stop.is_set():
+        count = progress.reserve(batch)
+        if count <= 0:
+            return
+        entry_ids = claim_next_jobs(worker, count, start=start, end=end, apps=apps)
+        progress.unreserve(count - len(entry_ids))
+        if not entry_ids:
+            return
+        for entry in get_entries_by_ids(entry_ids):
+            if stop.is_set():
+                # 中断时未处理的任务放回队列，下次运行继续
+                release_job(entry.id, worker)
+                progress.unreserve(1)
+                continue
+            start_time = time.time()
+            try:
+                result = process_ocr_task(entry, check_load=False)
+                store_ocr_result(None, entry, result, worker)
+            except Exception as e:
+                logger.error(f"补录OCR失败，条目 {entry.id}: {e}")
+                fail_job(entry.id, worker, str(e))
+                result = None
+            progress.record(name, _outcome(result), time.time() - start_time)
+
+
+def print_report(progress, workers, interrupted, start=None, end=None, apps=None):
+    """输出最终的吞吐量报告"""
+    elapsed = time.time() - progress.start_time
+    finished = progress.finished
+    results = progress.results
+    print()
+    print("已中断，进度已保存，重新运行即可继续" if interrupted else "补录完成")
+    print(f"  识别成功: {results['recognized']}  结果为空: {results['empty']}  "
+          f"失败（稍后重试）: {results['failed']}  超时（稍后重试）: {results['timeout']}  "
+          f"截图不存在已删除: {results['deleted']}")
+    if finished:
+        print(f"  共 {finished} 张，耗时 {_format_duration(elapsed)}，吞吐量 {finished / elapsed:.2f} 张/秒，"
+              f"平均每张 {progress.ocr_seconds / finished:.2f} 秒（{workers} 个工作线程）")
+        for name, count in sorted(progress.per_worker.items()):
+            print(f"    {name}: {count} 张")
+    for name, engine in get_engine_manager().stats()["engines"].items():
+        if engine["successes"] or engine["failures"]:
+            print(f"    {name}: 识别请求 {engine['successes']} 次，失败 {engine['failures']} 次，"
+                  f"平均耗时 {engine['latency'] or 0:.2f} 秒")
+    print(f"  剩余积压: {count_pending_jobs(start, end, apps)} 张")
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = build_arg_parser(prog="memococo-ocr-backfill", description="批量补录积压的OCR")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="工作线程数，默认为UmiOCR和RapidOCR的并发数之和（--single-engine 时为CPU核心数的一半）")
+    parser.add_argument("--since", default=None, help="只处理该日期（YYYY-MM-DD，包含）之后的截图")
+    parser.add_argument("--until", default=None, help="只处理该日期（YYYY-MM-DD，包含）之前的截图")
+    parser.add_argument("--app", action="append", default=[], help="只处理指定应用的截图，可重复指定")
+    parser.add_argument("--limit", type=int, default=None, help="最多处理的截图数量")
+    parser.add_argument("--retry-failed", action="store_true", help="同时重试已失败（尝试次数用完或结果为空）的截图")
+    parser.add_argument("--single-engine", action="store_true", help="不同时使用UmiOCR和RapidOCR")
+    options = parser.parse_args(argv)
+
+    try:
+        start = _parse_date(options.since) if options.since else None
+        end = _parse_date(options.until) + 86400 if options.until else None
+    except ValueError:
+        parser.error("日期格式应为 YYYY-MM-DD")
+    apps = options.app or None
+
+    manager = get_engine_manager()
+    manager.load_balance = not options.single_engine
+    if options.workers is None:
+        options.workers = max(1, (os.cpu_count() or 2) // 2) if options.single_engine else \
+            manager.concurrency_limit(OCR_ENGINE_UMIOCR) + manager.concurrency_limit(OCR_ENGINE_RAPIDOCR)
+
+    # 与正在运行的应用同时执行，只补齐表结构，不执行VACUUM
+    create_schema()
+    reclaimed = reclaim_dead_workers()
+    requeue_expired()
+    if reclaimed:
+        print(f"回收了 {reclaimed} 个中断时未完成的任务")
+    if options.retry_failed:
+        print(f"重新放回 {reset_failed_jobs(start, end, apps)} 个失败的任务")
+
+    total = count_pending_jobs(start, end, apps)
+    if options.limit is not None:
+        total = min(total, options.limit)
+    if total == 0:
+        print("没有需要补录的截图")
+        return 0
+    print(f"待补录 {total} 张截图，{options.workers} 个工作线程")
+
+    progress = BackfillProgress(total, options.limit)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=backfill_worker, args=(f"backfill-{index}", progress, stop, start, end, apps),
+                         daemon=True, name=f"OCRBackfill-{index}")
+        for index in range(1, max(1, options.workers) + 1)
+    ]
+    for thread in threads:
+        thread.start()
+
+    interrupted = False
+    last_report = time.time()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+            if time.time() - last_report >= PROGRESS_INTERVAL:
+                print(progress.line(), flush=True)
+                last_report = time.time()
+    except KeyboardInterrupt:
+        interrupted = True
+        print("\n正在停止，等待当前截图处理完成...", flush=True)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    print_report(progress, len(threads), interrupted, start, end, apps)
+    return 130 if interrupted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
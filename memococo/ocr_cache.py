@@ -0,0 +1,308 @@
+"""
+OCR结果缓存模块
+
+用户在几个窗口之间来回切换时，回到某个窗口得到的截图与几分钟前已OCR的截图几乎相同。
+本模块以截图的感知哈希（缩小后灰度图的DCT低频分量，256位）为键缓存OCR文本，
+查找时通过BK树按汉明距离匹配近似截图，命中后直接复用文本而不运行OCR模型。
+
+缓存保存在数据库的 ocr_cache 表中，重启后仍然有效；条目数超过 ocr_cache_max_entries 时
+淘汰最久未命中的条目。命中率和节省的OCR耗时可通过 stats() 获取。
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from memococo.config import logger, get_settings
+from memococo.common.db_manager import DatabaseManager
+
+# 哈希边长，哈希位数为其平方
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# 计算DCT前缩放到的边长
+_DCT_SIZE = HASH_SIZE * 4
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_DISTANCE = 4
+
+
+def compute_phash(image: np.ndarray) -> int:
+    """计算截图的感知哈希
+
+    Args:
+        image: 截图（RGB/RGBA或灰度NumPy数组）
+
+    Returns:
+        256位整数哈希
+    """
+    if image.ndim == 3:
+        if image.shape[2] == 4:
+            image = image[:, :, :3]
+        gray = cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image
+    small = cv2.resize(gray, (_DCT_SIZE, _DCT_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:HASH_SIZE, :HASH_SIZE].flatten()
+    # 直流分量只反映整体亮度，不参与中位数计算
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """计算两个哈希的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """按汉明距离组织的BK树，用于查找距离不超过阈值的最近哈希
+
+    树不支持删除，调用方自行忽略已淘汰的哈希并在必要时重建
+    """
+
+    def __init__(self):
+        self._root = None
+        self.size = 0
+
+    def add(self, value: int) -> None:
+        """插入哈希"""
+        self.size += 1
+        if self._root is None:
+            self._root = (value, {})
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (value, {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int, accept=None) -> Optional[Tuple[int, int]]:
+        """查找距离不超过 max_distance 的最近哈希
+
+        Args:
+            value: 要查找的哈希
+            max_distance: 最大汉明距离
+            accept: 可选的过滤函数，返回False的哈希被忽略
+
+        Returns:
+            (哈希, 距离)，找不到时返回None
+        """
+        if self._root is None:
+            return None
+        best = None
+        stack = [self._root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance and (best is None or distance < best[1]) \
+                    and (accept is None or accept(node_value)):
+                best = (node_value, distance)
+                if distance == 0:
+                    break
+            # 三角不等式：只有距离在 [d-r, d+r] 内的子树可能包含结果
+            radius = max_distance if best is None else best[1]
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return best
+
+
+class OCRCache:
+    """以感知哈希为键的OCR结果缓存"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_distance: int = DEFAULT_MAX_DISTANCE,
+                 persist: bool = True):
+        """初始化
+
+        Args:
+            max_entries: 最多缓存的截图数
+            max_distance: 视为同一画面的最大汉明距离
+            persist: 是否保存到数据库
+        """
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.persist = persist
+        self._lock = threading.Lock()
+        # 哈希 -> (文本, OCR耗时)，按最近使用排序
+        self._entries: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+        self._tree = BKTree()
+        self._loaded = not persist
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _key(value: int) -> str:
+        return format(value, f"0{HASH_BITS // 4}x")
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            rows = DatabaseManager.execute(
+                "SELECT hash, text, ocr_seconds FROM ocr_cache ORDER BY last_used DESC LIMIT ?",
+                (self.max_entries,)
+            )
+        except Exception as e:
+            logger.warning(f"加载OCR缓存失败: {e}")
+            return
+        # 按最近使用从旧到新插入，最新的排在末尾
+        for row in reversed(rows):
+            value = int(row["hash"], 16)
+            self._entries[value] = (row["text"], row["ocr_seconds"] or 0.0)
+            self._tree.add(value)
+        logger.info(f"已加载 {len(self._entries)} 条OCR缓存")
+
+    def _rebuild_tree(self) -> None:
+        # 淘汰的哈希仍留在树中，数量过多时重建
+        self._tree = BKTree()
+        for value in self._entries:
+            self._tree.add(value)
+
+    def lookup(self, image_hash: int) -> Optional[str]:
+        """查找近似截图的OCR文本
+
+        Args:
+            image_hash: 截图的感知哈希
+
+        Returns:
+            缓存的文本，未命中时返回None
+        """
+        with self._lock:
+            self._ensure_loaded()
+            found = self._tree.search(image_hash, self.max_distance, accept=self._entries.__contains__)
+            if found is None:
+                self.misses += 1
+                return None
+            value = found[0]
+            text, ocr_seconds = self._entries[value]
+            self._entries.move_to_end(value)
+            self.hits += 1
+            self.saved_seconds += ocr_seconds
+        if self.persist:
+            try:
+                DatabaseManager.execute(
+                    "UPDATE ocr_cache SET last_used = ?, hits = hits + 1 WHERE hash = ?",
+                    (int(time.time()), self._key(value))
+                )
+            except Exception as e:
+                logger.debug(f"更新OCR缓存使用时间失败: {e}")
+        return text
+
+    def put(self, image_hash: int, text: str, ocr_seconds: float) -> None:
+        """缓存OCR结果
+
+        Args:
+            image_hash: 截图的感知哈希
+            text: OCR文本
+            ocr_seconds: 本次OCR耗时（秒），命中时计入节省的时间
+        """
+        evicted = []
+        with self._lock:
+            self._ensure_loaded()
+            if image_hash not in self._entries:
+                self._tree.add(image_hash)
+            self._entries[image_hash] = (text, ocr_seconds)
+            self._entries.move_to_end(image_hash)
+            while len(self._entries) > self.max_entries:
+                value, _ = self._entries.popitem(last=False)
+                evicted.append(value)
+            if self._tree.size > 2 * max(len(self._entries), 1):
+                self._rebuild_tree()
+        if not self.persist:
+            return
+        try:
+            with DatabaseManager.transaction() as conn:
+                conn.execute(
+                    """INSERT INTO ocr_cache (hash, text, ocr_seconds, last_used, hits) VALUES (?, ?, ?, ?, 0)
+                       ON CONFLICT(hash) DO UPDATE SET
+                           text = excluded.text,
+                           ocr_seconds = excluded.ocr_seconds,
+                           last_used = excluded.last_used""",
+                    (self._key(image_hash), text, ocr_seconds, int(time.time()))
+                )
+                if evicted:
+                    conn.executemany("DELETE FROM ocr_cache WHERE hash = ?", [(self._key(v),) for v in evicted])
+        except Exception as e:
+            logger.warning(f"保存OCR缓存失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计
+
+        Returns:
+            条目数、命中数、未命中数、命中率和节省的OCR耗时（秒）
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 2),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """获取全局OCR缓存，配置 ocr_cache_enabled 为false时返回None"""
+    global _cache
+    settings = get_settings()
+    if not settings.get("ocr_cache_enabled", True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRCache(
+                    max_entries=settings.get("ocr_cache_max_entries", DEFAULT_MAX_ENTRIES),
+                    max_distance=settings.get("ocr_cache_max_distance", DEFAULT_MAX_DISTANCE),
+                )
+    return _cache
+
+
+def cached_ocr(images: List[np.ndarray], recognize) -> List[str]:
+    """先查缓存，只对未命中的截图调用 recognize
+
+    Args:
+        images: 截图列表
+        recognize: 识别函数，参数为截图，返回文本
+
+    Returns:
+        与 images 一一对应的文本列表
+    """
+    cache = get_ocr_cache()
+    if cache is None:
+        return [recognize(image) for image in images]
+
+    texts = []
+    for image in images:
+        try:
+            image_hash = compute_phash(image)
+        except Exception as e:
+            logger.debug(f"计算截图哈希失败: {e}")
+            texts.append(recognize(image))
+            continue
+        text = cache.lookup(image_hash)
+        if text is not None:
+            logger.debug("[OCR] 命中OCR缓存")
+            texts.append(text)
+            continue
+        start_time = time.time()
+        text = recognize(image)
+        # 空文本可能是识别失败，不缓存
+        if text:
+            cache.put(image_hash, text, time.time() - start_time)
+        texts.append(text)
+    return texts
@@ -0,0 +1,364 @@
+"""
+OCR引擎管理模块
+
+为每个OCR引擎维护一个熔断器，选择当前使用的引擎：
+
+- 配置 ocr_engine 为 "umiocr"（默认）时优先使用UmiOCR，为 "rapidocr" 时只使用本地RapidOCR
+- 引擎连续失败 FAILURE_THRESHOLD 次后熔断（open），之后的OCR改用RapidOCR
+- 后台线程每隔 ocr_health_check_interval 秒探测一次UmiOCR：启动时不可用、之后才启动的UmiOCR
+  也会被发现；熔断后探测成功时转为半开（half_open），下一次OCR成功后恢复使用UmiOCR
+- RapidOCR是本地引擎，作为最后的选择始终可用
+
+负载均衡（配置 ocr_load_balance，批量补录时默认开启）时两个引擎同时使用：每次识别由 acquire
+选择预计最早完成的引擎（(进行中的请求数 + 1) × 平滑后的识别耗时最小），UmiOCR最多同时处理
+ocr_umiocr_concurrency 个请求，RapidOCR最多 ocr_rapidocr_concurrency 个，各引擎分到的工作量
+与其实际吞吐量成正比。
+
+每个引擎的状态、成功和失败次数、平滑后的识别耗时以及最近的切换事件可通过 stats() 查看。
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from memococo.config import logger, get_settings
+
+# 导入UmiOCR客户端
+try:
+    from memococo.umiocr_client import UmiOcrClient
+    _umiocr_imported = True
+except ImportError:
+    _umiocr_imported = False
+
+# OCR引擎类型
+OCR_ENGINE_RAPIDOCR = "rapidocr"  # RapidOCR引擎
+OCR_ENGINE_UMIOCR = "umiocr"      # UmiOCR API引擎
+
+# 熔断器状态
+BREAKER_CLOSED = "closed"        # 正常使用
+BREAKER_OPEN = "open"            # 熔断，不使用
+BREAKER_HALF_OPEN = "half_open"  # 健康检查通过，下一次OCR决定是否恢复
+
+# 连续失败多少次后熔断
+FAILURE_THRESHOLD = 3
+# 默认健康检查间隔（秒）
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+# 识别耗时的指数平滑系数
+LATENCY_SMOOTHING = 0.2
+# 保留的引擎切换事件数
+MAX_EVENTS = 50
+# 负载均衡时UmiOCR的默认并发请求数
+DEFAULT_UMIOCR_CONCURRENCY = 2
+
+
+class CircuitBreaker:
+    """单个OCR引擎的熔断器和识别统计"""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, state: str = BREAKER_CLOSED):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.state = state
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.changed_at = time.time()
+
+    def allow(self) -> bool:
+        """是否可以使用该引擎"""
+        return self.state != BREAKER_OPEN
+
+    def _set_state(self, state: str) -> bool:
+        if state == self.state:
+            return False
+        self.state = state
+        self.changed_at = time.time()
+        return True
+
+    def record_success(self, latency: float) -> bool:
+        """记录一次成功的识别
+
+        Returns:
+            熔断器是否因此恢复（closed）
+        """
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.last_latency = latency
+        self.latency = latency if self.latency is None else \
+            self.latency + LATENCY_SMOOTHING * (latency - self.latency)
+        return self._set_state(BREAKER_CLOSED)
+
+    def record_failure(self, error: str) -> bool:
+        """记录一次失败的识别，半开状态下失败立即熔断
+
+        Returns:
+            熔断器是否因此熔断（open）
+        """
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == BREAKER_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            return self._set_state(BREAKER_OPEN)
+        return False
+
+    def record_probe(self, healthy: bool, error: Optional[str] = None) -> bool:
+        """记录一次健康检查结果
+
+        Returns:
+            熔断器状态是否变化
+        """
+        if healthy:
+            return self._set_state(BREAKER_HALF_OPEN) if self.state == BREAKER_OPEN else False
+        self.last_error = error or self.last_error
+        return self._set_state(BREAKER_OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "in_flight": self.in_flight,
+            "latency": None if self.latency is None else round(self.latency, 3),
+            "last_latency": None if self.last_latency is None else round(self.last_latency, 3),
+            "last_error": self.last_error,
+            "since": int(self.changed_at),
+        }
+
+
+class OCREngineManager:
+    """按熔断器状态在UmiOCR和RapidOCR之间切换或分配识别请求，后台定期探测UmiOCR"""
+
+    def __init__(self, umiocr_factory=None, interval: Optional[float] = None, load_balance: Optional[bool] = None):
+        """
+        Args:
+            umiocr_factory: 创建UmiOCR客户端的函数，默认为UmiOcrClient；UmiOCR客户端未导入时为None
+            interval: 健康检查间隔（秒），默认使用配置 ocr_health_check_interval
+            load_balance: 是否同时使用两个引擎，默认使用配置 ocr_load_balance
+        """
+        if umiocr_factory is None and _umiocr_imported:
+            umiocr_factory = UmiOcrClient
+        self._umiocr_factory = umiocr_factory
+        self._umiocr_client = None
+        self._interval = interval
+        self._lock = threading.Lock()
+        # 负载均衡时等待并发名额
+        self._slots = threading.Condition(self._lock)
+        self.load_balance = load_balance
+        # UmiOCR在第一次健康检查通过之前不使用
+        self.breakers = {
+            OCR_ENGINE_UMIOCR: CircuitBreaker(OCR_ENGINE_UMIOCR, state=BREAKER_OPEN),
+            OCR_ENGINE_RAPIDOCR: CircuitBreaker(OCR_ENGINE_RAPIDOCR),
+        }
+        self.active: Optional[str] = None
+        self.failovers = 0
+        self.events = deque(maxlen=MAX_EVENTS)
+        self._probed = False
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def interval(self) -> float:
+        if self._interval is not None:
+            return self._interval
+        return get_settings().get("ocr_health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL)
+
+    def preferred_engines(self) -> List[str]:
+        """按配置 ocr_engine 排列的候选引擎"""
+        if get_settings().get("ocr_engine", OCR_ENGINE_UMIOCR) == OCR_ENGINE_RAPIDOCR:
+            return [OCR_ENGINE_RAPIDOCR]
+        return [OCR_ENGINE_UMIOCR, OCR_ENGINE_RAPIDOCR]
+
+    def select(self) -> str:
+        """选择现在使用的引擎：候选引擎中第一个未熔断的，都熔断时使用RapidOCR
+
+        第一次调用时同步探测一次UmiOCR并启动后台健康检查线程
+        """
+        if not self._probed and OCR_ENGINE_UMIOCR in self.preferred_engines():
+            self.probe()
+        self.start()
+        with self._lock:
+            engine_type = next((name for name in self.preferred_engines() if self.breakers[name].allow()),
+                               OCR_ENGINE_RAPIDOCR)
+            if engine_type != self.active:
+                if self.active is not None:
+                    self._switch(self.active, engine_type)
+                self.active = engine_type
+        return engine_type
+
+    @property
+    def balancing(self) -> bool:
+        """是否同时使用两个引擎"""
+        if self.load_balance is not None:
+            return self.load_balance
+        return bool(get_settings().get("ocr_load_balance", False))
+
+    def concurrency_limit(self, engine_type: str) -> int:
+        """负载均衡时引擎的最大并发数"""
+        settings = get_settings()
+        if engine_type == OCR_ENGINE_UMIOCR:
+            return max(1, settings.get("ocr_umiocr_concurrency", DEFAULT_UMIOCR_CONCURRENCY))
+        return settings.get("ocr_rapidocr_concurrency", 0) or max(1, (os.cpu_count() or 2) // 2)
+
+    def acquire(self) -> str:
+        """为一次识别选择引擎并占用一个并发名额，识别完成后必须调用 release
+
+        不做负载均衡时等同于 select；负载均衡时在未熔断且有空闲名额的引擎中选择预计最早完成的，
+        还没有耗时数据的引擎优先（先测量），所有引擎都满负荷时等待
+
+        Returns:
+            引擎类型
+        """
+        if not self.balancing:
+            engine_type = self.select()
+            with self._lock:
+                self.breakers[engine_type].in_flight += 1
+            return engine_type
+
+        self.select()
+        with self._slots:
+            while True:
+                candidates = [
+                    name for name in self.preferred_engines()
+                    if self.breakers[name].allow() and self.breakers[name].in_flight < self.concurrency_limit(name)
+                ]
+                if candidates:
+                    break
+                self._slots.wait(1.0)
+            engine_type = min(candidates, key=self._expected_finish)
+            self.breakers[engine_type].in_flight += 1
+        return engine_type
+
+    def _expected_finish(self, engine_type: str) -> float:
+        """在该引擎上再提交一个请求的预计完成时间（调用时持有锁）"""
+        breaker = self.breakers[engine_type]
+        return (breaker.in_flight + 1) * (breaker.latency or 0.0)
+
+    def release(self, engine_type: str):
+        """释放 acquire 占用的并发名额"""
+        with self._slots:
+            breaker = self.breakers.get(engine_type)
+            if breaker is not None and breaker.in_flight > 0:
+                breaker.in_flight -= 1
+            self._slots.notify_all()
+
+    def _switch(self, old: str, new: str):
+        """记录一次引擎切换（调用时持有锁）"""
+        self.failovers += 1
+        reason = self.breakers[old].last_error if self.breakers[old].state == BREAKER_OPEN else "recovered"
+        self.events.append({"time": int(time.time()), "from": old, "to": new, "reason": reason})
+        if new == OCR_ENGINE_RAPIDOCR:
+            logger.warning(f"[OCR] {old} 不可用，切换到 {new}: {reason}")
+        else:
+            logger.info(f"[OCR] 切换回 {new}")
+
+    def umiocr_client(self):
+        """最近一次健康检查使用的UmiOCR客户端，从未探测成功时为None"""
+        return self._umiocr_client
+
+    def record_success(self, engine_type: str, latency: float):
+        """记录一次成功的识别及其耗时"""
+        breaker = self.breakers.get(engine_type)
+        if breaker is None:
+            return
+        with self._lock:
+            recovered = breaker.record_success(latency)
+        if recovered:
+            logger.info(f"[OCR] {engine_type} 已恢复")
+
+    def record_failure(self, engine_type: str, error: Exception):
+        """记录一次失败的识别，连续失败达到阈值时熔断"""
+        breaker = self.breakers.get(engine_type)
+        if breaker is None:
+            return
+        with self._lock:
+            opened = breaker.record_failure(str(error))
+        if opened:
+            logger.warning(f"[OCR] {engine_type} 连续失败 {breaker.consecutive_failures} 次，暂停使用: {error}")
+
+    def probe(self) -> bool:
+        """探测一次UmiOCR是否可用，并更新其熔断器
+
+        Returns:
+            UmiOCR是否可用
+        """
+        self._probed = True
+        if self._umiocr_factory is None:
+            with self._lock:
+                self.breakers[OCR_ENGINE_UMIOCR].record_probe(False, "UmiOCR客户端未导入")
+            return False
+        try:
+            if self._umiocr_client is None:
+                client = self._umiocr_factory()
+                healthy = client.is_available()
+                if healthy:
+                    self._umiocr_client = client
+            else:
+                healthy = self._umiocr_client.ping()
+            error = None if healthy else "health check failed"
+        except Exception as e:
+            healthy, error = False, str(e)
+        with self._lock:
+            changed = self.breakers[OCR_ENGINE_UMIOCR].record_probe(healthy, error)
+        if changed:
+            logger.info(f"[OCR] UmiOCR健康检查{'通过' if healthy else '失败'}")
+        return healthy
+
+    def request_probe(self):
+        """让后台线程立即探测一次（例如OCR调用超时后）"""
+        self._wakeup.set()
+
+    def start(self):
+        """启动后台健康检查线程"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="OCREngineHealth")
+            self._thread.start()
+
+    def stop(self):
+        """停止后台健康检查线程"""
+        self._stop.set()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                return
+            if OCR_ENGINE_UMIOCR in self.preferred_engines():
+                self.probe()
+
+    def stats(self) -> Dict[str, Any]:
+        """各引擎的熔断状态、识别统计和最近的切换事件"""
+        with self._lock:
+            return {
+                "active": self.active,
+                "load_balance": self.balancing,
+                "failovers": self.failovers,
+                "engines": {name: breaker.stats() for name, breaker in self.breakers.items()},
+                "events": list(self.events),
+            }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_engine_manager() -> OCREngineManager:
+    """获取全局OCR引擎管理器（第一次选择引擎时启动健康检查线程）"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = OCREngineManager()
+    return _manager
@@ -4,67 +4,69 @@ OCR引擎工厂模块
 根据硬件环境自动选择最合适的OCR引擎：
 - 优先使用UmiOCR API（速度最快，准确率高）
 - 如果UmiOCR不可用，使用RapidOCR（CPU模式，轻量级）
+
+UmiOCR的健康状态由OCR引擎管理器（见ocr_engines模块）维护，识别失败的图块立即改用RapidOCR
 """
 
-from memococo.config import logger
+from memococo.config import logger, get_settings
 import cv2
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 import time
 import gc
+from contextlib import contextmanager
 
-# OCR引擎类型
-OCR_ENGINE_RAPIDOCR = "rapidocr"  # RapidOCR引擎
-OCR_ENGINE_UMIOCR = "umiocr"      # UmiOCR API引擎
+from memococo.ocr_cache import cached_ocr
+from memococo.ocr_preprocess import prepare_content_tiles
+from memococo.ocr_profiles import (
+    OCRProfile, get_ocr_profile, engine_params_for, skipped_ocr_text, slice_text_lines
+)
+from memococo.ocr_models import current_model_tier, model_params
+from memococo.ocr_engines import get_engine_manager, OCR_ENGINE_RAPIDOCR, OCR_ENGINE_UMIOCR
+from memococo.common.error_handler import OCREngineError
 
-# 导入UmiOCR客户端
-try:
-    from memococo.umiocr_client import UmiOcrClient
-    _umiocr_imported = True
-except ImportError:
-    _umiocr_imported = False
+# 带位置的文字行：(左, 上, 右, 下, 文本)，坐标为原图像素
+TextLine = Tuple[int, int, int, int, str]
 
-# 全局OCR引擎，避免重复创建
-_ocr_engine = None
-_ocr_engine_type = None
-_umiocr_client = None
-_umiocr_available = None  # None表示未检查，True/False表示检查结果
+# 全局RapidOCR引擎，避免重复创建（UmiOCR客户端由OCR引擎管理器维护）
+_rapidocr_engine = None
+# 参数与默认配置档不同的OCR配置档各自使用的RapidOCR引擎，按参数缓存
+_profile_engines: Dict[Tuple, Any] = {}
 
 def check_umiocr_availability() -> bool:
     """检查UmiOCR是否可用
 
+    立即探测一次，结果更新OCR引擎管理器中UmiOCR的熔断器
+
     Returns:
         bool: UmiOCR是否可用
     """
-    global _umiocr_client, _umiocr_available, _umiocr_imported
-
-    # 如果已经检查过，直接返回结果
-    if _umiocr_available is not None:
-        return _umiocr_available
-
-    # 如果没有导入UmiOCR客户端，返回false
-    if not _umiocr_imported:
-        logger.info("未导入UmiOCR客户端，无法使用UmiOCR")
-        _umiocr_available = False
-        return False
+    available = get_engine_manager().probe()
+    logger.info("UmiOCR可用" if available else "UmiOCR不可用，将使用RapidOCR")
+    return available
 
-    try:
-        # 创建UmiOCR客户端并检查可用性
-        _umiocr_client = UmiOcrClient()
-        _umiocr_available = _umiocr_client.is_available()
+def reset_ocr_engines() -> None:
+    """丢弃已创建的RapidOCR引擎，并让OCR引擎管理器立即重新探测UmiOCR
 
-        if _umiocr_available:
-            logger.info("UmiOCR可用，将使用UmiOCR进行OCR识别")
-        else:
-            logger.info("UmiOCR不可用，将使用其他OCR引擎")
+    OCR调用超时后由OCR看门狗调用：卡住的调用可能仍占用旧的引擎实例
+    """
+    _discard_rapidocr_engines()
+    get_engine_manager().request_probe()
+    logger.info("[OCR] 已丢弃OCR引擎，下次OCR时重新创建")
 
-        return _umiocr_available
-    except Exception as e:
-        logger.error(f"检查UmiOCR可用性时出错: {e}")
-        _umiocr_available = False
-        return False
+def _discard_rapidocr_engines() -> None:
+    """丢弃已创建的RapidOCR引擎，下次OCR时按当前模型档位重新创建"""
+    global _rapidocr_engine
+    _rapidocr_engine = None
+    _profile_engines.clear()
 
+def prepare_model_tier() -> None:
+    """启动时确定OCR模型档位
 
+    需要生成int8模型或运行基准测试时在后台线程中进行，不占用第一次OCR调用的时限；
+    选择了移动端以外的档位后丢弃已用移动端模型创建的引擎
+    """
+    current_model_tier(create_rapidocr_engine, _discard_rapidocr_engines)
 
 def preprocess_image_for_ocr(image: np.ndarray) -> Optional[np.ndarray]:
     """预处理图像用于OCR识别
@@ -87,13 +89,93 @@ def preprocess_image_for_ocr(image: np.ndarray) -> Optional[np.ndarray]:
 
     return image
 
+def prepare_ocr_images(image: np.ndarray, mode: Optional[str] = None) -> List[np.ndarray]:
+    """按配置 ocr_preprocess 预处理截图，得到需要OCR的图像
+
+    content（默认）只保留文字区域，按原始分辨率裁剪并排入图块；文字铺满画面时与 resize 相同，
+    整图缩放到长边不超过2000像素
+
+    Args:
+        image: 原始图像
+        mode: 预处理方式，None时使用配置 ocr_preprocess
+
+    Returns:
+        需要OCR的图像列表，截图中没有文字时为空列表
+    """
+    mode = mode or get_settings().get("ocr_preprocess", "content")
+    if mode == "content" and image is not None and image.size > 0:
+        try:
+            tiles = prepare_content_tiles(image)
+        except Exception as e:
+            logger.warning(f"[OCR] 按内容预处理失败，改用整图缩放: {e}")
+            tiles = None
+        if tiles is not None:
+            return tiles
+
+    processed = preprocess_image_for_ocr(image)
+    return [] if processed is None else [processed]
+
+def recognize_lines(engine: Any, lines: List[np.ndarray]) -> str:
+    """跳过文本检测，直接用RapidOCR的识别模型批量识别文字行
+
+    Args:
+        engine: RapidOCR引擎实例
+        lines: 文字行图像列表
+
+    Returns:
+        识别出的文本，各行以换行分隔
+    """
+    if not lines:
+        return ""
+    results, _ = engine.text_rec(lines)
+    min_score = getattr(engine, "text_score", 0.5)
+    return "\n".join(result[0] for result in results if result[0] and result[1] >= min_score)
+
+def recognize_image_text(engine: Any, engine_type: str, image: np.ndarray,
+                         profile: Optional[OCRProfile] = None) -> str:
+    """预处理截图并逐个识别图块，返回合并后的文本
+
+    Args:
+        engine: OCR引擎实例
+        engine_type: 引擎类型
+        image: 原始图像
+        profile: OCR配置档，None时使用默认配置档
+
+    Returns:
+        识别出的文本，各图块的文本按顺序以换行分隔
+
+    Raises:
+        OCREngineError: UmiOCR和RapidOCR都无法识别
+    """
+    if profile is not None and profile.line_mode and engine_type == OCR_ENGINE_RAPIDOCR:
+        lines = slice_text_lines(image)
+        if lines is not None:
+            return recognize_lines(engine, lines)
+        logger.debug(f"[OCR] 配置档 {profile.name} 按行切片失败，改用文本检测")
+
+    texts = []
+    for tile in prepare_ocr_images(image, profile.preprocess if profile is not None else None):
+        try:
+            result = run_ocr_engine(engine, engine_type, tile)
+        except Exception as e:
+            if engine_type == OCR_ENGINE_RAPIDOCR:
+                raise OCREngineError("RapidOCR识别失败", cause=e)
+            # UmiOCR出错时本图块及之后的图块改用RapidOCR，不把出错当作没有文字
+            logger.warning(f"[OCR] {engine_type} 识别失败，改用RapidOCR: {e}")
+            engine, engine_type = get_profile_engine(profile or get_ocr_profile(), OCR_ENGINE_RAPIDOCR)
+            if engine is None:
+                raise OCREngineError("UmiOCR识别失败且RapidOCR不可用", cause=e)
+            result = run_ocr_engine(engine, engine_type, tile)
+        text = extract_text_from_ocr_result(result, engine_type)
+        if text:
+            texts.append(text)
+    return "\n".join(texts)
+
 def get_ocr_engine(force_type: Optional[str] = None) -> Tuple[Any, str]:
     """获取OCR引擎实例
 
-    选择OCR引擎的优先级：
-    1. 如果强制指定了引擎类型，使用指定的引擎
-    2. 如果UmiOCR可用，使用UmiOCR API，因为它速度最快
-    3. 使用RapidOCR (CPU模式)，轻量级且准确率高
+    未指定引擎类型时由OCR引擎管理器选择：按配置 ocr_engine 优先使用UmiOCR，
+    UmiOCR不可用或熔断时使用RapidOCR (CPU模式)，UmiOCR恢复后自动切换回来
 
     Args:
         force_type: 强制使用指定类型的引擎，可选值: "rapidocr", "umiocr"
@@ -101,52 +183,31 @@ def get_ocr_engine(force_type: Optional[str] = None) -> Tuple[Any, str]:
     Returns:
         Tuple[Any, str]: (OCR引擎实例, 引擎类型)
     """
-    global _ocr_engine, _ocr_engine_type, _umiocr_client, _umiocr_available
+    global _rapidocr_engine
 
-    # 如果引擎已初始化且类型匹配，直接返回
-    if _ocr_engine is not None and (force_type is None or force_type == _ocr_engine_type):
-        engine_name = {
-            OCR_ENGINE_RAPIDOCR: "RapidOCR (CPU)",
-            OCR_ENGINE_UMIOCR: "UmiOCR API"
-        }.get(_ocr_engine_type, _ocr_engine_type)
-        logger.debug(f"[OCR] 使用已初始化的OCR引擎: {engine_name}")
-        return _ocr_engine, _ocr_engine_type
-
-    # 如果强制指定了引擎类型
-    if force_type is not None:
-        engine_type = force_type
-    else:
-        # 1. 首先尝试使用UmiOCR
-        if _umiocr_available is None:  # 只在第一次检查
-            check_umiocr_availability()
-
-        if _umiocr_available:
-            # 如果UmiOCR可用，使用UmiOCR
-            engine_type = OCR_ENGINE_UMIOCR
-            logger.info("UmiOCR可用，使用UmiOCR进行OCR识别")
-        else:
-            # 2. 如果UmiOCR不可用，使用RapidOCR
-            # RapidOCR是轻量级的OCR引擎，适合CPU环境
-            engine_type = OCR_ENGINE_RAPIDOCR
-            logger.info("UmiOCR不可用，使用RapidOCR (CPU模式)")
+    manager = get_engine_manager()
+    engine_type = force_type or manager.select()
+
+    if engine_type == OCR_ENGINE_UMIOCR:
+        client = manager.umiocr_client()
+        if client is not None or force_type is not None:
+            return client, OCR_ENGINE_UMIOCR
+        engine_type = OCR_ENGINE_RAPIDOCR
 
-    # 创建引擎实例
     if engine_type == OCR_ENGINE_RAPIDOCR:
-        _ocr_engine = create_rapidocr_engine()
-        _ocr_engine_type = OCR_ENGINE_RAPIDOCR
-    elif engine_type == OCR_ENGINE_UMIOCR:
-        # UmiOCR引擎已经在check_umiocr_availability()中创建
-        _ocr_engine = _umiocr_client
-        _ocr_engine_type = OCR_ENGINE_UMIOCR
-    else:
-        logger.error(f"不支持的OCR引擎类型: {engine_type}")
-        return None, ""
-
-    return _ocr_engine, _ocr_engine_type
-
-def create_rapidocr_engine() -> Any:
+        if _rapidocr_engine is None:
+            _rapidocr_engine = create_rapidocr_engine()
+        return _rapidocr_engine, OCR_ENGINE_RAPIDOCR
+
+    logger.error(f"不支持的OCR引擎类型: {engine_type}")
+    return None, ""
+
+def create_rapidocr_engine(params: Optional[Dict[str, Any]] = None) -> Any:
     """创建RapidOCR引擎实例
 
+    Args:
+        params: RapidOCR构造参数（如 use_cls、det_limit_side_len），默认使用默认配置档在当前模型档位下的参数
+
     Returns:
         RapidOCR引擎实例
     """
@@ -154,27 +215,13 @@ def create_rapidocr_engine() -> Any:
         # 导入 RapidOCR
         from rapidocr_onnxruntime import RapidOCR
 
-        # 基本参数
-        params = {
-            "Global.lang_det": "ch_server",
-            "Global.lang_rec": "ch_server",
-            "Global.use_angle_cls": True,  # 启用角度检测，处理旋转文本
-            "Global.use_text_det": True,   # 启用文本检测
-            "Global.use_text_rec": True,   # 启用文本识别
-            "Det.limit_side_len": 960,     # 限制输入图像的最大边长，提高速度
-            "Det.limit_type": "min",       # 缩放类型，保持长宽比
-            "Det.thresh": 0.3,             # 检测置信度阈值，降低可提高速度但可能降低准确率
-            "Rec.rec_batch_num": 6,        # 识别批处理数量，提高并行处理能力
-            "Rec.rec_img_h": 32,           # 识别图像高度
-            "Rec.rec_img_w": 320,          # 识别图像宽度
-            "Cls.cls_batch_num": 6,        # 角度分类批处理数量
-            "Cls.cls_thresh": 0.9,         # 角度分类置信度阈值
-        }
-
-        logger.info("初始化 RapidOCR 引擎 (CPU模式)")
+        if params is None:
+            params = profile_engine_params(get_ocr_profile())
+
+        logger.info(f"初始化 RapidOCR 引擎 (CPU模式), 参数: {params}")
 
         # 创建RapidOCR实例
-        engine = RapidOCR(params=params)
+        engine = RapidOCR(**params)
         logger.debug("RapidOCR引擎初始化成功")
         return engine
     except ImportError as e:
@@ -187,8 +234,41 @@ def create_rapidocr_engine() -> Any:
 
 
 
-def perform_ocr(engine: Any, engine_type: str, image: np.ndarray) -> List:
-    """使用指定的OCR引擎执行文本识别
+def profile_engine_params(profile: OCRProfile) -> Dict[str, Any]:
+    """配置档在当前模型档位下的完整RapidOCR参数（模型档位尚未确定时使用移动端模型，见 prepare_model_tier）"""
+    return engine_params_for(profile, model_params(create_rapidocr_engine, _discard_rapidocr_engines))
+
+def get_profile_engine(profile: OCRProfile, force_type: Optional[str] = None) -> Tuple[Any, str]:
+    """获取OCR配置档使用的引擎
+
+    UmiOCR不使用配置档中的RapidOCR参数；参数与默认配置档相同的配置档共用全局引擎
+
+    Args:
+        profile: OCR配置档
+        force_type: 强制使用指定类型的引擎，见 get_ocr_engine
+
+    Returns:
+        Tuple[Any, str]: (OCR引擎实例, 引擎类型)
+    """
+    engine, engine_type = get_ocr_engine(force_type)
+    if engine is None or engine_type != OCR_ENGINE_RAPIDOCR:
+        return engine, engine_type
+
+    params = profile_engine_params(profile)
+    if params == profile_engine_params(get_ocr_profile()):
+        return engine, engine_type
+    key = tuple(sorted((name, repr(value)) for name, value in params.items()))
+    profile_engine = _profile_engines.get(key)
+    if profile_engine is None:
+        logger.info(f"[OCR] 为配置档 {profile.name} 创建RapidOCR引擎")
+        profile_engine = create_rapidocr_engine(params)
+        if profile_engine is None:
+            return engine, engine_type
+        _profile_engines[key] = profile_engine
+    return profile_engine, engine_type
+
+def run_ocr_engine(engine: Any, engine_type: str, image: np.ndarray) -> List:
+    """使用指定的OCR引擎执行文本识别，结果和耗时计入OCR引擎管理器
 
     Args:
         engine: OCR引擎实例
@@ -196,39 +276,68 @@ def perform_ocr(engine: Any, engine_type: str, image: np.ndarray) -> List:
         image: 要处理的图像
 
     Returns:
-        识别结果列表
+        识别结果列表，没有文字时为空
+
+    Raises:
+        OCREngineError: 引擎不可用或识别出错
     """
     if engine is None:
-        return []
-
-    # 记录使用的OCR引擎类型
-    engine_name = {
-        OCR_ENGINE_RAPIDOCR: "RapidOCR (CPU)",
-        OCR_ENGINE_UMIOCR: "UmiOCR API"
-    }.get(engine_type, engine_type)
+        raise OCREngineError(f"OCR引擎 {engine_type} 不可用")
 
+    manager = get_engine_manager()
     start_time = time.time()
-    logger.debug(f"[OCR] 开始使用 {engine_name} 进行OCR识别")
-
+    logger.debug(f"[OCR] 开始使用 {engine_type} 进行OCR识别")
     try:
         if engine_type == OCR_ENGINE_RAPIDOCR:
-            # RapidOCR处理
-            result, _ = engine(image)  # 忽略引擎返回的耗时
-            elapsed_time = time.time() - start_time
-            logger.debug(f"[OCR] RapidOCR处理完成，耗时: {elapsed_time:.4f} 秒")
-            return result
+            # RapidOCR处理，忽略引擎返回的耗时
+            result, _ = engine(image)
         elif engine_type == OCR_ENGINE_UMIOCR:
             # UmiOCR处理
             result = engine.recognize(image)
-            elapsed_time = time.time() - start_time
-            logger.debug(f"[OCR] UmiOCR处理完成，耗时: {elapsed_time:.4f} 秒")
-            return result
         else:
-            logger.error(f"[OCR] 不支持的OCR引擎类型: {engine_type}")
-            return []
+            raise OCREngineError(f"不支持的OCR引擎类型: {engine_type}")
     except Exception as e:
-        elapsed_time = time.time() - start_time
-        logger.error(f"[OCR] {engine_name}处理错误，耗时: {elapsed_time:.4f} 秒, 错误: {e}")
+        manager.record_failure(engine_type, e)
+        raise
+    elapsed_time = time.time() - start_time
+    manager.record_success(engine_type, elapsed_time)
+    logger.debug(f"[OCR] {engine_type} 处理完成，耗时: {elapsed_time:.4f} 秒")
+    return result or []
+
+@contextmanager
+def acquire_profile_engine(profile: OCRProfile):
+    """由OCR引擎管理器为一次识别分配引擎（负载均衡时占用该引擎的一个并发名额）
+
+    Args:
+        profile: OCR配置档
+
+    Yields:
+        Tuple[Any, str]: (OCR引擎实例, 引擎类型)
+    """
+    manager = get_engine_manager()
+    engine_type = manager.acquire()
+    try:
+        yield get_profile_engine(profile, engine_type)
+    finally:
+        manager.release(engine_type)
+
+def perform_ocr(engine: Any, engine_type: str, image: np.ndarray) -> List:
+    """使用指定的OCR引擎执行文本识别
+
+    Args:
+        engine: OCR引擎实例
+        engine_type: 引擎类型
+        image: 要处理的图像
+
+    Returns:
+        识别结果列表，出错时为空列表
+    """
+    if engine is None:
+        return []
+    try:
+        return run_ocr_engine(engine, engine_type, image)
+    except Exception as e:
+        logger.error(f"[OCR] {engine_type} 处理错误: {e}")
         return []
 
 def extract_text_from_ocr_result(result: List, engine_type: str) -> str:
@@ -262,40 +371,107 @@ def extract_text_from_ocr_result(result: List, engine_type: str) -> str:
 
     return text
 
-def extract_text_from_image(image: np.ndarray) -> str:
+def text_lines_from_ocr_result(result: List, engine_type: str, scale: float = 1.0) -> List[TextLine]:
+    """从OCR结果中提取带位置的文字行
+
+    Args:
+        result: OCR识别结果
+        engine_type: 引擎类型
+        scale: 识别时图像相对原图的缩放比例，位置按此换算回原图坐标
+
+    Returns:
+        按从上到下、从左到右排序的文字行
+    """
+    lines = []
+    for item in result or []:
+        if engine_type == OCR_ENGINE_RAPIDOCR:
+            # RapidOCR结果格式: [[box, text, score], ...]，box为四个角点
+            box, text = item[0], item[1]
+        else:
+            # UmiOCR结果格式: [{"text": "...", "box": [[x, y], ...], ...}, ...]
+            box, text = item.get("box"), item.get("text", "")
+        if not text or not box:
+            continue
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+        lines.append((int(min(xs) / scale), int(min(ys) / scale),
+                      int(np.ceil(max(xs) / scale)), int(np.ceil(max(ys) / scale)), text))
+    lines.sort(key=lambda line: (line[1], line[0]))
+    return lines
+
+def recognize_text_lines(image: np.ndarray, app: Optional[str] = None) -> List[TextLine]:
+    """整图识别（不按内容切图块、不经过OCR缓存），返回带位置的文字行
+
+    供滚动时增量OCR使用：之前识别的文字行按滚动距离平移后复用，只识别新出现的部分
+
+    Args:
+        image: 要处理的图像
+        app: 截图所属应用，用于选择OCR配置档
+
+    Returns:
+        文字行列表，坐标为原图像素
+
+    Raises:
+        OCREngineError: UmiOCR和RapidOCR都无法识别
+    """
+    if image is None or image.size == 0:
+        return []
+    profile = get_ocr_profile(app)
+    processed = preprocess_image_for_ocr(image)
+    scale = processed.shape[1] / image.shape[1]
+    with acquire_profile_engine(profile) as (engine, engine_type):
+        if engine is None:
+            raise OCREngineError("没有可用的OCR引擎")
+        try:
+            result = run_ocr_engine(engine, engine_type, processed)
+        except Exception as e:
+            if engine_type == OCR_ENGINE_RAPIDOCR:
+                raise OCREngineError("RapidOCR识别失败", cause=e)
+            logger.warning(f"[OCR] {engine_type} 识别失败，改用RapidOCR: {e}")
+            engine, engine_type = get_profile_engine(profile, OCR_ENGINE_RAPIDOCR)
+            if engine is None:
+                raise OCREngineError("UmiOCR识别失败且RapidOCR不可用", cause=e)
+            result = run_ocr_engine(engine, engine_type, processed)
+    return text_lines_from_ocr_result(result, engine_type, scale)
+
+def extract_text_from_image(image: np.ndarray, app: Optional[str] = None, title: Optional[str] = None) -> str:
     """从图像中提取文本
 
-    根据硬件环境自动选择最合适的OCR引擎
+    根据硬件环境自动选择最合适的OCR引擎，按截图所属应用选择OCR配置档，
+    近似画面已识别过时直接使用OCR缓存中的文本
 
     Args:
         image: 要处理的图像（NumPy数组）
+        app: 截图所属应用，用于选择OCR配置档
+        title: 窗口标题，配置档为不做OCR时作为文本
 
     Returns:
-        提取的文本，如果提取失败则返回空字符串
+        提取的文本，图像无效或引擎没有识别出文字时为空字符串
+
+    Raises:
+        OCREngineError: 没有可用的OCR引擎（UmiOCR和RapidOCR都出错）或识别出错
     """
     # 检查图像是否有效
     if image is None or not isinstance(image, np.ndarray) or image.size == 0:
         logger.error("无效的图像")
         return ""
 
+    profile = get_ocr_profile(app)
+    if profile.skip:
+        return skipped_ocr_text(app, title)
+    return cached_ocr([image], lambda img: _recognize_image(img, profile))[0]
+
+def _recognize_image(image: np.ndarray, profile: Optional[OCRProfile] = None) -> str:
+    """对单张图像运行OCR引擎（不经过缓存）"""
     start_time = time.time()
+    profile = profile or get_ocr_profile()
 
     try:
-        # 图像预处理
-        processed_image = preprocess_image_for_ocr(image)
-        if processed_image is None:
-            return ""
-
-        # 获取OCR引擎
-        engine, engine_type = get_ocr_engine()
-        if engine is None:
-            return ""
-
-        # 执行OCR识别
-        result = perform_ocr(engine, engine_type, processed_image)
-
-        # 提取文本
-        text = extract_text_from_ocr_result(result, engine_type)
+        # 获取OCR引擎并执行OCR识别
+        with acquire_profile_engine(profile) as (engine, engine_type):
+            if engine is None:
+                raise OCREngineError("没有可用的OCR引擎")
+            text = recognize_image_text(engine, engine_type, image, profile)
 
         # 记录使用的OCR引擎类型
         engine_name = {
@@ -305,59 +481,77 @@ def extract_text_from_image(image: np.ndarray) -> str:
 
         elapsed_time = time.time() - start_time
         text_length = len(text)
-        logger.info(f"[OCR] 引擎: {engine_name}, 文本长度: {text_length} 字符, 耗时: {elapsed_time:.2f} 秒")
+        logger.info(f"[OCR] 引擎: {engine_name}, 配置档: {profile.name}, 文本长度: {text_length} 字符, 耗时: {elapsed_time:.2f} 秒")
 
         return text
 
+    except OCREngineError as e:
+        # 引擎出错不等于没有文字，交给调用者稍后重试
+        logger.error(f"[OCR] 没有可用的OCR引擎，耗时: {time.time() - start_time:.2f} 秒, 错误: {e}")
+        raise
     except Exception as e:
+        # 引擎运行时错误（如内存不足）或预处理出错同样交给调用者退避重试，空文本只表示引擎确实没有识别出文字
         elapsed_time = time.time() - start_time
         logger.error(f"[OCR] 处理出错，耗时: {elapsed_time:.2f} 秒, 错误: {e}")
-        return ""
+        raise OCREngineError("OCR处理出错", cause=e)
 
-def extract_text_from_images_batch(images: List[np.ndarray]) -> List[str]:
+def extract_text_from_images_batch(images: List[np.ndarray], apps: Optional[List[Optional[str]]] = None,
+                                   titles: Optional[List[Optional[str]]] = None) -> List[str]:
     """批量从多个图像中提取文本
 
-    根据硬件环境自动选择最合适的OCR引擎
+    根据硬件环境自动选择最合适的OCR引擎，按截图所属应用选择OCR配置档
 
     Args:
         images: 要处理的图像列表（NumPy数组列表）
+        apps: 与images对应的应用列表，用于选择OCR配置档
+        titles: 与images对应的窗口标题列表，配置档为不做OCR时作为文本
 
     Returns:
-        提取的文本列表，如果某个图像提取失败则对应位置为空字符串
+        提取的文本列表，图像无效或引擎没有识别出文字时对应位置为空字符串
+
+    Raises:
+        OCREngineError: 没有可用的OCR引擎（UmiOCR和RapidOCR都出错）或识别出错
     """
     if not images:
         return []
+    apps = apps or [None] * len(images)
+    titles = titles or [None] * len(images)
 
-    # 过滤无效图像
+    # 过滤无效图像，不做OCR的截图直接使用窗口标题
+    results = ["" for _ in range(len(images))]
     valid_images = []
     valid_indices = []
     for i, image in enumerate(images):
         if image is not None and isinstance(image, np.ndarray) and image.size > 0:
-            processed = preprocess_image_for_ocr(image)
-            if processed is not None:
-                valid_images.append(processed)
-                valid_indices.append(i)
+            profile = get_ocr_profile(apps[i])
+            if profile.skip:
+                results[i] = skipped_ocr_text(apps[i], titles[i])
+                continue
+            valid_images.append((image, profile))
+            valid_indices.append(i)
 
     if not valid_images:
-        return ["" for _ in range(len(images))]
+        return results
 
     # 批量处理图像
     start_time = time.time()
-    results = ["" for _ in range(len(images))]
 
     try:
         # 获取OCR引擎
         engine, engine_type = get_ocr_engine()
         if engine is None:
-            return results
+            raise OCREngineError("没有可用的OCR引擎")
 
-        # 逐个处理图像
-        for i, img in enumerate(valid_images):
-            result = perform_ocr(engine, engine_type, img)
-            text = extract_text_from_ocr_result(result, engine_type)
+        # 逐个处理图像，缓存中已有近似画面的直接复用文本
+        for i, (image, profile) in enumerate(valid_images):
+            def recognize(img, profile=profile):
+                with acquire_profile_engine(profile) as (profile_engine, profile_engine_type):
+                    if profile_engine is None:
+                        raise OCREngineError("没有可用的OCR引擎")
+                    return recognize_image_text(profile_engine, profile_engine_type, img, profile)
 
             # 将结果放回原始位置
-            results[valid_indices[i]] = text
+            results[valid_indices[i]] = cached_ocr([image], recognize)[0]
 
         # 记录使用的OCR引擎类型
         engine_name = {
@@ -371,10 +565,13 @@ def extract_text_from_images_batch(images: List[np.ndarray]) -> List[str]:
 
         return results
 
+    except OCREngineError as e:
+        logger.error(f"[OCR] 批量处理时没有可用的OCR引擎，耗时: {time.time() - start_time:.2f} 秒, 错误: {e}")
+        raise
     except Exception as e:
         elapsed_time = time.time() - start_time
         logger.error(f"[OCR] 批量处理出错，耗时: {elapsed_time:.2f} 秒, 错误: {e}")
-        return results
+        raise OCREngineError("OCR批量处理出错", cause=e)
 
 # 测试代码
 if __name__ == "__main__":
@@ -0,0 +1,380 @@
+"""
+OCR任务队列模块
+
+每个需要OCR的条目在数据库的 ocr_jobs 表中有一条任务记录，由entries表上的触发器维护
+（插入未OCR的条目时创建，写入文本后标记完成，删除条目时删除）。任务状态：
+
+- pending: 等待处理；失败后在 next_attempt_at 之前处于退避中，不会被领取
+- leased: 已被某个工作者领取，租约到期（lease_expires）之前其他工作者不能领取。
+  工作者崩溃或进程退出后，租约到期的任务由 requeue_expired 放回pending
+- done: 条目已写入OCR文本
+- failed: 尝试次数达到 ocr_max_attempts，或遇到不可重试的错误（例如OCR结果为空），
+  不再自动处理，条目和截图保留
+
+领取任务时尝试次数加一（放弃领取时减一），领取本身是带条件的UPDATE，
+多个线程或进程可以同时处理同一个队列，重启后从数据库中的状态继续。
+处理顺序仍由OCR调度器决定，本模块只决定哪些条目现在可以处理。
+"""
+
+import os
+import time
+import socket
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from memococo.config import logger, get_settings
+from memococo.common.db_manager import DatabaseManager
+
+JOB_PENDING = "pending"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+DEFAULT_MAX_ATTEMPTS = 5
+# 租约时长（秒），应远大于单张截图的OCR耗时
+LEASE_SECONDS = 600
+# 第n次失败后等待 BACKOFF_BASE * 2^(n-1) 秒再重试，最多等待 BACKOFF_MAX 秒
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+
+# 错误信息的最大保存长度
+_MAX_ERROR_LENGTH = 500
+
+_due_lock = threading.Lock()
+_due_checked_at = 0.0
+
+
+def worker_id(name: Optional[str] = None) -> str:
+    """生成工作者标识：主机名:进程ID:名称（默认为当前线程名）"""
+    return f"{socket.gethostname()}:{os.getpid()}:{name or threading.current_thread().name}"
+
+
+def max_attempts() -> int:
+    """每个任务的最大尝试次数"""
+    return get_settings().get("ocr_max_attempts", DEFAULT_MAX_ATTEMPTS)
+
+
+def backoff_seconds(attempts: int) -> float:
+    """第attempts次失败后的重试等待时间"""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, attempts - 1))
+
+
+def claim_jobs(entry_ids: List[int], worker: str, ignore_backoff: bool = False,
+               lease_seconds: float = LEASE_SECONDS) -> List[int]:
+    """领取指定条目的任务
+
+    Args:
+        entry_ids: 条目ID列表
+        worker: 工作者标识
+        ignore_backoff: 是否领取仍在退避中的任务（用户正在查看的截图）
+        lease_seconds: 租约时长
+
+    Returns:
+        成功领取的条目ID，顺序与entry_ids一致；已被其他工作者领取、在退避中、
+        已完成或失败的任务不在结果中
+    """
+    if not entry_ids:
+        return []
+    now = time.time()
+    due = float("inf") if ignore_backoff else now
+    claimed = []
+    try:
+        with DatabaseManager.transaction() as conn:
+            for entry_id in entry_ids:
+                cursor = conn.execute(
+                    "UPDATE ocr_jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE entry_id = ? AND state = ? AND next_attempt_at <= ?",
+                    (JOB_LEASED, worker, now + lease_seconds, int(now), entry_id, JOB_PENDING, due)
+                )
+                if cursor.rowcount == 1:
+                    claimed.append(entry_id)
+    except Exception as e:
+        logger.error(f"领取OCR任务失败: {e}")
+        return []
+    return claimed
+
+
+def _entry_filter(start: Optional[int], end: Optional[int], apps: Optional[List[str]]) -> Tuple[str, Tuple]:
+    """按截图时间范围和应用筛选任务的SQL条件（entries表别名为e）"""
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("e.timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("e.timestamp < ?")
+        params.append(end)
+    if apps:
+        clauses.append(f"e.app IN ({','.join('?' * len(apps))})")
+        params.extend(apps)
+    return "".join(f" AND {clause}" for clause in clauses), tuple(params)
+
+
+def claim_next_jobs(worker: str, count: int, oldest_first: bool = True,
+                    lease_seconds: float = LEASE_SECONDS, start: Optional[int] = None,
+                    end: Optional[int] = None, apps: Optional[List[str]] = None) -> List[int]:
+    """按截图时间领取下一批可处理的任务
+
+    Args:
+        worker: 工作者标识
+        count: 最多领取的数量
+        oldest_first: 是否从最早的截图开始
+        lease_seconds: 租约时长
+        start: 只领取该时间戳（包含）之后的截图
+        end: 只领取该时间戳（不包含）之前的截图
+        apps: 只领取这些应用的截图
+
+    Returns:
+        成功领取的条目ID
+    """
+    order = "ASC" if oldest_first else "DESC"
+    condition, params = _entry_filter(start, end, apps)
+    try:
+        rows = DatabaseManager.execute(
+            f"SELECT j.entry_id FROM ocr_jobs j JOIN entries e ON e.id = j.entry_id "
+            f"WHERE j.state = ? AND j.next_attempt_at <= ?{condition} ORDER BY e.timestamp {order} LIMIT ?",
+            (JOB_PENDING, time.time()) + params + (count,)
+        )
+    except Exception as e:
+        logger.error(f"查询OCR任务失败: {e}")
+        return []
+    return claim_jobs([row["entry_id"] for row in rows], worker, lease_seconds=lease_seconds)
+
+
+def release_job(entry_id: int, worker: str) -> bool:
+    """放弃已领取的任务（例如因系统负载过高），不计入尝试次数，立即可以再次领取
+
+    Returns:
+        任务是否仍由该工作者持有并已放回
+    """
+    return _finish_lease(
+        "UPDATE ocr_jobs SET state = ?, worker = NULL, lease_expires = NULL, attempts = MAX(0, attempts - 1), "
+        "next_attempt_at = ?, updated_at = ? WHERE entry_id = ? AND state = ? AND worker = ?",
+        (JOB_PENDING, time.time(), int(time.time()), entry_id, JOB_LEASED, worker)
+    )
+
+
+def fail_job(entry_id: int, worker: str, error: str, permanent: bool = False) -> Optional[str]:
+    """记录任务失败
+
+    尝试次数未达到上限且错误可重试时，任务在退避时间后重新变为可领取，否则标记为失败
+
+    Args:
+        entry_id: 条目ID
+        worker: 工作者标识
+        error: 错误信息
+        permanent: 是否为不可重试的错误
+
+    Returns:
+        任务的新状态（pending或failed），任务已不由该工作者持有时返回None
+    """
+    rows = DatabaseManager.execute(
+        "SELECT attempts FROM ocr_jobs WHERE entry_id = ? AND state = ? AND worker = ?",
+        (entry_id, JOB_LEASED, worker)
+    )
+    if not rows:
+        return None
+    attempts = rows[0]["attempts"]
+    state = JOB_FAILED if permanent or attempts >= max_attempts() else JOB_PENDING
+    now = time.time()
+    if not _finish_lease(
+        "UPDATE ocr_jobs SET state = ?, worker = NULL, lease_expires = NULL, next_attempt_at = ?, "
+        "last_error = ?, updated_at = ? WHERE entry_id = ? AND state = ? AND worker = ?",
+        (state, now + backoff_seconds(attempts), str(error)[:_MAX_ERROR_LENGTH], int(now),
+         entry_id, JOB_LEASED, worker)
+    ):
+        return None
+    if state == JOB_FAILED:
+        logger.warning(f"[OCR] 条目 {entry_id} 的OCR任务失败（第 {attempts} 次尝试），不再重试: {error}")
+    else:
+        logger.info(f"[OCR] 条目 {entry_id} 的OCR任务失败（第 {attempts} 次尝试），"
+                    f"{backoff_seconds(attempts):.0f} 秒后重试: {error}")
+    return state
+
+
+def _finish_lease(sql: str, parameters: Tuple) -> bool:
+    try:
+        with DatabaseManager.transaction() as conn:
+            return conn.execute(sql, parameters).rowcount == 1
+    except Exception as e:
+        logger.error(f"更新OCR任务失败: {e}")
+        return False
+
+
+def requeue_expired() -> List[Tuple[int, int]]:
+    """把租约已到期的任务放回队列（持有者已崩溃或退出），尝试次数用完的标记为失败
+
+    Returns:
+        重新变为可领取的 (条目ID, 时间戳) 列表
+    """
+    now = time.time()
+    try:
+        rows = DatabaseManager.execute(
+            "SELECT j.entry_id, j.attempts, j.worker, e.timestamp FROM ocr_jobs j "
+            "JOIN entries e ON e.id = j.entry_id WHERE j.state = ? AND j.lease_expires < ?",
+            (JOB_LEASED, now)
+        )
+        requeued = []
+        limit = max_attempts()
+        with DatabaseManager.transaction() as conn:
+            for row in rows:
+                state = JOB_FAILED if row["attempts"] >= limit else JOB_PENDING
+                cursor = conn.execute(
+                    "UPDATE ocr_jobs SET state = ?, worker = NULL, lease_expires = NULL, next_attempt_at = ?, "
+                    "last_error = ?, updated_at = ? WHERE entry_id = ? AND state = ? AND lease_expires < ?",
+                    (state, now, f"lease expired ({row['worker']})", int(now), row["entry_id"], JOB_LEASED, now)
+                )
+                if cursor.rowcount == 1 and state == JOB_PENDING:
+                    requeued.append((row["entry_id"], row["timestamp"]))
+        if rows:
+            logger.warning(f"[OCR] {len(rows)} 个OCR任务的租约已到期，{len(requeued)} 个重新放回队列")
+        return requeued
+    except Exception as e:
+        logger.error(f"回收过期的OCR任务失败: {e}")
+        return []
+
+
+def reclaim_dead_workers() -> int:
+    """把本机上已退出的进程持有的任务立即放回队列，不必等待租约到期
+
+    Returns:
+        重新变为可领取的任务数量（同时包括其他租约已到期的任务）
+    """
+    host = socket.gethostname()
+    try:
+        rows = DatabaseManager.execute(
+            "SELECT DISTINCT worker FROM ocr_jobs WHERE state = ? AND worker LIKE ?", (JOB_LEASED, f"{host}:%")
+        )
+    except Exception as e:
+        logger.error(f"查询OCR任务持有者失败: {e}")
+        return 0
+    dead = []
+    for row in rows:
+        try:
+            pid = int(row["worker"].split(":")[1])
+        except (IndexError, ValueError):
+            continue
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            dead.append(row["worker"])
+        except OSError:
+            # 进程存在但属于其他用户
+            pass
+    if not dead:
+        return 0
+    try:
+        # 租约改为已到期，由 requeue_expired 按尝试次数放回或标记为失败
+        with DatabaseManager.transaction() as conn:
+            for worker in dead:
+                conn.execute("UPDATE ocr_jobs SET lease_expires = 0 WHERE state = ? AND worker = ?", (JOB_LEASED, worker))
+    except Exception as e:
+        logger.error(f"回收已退出进程的OCR任务失败: {e}")
+        return 0
+    return len(requeue_expired())
+
+
+def reset_failed_jobs(start: Optional[int] = None, end: Optional[int] = None,
+                      apps: Optional[List[str]] = None) -> int:
+    """把失败的任务重新放回队列，尝试次数清零
+
+    Args:
+        start: 只处理该时间戳（包含）之后的截图
+        end: 只处理该时间戳（不包含）之前的截图
+        apps: 只处理这些应用的截图
+
+    Returns:
+        放回的任务数量
+    """
+    condition, params = _entry_filter(start, end, apps)
+    try:
+        with DatabaseManager.transaction() as conn:
+            return conn.execute(
+                f"UPDATE ocr_jobs SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? "
+                f"WHERE state = ? AND entry_id IN (SELECT e.id FROM entries e WHERE 1 = 1{condition})",
+                (JOB_PENDING, int(time.time()), JOB_FAILED) + params
+            ).rowcount
+    except Exception as e:
+        logger.error(f"重置失败的OCR任务失败: {e}")
+        return 0
+
+
+def count_pending_jobs(start: Optional[int] = None, end: Optional[int] = None,
+                       apps: Optional[List[str]] = None) -> int:
+    """等待处理的任务数量（包括退避中和已被领取的任务）
+
+    Args:
+        start: 只统计该时间戳（包含）之后的截图
+        end: 只统计该时间戳（不包含）之前的截图
+        apps: 只统计这些应用的截图
+    """
+    condition, params = _entry_filter(start, end, apps)
+    try:
+        rows = DatabaseManager.execute(
+            f"SELECT COUNT(*) AS jobs FROM ocr_jobs j JOIN entries e ON e.id = j.entry_id "
+            f"WHERE j.state IN (?, ?){condition}",
+            (JOB_PENDING, JOB_LEASED) + params
+        )
+        return rows[0]["jobs"] if rows else 0
+    except Exception as e:
+        logger.error(f"统计OCR任务失败: {e}")
+        return 0
+
+
+def count_pending_jobs_by_day(start: Optional[int] = None) -> Dict[str, int]:
+    """按截图日期统计等待处理的任务数量（包括退避中和已被领取的任务，不包括已失败的任务）
+
+    Args:
+        start: 只统计该时间戳（包含）之后的截图
+
+    Returns:
+        日期键（YYYY/MM/DD，本地时间，与截图目录结构一致）到任务数量的映射
+    """
+    condition, params = _entry_filter(start, None, None)
+    try:
+        rows = DatabaseManager.execute(
+            f"SELECT strftime('%Y/%m/%d', e.timestamp, 'unixepoch', 'localtime') AS day, COUNT(*) AS jobs "
+            f"FROM ocr_jobs j JOIN entries e ON e.id = j.entry_id WHERE j.state IN (?, ?){condition} GROUP BY day",
+            (JOB_PENDING, JOB_LEASED) + params
+        )
+        return {row["day"]: row["jobs"] for row in rows}
+    except Exception as e:
+        logger.error(f"统计OCR任务失败: {e}")
+        return {}
+
+
+def take_due_jobs() -> List[Tuple[int, int]]:
+    """回收过期租约，并返回上次调用以来退避结束或被放回的任务
+
+    供工作者把这些条目重新加入OCR调度器（失败或被其他工作者持有的条目会从调度器中移除）
+
+    Returns:
+        (条目ID, 时间戳) 列表
+    """
+    global _due_checked_at
+    with _due_lock:
+        since, now = _due_checked_at, time.time()
+        _due_checked_at = now
+    due = requeue_expired()
+    try:
+        rows = DatabaseManager.execute(
+            "SELECT j.entry_id, e.timestamp FROM ocr_jobs j JOIN entries e ON e.id = j.entry_id "
+            "WHERE j.state = ? AND j.next_attempt_at > ? AND j.next_attempt_at <= ?",
+            (JOB_PENDING, since, now)
+        )
+        due.extend((row["entry_id"], row["timestamp"]) for row in rows)
+    except Exception as e:
+        logger.error(f"查询到期的OCR任务失败: {e}")
+    return due
+
+
+def job_stats() -> Dict[str, int]:
+    """各状态的任务数量"""
+    stats = {JOB_PENDING: 0, JOB_LEASED: 0, JOB_DONE: 0, JOB_FAILED: 0}
+    try:
+        for row in DatabaseManager.execute("SELECT state, COUNT(*) AS jobs FROM ocr_jobs GROUP BY state"):
+            stats[row["state"]] = row["jobs"]
+    except Exception as e:
+        logger.error(f"获取OCR任务统计失败: {e}")
+    return stats
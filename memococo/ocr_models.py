@@ -0,0 +1,331 @@
+"""
+OCR模型档位模块
+
+RapidOCR可以使用不同大小的检测、识别模型：
+- server: PP-OCR服务端模型，准确率最高，速度最慢。需要把模型文件放到 ocr_models/server/ 目录
+  （det.onnx 和 rec.onnx）
+- mobile: RapidOCR自带的移动端模型
+- int8: 由移动端模型动态量化得到的int8模型，首次使用时自动生成（需要安装onnx包）
+
+配置 ocr_model_tier 为 auto（默认）时，在本机上对可用档位各识别一张基准截图，
+选择满足 ocr_latency_target 的最准确档位，结果保存在 ocr_models/benchmark.json 中，
+CPU或线程配置变化后重新测试。生成int8模型和基准测试需要较长时间，在后台线程中进行
+（启动时开始，见 start_model_tier_selection），完成前使用移动端模型，不占用OCR调用的时限。
+
+同时提供ONNX Runtime会话的线程数参数（ocr_intra_op_threads / ocr_inter_op_threads）。
+"""
+
+import os
+import json
+import time
+import platform
+import threading
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from memococo.config import logger, get_settings, appdata_folder
+
+# 按准确率从高到低排列
+MODEL_TIERS = ("server", "mobile", "int8")
+DEFAULT_LATENCY_TARGET = 3.0
+
+models_folder = os.path.join(appdata_folder, "ocr_models")
+BENCHMARK_FILE = "benchmark.json"
+
+# 保护已选择的档位
+_lock = threading.RLock()
+# 同一时间只运行一次完整的选择（生成模型、基准测试）
+_selection_lock = threading.Lock()
+_selected_tier = None
+_selected_for = None
+_selection_thread: Optional[threading.Thread] = None
+
+
+def _bundled_model_paths() -> Dict[str, str]:
+    """RapidOCR自带的检测、识别模型路径"""
+    import rapidocr_onnxruntime
+    from rapidocr_onnxruntime.utils import read_yaml
+
+    root = os.path.dirname(rapidocr_onnxruntime.__file__)
+    config = read_yaml(os.path.join(root, "config.yaml"))
+    return {
+        "det": os.path.join(root, config["Det"]["model_path"]),
+        "rec": os.path.join(root, config["Rec"]["model_path"]),
+    }
+
+
+def _quantize_bundled_models(target: str) -> bool:
+    """把自带的移动端模型动态量化为int8模型"""
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError:
+        logger.info("未安装onnx包，无法生成int8量化模型（pip install onnx）")
+        return False
+
+    os.makedirs(target, exist_ok=True)
+    try:
+        for name, source in _bundled_model_paths().items():
+            output = os.path.join(target, f"{name}.onnx")
+            if os.path.exists(output):
+                continue
+            logger.info(f"正在生成int8量化模型: {output}")
+            temp = output + ".tmp"
+            quantize_dynamic(source, temp, weight_type=QuantType.QUInt8)
+            os.replace(temp, output)
+        return True
+    except Exception as e:
+        logger.error(f"生成int8量化模型失败: {e}")
+        return False
+
+
+def tier_model_params(tier: str, prepare: bool = False) -> Optional[Dict[str, str]]:
+    """档位对应的RapidOCR模型参数
+
+    Args:
+        tier: 模型档位
+        prepare: 是否在模型不存在时尝试生成（仅int8档位）
+
+    Returns:
+        模型路径参数（det_model_path、rec_model_path），mobile为空字典；档位不可用时返回None
+    """
+    if tier == "mobile":
+        return {}
+    if tier not in MODEL_TIERS:
+        return None
+    folder = os.path.join(models_folder, tier)
+    paths = {"det_model_path": os.path.join(folder, "det.onnx"), "rec_model_path": os.path.join(folder, "rec.onnx")}
+    if not all(os.path.exists(path) for path in paths.values()):
+        if not (prepare and tier == "int8" and _quantize_bundled_models(folder)):
+            return None
+    return paths
+
+
+def available_tiers(prepare: bool = False) -> List[str]:
+    """本机可用的模型档位（按准确率从高到低）"""
+    return [tier for tier in MODEL_TIERS if tier_model_params(tier, prepare) is not None]
+
+
+def session_params() -> Dict[str, int]:
+    """ONNX Runtime线程数参数，0表示由ONNX Runtime决定"""
+    settings = get_settings()
+    return {
+        "intra_op_num_threads": settings.get("ocr_intra_op_threads", 0) or -1,
+        "inter_op_num_threads": settings.get("ocr_inter_op_threads", 0) or -1,
+    }
+
+
+def _benchmark_frame() -> np.ndarray:
+    """生成一张1920x1080、20行文字的基准截图"""
+    image = np.full((1080, 1920, 3), 255, dtype=np.uint8)
+    for line in range(20):
+        cv2.putText(image, f"{line:02d} The quick brown fox jumps over the lazy dog 0123456789",
+                    (40, 60 + line * 48), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (20, 20, 20), 2, cv2.LINE_AA)
+    return image
+
+
+def benchmark_tiers(tiers: List[str], create_engine, runs: int = 1) -> Dict[str, float]:
+    """在本机上测试各档位识别基准截图的耗时
+
+    Args:
+        tiers: 要测试的档位
+        create_engine: 创建引擎的函数，参数为RapidOCR参数
+        runs: 每个档位计时的次数（另有一次预热），取最小值
+
+    Returns:
+        {档位: 秒}，创建引擎失败的档位不在结果中
+    """
+    from memococo.ocr_profiles import DEFAULT_ENGINE_PARAMS
+
+    frame = _benchmark_frame()
+    results = {}
+    for tier in tiers:
+        params = tier_model_params(tier, prepare=True)
+        if params is None:
+            continue
+        engine = create_engine(dict(DEFAULT_ENGINE_PARAMS, **session_params(), **params))
+        if engine is None:
+            continue
+        try:
+            engine(frame)
+            timings = []
+            for _ in range(max(1, runs)):
+                start_time = time.time()
+                engine(frame)
+                timings.append(time.time() - start_time)
+            results[tier] = min(timings)
+            logger.info(f"[OCR] 模型档位 {tier} 基准耗时: {results[tier]:.2f} 秒")
+        except Exception as e:
+            logger.warning(f"[OCR] 测试模型档位 {tier} 失败: {e}")
+        finally:
+            del engine
+    return results
+
+
+def choose_tier(results: Dict[str, float], target: float) -> Optional[str]:
+    """选择满足耗时目标的最准确档位，都不满足时选择最快的档位"""
+    if not results:
+        return None
+    for tier in MODEL_TIERS:
+        if tier in results and results[tier] <= target:
+            return tier
+    return min(results, key=results.get)
+
+
+def _machine_signature() -> Dict[str, Any]:
+    try:
+        import onnxruntime
+        ort_version = onnxruntime.__version__
+    except ImportError:
+        ort_version = None
+    return {
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "onnxruntime": ort_version,
+        "session": session_params(),
+    }
+
+
+def _load_benchmark(signature: Dict[str, Any], target: float) -> Optional[str]:
+    try:
+        with open(os.path.join(models_folder, BENCHMARK_FILE), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("signature") != signature:
+        return None
+    tier = choose_tier(saved.get("results", {}), target)
+    if tier is not None and tier_model_params(tier) is None:
+        return None
+    return tier
+
+
+def _save_benchmark(signature: Dict[str, Any], results: Dict[str, float]) -> None:
+    try:
+        os.makedirs(models_folder, exist_ok=True)
+        path = os.path.join(models_folder, BENCHMARK_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "results": results, "updated_at": int(time.time())}, f, indent=2)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.warning(f"保存OCR模型基准测试结果失败: {e}")
+
+
+def _tier_settings():
+    settings = get_settings()
+    configured = settings.get("ocr_model_tier", "auto")
+    target = settings.get("ocr_latency_target", DEFAULT_LATENCY_TARGET)
+    return configured, target, (configured, target)
+
+
+def _set_selected(tier: str, key) -> None:
+    global _selected_tier, _selected_for
+    with _lock:
+        _selected_tier, _selected_for = tier, key
+    logger.info(f"[OCR] 使用模型档位: {tier}")
+
+
+def _get_selected(key) -> Optional[str]:
+    with _lock:
+        if _selected_tier is not None and _selected_for == key:
+            return _selected_tier
+    return None
+
+
+def select_model_tier(create_engine=None) -> str:
+    """确定使用的模型档位（可能生成int8模型并运行基准测试，耗时较长）
+
+    配置 ocr_model_tier 指定了可用的档位时直接使用；为auto时读取保存的基准测试结果，
+    没有结果（第一次运行或CPU、线程配置变化）时在本机上测试
+
+    Args:
+        create_engine: 创建引擎的函数，基准测试时使用
+
+    Returns:
+        模型档位
+    """
+    configured, target, key = _tier_settings()
+    tier = _get_selected(key)
+    if tier is not None:
+        return tier
+    with _selection_lock:
+        tier = _get_selected(key)
+        if tier is not None:
+            return tier
+        if configured != "auto":
+            if tier_model_params(configured, prepare=True) is not None:
+                tier = configured
+            else:
+                logger.warning(f"[OCR] 模型档位 {configured} 不可用，改用自动选择")
+        if tier is None:
+            signature = _machine_signature()
+            tier = _load_benchmark(signature, target)
+            if tier is None and create_engine is not None:
+                logger.info("[OCR] 首次运行，正在测试本机可用的OCR模型档位")
+                results = benchmark_tiers(available_tiers(prepare=True), create_engine)
+                if results:
+                    _save_benchmark(signature, results)
+                tier = choose_tier(results, target)
+        tier = tier or "mobile"
+        _set_selected(tier, key)
+        return tier
+
+
+def start_model_tier_selection(create_engine=None, on_selected=None) -> None:
+    """在后台线程中确定模型档位
+
+    Args:
+        create_engine: 创建引擎的函数，基准测试时使用
+        on_selected: 选择了移动端以外的档位后调用（丢弃用移动端模型创建的引擎）
+    """
+    global _selection_thread
+
+    def run():
+        try:
+            tier = select_model_tier(create_engine)
+        except Exception as e:
+            logger.error(f"[OCR] 确定模型档位失败，继续使用移动端模型: {e}")
+            return
+        if tier != "mobile" and on_selected is not None:
+            on_selected()
+
+    with _lock:
+        if _selection_thread is not None and _selection_thread.is_alive():
+            return
+        _selection_thread = threading.Thread(target=run, name="OCRModelTier", daemon=True)
+        _selection_thread.start()
+
+
+def current_model_tier(create_engine=None, on_selected=None) -> str:
+    """当前使用的模型档位，不阻塞
+
+    已选择过、指定的档位模型已存在或有保存的基准测试结果时直接返回；
+    否则在后台线程中生成模型、运行基准测试（见 start_model_tier_selection），完成前返回mobile
+
+    Args:
+        create_engine: 创建引擎的函数，基准测试时使用
+        on_selected: 后台选择完成后调用
+
+    Returns:
+        模型档位
+    """
+    configured, target, key = _tier_settings()
+    tier = _get_selected(key)
+    if tier is not None:
+        return tier
+    if configured != "auto" and tier_model_params(configured) is not None:
+        tier = configured
+    else:
+        tier = _load_benchmark(_machine_signature(), target)
+    if tier is not None:
+        _set_selected(tier, key)
+        return tier
+    start_model_tier_selection(create_engine, on_selected)
+    return "mobile"
+
+
+def model_params(create_engine=None, on_selected=None) -> Dict[str, Any]:
+    """当前模型档位和会话选项对应的RapidOCR参数（不阻塞，见 current_model_tier）"""
+    tier = current_model_tier(create_engine, on_selected)
+    return dict(session_params(), **(tier_model_params(tier) or {}))
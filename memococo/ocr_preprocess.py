@@ -0,0 +1,186 @@
+"""
+OCR预处理模块
+
+原来的预处理只把长边超过2000像素的截图整体缩小，4K屏幕上的小字会因此无法识别，
+而大片空白（壁纸、编辑器空白区域、视频画面）仍然要经过文本检测。
+
+按内容预处理的步骤：
+1. 在缩小的灰度图上计算形态学梯度，梯度较强的像素视为笔画边缘，均匀区域没有边缘；
+2. 把边缘连接成文本块（连通域），丢弃过小的块以及颜色分布分散的照片、视频区域；
+3. 按原始分辨率裁剪文本块，依次排入若干张图块，每张图块只做一次OCR。
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 分析文本区域时缩放到的最长边
+ANALYSIS_MAX_SIDE = 1280
+# 形态学梯度超过该值的像素视为笔画边缘
+EDGE_THRESHOLD = 40
+# 连接同一文本块内字符和行的闭运算核（分析分辨率下的宽、高）
+BLOCK_KERNEL = (15, 7)
+# 分析分辨率下文本块的最小宽、高
+MIN_BLOCK_SIZE = (6, 4)
+# 亮度直方图中最集中的两档占比低于该值时视为照片或视频画面
+TEXT_HISTOGRAM_SHARE = 0.55
+# 文字与背景的亮度差（第2和第98百分位之差）低于该值时视为纹理而非文字
+TEXT_MIN_CONTRAST = 60
+# 裁剪文本块时向外扩展的像素（原始分辨率）
+REGION_PADDING = 8
+# 图块的最大边长和最小边长（原始分辨率）。RapidOCR会把短边放大到 Det.limit_side_len（960），
+# 过窄的图块会被放大成很长的图像，因此小图块补白到最小边长
+TILE_MAX_SIDE = 1920
+TILE_MIN_SIDE = 960
+# 图块中文本块之间的间隔
+TILE_GAP = 16
+# 文本块覆盖超过该比例的画面，或图块数超过上限时，不再裁剪
+MAX_CONTENT_RATIO = 0.75
+MAX_TILES = 6
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        image = image[:, :, :3]
+    return cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2GRAY)
+
+
+def _is_text_like(gray: np.ndarray) -> bool:
+    """文字区域的亮度集中在背景色和文字颜色两档附近且反差明显，照片的亮度分布分散"""
+    histogram = cv2.calcHist([gray], [0], None, [16], [0, 256]).flatten()
+    top_two = np.sort(histogram)[-2:].sum()
+    if top_two < TEXT_HISTOGRAM_SHARE * gray.size:
+        return False
+    low, high = np.percentile(gray, (2, 98))
+    return high - low >= TEXT_MIN_CONTRAST
+
+
+def find_text_regions(image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """查找截图中可能包含文字的区域
+
+    Args:
+        image: 截图（RGB/RGBA或灰度NumPy数组）
+
+    Returns:
+        原始分辨率下的区域列表 (x, y, w, h)，按从上到下、从左到右排序
+    """
+    gray = _to_gray(image)
+    height, width = gray.shape
+    scale = min(1.0, ANALYSIS_MAX_SIDE / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+
+    gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    edges = (gradient > EDGE_THRESHOLD).astype(np.uint8)
+    blocks = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, BLOCK_KERNEL))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+
+    regions = []
+    for x, y, w, h, _ in stats[1:count]:
+        if w < MIN_BLOCK_SIZE[0] or h < MIN_BLOCK_SIZE[1]:
+            continue
+        if not _is_text_like(small[y:y + h, x:x + w]):
+            continue
+        # 换算回原始分辨率并向外扩展
+        x0 = max(0, int(x / scale) - REGION_PADDING)
+        y0 = max(0, int(y / scale) - REGION_PADDING)
+        x1 = min(width, int(np.ceil((x + w) / scale)) + REGION_PADDING)
+        y1 = min(height, int(np.ceil((y + h) / scale)) + REGION_PADDING)
+        regions.append((x0, y0, x1 - x0, y1 - y0))
+    regions.sort(key=lambda region: (region[1], region[0]))
+    return regions
+
+
+def _split_region(region: Tuple[int, int, int, int]) -> List[Tuple[int, int, int, int]]:
+    """把超过图块大小的区域切成若干块，相邻块之间保留重叠以免切断文字行"""
+    x, y, w, h = region
+    overlap = TILE_GAP * 2
+    limit = TILE_MAX_SIDE
+    parts = []
+    top = y
+    while True:
+        part_h = min(limit, y + h - top)
+        left = x
+        while True:
+            part_w = min(limit, x + w - left)
+            parts.append((left, top, part_w, part_h))
+            if left + part_w >= x + w:
+                break
+            left += part_w - overlap
+        if top + part_h >= y + h:
+            break
+        top += part_h - overlap
+    return parts
+
+
+def _new_tile(background: int, channels: Optional[int], dtype) -> np.ndarray:
+    shape = (TILE_MAX_SIDE, TILE_MAX_SIDE) if channels is None else (TILE_MAX_SIDE, TILE_MAX_SIDE, channels)
+    return np.full(shape, background, dtype=dtype)
+
+
+def pack_regions(image: np.ndarray, regions: List[Tuple[int, int, int, int]]) -> List[np.ndarray]:
+    """按原始分辨率把文本区域依次排入图块（逐行排列，一行放满后换行，一张放满后换下一张）
+
+    Args:
+        image: 截图
+        regions: 区域列表 (x, y, w, h)
+
+    Returns:
+        图块列表
+    """
+    channels = None if image.ndim == 2 else image.shape[2]
+    # 用截图的主要亮度作为图块底色，深色主题下不会在文本块周围产生额外的边缘
+    background = int(np.median(_to_gray(image)[::16, ::16]))
+    tiles = []
+    tile = None
+    cursor_x = cursor_y = shelf_h = used_w = 0
+
+    def finish():
+        used_h = cursor_y + shelf_h
+        tiles.append(tile[:max(used_h, TILE_MIN_SIDE), :max(used_w, TILE_MIN_SIDE)].copy())
+
+    for region in regions:
+        for x, y, w, h in _split_region(region):
+            if tile is not None and cursor_x + w > TILE_MAX_SIDE:
+                cursor_x, cursor_y, shelf_h = 0, cursor_y + shelf_h + TILE_GAP, 0
+            if tile is not None and cursor_y + h > TILE_MAX_SIDE:
+                finish()
+                tile = None
+            if tile is None:
+                tile = _new_tile(background, channels, image.dtype)
+                cursor_x = cursor_y = shelf_h = used_w = 0
+            tile[cursor_y:cursor_y + h, cursor_x:cursor_x + w] = image[y:y + h, x:x + w]
+            cursor_x += w + TILE_GAP
+            shelf_h = max(shelf_h, h)
+            used_w = max(used_w, cursor_x - TILE_GAP)
+    if tile is not None:
+        finish()
+    return tiles
+
+
+def prepare_content_tiles(image: np.ndarray) -> Optional[List[np.ndarray]]:
+    """按内容裁剪截图，得到需要OCR的图块
+
+    Args:
+        image: 截图
+
+    Returns:
+        图块列表（没有文字时为空列表）；文字铺满画面或过于分散、裁剪收益不大时返回None，
+        由调用方改用整图缩放
+    """
+    regions = find_text_regions(image)
+    if not regions:
+        return []
+    area = sum(w * h for _, _, w, h in regions)
+    if area > MAX_CONTENT_RATIO * image.shape[0] * image.shape[1]:
+        return None
+    tiles = pack_regions(image, regions)
+    if len(tiles) > MAX_TILES:
+        return None
+    return tiles
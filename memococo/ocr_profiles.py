@@ -0,0 +1,192 @@
+"""
+OCR配置档模块
+
+不同应用的截图适合不同的OCR参数：终端是等宽的水平文字，不需要方向分类，也可以跳过文本检测
+按行切片后直接识别；图片查看器、视频播放器的画面可以完全不做OCR。
+
+配置档按截图时记录的应用名（entries.app）选择，每个配置档包含：
+- skip: 不做OCR，以窗口标题（没有标题时为应用名）作为文本，截图仍可按标题搜索
+- preprocess: 预处理方式（content/resize），None表示使用配置 ocr_preprocess
+- line_mode: 按行切片后只运行识别模型（适合背景单一的终端），切片失败时回退到正常识别
+- engine_params: RapidOCR参数（与RapidOCR构造函数的关键字参数相同，如 use_cls、det_limit_side_len），
+  与默认参数合并，每个配置档使用各自的引擎实例
+
+在配置文件中可以新增或覆盖配置档以及应用与配置档的对应关系：
+
+    [ocr_profiles.fast]
+    engine_params = { use_cls = false, det_limit_side_len = 736 }
+
+    [ocr_app_profiles]
+    vlc = "skip"
+    "gnome-terminal-server" = "terminal"
+"""
+
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from memococo.config import logger, get_settings
+
+OCRProfile = namedtuple("OCRProfile", ["name", "skip", "preprocess", "line_mode", "engine_params"])
+
+DEFAULT_PROFILE = "default"
+
+# RapidOCR默认参数
+DEFAULT_ENGINE_PARAMS = {
+    "use_cls": True,               # 启用角度分类，处理旋转文本
+    "det_limit_side_len": 960,     # 检测时短边缩放到的长度
+    "det_limit_type": "min",       # 按短边缩放，保持长宽比
+    "det_thresh": 0.3,             # 检测置信度阈值，降低可提高速度但可能降低准确率
+    "rec_batch_num": 6,            # 识别批处理数量，提高并行处理能力
+    "cls_batch_num": 6,            # 角度分类批处理数量
+    "cls_thresh": 0.9,             # 角度分类置信度阈值
+}
+
+BUILTIN_PROFILES = {
+    DEFAULT_PROFILE: OCRProfile(DEFAULT_PROFILE, False, None, False, {}),
+    "terminal": OCRProfile("terminal", False, None, True, {"use_cls": False}),
+    "skip": OCRProfile("skip", True, None, False, {}),
+}
+
+# 应用名（截图时记录的app）与配置档的默认对应关系
+BUILTIN_APP_PROFILES = {
+    "gnome-terminal-server": "terminal",
+    "org.gnome.Terminal": "terminal",
+    "org.gnome.Console": "terminal",
+    "kgx": "terminal",
+    "konsole": "terminal",
+    "xfce4-terminal": "terminal",
+    "terminator": "terminal",
+    "tilix": "terminal",
+    "kitty": "terminal",
+    "alacritty": "terminal",
+    "Alacritty": "terminal",
+    "wezterm-gui": "terminal",
+    "deepin-terminal": "terminal",
+    "WindowsTerminal": "terminal",
+}
+
+# 按行切片：与背景亮度差超过该值的像素视为文字
+LINE_INK_THRESHOLD = 40
+# 按行切片：背景色像素占比低于该值时（不是单一背景的终端画面）回退到正常识别
+LINE_MIN_BACKGROUND_SHARE = 0.6
+# 按行切片：文字行的高度范围（像素），超出时回退到正常识别
+LINE_MIN_HEIGHT = 6
+LINE_MAX_HEIGHT = 64
+# 按行切片：行内允许的空白行数（下划线、行距）
+LINE_MAX_GAP = 1
+# 按行切片：行图像四周保留的像素
+LINE_PADDING = 2
+
+
+def _merged_profiles() -> Dict[str, OCRProfile]:
+    profiles = dict(BUILTIN_PROFILES)
+    for name, options in (get_settings().get("ocr_profiles") or {}).items():
+        if not isinstance(options, dict):
+            logger.warning(f"忽略无效的OCR配置档: {name}")
+            continue
+        base = profiles.get(name, BUILTIN_PROFILES[DEFAULT_PROFILE])
+        profiles[name] = OCRProfile(
+            name=name,
+            skip=bool(options.get("skip", base.skip)),
+            preprocess=options.get("preprocess", base.preprocess),
+            line_mode=bool(options.get("line_mode", base.line_mode)),
+            engine_params=dict(base.engine_params, **(options.get("engine_params") or {})),
+        )
+    return profiles
+
+
+def list_ocr_profiles() -> List[OCRProfile]:
+    """列出所有配置档（内置配置档和配置文件中定义的配置档）"""
+    return list(_merged_profiles().values())
+
+
+def get_ocr_profile(app: Optional[str] = None) -> OCRProfile:
+    """获取应用对应的OCR配置档
+
+    Args:
+        app: 截图时记录的应用名，None时返回默认配置档
+
+    Returns:
+        OCR配置档，应用没有对应配置档或配置档不存在时返回默认配置档
+    """
+    profiles = _merged_profiles()
+    if app:
+        app_profiles = dict(BUILTIN_APP_PROFILES, **(get_settings().get("ocr_app_profiles") or {}))
+        name = app_profiles.get(app)
+        if name is not None:
+            if name in profiles:
+                return profiles[name]
+            logger.warning(f"应用 {app} 对应的OCR配置档不存在: {name}")
+    return profiles[DEFAULT_PROFILE]
+
+
+def get_profile_by_name(name: str) -> Optional[OCRProfile]:
+    """按名称获取OCR配置档"""
+    return _merged_profiles().get(name)
+
+
+def engine_params_for(profile: OCRProfile, model: Optional[Dict] = None) -> Dict:
+    """配置档的完整RapidOCR参数
+
+    Args:
+        profile: OCR配置档
+        model: 模型档位和会话选项参数（见ocr_models模块），配置档中的同名参数优先
+    """
+    return dict(DEFAULT_ENGINE_PARAMS, **(model or {}), **profile.engine_params)
+
+
+def skipped_ocr_text(app: Optional[str], title: Optional[str]) -> str:
+    """不做OCR的截图使用的文本"""
+    return title or app or ""
+
+
+def slice_text_lines(image: np.ndarray) -> Optional[List[np.ndarray]]:
+    """按水平投影把背景单一的截图（终端）切成文字行
+
+    Args:
+        image: 截图
+
+    Returns:
+        文字行图像列表（从上到下）；画面不是单一背景或行高异常时返回None
+    """
+    if image.ndim == 3:
+        channels = image[:, :, :3]
+        gray = cv2.cvtColor(np.ascontiguousarray(channels), cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image
+    background = int(np.median(gray[::4, ::4]))
+    ink = cv2.absdiff(gray, np.full_like(gray, background)) > LINE_INK_THRESHOLD
+    if 1 - ink.mean() < LINE_MIN_BACKGROUND_SHARE:
+        return None
+
+    rows = ink.any(axis=1)
+    runs: List[Tuple[int, int]] = []
+    start = gap = None
+    for y, has_ink in enumerate(rows):
+        if has_ink:
+            if start is None:
+                start = y
+            gap = 0
+        elif start is not None:
+            gap += 1
+            if gap > LINE_MAX_GAP:
+                runs.append((start, y - gap + 1))
+                start = None
+    if start is not None:
+        runs.append((start, len(rows)))
+
+    lines = []
+    height, width = gray.shape
+    for top, bottom in runs:
+        if bottom - top > LINE_MAX_HEIGHT:
+            return None
+        if bottom - top < LINE_MIN_HEIGHT:
+            continue
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        left = max(0, columns[0] - LINE_PADDING)
+        right = min(width, columns[-1] + 1 + LINE_PADDING)
+        lines.append(image[max(0, top - LINE_PADDING):min(height, bottom + LINE_PADDING), left:right])
+    return lines
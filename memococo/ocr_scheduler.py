@@ -0,0 +1,435 @@
+"""
+OCR调度模块
+
+在内存中维护未OCR条目的有序集合，以及由已OCR条目分隔出的“未覆盖区间”最大堆，
+每次取出时间跨度最大的区间，选择其中点附近的条目进行OCR，使时间线上的OCR覆盖尽快变得均匀。
+
+- 启动后第一次调度时从数据库载入一次（两条查询），之后不再扫描数据库
+- 数据库条目插入、OCR完成、删除时通过 database.add_entry_listener 增量更新
+- 已选出但尚未完成的条目视为已覆盖，同一批次中的其余条目会落在其他区间；
+  因系统负载跳过的条目通过 release 放回原区间
+- 用户正在查看的截图通过 prioritize 进入优先队列，先于所有区间被选出，
+  wait_done 可以等待某个条目完成（供长轮询接口使用）
+
+条目用 (timestamp, id) 作为键，保证时间戳相同的条目也能区分。未OCR条目和区间起点保存在有序容器
+（sortedcontainers.SortedList/SortedDict）中，插入、删除、按位置访问和查找前后条目都是O(log n)，
+积压数万条时每次调度的开销也不随积压数线性增长。
+"""
+
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from sortedcontainers import SortedDict, SortedList
+
+from memococo.config import ocr_logger
+from memococo.database import add_entry_listener, get_pending_ocr_runs, get_last_ocr_timestamp
+
+Key = Tuple[int, int]
+
+# 优先队列的最大长度，超出时丢弃最早的请求
+PRIORITY_QUEUE_SIZE = 256
+
+
+class OCRScheduler:
+    """基于未覆盖区间的OCR调度器"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # 条目完成、删除或放弃时通知等待者
+        self._done = threading.Condition(self._lock)
+        self._seeded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        # 按 (timestamp, id) 排序的未OCR条目
+        self._pending = SortedList()
+        # 条目ID到键的映射（包括处理中的条目）
+        self._ids: Dict[int, Key] = {}
+        # 区间：连续的未OCR条目，中间没有已OCR的条目；按起点排序，起点键 -> 终点键
+        self._runs = SortedDict()
+        # 最大堆（惰性删除）：(-时间跨度, -条目数, 起点键, 终点键)
+        self._heap: List[Tuple[int, int, Key, Key]] = []
+        # 处理中的条目 -> (是否与前一个条目相连, 是否与后一个条目相连)
+        self._inflight: Dict[Key, Tuple[bool, bool]] = {}
+        # 最新的已覆盖时间戳，用于判断新截图能否并入最后一个区间
+        self._last_covered: Optional[int] = None
+        # 优先队列，最近请求的条目在末尾，先被选出
+        self._priority: "OrderedDict[Key, None]" = OrderedDict()
+
+    def seed(self, rows: List[Tuple[int, int, int]], last_covered: Optional[int]) -> None:
+        """载入未OCR条目
+
+        Args:
+            rows: (id, timestamp, 区间编号) 列表，按时间戳排序，区间编号相同的条目之间没有已OCR条目
+            last_covered: 最新的已OCR条目时间戳
+        """
+        with self._lock:
+            self._reset()
+            self._last_covered = last_covered
+            self._pending.update((timestamp, entry_id) for entry_id, timestamp, _ in rows)
+            group = None
+            start = previous = None
+            for entry_id, timestamp, run_id in rows:
+                key = (timestamp, entry_id)
+                self._ids[entry_id] = key
+                if run_id != group:
+                    if start is not None:
+                        self._set_run(start, previous)
+                    group = run_id
+                    start = key
+                previous = key
+            if start is not None:
+                self._set_run(start, previous)
+            self._seeded = True
+
+    def ensure_seeded(self) -> None:
+        """第一次使用时从数据库载入"""
+        if self._seeded:
+            return
+        with self._lock:
+            if self._seeded:
+                return
+            rows = get_pending_ocr_runs()
+            self.seed(rows, get_last_ocr_timestamp())
+            ocr_logger.info(f"OCR scheduler loaded {len(self._pending)} pending entries in {len(self._runs)} gaps")
+
+    # ---- 区间维护 ----
+
+    def _index(self, key: Key) -> int:
+        return self._pending.bisect_left(key)
+
+    def _set_run(self, start: Key, end: Key) -> None:
+        self._runs[start] = end
+        count = self._index(end) - self._index(start) + 1
+        heapq.heappush(self._heap, (start[0] - end[0], -count, start, end))
+
+    def _delete_run(self, start: Key) -> None:
+        del self._runs[start]
+
+    def _run_of(self, key: Key) -> Optional[Key]:
+        """查找包含键所在时间位置的区间起点"""
+        index = self._runs.bisect_right(key) - 1
+        if index >= 0:
+            start, end = self._runs.peekitem(index)
+            if end >= key:
+                return start
+        return None
+
+    def _split(self, key: Key) -> Tuple[bool, bool]:
+        """把未OCR条目从区间中取出，区间在该位置断开
+
+        Returns:
+            (是否与前一个条目相连, 是否与后一个条目相连)
+        """
+        start = self._run_of(key)
+        index = self._index(key)
+        del self._pending[index]
+        if start is None:
+            return False, False
+        end = self._runs[start]
+        self._delete_run(start)
+        joined_left = key != start
+        joined_right = key != end
+        if joined_left:
+            self._set_run(start, self._pending[index - 1])
+        if joined_right:
+            self._set_run(self._pending[index], end)
+        return joined_left, joined_right
+
+    def _join(self, key: Key, joined_left: bool, joined_right: bool, keep: bool) -> None:
+        """把处理中的条目放回（keep=True）或删除后重新连接两侧的区间"""
+        index = self._index(key)
+        if self._run_of(key) is not None:
+            # 期间已有区间跨过该位置（例如乱序插入的条目）
+            if keep:
+                self._pending.add(key)
+            return
+        left = right = None
+        if joined_left and index > 0:
+            previous = self._pending[index - 1]
+            candidate = self._run_of(previous)
+            if candidate is not None and self._runs[candidate] == previous:
+                left = candidate
+        if joined_right and index < len(self._pending):
+            following = self._pending[index]
+            if following in self._runs:
+                right = following
+
+        if keep:
+            self._pending.add(key)
+        elif left is None or right is None:
+            # 删除的条目只影响两侧区间能否合并，单侧时无需调整
+            return
+
+        start = left if left is not None else key
+        end = self._runs[right] if right is not None else key
+        if right is not None:
+            self._delete_run(right)
+        self._set_run(start, end)
+
+    def _remove_pending(self, key: Key) -> None:
+        """删除未OCR条目（条目被删除，不构成覆盖）"""
+        start = self._run_of(key)
+        index = self._index(key)
+        del self._pending[index]
+        if start is None:
+            return
+        end = self._runs[start]
+        if start == end:
+            self._delete_run(start)
+        elif key == start:
+            self._delete_run(start)
+            self._set_run(self._pending[index], end)
+        elif key == end:
+            self._set_run(start, self._pending[index - 1])
+
+    def _mark_covered(self, timestamp: int) -> None:
+        if self._last_covered is None or timestamp > self._last_covered:
+            self._last_covered = timestamp
+
+    def _cover(self, timestamp: int) -> None:
+        """记录一个已覆盖的时间点，必要时把包含它的区间断开"""
+        self._mark_covered(timestamp)
+        start = self._run_of((timestamp, -1))
+        if start is None:
+            return
+        end = self._runs[start]
+        if not (start[0] < timestamp < end[0]):
+            return
+        index = self._pending.bisect_left((timestamp, -1))
+        self._delete_run(start)
+        self._set_run(start, self._pending[index - 1])
+        self._set_run(self._pending[index], end)
+
+    def _compact_heap(self) -> None:
+        """堆中过期的项太多时重建"""
+        if len(self._heap) > 4 * len(self._runs) + 1024:
+            self._heap = [item for item in self._heap if self._runs.get(item[2]) == item[3]]
+            heapq.heapify(self._heap)
+
+    # ---- 数据库变化 ----
+
+    def add_pending(self, entry_id: int, timestamp: int) -> None:
+        """新增未OCR条目"""
+        with self._lock:
+            if entry_id in self._ids:
+                return
+            key = (timestamp, entry_id)
+            self._ids[entry_id] = key
+            if self._pending and key < self._pending[-1]:
+                # 乱序插入：落在已有区间内时只加入有序集合，否则单独成为一个区间
+                start = self._run_of(key)
+                self._pending.add(key)
+                if start is None:
+                    self._set_run(key, key)
+                return
+
+            self._pending.add(key)
+            if self._runs:
+                last_start, last_end = self._runs.peekitem(-1)
+                if self._last_covered is None or self._last_covered < last_end[0]:
+                    # 最后一个区间之后没有已覆盖的条目，延长该区间
+                    self._set_run(last_start, key)
+                    self._compact_heap()
+                    return
+            self._set_run(key, key)
+
+    def complete(self, entry_id: int, timestamp: Optional[int] = None) -> None:
+        """条目完成OCR（文本已写入数据库）"""
+        with self._lock:
+            key = self._ids.pop(entry_id, None)
+            if key is None:
+                if timestamp is not None:
+                    self._cover(timestamp)
+                return
+            if self._inflight.pop(key, None) is None:
+                self._split(key)
+            self._mark_covered(key[0])
+            self._priority.pop(key, None)
+            self._done.notify_all()
+
+    def remove(self, entry_id: int) -> None:
+        """条目从数据库删除"""
+        with self._lock:
+            key = self._ids.pop(entry_id, None)
+            if key is None:
+                return
+            flags = self._inflight.pop(key, None)
+            if flags is not None:
+                self._join(key, flags[0], flags[1], keep=False)
+            else:
+                self._remove_pending(key)
+            self._priority.pop(key, None)
+            self._done.notify_all()
+
+    def release(self, entry_id: int) -> None:
+        """把处理中的条目放回原区间（例如因系统负载过高而跳过）"""
+        with self._lock:
+            key = self._ids.get(entry_id)
+            flags = self._inflight.pop(key, None) if key is not None else None
+            if flags is not None:
+                self._join(key, flags[0], flags[1], keep=True)
+
+    def drop(self, entry_id: int) -> None:
+        """放弃处理中的条目（OCR失败），本次运行不再调度，重启后重新载入"""
+        with self._lock:
+            key = self._ids.pop(entry_id, None)
+            if key is not None:
+                self._inflight.pop(key, None)
+                self._done.notify_all()
+
+    def on_entry_event(self, event: str, entry_id: int, timestamp: Optional[int], pending: bool) -> None:
+        """数据库条目变化监听器
+
+        Args:
+            event: "insert"、"update" 或 "remove"
+            entry_id: 条目ID
+            timestamp: 条目时间戳（update时可能为None）
+            pending: 条目是否仍需要OCR
+        """
+        if not self._seeded:
+            # 尚未载入时忽略，载入时会直接读取数据库的最新状态
+            return
+        if event == "insert":
+            if pending:
+                self.add_pending(entry_id, timestamp)
+            else:
+                self.complete(entry_id, timestamp)
+        elif event == "update":
+            if not pending:
+                self.complete(entry_id, timestamp)
+        elif event == "remove":
+            self.remove(entry_id)
+
+    # ---- 调度 ----
+
+    def _is_pending(self, key: Key) -> bool:
+        index = self._index(key)
+        return index < len(self._pending) and self._pending[index] == key
+
+    def _take(self, key: Key) -> None:
+        """把未OCR条目标记为处理中"""
+        self._inflight[key] = self._split(key)
+        self._mark_covered(key[0])
+
+    def prioritize(self, timestamp: int, radius: int = 0, limit: int = 1) -> List[Key]:
+        """把指定时间附近的未OCR条目加入优先队列
+
+        Args:
+            timestamp: 用户正在查看的截图时间戳
+            radius: 同时加入前后多少秒内的条目
+            limit: 最多加入的条目数量，距离timestamp越近越优先
+
+        Returns:
+            加入优先队列的 (timestamp, id) 列表，按距离从近到远排列
+        """
+        self.ensure_seeded()
+        with self._lock:
+            nearby = self._pending.irange((timestamp - radius,), (timestamp + radius + 1,), inclusive=(True, False))
+            keys = sorted(nearby, key=lambda key: abs(key[0] - timestamp))[:limit]
+            # 最近的条目最后加入，最先被选出
+            for key in reversed(keys):
+                self._priority.pop(key, None)
+                self._priority[key] = None
+            while len(self._priority) > PRIORITY_QUEUE_SIZE:
+                self._priority.popitem(last=False)
+            return keys
+
+    def pick_priority(self, count: int) -> List[Key]:
+        """只从优先队列中选出条目
+
+        Args:
+            count: 最多选择的条目数量
+
+        Returns:
+            (timestamp, id) 列表
+        """
+        self.ensure_seeded()
+        selected = []
+        with self._lock:
+            while len(selected) < count and self._priority:
+                key, _ = self._priority.popitem()
+                if self._is_pending(key):
+                    self._take(key)
+                    selected.append(key)
+        return selected
+
+    def has_priority(self) -> bool:
+        """优先队列是否有等待处理的条目"""
+        return bool(self._priority)
+
+    def wait_done(self, entry_id: int, timeout: float) -> bool:
+        """等待条目完成OCR、被删除或被放弃
+
+        Args:
+            entry_id: 条目ID
+            timeout: 最长等待秒数
+
+        Returns:
+            条目是否已不在调度器中（False表示超时）
+        """
+        with self._done:
+            return self._done.wait_for(lambda: entry_id not in self._ids, timeout)
+
+    def pick(self, count: int) -> List[Key]:
+        """选出下一批需要OCR的条目
+
+        先选出优先队列中的条目，然后每次从最大的未覆盖区间中选择最接近区间时间中点的条目，
+        选出的条目标记为处理中。
+
+        Args:
+            count: 最多选择的条目数量
+
+        Returns:
+            (timestamp, id) 列表，按选择顺序排列
+        """
+        selected = self.pick_priority(count)
+        with self._lock:
+            while len(selected) < count and self._heap:
+                _, _, start, end = heapq.heappop(self._heap)
+                if self._runs.get(start) != end:
+                    continue
+                first = self._index(start)
+                last = self._index(end)
+                middle = (start[0] + end[0]) / 2
+                index = min(max(self._pending.bisect_left((middle,)), first), last + 1)
+                if index > first and (index > last or middle - self._pending[index - 1][0] <= self._pending[index][0] - middle):
+                    index -= 1
+                key = self._pending[index]
+                self._take(key)
+                selected.append(key)
+            self._compact_heap()
+        return selected
+
+    def stats(self) -> Dict[str, Any]:
+        """调度器状态"""
+        with self._lock:
+            largest = 0
+            for neg_span, _, start, end in self._heap:
+                if self._runs.get(start) == end:
+                    largest = max(largest, -neg_span)
+            return {
+                "pending": len(self._pending),
+                "gaps": len(self._runs),
+                "in_progress": len(self._inflight),
+                "priority": len(self._priority),
+                "largest_gap_seconds": largest,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_ocr_scheduler() -> OCRScheduler:
+    """获取全局OCR调度器（第一次调用时注册数据库监听器）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                scheduler = OCRScheduler()
+                add_entry_listener(scheduler.on_entry_event)
+                _scheduler = scheduler
+    return _scheduler
@@ -0,0 +1,181 @@
+"""
+OCR看门狗模块
+
+每次OCR调用在受监督的工作线程中运行，调用者最多等待 ocr_timeout 秒。超时时调用者收到
+OCRTimeoutError，卡住的工作线程被放弃（Python线程无法强制终止，它在OCR返回后自行退出），
+之后的调用使用新的工作线程和重新创建的OCR引擎。这样卡住的RapidOCR调用或无响应的UmiOCR
+不会阻塞截图线程和OCR工作线程，超时的截图保留为未OCR，由OCR任务队列稍后重试。
+
+仍未退出的被放弃线程达到上限时不再启动新的OCR，直接超时，避免线程和内存无限增长。
+"""
+
+import queue
+import threading
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional
+
+from memococo.config import logger, get_settings
+from memococo.common.error_handler import OCRTimeoutError
+
+# 单张截图的默认OCR时限（秒）
+DEFAULT_OCR_TIMEOUT = 20
+# 仍在运行的被放弃工作线程的上限
+MAX_ABANDONED_WORKERS = 2
+
+
+def ocr_timeout(count: int = 1) -> float:
+    """识别count张截图的时限（秒）"""
+    return get_settings().get("ocr_timeout", DEFAULT_OCR_TIMEOUT) * max(1, count)
+
+
+class _Worker:
+    """执行OCR调用的工作线程，一次只执行一个调用"""
+
+    def __init__(self, name: str):
+        self.tasks = queue.Queue()
+        self.abandoned = False
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            future, func, args, kwargs = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            if self.abandoned:
+                return
+
+    def abandon(self):
+        """放弃该线程：当前调用返回后线程退出"""
+        self.abandoned = True
+        self.tasks.put(None)
+
+
+class OCRWatchdog:
+    """在受监督的工作线程中执行OCR调用并强制时限
+
+    多个线程可以同时调用，每个调用占用一个空闲工作线程（没有空闲线程时新建）。
+    """
+
+    def __init__(self, name: str = "OCRWatchdog", max_abandoned: int = MAX_ABANDONED_WORKERS,
+                 on_restart: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            name: 工作线程名前缀
+            max_abandoned: 仍在运行的被放弃工作线程的上限
+            on_restart: 放弃工作线程后调用，用于丢弃可能卡住的OCR引擎
+        """
+        self.name = name
+        self.max_abandoned = max_abandoned
+        self.on_restart = on_restart
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._abandoned: List[_Worker] = []
+        self._created = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.rejected = 0
+
+    def _stuck_workers(self) -> int:
+        self._abandoned = [worker for worker in self._abandoned if worker.thread.is_alive()]
+        return len(self._abandoned)
+
+    def _acquire(self) -> Optional[_Worker]:
+        with self._lock:
+            if self._stuck_workers() >= self.max_abandoned:
+                self.rejected += 1
+                return None
+            self.calls += 1
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+            return _Worker(f"{self.name}-{self._created}")
+
+    def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """在工作线程中执行func，最多等待timeout秒
+
+        Args:
+            func: OCR调用
+            timeout: 时限（秒），默认为 ocr_timeout()
+            *args, **kwargs: 传给func的参数
+
+        Returns:
+            func的返回值，func抛出的异常原样抛出
+
+        Raises:
+            OCRTimeoutError: 超过时限，或卡住的工作线程过多
+        """
+        timeout = ocr_timeout() if timeout is None else timeout
+        worker = self._acquire()
+        if worker is None:
+            raise OCRTimeoutError("OCR引擎仍卡在之前的调用中，跳过本次OCR",
+                                  details={"stuck_workers": self.max_abandoned})
+
+        future = concurrent.futures.Future()
+        worker.tasks.put((future, func, args, kwargs))
+        try:
+            result = future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self._restart(worker, timeout)
+            raise OCRTimeoutError(f"OCR超过 {timeout:.0f} 秒未完成", details={"timeout": timeout})
+        except BaseException:
+            self._release(worker)
+            raise
+        self._release(worker)
+        return result
+
+    def _release(self, worker: _Worker):
+        with self._lock:
+            self._idle.append(worker)
+
+    def _restart(self, worker: _Worker, timeout: float):
+        """放弃超时的工作线程，丢弃可能卡住的OCR引擎"""
+        worker.abandon()
+        with self._lock:
+            self._abandoned.append(worker)
+            self.timeouts += 1
+            self.restarts += 1
+        logger.warning(f"[OCR] 调用超过 {timeout:.0f} 秒未完成，放弃工作线程 {worker.thread.name}，"
+                       f"之后使用新的工作线程和OCR引擎")
+        if self.on_restart is not None:
+            try:
+                self.on_restart()
+            except Exception as e:
+                logger.error(f"[OCR] 重置OCR引擎失败: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """调用、超时、工作线程重启次数和仍卡住的工作线程数"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+                "rejected": self.rejected,
+                "stuck_workers": self._stuck_workers(),
+            }
+
+
+def _reset_engines():
+    from memococo.ocr_factory import reset_ocr_engines
+    reset_ocr_engines()
+
+
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+
+def get_ocr_watchdog() -> OCRWatchdog:
+    """获取全局OCR看门狗"""
+    global _watchdog
+    if _watchdog is None:
+        with _watchdog_lock:
+            if _watchdog is None:
+                _watchdog = OCRWatchdog(on_restart=_reset_engines)
+    return _watchdog
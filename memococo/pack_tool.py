@@ -0,0 +1,79 @@
+"""
+截图打包转换工具
+
+把已有日期目录中的单文件截图转换为打包存储（frames.pack + frames.idx），或反向还原。
+已归档为视频的日期会被跳过。
+
+用法：
+    memococo-pack --to pack                 # 转换除今天以外的所有日期目录
+    memococo-pack --to pack --days 7        # 只转换最近7天
+    memococo-pack --to files 2025/04/16     # 还原指定日期
+"""
+
+import os
+import sys
+import time
+import datetime
+
+from memococo.config import logger, screenshots_path, build_arg_parser
+from memococo.frame_store import convert_day_to_pack, convert_day_to_files, is_day_archived
+from memococo.storage_catalog import refresh_day, list_day_folders, day_key_from_folder
+
+
+def _select_day_folders(days=None):
+    """列出需要转换的日期目录（按日期升序）"""
+    folders = []
+    for folder in list_day_folders():
+        try:
+            folder_date = datetime.datetime.strptime(day_key_from_folder(folder), "%Y/%m/%d")
+        except ValueError:
+            continue
+        if days is not None and (datetime.datetime.now() - folder_date).days > days:
+            continue
+        folders.append(folder)
+    return sorted(folders)
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = build_arg_parser(prog="memococo-pack", description="转换截图存储格式")
+    parser.add_argument("--to", choices=["pack", "files"], required=True, help="目标存储格式")
+    parser.add_argument("--days", type=int, default=None, help="只处理最近若干天的目录")
+    parser.add_argument("--include-today", action="store_true", help="同时处理今天的目录（截图线程运行时不要使用）")
+    parser.add_argument("dates", nargs="*", help="指定日期，格式为YYYY/MM/DD")
+    options = parser.parse_args(argv)
+
+    if options.dates:
+        folders = [os.path.join(screenshots_path, *date.split("/")) for date in options.dates]
+    else:
+        folders = _select_day_folders(options.days)
+    today = os.path.join(screenshots_path, datetime.datetime.now().strftime("%Y/%m/%d"))
+    if not options.include_today:
+        folders = [folder for folder in folders if os.path.normpath(folder) != os.path.normpath(today)]
+
+    convert = convert_day_to_pack if options.to == "pack" else convert_day_to_files
+    total = 0
+    start_time = time.time()
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print(f"跳过不存在的目录: {folder}")
+            continue
+        if is_day_archived(folder):
+            continue
+        try:
+            count = convert(folder)
+        except Exception as e:
+            logger.error(f"转换目录失败 {folder}: {e}")
+            print(f"转换失败: {folder}: {e}")
+            continue
+        if count:
+            refresh_day(folder)
+            print(f"{folder}: {count} 张截图")
+        total += count
+
+    print(f"完成，共转换 {total} 张截图，耗时 {time.time() - start_time:.1f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+资源调度模块
+
+后台线程按固定间隔采样CPU（总体和每个核心）、CPU温度、电池和内存，用指数加权移动平均（EWMA）
+平滑后保存在内存中，截图和OCR循环只读取最近的结果，不再在热路径中调用
+psutil.cpu_percent(interval=...) 阻塞等待。
+
+OCR并发数按AIMD方式调整：每个采样周期内负载低于 ocr_cpu_threshold / ocr_temp_threshold 时加1，
+超出时减半，减到0表示暂停OCR。
+"""
+
+import time
+import threading
+import multiprocessing
+from collections import namedtuple
+from typing import List, Optional
+
+import psutil
+
+from memococo.config import logger, get_settings
+from memococo.utils import get_cpu_temperature
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 2.0
+# EWMA平滑系数，越大越接近最近一次采样
+EWMA_ALPHA = 0.3
+# 内存使用率超过该值时同样视为过载
+MEMORY_THRESHOLD = 90
+
+ResourceSnapshot = namedtuple("ResourceSnapshot", [
+    "cpu_percent", "per_core", "temperature", "memory_percent",
+    "on_battery", "battery_percent", "ocr_concurrency", "updated_at"
+])
+
+
+def _ewma(previous: Optional[float], value: Optional[float], alpha: float) -> Optional[float]:
+    if value is None:
+        return previous
+    if previous is None:
+        return float(value)
+    return alpha * value + (1 - alpha) * previous
+
+
+class ResourceGovernor:
+    """系统资源采样和OCR并发控制"""
+
+    def __init__(self, max_ocr_concurrency: Optional[int] = None, interval: float = SAMPLE_INTERVAL,
+                 alpha: float = EWMA_ALPHA):
+        """初始化
+
+        Args:
+            max_ocr_concurrency: OCR并发数上限，默认CPU核心数的一半
+            interval: 采样间隔（秒）
+            alpha: EWMA平滑系数
+        """
+        self.interval = interval
+        self.alpha = alpha
+        self.max_ocr_concurrency = max_ocr_concurrency or max(1, multiprocessing.cpu_count() // 2)
+        self._lock = threading.Lock()
+        self._cpu = None
+        self._per_core: List[float] = []
+        self._temperature = None
+        self._memory = None
+        self._on_battery = False
+        self._battery_percent = None
+        self._updated_at = 0.0
+        self._ocr_concurrency = 1
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _thresholds(self):
+        settings = get_settings()
+        return settings.get("ocr_cpu_threshold", 70), settings.get("ocr_temp_threshold", 70)
+
+    def record(self, per_core: List[float], temperature: Optional[float], memory_percent: Optional[float],
+               on_battery: bool = False, battery_percent: Optional[float] = None) -> None:
+        """记录一次采样并调整OCR并发数
+
+        Args:
+            per_core: 每个核心的CPU使用率（百分比）
+            temperature: CPU温度（摄氏度），无法获取时为None
+            memory_percent: 内存使用率（百分比）
+            on_battery: 是否使用电池供电
+            battery_percent: 电池电量（百分比）
+        """
+        cpu = sum(per_core) / len(per_core) if per_core else None
+        with self._lock:
+            self._cpu = _ewma(self._cpu, cpu, self.alpha)
+            if len(self._per_core) != len(per_core):
+                self._per_core = [float(value) for value in per_core]
+            else:
+                self._per_core = [_ewma(old, new, self.alpha) for old, new in zip(self._per_core, per_core)]
+            self._temperature = _ewma(self._temperature, temperature, self.alpha)
+            self._memory = _ewma(self._memory, memory_percent, self.alpha)
+            self._on_battery = on_battery
+            self._battery_percent = battery_percent
+            self._updated_at = time.time()
+
+            # AIMD：预算内加1，超出预算减半
+            if self._over_budget():
+                self._ocr_concurrency //= 2
+            else:
+                self._ocr_concurrency = min(self.max_ocr_concurrency, self._ocr_concurrency + 1)
+
+    def sample(self) -> None:
+        """采样一次（不阻塞：cpu_percent 返回距上次调用以来的平均值）"""
+        try:
+            per_core = psutil.cpu_percent(interval=None, percpu=True)
+            if not isinstance(per_core, list):
+                per_core = [per_core]
+        except Exception as e:
+            logger.warning(f"采样CPU使用率失败: {e}")
+            per_core = []
+        try:
+            memory_percent = psutil.virtual_memory().percent
+        except Exception:
+            memory_percent = None
+        on_battery = False
+        battery_percent = None
+        try:
+            battery = psutil.sensors_battery()
+            if battery is not None:
+                on_battery = battery.power_plugged is False
+                battery_percent = battery.percent
+        except Exception:
+            pass
+        self.record(per_core, get_cpu_temperature(), memory_percent, on_battery, battery_percent)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"资源采样失败: {e}")
+
+    def start(self) -> None:
+        """启动后台采样线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # 第一次调用只建立基准，之后的调用返回两次调用之间的平均值
+        psutil.cpu_percent(interval=None, percpu=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="ResourceGovernorThread")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台采样线程"""
+        self._stop.set()
+
+    def _ensure_fresh(self) -> None:
+        # 采样线程未运行时（例如在测试或命令行工具中），按需补一次不阻塞的采样
+        if (self._thread is None or not self._thread.is_alive()) and time.time() - self._updated_at > self.interval:
+            self.sample()
+
+    def _over_budget(self, cpu_threshold: Optional[float] = None, temp_threshold: Optional[float] = None) -> bool:
+        default_cpu, default_temp = self._thresholds()
+        cpu_threshold = default_cpu if cpu_threshold is None else cpu_threshold
+        temp_threshold = default_temp if temp_threshold is None else temp_threshold
+        if self._cpu is not None and self._cpu > cpu_threshold:
+            return True
+        if self._temperature is not None and self._temperature > temp_threshold:
+            return True
+        return self._memory is not None and self._memory > MEMORY_THRESHOLD
+
+    def is_overloaded(self, cpu_threshold: Optional[float] = None, temp_threshold: Optional[float] = None) -> bool:
+        """系统是否超出负载预算
+
+        Args:
+            cpu_threshold: CPU使用率阈值，默认使用配置 ocr_cpu_threshold
+            temp_threshold: CPU温度阈值，默认使用配置 ocr_temp_threshold
+
+        Returns:
+            平滑后的CPU使用率、温度或内存使用率是否超过阈值
+        """
+        self._ensure_fresh()
+        with self._lock:
+            return self._over_budget(cpu_threshold, temp_threshold)
+
+    def on_battery(self) -> bool:
+        """是否使用电池供电"""
+        self._ensure_fresh()
+        return self._on_battery
+
+    def ocr_concurrency(self) -> int:
+        """当前允许的OCR并发数，0表示暂停OCR"""
+        self._ensure_fresh()
+        return self._ocr_concurrency
+
+    def ocr_allowed(self) -> bool:
+        """当前是否允许进行后台OCR"""
+        return self.ocr_concurrency() > 0
+
+    def snapshot(self) -> ResourceSnapshot:
+        """获取最近的资源状态"""
+        self._ensure_fresh()
+        with self._lock:
+            return ResourceSnapshot(
+                cpu_percent=self._cpu,
+                per_core=list(self._per_core),
+                temperature=self._temperature,
+                memory_percent=self._memory,
+                on_battery=self._on_battery,
+                battery_percent=self._battery_percent,
+                ocr_concurrency=self._ocr_concurrency,
+                updated_at=self._updated_at,
+            )
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_resource_governor() -> ResourceGovernor:
+    """获取全局资源调度器（第一次调用时启动采样线程）"""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                governor = ResourceGovernor()
+                governor.start()
+                _governor = governor
+    return _governor
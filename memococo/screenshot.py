@@ -1,22 +1,34 @@
 import os
 import time
 import sys
-import mss
 import numpy as np
 from PIL import Image
 import datetime
 import io
-from memococo.config import screenshots_path, args,app_name_en,app_name_cn,screenshot_logger
-from memococo.database import insert_entry,get_empty_text_count,get_newest_empty_text,remove_entry,update_entry_text,get_empty_text_batch,update_entries_text_batch,remove_entries_batch
+from typing import List, NamedTuple, Optional
+from memococo.config import screenshots_path, args,app_name_en,app_name_cn,screenshot_logger,get_settings
+from memococo.database import insert_entry,get_ocr_text,get_empty_text_count,remove_entry,update_entry_text,update_entries_text_batch,remove_entries_batch
+from memococo.ocr_jobs import worker_id, release_job, fail_job
+from memococo.ocr_scheduler import get_ocr_scheduler
+from memococo.ocr_processor import find_optimal_entries_for_ocr
 from memococo.ocr import extract_text_from_image, extract_text_from_images_batch
+from memococo.common.error_handler import OCRTimeoutError
+from memococo.thumbnail import save_thumbnail
+from memococo.storage_catalog import record_frame_saved
+from memococo.frame_store import encode_frame, save_frame, save_frame_ref, load_frame_image, is_day_archived, get_day_folder, find_webp_quality
+from memococo.resource_governor import get_resource_governor
+from memococo.x11_backend import x11_active_window, X11Unavailable
+from memococo.capture_trigger import get_capture_trigger, TRIGGER_IDLE_TICK, TRIGGER_FOCUS, TRIGGER_INPUT
+from memococo.frame_grabber import get_frame_grabber
+from memococo.monitor_tracker import MonitorTracker, frame_signature
+from memococo.frame_dedup import get_recent_frame_cache
+from memococo.scroll_ocr import get_scroll_ocr
+from memococo.motion_detector import get_motion_detector, mask_region, region_area, OCR_SKIP_AREA
 import subprocess
-import pyautogui
-import psutil
 from memococo.utils import (
     get_active_app_name,
     get_active_window_title,
-    is_user_active,
-    get_cpu_temperature
+    is_user_active
 )
 
 # 导入ImageVideoTool类
@@ -168,21 +180,107 @@ def take_active_on_windows():
         screenshot_logger.error(f"捕获活动窗口时出错: {e}")
         return None
 
-def take_active_on_linux():
+def get_active_window_geometry_linux():
+    """获取Linux系统上当前活动窗口在屏幕中的位置
+
+    优先使用X11后端，与同一次截图中读取的应用名和标题共用一次查询，不可用时使用 xdotool 子进程
+
+    Returns:
+        (x, y, width, height)，没有活动窗口或无法获取时返回None
+    """
+    try:
+        window = x11_active_window()
+        return (window.x, window.y, window.width, window.height) if window else None
+    except X11Unavailable:
+        pass
+    except Exception as e:
+        screenshot_logger.error(f"Error getting active window geometry: {e}")
+        return None
     try:
         window_id = subprocess.check_output(['xdotool', 'getactivewindow']).strip()
         window_geometry = subprocess.check_output(['xdotool', 'getwindowgeometry', '--shell', window_id]).decode()
         window_geometry = dict(line.split('=') for line in window_geometry.split('\n') if '=' in line)
-        x = int(window_geometry['X'])
-        y = int(window_geometry['Y'])
-        width = int(window_geometry['WIDTH'])
-        height = int(window_geometry['HEIGHT'])
-        screenshot = pyautogui.screenshot(region=(x, y, width, height))
-        return np.array(screenshot)
+        return (int(window_geometry['X']), int(window_geometry['Y']),
+                int(window_geometry['WIDTH']), int(window_geometry['HEIGHT']))
     except Exception as e:
-        screenshot_logger.error(f"Error taking screenshot of active window: {e}")
+        screenshot_logger.error(f"Error getting active window geometry: {e}")
     return None
 
+def grab_region(geometry):
+    """单独截取屏幕的一个区域（活动窗口不在已截取的显示器中时使用）"""
+    # pyautogui只在这里使用，导入时需要连接显示服务器
+    import pyautogui
+    try:
+        return np.array(pyautogui.screenshot(region=geometry))
+    except Exception as e:
+        screenshot_logger.error(f"Error taking screenshot of active window: {e}")
+        return None
+
+def find_window_monitor(monitors, geometry):
+    """找出包含窗口面积最大的显示器
+
+    Args:
+        monitors: 显示器区域列表（mss的 left/top/width/height）
+        geometry: 窗口位置 (x, y, width, height)
+
+    Returns:
+        (显示器在列表中的位置, 窗口在该显示器内的区域 (left, top, right, bottom))，窗口不在任何显示器中时返回None
+    """
+    x, y, width, height = geometry
+    best, best_area = None, 0
+    for position, monitor in enumerate(monitors):
+        left, top = max(x, monitor["left"]), max(y, monitor["top"])
+        right = min(x + width, monitor["left"] + monitor["width"])
+        bottom = min(y + height, monitor["top"] + monitor["height"])
+        area = max(0, right - left) * max(0, bottom - top)
+        if area > best_area:
+            best, best_area = (position, (left, top, right, bottom)), area
+    return best
+
+def window_frame_box(frame, monitor, rect):
+    """把窗口在显示器内的区域换算为画面像素坐标
+
+    Args:
+        frame: 显示器画面
+        monitor: 显示器区域（mss的 left/top/width/height）
+        rect: 窗口在该显示器内的区域 (left, top, right, bottom)，屏幕坐标
+
+    Returns:
+        (left, top, right, bottom)，画面像素坐标
+    """
+    left, top, right, bottom = rect
+    # 高分屏上画面的像素数可能是显示器逻辑尺寸的整数倍
+    scale_x = frame.shape[1] / monitor["width"]
+    scale_y = frame.shape[0] / monitor["height"]
+    return (round((left - monitor["left"]) * scale_x), round((top - monitor["top"]) * scale_y),
+            round((right - monitor["left"]) * scale_x), round((bottom - monitor["top"]) * scale_y))
+
+def crop_window(screenshots, monitors, geometry):
+    """从已截取的显示器画面中裁剪出活动窗口
+
+    返回的是显示器画面的numpy视图，不复制像素，与显示器截图来自同一时刻。
+    窗口跨越多个显示器时使用包含窗口面积最大的显示器，超出画面的部分被裁掉。
+
+    Args:
+        screenshots: 显示器截图列表
+        monitors: 与截图对应的显示器区域（mss的 left/top/width/height）
+        geometry: 窗口位置 (x, y, width, height)
+
+    Returns:
+        活动窗口的画面，窗口不在任何一个画面中时返回None
+    """
+    found = find_window_monitor(monitors, geometry)
+    if found is None:
+        return None
+    position, rect = found
+    frame = screenshots[position]
+    left, top, right, bottom = window_frame_box(frame, monitors[position], rect)
+    return frame[top:bottom, left:right]
+
+def take_active_on_linux():
+    geometry = get_active_window_geometry_linux()
+    return grab_region(geometry) if geometry else None
+
 def take_active_window_screenshot():
     if sys.platform == WINDOWS:
         return take_active_on_windows()
@@ -193,8 +291,23 @@ def take_active_window_screenshot():
     else:
         raise NotImplementedError("This platform is not supported")
 
-def take_screenshots(monitor=1):
-    screenshots = []
+class ScreenCapture(NamedTuple):
+    """一次截图的结果"""
+    monitor_ids: List[int]            # 显示器编号（从1开始）
+    frames: List[np.ndarray]          # 对应的显示器画面
+    window: Optional[np.ndarray]      # 活动窗口画面
+    window_monitor: Optional[int]     # 活动窗口所在的显示器编号，无法确定时为None
+    window_box: Optional[tuple] = None  # 活动窗口在所在显示器画面中的区域 (left, top, right, bottom)
+
+def capture_screen():
+    """截取每个显示器和活动窗口
+
+    Returns:
+        ScreenCapture
+    """
+    monitor_ids, screenshots = [], []
+    # mss截图时对应的显示器区域，用于从中裁剪活动窗口
+    monitors = []
 
     # 检查是否为Windows 11系统
     if sys.platform == WINDOWS:
@@ -211,59 +324,38 @@ def take_screenshots(monitor=1):
                     screenshots = [win11_screenshots[0]]
                 else:
                     screenshots = win11_screenshots
+                monitor_ids = list(range(1, len(screenshots) + 1))
             else:
                 # 如果Windows 11截图模块失败，回退到传统方法
                 screenshot_logger.warning("Windows 11截图模块失败，回退到传统方法")
-                with mss.mss() as sct:
-                    for monitor_idx in range(len(sct.monitors)):
-                        if args.primary_monitor_only and monitor_idx != 1:
-                            continue
-                        monitor_ = sct.monitors[monitor_idx]
-                        screenshot = np.array(sct.grab(monitor_))
-                        screenshot = screenshot[:, :, [2, 1, 0]]
-                        screenshots.append(screenshot)
+                monitor_ids, screenshots, monitors = get_frame_grabber().grab_all(args.primary_monitor_only)
         except Exception as e:
             screenshot_logger.error(f"Windows 11截图失败: {e}，回退到传统方法")
             # 回退到传统方法
-            with mss.mss() as sct:
-                for monitor_idx in range(len(sct.monitors)):
-                    if args.primary_monitor_only and monitor_idx != 1:
-                        continue
-                    monitor_ = sct.monitors[monitor_idx]
-                    screenshot = np.array(sct.grab(monitor_))
-                    screenshot = screenshot[:, :, [2, 1, 0]]
-                    screenshots.append(screenshot)
+            monitor_ids, screenshots, monitors = get_frame_grabber().grab_all(args.primary_monitor_only)
     else:
-        # 非Windows系统使用传统方法
-        with mss.mss() as sct:
-            for monitor_idx in range(len(sct.monitors)):
-                if args.primary_monitor_only and monitor_idx != 1:
-                    continue
-                monitor_ = sct.monitors[monitor_idx]
-                screenshot = np.array(sct.grab(monitor_))
-                screenshot = screenshot[:, :, [2, 1, 0]]
-                screenshots.append(screenshot)
-    
-    # 获取活动窗口截图
-    active_window_screenshot = take_active_window_screenshot()
-    
-    # 如果screenshots数量大于2,则将screenshots列表中相似度超过95%的图片删除
-    if len(screenshots) >= 2:
-        i = 0
-        while i < len(screenshots):
-            j = i + 1
-            while j < len(screenshots):
-                if is_similar(screenshots[i], screenshots[j]):
-                    screenshots.pop(j)
-                else:
-                    j += 1
-            i += 1
+        # 非Windows系统使用传统方法：复用当前线程的mss句柄和画面缓冲区
+        monitor_ids, screenshots, monitors = get_frame_grabber().grab_all(args.primary_monitor_only)
     
-    # 添加活动窗口截图
-    if active_window_screenshot is not None:
-        screenshots.append(active_window_screenshot)
+    # 获取活动窗口截图：Linux上直接从显示器画面中裁剪，不再单独截取一次屏幕
+    window_monitor = window_box = None
+    if sys.platform.startswith(LINUX) and monitors:
+        geometry = get_active_window_geometry_linux()
+        active_window_screenshot = None
+        if geometry:
+            found = find_window_monitor(monitors, geometry)
+            if found is not None:
+                window_monitor = monitor_ids[found[0]]
+                window_box = window_frame_box(screenshots[found[0]], monitors[found[0]], found[1])
+            active_window_screenshot = crop_window(screenshots, monitors, geometry)
+            if active_window_screenshot is None:
+                active_window_screenshot = grab_region(geometry)
+    else:
+        active_window_screenshot = take_active_window_screenshot()
+    if window_monitor is None and len(monitor_ids) == 1:
+        window_monitor = monitor_ids[0]
 
-    return screenshots
+    return ScreenCapture(monitor_ids, screenshots, active_window_screenshot, window_monitor, window_box)
 
 def compress_img_PIL(img_path, target_size_kb=200, show=False):
     """智能压缩图像到目标大小
@@ -318,28 +410,12 @@ def compress_img_PIL(img_path, target_size_kb=200, show=False):
         # 对于WebP格式，尝试调整压缩级别
         elif img_path.lower().endswith('.webp'):
             # 使用二分法快速找到最佳质量
-            quality_low, quality_high = 10, 95
-            best_quality = quality_high
-
-            while quality_low <= quality_high:
-                mid_quality = (quality_low + quality_high) // 2
-                # 使用内存流测试压缩效果
-                buffer = io.BytesIO()
-                img.save(buffer, format="WEBP", quality=mid_quality)
-                current_size_kb = len(buffer.getvalue()) / 1024
-
-                if abs(current_size_kb - target_size_kb) < 10:  # 允许10KB的误差
-                    best_quality = mid_quality
-                    break
-                elif current_size_kb > target_size_kb:
-                    quality_high = mid_quality - 1
-                else:
-                    quality_low = mid_quality + 1
-                    best_quality = mid_quality  # 保存当前最佳质量
+            best_quality, data = find_webp_quality(img, target_size_kb)
 
             # 使用最佳质量保存
             screenshot_logger.debug(f"Compressing WebP image with quality {best_quality}")
-            img.save(img_path, format="WEBP", quality=best_quality)
+            with open(img_path, "wb") as f:
+                f.write(data)
 
         # 其他格式使用尺寸缩放
         else:
@@ -382,11 +458,8 @@ def compress_img_PIL(img_path, target_size_kb=200, show=False):
             screenshot_logger.error(f"Fallback compression also failed: {e2}")
 
 def power_saving_mode(save_power):
-    if save_power:
-        battery = psutil.sensors_battery()
-        if  battery is not None and battery.power_plugged == False:
-            return True
-    return False
+    # 电池状态由资源调度器在后台采样，这里不再每次查询
+    return bool(save_power) and get_resource_governor().on_battery()
 
 # OCR相关代码已移至ocr_processor.py
 
@@ -396,12 +469,23 @@ import multiprocessing
 # 获取CPU核心数，用于参考
 _cpu_count = multiprocessing.cpu_count()
 
-def process_batch_ocr_idle(batch_entries, save_power=True):
+def _fail_idle_job(entry_id, worker, error, permanent=False):
+    """记录空闲OCR失败，OCR调度器放弃该条目（可以重试时由OCR任务队列在退避结束后放回）"""
+    fail_job(entry_id, worker, error, permanent=permanent)
+    get_ocr_scheduler().drop(entry_id)
+
+def _release_idle_job(entry_id, worker):
+    """把未处理的空闲OCR条目放回OCR任务队列和OCR调度器"""
+    release_job(entry_id, worker)
+    get_ocr_scheduler().release(entry_id)
+
+def process_batch_ocr_idle(batch_entries, save_power=True, worker=None):
     """批量处理空闲时OCR任务
 
     Args:
-        batch_entries: 批量条目列表
+        batch_entries: 批量条目列表，对应的OCR任务已由worker领取
         save_power: 是否启用省电模式
+        worker: 领取OCR任务的工作者标识
 
     Returns:
         处理结果统计 (成功数, 失败数, 删除数)
@@ -414,53 +498,34 @@ def process_batch_ocr_idle(batch_entries, save_power=True):
     # 预加载图片和分类
     local_images = []  # (entry, image_array)
     backup_images = []  # (entry, image_stream)
-    failed_entries = []  # 需要删除的条目
+    failed_entries = []  # 截图不存在，需要删除的条目
+    empty_entries = []  # OCR结果为空的条目，保留截图，任务标记为失败
 
     for i, entry in enumerate(batch_entries):
         # 每处理3个条目检查一次用户活跃状态
         if i > 0 and i % 3 == 0:
             if is_user_active():
                 screenshot_logger.info(f"用户变为活跃状态，中断批量OCR处理，已处理 {i}/{len(batch_entries)} 条")
+                # 未处理的条目放回任务队列
+                for pending_entry in batch_entries[i:]:
+                    _release_idle_job(pending_entry.id, worker)
                 break
 
         try:
-            timestamp_dt = datetime.datetime.fromtimestamp(entry.timestamp)
-            date_folder = get_screenshot_path(timestamp_dt)
-            image_path = os.path.join(date_folder, f"{entry.timestamp}.webp")
-
-            # 检查本地图片是否存在
-            if os.path.exists(image_path):
-                # 本地图片存在，直接加载
-                try:
-                    image = Image.open(image_path)
-                    local_images.append((entry, np.array(image)))
-                    image.close()  # 释放PIL图像对象
-                except Exception as img_e:
-                    screenshot_logger.error(f"加载本地图片失败 {image_path}: {img_e}")
-                    failed_entries.append(entry.id)
+            # 通过截图存储读取（单文件、打包文件或已归档的视频帧）
+            image = load_frame_image(entry.timestamp, monitor=entry.monitor)
+            if image is None:
+                screenshot_logger.debug(f"截图不存在: {entry.timestamp}")
+                failed_entries.append(entry.id)
+            elif is_day_archived(get_day_folder(entry.timestamp)):
+                backup_images.append((entry, np.array(image)))
+                image.close()  # 释放PIL图像对象
             else:
-                # 本地图片不存在，检查备份
-                try:
-                    image_video_tool = ImageVideoTool(date_folder)
-                    if image_video_tool.is_backed_up():
-                        image_filename = f"{entry.timestamp}.webp"
-                        image_stream = image_video_tool.query_image(image_filename)
-                        if image_stream:
-                            image = Image.open(image_stream)
-                            backup_images.append((entry, np.array(image)))
-                            image.close()  # 释放PIL图像对象
-                        else:
-                            screenshot_logger.debug(f"无法从备份获取图片: {image_filename}")
-                            failed_entries.append(entry.id)
-                    else:
-                        screenshot_logger.debug(f"文件夹未备份: {date_folder}")
-                        failed_entries.append(entry.id)
-                except Exception as backup_e:
-                    screenshot_logger.error(f"处理备份图片失败 {entry.id}: {backup_e}")
-                    failed_entries.append(entry.id)
+                local_images.append((entry, np.array(image)))
+                image.close()  # 释放PIL图像对象
         except Exception as e:
             screenshot_logger.error(f"预加载图片失败 {entry.id}: {e}")
-            failed_entries.append(entry.id)
+            _fail_idle_job(entry.id, worker, f"预加载图片失败: {e}")
 
     # 批量OCR处理
     success_updates = []
@@ -471,14 +536,15 @@ def process_batch_ocr_idle(batch_entries, save_power=True):
         try:
             screenshot_logger.info(f"开始处理 {len(local_images)} 张本地图片")
             images = [img for _, img in local_images]
-            texts = extract_text_from_images_batch(images)
+            texts = extract_text_from_images_batch(images, apps=[entry.app for entry, _ in local_images],
+                                                   titles=[entry.title for entry, _ in local_images])
 
             for i, ((entry, _), text) in enumerate(zip(local_images, texts)):
                 if text and text.strip():
                     success_updates.append((entry.id, text, ""))
                     screenshot_logger.debug(f"本地图片OCR成功: {entry.id}, 文本长度: {len(text)}")
                 else:
-                    failed_entries.append(entry.id)
+                    empty_entries.append(entry.id)
                     screenshot_logger.debug(f"本地图片OCR结果为空: {entry.id}")
 
             # 释放内存
@@ -487,6 +553,8 @@ def process_batch_ocr_idle(batch_entries, save_power=True):
         except Exception as e:
             screenshot_logger.error(f"批量OCR处理本地图片失败: {e}")
             failed_count += len(local_images)
+            for entry, _ in local_images:
+                _fail_idle_job(entry.id, worker, str(e))
             local_images.clear()
 
     # 处理备份图片
@@ -494,14 +562,15 @@ def process_batch_ocr_idle(batch_entries, save_power=True):
         try:
             screenshot_logger.info(f"开始处理 {len(backup_images)} 张备份图片")
             images = [img for _, img in backup_images]
-            texts = extract_text_from_images_batch(images)
+            texts = extract_text_from_images_batch(images, apps=[entry.app for entry, _ in backup_images],
+                                                   titles=[entry.title for entry, _ in backup_images])
 
             for i, ((entry, _), text) in enumerate(zip(backup_images, texts)):
                 if text and text.strip():
                     success_updates.append((entry.id, text, ""))
                     screenshot_logger.debug(f"备份图片OCR成功: {entry.id}, 文本长度: {len(text)}")
                 else:
-                    failed_entries.append(entry.id)
+                    empty_entries.append(entry.id)
                     screenshot_logger.debug(f"备份图片OCR结果为空: {entry.id}")
 
             # 释放内存
@@ -510,6 +579,8 @@ def process_batch_ocr_idle(batch_entries, save_power=True):
         except Exception as e:
             screenshot_logger.error(f"批量OCR处理备份图片失败: {e}")
             failed_count += len(backup_images)
+            for entry, _ in backup_images:
+                _fail_idle_job(entry.id, worker, str(e))
             backup_images.clear()
 
     # 批量更新数据库
@@ -517,7 +588,12 @@ def process_batch_ocr_idle(batch_entries, save_power=True):
     if success_updates:
         success_count = update_entries_text_batch(success_updates)
 
-    # 批量删除失败的条目
+    # OCR结果为空的条目重试也不会得到文本
+    for entry_id in empty_entries:
+        _fail_idle_job(entry_id, worker, "OCR returned empty text", permanent=True)
+    failed_count += len(empty_entries)
+
+    # 批量删除截图不存在的条目
     deleted_count = 0
     if failed_entries:
         deleted_count = remove_entries_batch(failed_entries)
@@ -525,6 +601,83 @@ def process_batch_ocr_idle(batch_entries, save_power=True):
     screenshot_logger.info(f"批量OCR处理完成: 成功 {success_count}, 失败 {failed_count}, 删除 {deleted_count}")
     return (success_count, failed_count, deleted_count)
 
+def save_monitor_frame(frame, timestamp, monitor_id, app, title, save_power=True, enable_compress=True,
+                       motion_region=None, scroll_window=None):
+    """编码、OCR并保存一个显示器的画面
+
+    Args:
+        frame: 显示器画面
+        timestamp: 截图时间戳（与显示器编号一起作为截图存储的键）
+        monitor_id: 显示器编号
+        app: 该显示器上的活动应用名，活动窗口不在该显示器上时为空
+        title: 该显示器上的活动窗口标题，活动窗口不在该显示器上时为空
+        save_power: 是否启用省电模式
+        enable_compress: 是否启用图像压缩
+        motion_region: 持续变化的区域（视频、动画、滚动日志），OCR时遮盖，几乎占满画面时不即时OCR
+        scroll_window: 活动窗口 (窗口标识, 窗口区域, 显示器签名)，与该窗口上一张截图相比只是滚动时只识别新出现的区域
+    """
+    start_time = time.time()
+    image = Image.fromarray(frame)
+
+    # 复用内存中的截图生成缩略图，供时间轴预览和搜索结果使用
+    thumb_path = save_thumbnail(image, timestamp, monitor_id)
+
+    motion_ocr = None
+    if motion_region is not None:
+        motion_ocr = "skipped" if region_area(motion_region) >= OCR_SKIP_AREA else "masked"
+
+    # 检查系统负载（资源调度器后台采样的平滑值，不阻塞截图线程）
+    if power_saving_mode(save_power) or get_resource_governor().is_overloaded() or motion_ocr == "skipped":
+        ocr_text = ''
+    else:
+        #使用ocr处理，直接使用内存中的截图，与无损保存的文件内容一致
+        ocr_frame = mask_region(frame, motion_region) if motion_ocr == "masked" else frame
+        try:
+            if scroll_window is not None and motion_ocr is None:
+                ocr_text = get_scroll_ocr().extract_text(frame, *scroll_window, app=app, title=title)
+            else:
+                ocr_text = extract_text_from_image(ocr_frame, app=app, title=title)
+        except OCRTimeoutError as e:
+            # 不等待卡住的OCR引擎，截图无损保存，由OCR任务队列稍后识别
+            screenshot_logger.warning(f"OCR timed out, saving screenshot for later OCR: {e}")
+            ocr_text = ''
+        except Exception as e:
+            screenshot_logger.error(f"Failed to ocr: {e}")
+            ocr_text = ''
+
+    #如果ocr_text不为空，则压缩图像；未OCR的截图无损保存，保证之后OCR的准确性
+    encode_start_time = time.time()
+    target_size_kb = 200 if enable_compress and ocr_text else None
+    frame_data = encode_frame(image, target_size_kb=target_size_kb)
+    # 编码完成后一次性写入截图存储（打包存储只追加，不能写入后再压缩）
+    frame_location = save_frame(timestamp, frame_data, monitor_id)
+    screenshot_logger.debug(f"截图已保存: {frame_location}, 显示器: {monitor_id}, 耗时: {time.time() - encode_start_time:.2f}秒")
+
+    # 累加到存储目录
+    thumb_size = os.path.getsize(thumb_path) if thumb_path else 0
+    record_frame_saved(timestamp, len(frame_data) + thumb_size)
+
+    # 压缩完成后，将数据插入数据库
+    insert_entry("", timestamp, ocr_text, app, title, monitor=monitor_id)
+
+    # 用于估计持续变化时跳过的截图节省的存储和CPU时间
+    get_motion_detector().record_saved(monitor_id, len(frame_data) + thumb_size, time.time() - start_time, motion_ocr)
+
+def save_frame_reference(timestamp, target, monitor_id, app, title):
+    """保存对已有截图的引用（切换回内容没有变化的窗口），复用被引用截图的图片和OCR文本
+
+    Args:
+        timestamp: 截图时间戳
+        target: 被引用截图的时间戳（同一显示器上的截图）
+        monitor_id: 显示器编号
+        app: 活动应用名
+        title: 活动窗口标题
+    """
+    save_frame_ref(timestamp, target, monitor_id)
+    # 被引用的截图还没有OCR时文本为空，由OCR任务队列通过引用读取图片识别
+    insert_entry("", timestamp, get_ocr_text(target, monitor_id), app, title, monitor=monitor_id)
+    screenshot_logger.debug(f"截图与 {target} 几乎相同，保存为引用: {timestamp}, 显示器: {monitor_id}")
+
 def record_screenshots_thread(ignored_apps, ignored_apps_updated, save_power=True, idle_time=5, enable_compress=True):
     """截图主线程，负责截图、压缩图片和保存数据到数据库
 
@@ -536,38 +689,30 @@ def record_screenshots_thread(ignored_apps, ignored_apps_updated, save_power=Tru
         idle_time: 空闲时间（秒）
         enable_compress: 是否启用图像压缩
     """
+    # 空闲时OCR在OCR任务队列中使用的工作者标识
+    ocr_worker = worker_id()
+
     # 新增变量记录上次应用状态
     last_app_name = None
     last_window_title = None
-    last_window_shot = None
 
-    # 动态调整截图间隔
-    base_interval = idle_time
-    current_interval = base_interval
-    max_interval = base_interval * 4  # 最大间隔时间
-    last_adjustment = time.time()
+    # 由截图触发器决定截图时机（窗口切换、输入活动、空闲），截图间隔按变化率和OCR积压调整
+    trigger = get_capture_trigger(idle_time)
 
     dirDate = datetime.datetime.now()
     create_directory_if_not_exists(get_screenshot_path(dirDate))
     screenshot_logger.info("Screenshot recording started")
-    last_screenshots = take_screenshots()
+    # 每个显示器上一次保存的画面签名
+    monitor_tracker = MonitorTracker()
+    # 持续变化（视频、动画、滚动日志）的显示器降低保存频率
+    motion_detector = get_motion_detector()
+    # 每个窗口最近保存的截图签名，切换回没有变化的窗口时保存为引用
+    recent_frames = get_recent_frame_cache()
+    # 每个显示器上一次保存的截图时间戳
+    last_timestamps = {}
     user_inactive_logged = False  # 添加标志位记录上一次用户是否处于非活动状态
-    default_idle_time = idle_time
-    # 间隔时间为5秒
     while True:
-        # pending_ocr_count = get_empty_text_count()
-
-        # 根据待处理数量动态调整间隔
-        # if pending_ocr_count > 200 and last_adjustment + 60 < time.time():
-        #     current_interval = min(current_interval * 1.5, max_interval)
-        #     last_adjustment = time.time()
-        #     screenshot_logger.debug(f"Adjusting interval to {current_interval} seconds")
-        # elif pending_ocr_count < 50 and last_adjustment + 60 < time.time():
-        #     current_interval = max(base_interval, current_interval / 1.2)
-        #     last_adjustment = time.time()
-        #     screenshot_logger.debug(f"Adjusting interval to {current_interval} seconds")
-
-        time.sleep(current_interval)
+        trigger_reason = trigger.wait()
         if ignored_apps_updated.is_set():
             ignored_apps_updated.clear()
             screenshot_logger.debug(f"Updated ignored_apps: {ignored_apps}")
@@ -590,81 +735,52 @@ def record_screenshots_thread(ignored_apps, ignored_apps_updated, save_power=Tru
                 else:
                     batch_size = 1
 
+                # 由OCR调度器选择条目（优先处理用户正在查看的截图，然后是时间线上最大的未OCR区间的中点），
+                # 选出的条目已在OCR任务队列中领取
                 if batch_size > 1:
                     # 批量处理模式
                     screenshot_logger.info(f"待处理OCR数量: {pending_count}, 启用批量处理模式, 批量大小: {batch_size}")
-                    batch_entries = get_empty_text_batch(batch_size, oldest_first=True)
+                    batch_entries = find_optimal_entries_for_ocr(batch_size, ocr_worker)
                     if batch_entries:
-                        process_batch_ocr_idle(batch_entries, save_power)
+                        process_batch_ocr_idle(batch_entries, save_power, ocr_worker)
                         continue
                 else:
-                    # 单条处理模式（原有逻辑）
-                    idle_data = get_newest_empty_text()
-                    if idle_data:
+                    # 单条处理模式
+                    idle_entries = find_optimal_entries_for_ocr(1, ocr_worker)
+                    if idle_entries:
+                        idle_data = idle_entries[0]
                         screenshot_logger.debug(f"Idle data: {idle_data}")
                         try:
-                            timestamp_dt = datetime.datetime.fromtimestamp(idle_data.timestamp)
-                            date_folder = get_screenshot_path(timestamp_dt)
-                            image_path = os.path.join(date_folder, f"{idle_data.timestamp}.webp")
-
-                            # 检查图片是否存在
-                            if not os.path.exists(image_path):
-                                # 检查该日期文件夹是否已备份
-                                image_video_tool = ImageVideoTool(date_folder)
-                                if image_video_tool.is_backed_up():
-                                    screenshot_logger.info(f"Image not found but folder is backed up, trying to retrieve from backup: {image_path}")
-                                    # 尝试从备份中获取图片
-                                    image_filename = f"{idle_data.timestamp}.webp"
-                                    image_stream = image_video_tool.query_image(image_filename)
-
-                                    if image_stream:
-                                        # 从备份中成功获取图片，进行OCR处理
-                                        screenshot_logger.info(f"Successfully retrieved image from backup: {image_filename}")
-                                        image = Image.open(image_stream)
-                                        idle_ocr_text = extract_text_from_image(np.array(image))
-
-                                        # 如果OCR文本为空，则删除待处理数据
-                                        if not idle_ocr_text:
-                                            screenshot_logger.debug(f"OCR text is empty for backed up image: {image_filename}")
-                                            remove_entry(idle_data.id)
-                                            continue
-
-                                        # 更新OCR文本
-                                        update_entry_text(idle_data.id, idle_ocr_text, "")
-                                        screenshot_logger.info(f"Updated OCR text from backed up image: {image_filename}")
-                                        continue
-                                    else:
-                                        # 无法从备份中获取图片，删除待处理数据
-                                        screenshot_logger.warning(f"Failed to retrieve image from backup: {image_filename}")
-                                        remove_entry(idle_data.id)
-                                        continue
-                                else:
-                                    # 文件夹未备份且图片不存在，删除待处理数据
-                                    screenshot_logger.warning(f"Image not found and folder not backed up: {image_path}")
-                                    remove_entry(idle_data.id)
-                                    continue
-
-                            # 图片存在，直接进行OCR处理
-                            idle_ocr_text = extract_text_from_image(np.array(Image.open(image_path)))
-
-                            # 如果idle_ocr_text 为空，则删除待处理数据
-                            if not idle_ocr_text:
-                                screenshot_logger.debug(f"OCR text is empty for image: {image_path}")
+                            # 通过截图存储读取（单文件、打包文件或已归档的视频帧）
+                            image = load_frame_image(idle_data.timestamp, monitor=idle_data.monitor)
+                            if image is None:
+                                # 截图不存在，删除待处理数据
+                                screenshot_logger.warning(f"Image not found: {idle_data.timestamp}")
                                 remove_entry(idle_data.id)
                                 continue
 
+                            idle_ocr_text = extract_text_from_image(np.array(image), app=idle_data.app, title=idle_data.title)
+
+                            # 如果idle_ocr_text 为空，保留截图，OCR任务标记为失败（重试也不会得到文本）
+                            if not idle_ocr_text:
+                                screenshot_logger.debug(f"OCR text is empty for image: {idle_data.timestamp}")
+                                _fail_idle_job(idle_data.id, ocr_worker, "OCR returned empty text", permanent=True)
+                                continue
+
                             # 更新OCR文本
                             update_entry_text(idle_data.id, idle_ocr_text, "")
-                            screenshot_logger.info(f"Updated OCR text for image: {image_path}")
+                            screenshot_logger.info(f"Updated OCR text for image: {idle_data.timestamp}")
                             continue
                         except Exception as e:
                             screenshot_logger.error(f"Error processing idle data: {e}")
-                            # 删除待处理数据
-                            remove_entry(idle_data.id)
+                            # 保留待处理数据，退避后由OCR任务队列重试
+                            _fail_idle_job(idle_data.id, ocr_worker, str(e))
                             continue
+            # 空闲时的定时唤醒只处理OCR积压，截图由触发器按 capture_idle_floor 间隔触发
+            if trigger_reason == TRIGGER_IDLE_TICK:
+                continue
         else:
             user_inactive_logged = False
-            idle_time = default_idle_time
         active_app_name = get_active_app_name()
         active_window_title = get_active_window_title()
 
@@ -678,62 +794,69 @@ def record_screenshots_thread(ignored_apps, ignored_apps_updated, save_power=Tru
         if active_window_title == app_name_cn or active_window_title == app_name_en:
             continue
 
-        screenshots = take_screenshots()
-        last_screenshot = last_screenshots[0]
-        window_shot = screenshots[-1] if len(screenshots) > 1 else screenshots[0]
+        capture = capture_screen()
         # 新增应用状态比较逻辑
         app_changed = (active_app_name != last_app_name) or (active_window_title != last_window_title)
-        should_save = False
+        # 切换了应用或窗口时，活动窗口所在的显示器即使画面没有变化也保存（无法确定时保存全部显示器）
+        force = ()
         if app_changed:
-            should_save = True
-        else:
-            # 当应用未变化时进行图像相似度比较
-            if last_window_shot is not None and window_shot is not None:
-                should_save = not is_similar(window_shot, last_window_shot) and not is_similar(last_screenshot,screenshots[0])
-            else:
-                # 初次运行或截图获取失败时强制保存
-                should_save = True
-        if should_save:
+            force = [capture.window_monitor] if capture.window_monitor is not None else capture.monitor_ids
+        # 每个显示器与自己上一次保存的画面比较，只保存有变化的显示器
+        changed = monitor_tracker.changed_monitors(capture.monitor_ids, capture.frames, force)
+        motion_detector.update(monitor_tracker.signatures)
+        # 切换窗口或用户输入后的截图总是保存，其余截图中持续变化的显示器按 motion_capture_interval 保存
+        user_driven = trigger_reason in (TRIGGER_FOCUS, TRIGGER_INPUT)
+        # 活动窗口所在的显示器记录活动应用和窗口标题，其他显示器上的应用无法得知，记录为空
+        monitor_apps = {monitor_id: active_app_name if capture.window_monitor in (None, monitor_id) else None
+                        for monitor_id in capture.monitor_ids}
+        monitor_titles = {monitor_id: active_window_title if monitor_apps[monitor_id] is not None else None
+                          for monitor_id in capture.monitor_ids}
+        for monitor_id in list(changed):
+            if not motion_detector.should_save(monitor_id, monitor_apps[monitor_id],
+                                               forced=user_driven or monitor_id in force):
+                del changed[monitor_id]
+        trigger.record_result(bool(changed))
+        if changed:
             startTime = time.time()
-            screenshot_logger.debug("Screenshot changed, saving...")
+            screenshot_logger.debug(f"Screenshot changed on monitors {sorted(changed)}, saving...")
 
-            # 更新最后保存的截图和应用状态
+            # 更新最后保存的应用状态
             last_app_name = active_app_name
             last_window_title = active_window_title
-            last_window_shot = window_shot.copy() if window_shot is not None else None
 
-            # 保存完整截图
-            image = Image.fromarray(screenshots[0])
-            timestamp = int(time.time())
-            image_path = os.path.join(get_screenshot_path(dirDate), f"{timestamp}.webp")
-            image.save(image_path, format="webp", lossless=True)
+            window_signature = None
+            if capture.window is not None and capture.window.size and get_settings().get("frame_dedup", True):
+                window_signature = frame_signature(capture.window)
+            window_key = (capture.window_monitor, active_app_name, active_window_title)
 
-            # 检查CPU使用率和温度
-            cpu_usage = psutil.cpu_percent(interval=1)
-            cpu_temperature = get_cpu_temperature()
-            
-            if power_saving_mode(save_power) or cpu_usage > 70 or (cpu_temperature is not None and cpu_temperature > 70):
-                ocr_text = ''
-            else:
-                #使用ocr处理
-                try:
-                    ocr_image = Image.open(image_path)
-                    image_array = np.array(ocr_image)
-                    ocr_text = extract_text_from_image(image_array)
-                except Exception as e:
-                    screenshot_logger.error(f"Failed to ocr: {e}")
-                    ocr_text = ''
-                    
-            #如果ocr_text不为空，则压缩图像
-            if enable_compress and ocr_text:
-                screenshot_logger.debug(f"开始压缩图像: {image_path}")
-                compress_start_time = time.time()
-                compress_img_PIL(image_path, target_size_kb=200)
-                compress_end_time = time.time()
-                screenshot_logger.debug(f"图像压缩完成: {image_path}, 耗时: {compress_end_time - compress_start_time:.2f}秒")
-
-            # 压缩完成后，将数据插入数据库
-            insert_entry("", timestamp, ocr_text, active_app_name, active_window_title)
+            # 截图以 (时间戳, 显示器编号) 为键，这次截图的所有显示器使用同一时间戳；
+            # 同一显示器在一秒内再次保存时顺延到下一秒
+            timestamp = max([int(time.time())] + [last_timestamps.get(monitor_id, 0) + 1 for monitor_id in changed])
+
+            # 活动窗口所在的显示器先保存
+            order = sorted(zip(capture.monitor_ids, capture.frames),
+                           key=lambda item: item[0] != capture.window_monitor)
+            for monitor_id, frame in order:
+                if monitor_id not in changed:
+                    continue
+                monitor_app = monitor_apps[monitor_id] or ""
+                monitor_title = monitor_titles[monitor_id] or ""
+                deduplicate = window_signature is not None and monitor_id == capture.window_monitor
+                target = recent_frames.find(window_key, window_signature, changed[monitor_id]) if deduplicate else None
+                if target is not None:
+                    save_frame_reference(timestamp, target, monitor_id, monitor_app, monitor_title)
+                else:
+                    # 用户输入（例如滚动）后的截图不遮盖持续变化的区域
+                    motion_region = None if user_driven else motion_detector.region(monitor_id, monitor_apps[monitor_id])
+                    scroll_window = None
+                    if monitor_id == capture.window_monitor and capture.window_box is not None:
+                        scroll_window = (window_key, capture.window_box, changed[monitor_id])
+                    save_monitor_frame(frame, timestamp, monitor_id, monitor_app, monitor_title,
+                                       save_power, enable_compress, motion_region, scroll_window)
+                    if deduplicate:
+                        recent_frames.add(window_key, window_signature, changed[monitor_id], timestamp)
+                monitor_tracker.mark_saved(monitor_id, changed[monitor_id])
+                last_timestamps[monitor_id] = timestamp
 
             # 如果当前的年月日和dirDate不同，则创建新的目录
             if dirDate != datetime.datetime.now().date():
@@ -0,0 +1,301 @@
+"""
+滚动增量OCR模块
+
+滚动浏览文档或聊天记录时，相邻两张截图大部分是同样的内容，只是上下平移了一段距离，
+extract_text_from_image 却每次都重新识别整张截图。本模块在同一窗口相邻的两张截图之间估计垂直滚动距离，
+只识别新出现的一条区域，之前识别出的文字行平移后复用：
+
+- 活动窗口区域缩小为1/SCROLL_SCALE的灰度图，用相位相关（cv2.phaseCorrelate）估计平移距离
+- 逐行验证：窗口中每一行要么与上一张相同（工具栏、状态栏），要么与上一张平移后相同（滚动区域），
+  其余只允许是滚动区域一端新出现的行；不满足时（侧边栏与正文并排、内容同时有其他变化）视为没有滚动
+- 窗口之外的画面必须没有变化（与截图去重相同，只允许极少数格子不同）
+
+没有滚动时使用正常的OCR流程，不保留文字行位置；检测到滚动而上一张截图没有文字行位置时整图识别一次，
+之后连续滚动只识别新出现的区域（加上 STRIP_MARGIN 的重叠，保证被切开的行能完整识别一次）。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from memococo.config import logger, get_settings
+from memococo.motion_detector import CELL, cell_differences
+from memococo.frame_dedup import CELL_DIFF, OUTSIDE_CELLS
+from memococo.ocr_factory import TextLine
+from memococo.ocr_profiles import get_ocr_profile
+
+# 估计滚动距离时灰度图的缩小倍数
+SCROLL_SCALE = 2
+# 相位相关峰值低于该值时视为没有平移
+MIN_RESPONSE = 0.05
+# 逐行比较时平均灰度差不超过该值视为相同
+ROW_DIFF = 4.0
+# 滚动距离超过窗口高度的该比例时视为内容整体变化
+MAX_SHIFT = 0.8
+# 新出现区域向已识别部分多识别的像素数，不小于一行文字的高度
+STRIP_MARGIN = 48
+# 记住的窗口数
+MAX_WINDOWS = 16
+
+# 窗口区域：(左, 上, 右, 下)，为画面像素
+Box = Tuple[int, int, int, int]
+
+
+class ScrollShift(NamedTuple):
+    """两张截图之间的滚动"""
+    shift: int        # 内容的垂直移动距离，向上滚动（内容下移）为正
+    top: int          # 滚动区域的上边界（行号）
+    bottom: int       # 滚动区域的下边界（行号，不含）
+
+
+def window_gray(frame: np.ndarray, box: Box) -> np.ndarray:
+    """截取窗口区域，缩小为估计滚动距离用的float32灰度图"""
+    left, top, right, bottom = box
+    region = frame[top:bottom, left:right]
+    gray = cv2.cvtColor(np.ascontiguousarray(region[:, :, :3]), cv2.COLOR_RGB2GRAY)
+    height, width = gray.shape
+    if height // SCROLL_SCALE >= 2 and width // SCROLL_SCALE >= 2:
+        gray = cv2.resize(gray, (width // SCROLL_SCALE, height // SCROLL_SCALE), interpolation=cv2.INTER_AREA)
+    return gray.astype(np.float32)
+
+
+def estimate_scroll(previous: np.ndarray, current: np.ndarray) -> Optional[ScrollShift]:
+    """估计两张灰度图之间的垂直滚动
+
+    Args:
+        previous: 上一张灰度图
+        current: 本次的灰度图（尺寸相同）
+
+    Returns:
+        滚动距离和滚动区域（灰度图的行号），没有滚动或无法确定时返回None
+    """
+    if previous.shape != current.shape or min(previous.shape) < 16:
+        return None
+    height = previous.shape[0]
+    window = cv2.createHanningWindow((previous.shape[1], height), cv2.CV_32F)
+    # phaseCorrelate 会把窗函数乘到输入上，传入副本
+    (dx, dy), response = cv2.phaseCorrelate(previous.copy(), current.copy(), window)
+    shift = int(round(dy))
+    if response < MIN_RESPONSE or abs(dx) > 0.5 or shift == 0 or abs(shift) >= height * MAX_SHIFT:
+        return None
+
+    static = np.abs(current - previous).mean(axis=1) <= ROW_DIFF
+    shifted = np.zeros(height, dtype=bool)
+    if shift > 0:
+        shifted[shift:] = np.abs(current[shift:] - previous[:height - shift]).mean(axis=1) <= ROW_DIFF
+    else:
+        shifted[:height + shift] = np.abs(current[:height + shift] - previous[-shift:]).mean(axis=1) <= ROW_DIFF
+
+    # 滚动区域为有变化的行的范围，范围之外的行都与上一张相同
+    changed = np.flatnonzero(~static)
+    if len(changed) == 0:
+        return None
+    top, bottom = int(changed[0]), int(changed[-1]) + 1
+    if bottom - top <= abs(shift):
+        return None
+    # 滚动区域中除了一端新出现的行，都必须与上一张平移后相同
+    if shift > 0:
+        moved = shifted[top + shift:bottom]
+    else:
+        moved = shifted[top:bottom + shift]
+    if not moved.all():
+        return None
+    return ScrollShift(shift, top, bottom)
+
+
+def exposed_strip(scroll: ScrollShift) -> Tuple[int, int]:
+    """滚动区域中需要识别的部分（新出现的行加上 STRIP_MARGIN 的重叠）"""
+    if scroll.shift > 0:
+        return scroll.top, min(scroll.bottom, scroll.top + scroll.shift + STRIP_MARGIN)
+    return max(scroll.top, scroll.bottom + scroll.shift - STRIP_MARGIN), scroll.bottom
+
+
+def merge_scrolled_lines(previous: List[TextLine], strip_lines: List[TextLine], box: Box,
+                         scroll: ScrollShift) -> List[TextLine]:
+    """合并平移后的旧文字行和新识别区域的文字行
+
+    Args:
+        previous: 上一张截图的文字行
+        strip_lines: 新识别区域的文字行（画面坐标）
+        box: 窗口区域
+        scroll: 滚动距离和滚动区域（画面坐标）
+
+    Returns:
+        本次截图的文字行：滚动区域之外的旧文字行不变，滚动区域内的旧文字行平移，
+        重叠部分以中线为界，一侧使用旧文字行，另一侧使用新识别的文字行
+    """
+    left, _, right, _ = box
+    # 重叠部分的中线
+    if scroll.shift > 0:
+        boundary = scroll.top + scroll.shift + STRIP_MARGIN // 2
+    else:
+        boundary = scroll.bottom + scroll.shift - STRIP_MARGIN // 2
+
+    def in_scroll_area(line):
+        center_x, center_y = (line[0] + line[2]) / 2, (line[1] + line[3]) / 2
+        return left <= center_x < right and scroll.top <= center_y < scroll.bottom
+
+    def new_side(line):
+        center = (line[1] + line[3]) / 2
+        return center < boundary if scroll.shift > 0 else center >= boundary
+
+    lines = []
+    for line in previous:
+        if not in_scroll_area(line):
+            lines.append(line)
+            continue
+        moved = (line[0], line[1] + scroll.shift, line[2], line[3] + scroll.shift, line[4])
+        if moved[1] >= scroll.top and moved[3] <= scroll.bottom and not new_side(moved):
+            lines.append(moved)
+    lines.extend(line for line in strip_lines if new_side(line))
+    lines.sort(key=lambda line: (line[1], line[0]))
+    return lines
+
+
+def lines_text(lines: List[TextLine]) -> str:
+    """文字行合并为文本"""
+    return "\n".join(line[4] for line in lines)
+
+
+def outside_unchanged(previous: np.ndarray, current: np.ndarray, box: Box, frame_height: int) -> bool:
+    """窗口之外的画面是否没有变化
+
+    Args:
+        previous: 上一张截图的显示器签名
+        current: 本次的显示器签名
+        box: 窗口区域（画面坐标）
+        frame_height: 画面高度，用于换算签名坐标
+
+    Returns:
+        窗口之外不同的格子不超过 OUTSIDE_CELLS 个
+    """
+    if previous.shape != current.shape:
+        return False
+    changed = cell_differences(previous, current) > CELL_DIFF
+    cell = CELL * frame_height / current.shape[0]
+    left, top, right, bottom = box
+    changed[int(top // cell):int(np.ceil(bottom / cell)), int(left // cell):int(np.ceil(right / cell))] = False
+    return int(changed.sum()) <= OUTSIDE_CELLS
+
+
+class _WindowState(NamedTuple):
+    """窗口上一张识别过的截图"""
+    box: Box
+    gray: np.ndarray
+    signature: np.ndarray
+    lines: Optional[List[TextLine]]
+
+
+def _default_recognize_text(image, app=None, title=None):
+    from memococo.ocr import extract_text_from_image
+    return extract_text_from_image(image, app=app, title=title)
+
+
+def _default_recognize_lines(image, app=None):
+    from memococo.ocr import extract_text_lines
+    return extract_text_lines(image, app=app)
+
+
+class ScrollOCR:
+    """按窗口记录上一张截图，滚动时只识别新出现的区域"""
+
+    def __init__(self, recognize_text: Callable = _default_recognize_text,
+                 recognize_lines: Callable = _default_recognize_lines, max_windows: int = MAX_WINDOWS):
+        """初始化
+
+        Args:
+            recognize_text: 正常OCR流程，(图像, app, title) -> 文本
+            recognize_lines: 整图识别，(图像, app) -> 文字行
+            max_windows: 记住的窗口数
+        """
+        self._recognize_text = recognize_text
+        self._recognize_lines = recognize_lines
+        self.max_windows = max_windows
+        self._windows: "OrderedDict[Hashable, _WindowState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.full = 0
+        self.line_frames = 0
+        self.incremental = 0
+        self.rows_total = 0
+        self.rows_recognized = 0
+
+    def extract_text(self, frame: np.ndarray, key: Hashable, box: Box, signature: np.ndarray,
+                     app: Optional[str] = None, title: Optional[str] = None) -> str:
+        """识别截图文本，与同一窗口上一张截图相比只是滚动时只识别新出现的区域
+
+        Args:
+            frame: 显示器画面
+            key: 窗口标识（显示器、应用、标题）
+            box: 活动窗口在画面中的区域
+            signature: 显示器画面的签名（monitor_tracker.frame_signature）
+            app: 活动应用名
+            title: 活动窗口标题
+
+        Returns:
+            识别出的文本
+        """
+        if get_ocr_profile(app).skip or not get_settings().get("scroll_ocr", True):
+            return self._recognize_text(frame, app=app, title=title)
+
+        gray = window_gray(frame, box)
+        with self._lock:
+            state = self._windows.get(key)
+        scroll = None
+        if state is not None and state.box == box and outside_unchanged(state.signature, signature, box,
+                                                                            frame.shape[0]):
+            scroll = estimate_scroll(state.gray, gray)
+
+        lines = None
+        if scroll is None:
+            text = self._recognize_text(frame, app=app, title=title)
+            self.full += 1
+        else:
+            # 换算为画面坐标
+            bottom = box[3] if scroll.bottom == gray.shape[0] else box[1] + scroll.bottom * SCROLL_SCALE
+            scroll = ScrollShift(scroll.shift * SCROLL_SCALE, box[1] + scroll.top * SCROLL_SCALE, bottom)
+            if state.lines is None:
+                lines = self._recognize_lines(frame, app=app)
+                self.line_frames += 1
+            else:
+                strip_top, strip_bottom = exposed_strip(scroll)
+                strip_lines = [(line[0] + box[0], line[1] + strip_top, line[2] + box[0], line[3] + strip_top, line[4])
+                               for line in self._recognize_lines(frame[strip_top:strip_bottom, box[0]:box[2]], app=app)]
+                lines = merge_scrolled_lines(state.lines, strip_lines, box, scroll)
+                self.incremental += 1
+                self.rows_total += box[3] - box[1]
+                self.rows_recognized += strip_bottom - strip_top
+                logger.debug(f"[OCR] 窗口滚动 {scroll.shift} 像素，只识别新出现的 {strip_bottom - strip_top} 行")
+            text = lines_text(lines)
+
+        with self._lock:
+            self._windows[key] = _WindowState(box, gray, signature, lines)
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+        return text
+
+    def stats(self) -> dict:
+        """滚动增量OCR统计：正常识别、整图识别文字行和增量识别的截图数，增量识别实际识别的行数比例"""
+        return {
+            "full": self.full,
+            "line_frames": self.line_frames,
+            "incremental": self.incremental,
+            "recognized_ratio": round(self.rows_recognized / self.rows_total, 3) if self.rows_total else None,
+        }
+
+
+_scroll_ocr: Optional[ScrollOCR] = None
+_scroll_ocr_lock = threading.Lock()
+
+
+def get_scroll_ocr() -> ScrollOCR:
+    """获取全局滚动增量OCR"""
+    global _scroll_ocr
+    if _scroll_ocr is None:
+        with _scroll_ocr_lock:
+            if _scroll_ocr is None:
+                _scroll_ocr = ScrollOCR()
+    return _scroll_ocr
@@ -121,7 +121,7 @@ const SearchController = {
             colDiv.innerHTML = `
                 <div class="card rounded-lg">
                     <a href="#" data-toggle="modal" data-target="#modal-${start + index}">
-                        <img data-src="/pictures/${entry[4]}.webp" alt="Image" class="card-img-top lazy-load responsive-img">
+                        <img data-src="/thumbs/${entry[6]}.webp" alt="Image" class="card-img-top lazy-load responsive-img">
                     </a>
                     <div class="card-footer text-muted text-center">
                         ${formattedDate}
@@ -138,7 +138,7 @@ const SearchController = {
                             </div>
                             <div class="modal-body d-flex align-items-center justify-content-center h-100">
                                 <div class="image-container" style="width: 100%; height: 100%;">
-                                    <img src="/pictures/${entry[4]}.webp" alt="Image" class="no-lazy responsive-img" style="width: 100%; height: 100%; object-fit: contain; margin: 0 auto;">
+                                    <img src="/pictures/${entry[6]}.webp" loading="lazy" alt="Image" class="no-lazy responsive-img" style="width: 100%; height: 100%; object-fit: contain; margin: 0 auto;">
                                 </div>
                             </div>
                             <div class="modal-footer">
@@ -22,21 +22,29 @@ const TimelineController = {
 
     // 数据
     data: {
-        timestamps: [],
+        // 截图名（<时间戳> 或 <时间戳>_<显示器编号>），按时间降序
+        frames: [],
         timeoutId: null,
         previewTimeoutId: null,
         imgWidth: 0,
         imgHeight: 0,
-        lastPreviewTimestamp: null
+        lastPreviewFrame: null,
+        // 按小时缓存的雪碧图索引（小时键 -> 索引）
+        sprites: {},
+        // 正在加载雪碧图的小时键
+        spritesLoading: {}
     },
 
+    // 透明占位图，用雪碧图背景显示预览时使用
+    TRANSPARENT_PIXEL: 'data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7',
+
     /**
      * 初始化时间轴控制器
-     * @param {Array} timestamps 时间戳数组
+     * @param {Array} frames 截图名数组
      */
-    init: function(timestamps) {
-        // 保存时间戳数据
-        this.data.timestamps = timestamps;
+    init: function(frames) {
+        // 保存截图数据
+        this.data.frames = frames;
 
         // 获取DOM元素
         this.elements.container = document.getElementById('image-container');
@@ -67,22 +75,22 @@ const TimelineController = {
      * 设置初始值
      */
     setInitialValues: function() {
-        // 设置滑块初始值为最新的时间戳
-        this.elements.slider.value = this.data.timestamps.length - 1;
+        // 设置滑块初始值为最新的截图
+        this.elements.slider.value = this.data.frames.length - 1;
 
-        // 获取初始时间戳
-        const initialIndex = 0; // 最新的时间戳索引
-        const initialTimestamp = this.data.timestamps[initialIndex];
+        // 获取初始截图
+        const initialIndex = 0; // 最新的截图索引
+        const initialFrame = this.data.frames[initialIndex];
 
         // 设置时间显示
-        this.elements.sliderValue.textContent = this.formatTimestamp(initialTimestamp);
+        this.elements.sliderValue.textContent = this.formatTimestamp(this.frameTimestamp(initialFrame));
 
         // 加载初始图片
-        this.elements.timestampImage.src = `/pictures/${initialTimestamp}.webp`;
+        this.elements.timestampImage.src = `/pictures/${initialFrame}.webp`;
 
-        // 设置预览图片的初始src
+        // 设置预览图片的初始src（使用缩略图）
         if (this.elements.previewImage) {
-            this.elements.previewImage.src = `/pictures/${initialTimestamp}.webp`;
+            this.elements.previewImage.src = `/thumbs/${initialFrame}.webp`;
         }
     },
 
@@ -120,21 +128,22 @@ const TimelineController = {
         const relativePosition = (event.clientX - sliderRect.left) / sliderRect.width;
 
         // 使用与handleSliderInput完全相同的计算方式
-        const sliderValue = Math.round(relativePosition * (this.data.timestamps.length - 1));
-        const reversedIndex = this.data.timestamps.length - 1 - sliderValue;
+        const sliderValue = Math.round(relativePosition * (this.data.frames.length - 1));
+        const reversedIndex = this.data.frames.length - 1 - sliderValue;
 
-        // 获取对应的时间戳并确保它是一个数字
-        const timestamp = parseInt(this.data.timestamps[reversedIndex], 10);
+        // 获取对应的截图及其时间戳
+        const frame = this.data.frames[reversedIndex];
+        const timestamp = this.frameTimestamp(frame);
 
-        // 如果时间戳无效或与上次预览的相同，则不重新加载
-        if (isNaN(timestamp) || timestamp === this.data.lastPreviewTimestamp) {
+        // 如果时间戳无效或与上次预览的截图相同，则不重新加载
+        if (isNaN(timestamp) || frame === this.data.lastPreviewFrame) {
             // 只更新位置
             this.elements.sliderPreview.style.left = `${event.clientX}px`;
             return;
         }
 
-        // 保存当前时间戳
-        this.data.lastPreviewTimestamp = timestamp;
+        // 保存当前截图
+        this.data.lastPreviewFrame = frame;
 
         // 更新预览时间文本
         this.elements.previewTime.textContent = this.formatTimestamp(timestamp);
@@ -148,8 +157,7 @@ const TimelineController = {
         this.data.previewTimeoutId = setTimeout(() => {
             // 确保timestamp是有效的数字
             if (!isNaN(timestamp)) {
-                console.log('Loading preview for timestamp:', timestamp);
-                this.elements.previewImage.src = `/pictures/${timestamp}.webp`;
+                this.showPreview(frame);
             } else {
                 console.error('Invalid timestamp for preview:', timestamp);
             }
@@ -159,6 +167,98 @@ const TimelineController = {
         this.elements.sliderPreview.style.left = `${event.clientX}px`;
     },
 
+    /**
+     * 显示指定截图的预览图
+     *
+     * 优先使用该小时的雪碧图（一次下载即可覆盖整小时的预览），
+     * 雪碧图尚未加载或不包含该帧时回退到单张缩略图
+     * @param {string} frame 截图名
+     */
+    showPreview: function(frame) {
+        const timestamp = this.frameTimestamp(frame);
+        const hourKey = this.getHourKey(timestamp);
+        const sprite = this.data.sprites[hourKey];
+        const cell = sprite ? sprite.frames[frame] : undefined;
+        const img = this.elements.previewImage;
+
+        if (cell !== undefined) {
+            // 宽高比与单元格不同的截图（其他方向的显示器）居中放在单元格内，只显示其内容区域
+            const [left, top, width, height] = (sprite.boxes && sprite.boxes[frame]) ||
+                [0, 0, sprite.cell_width, sprite.cell_height];
+            const x = (cell % sprite.columns) * sprite.cell_width + left;
+            const y = Math.floor(cell / sprite.columns) * sprite.cell_height + top;
+            img.src = this.TRANSPARENT_PIXEL;
+            img.style.width = `${width}px`;
+            img.style.height = `${height}px`;
+            img.style.background = `url(/thumbs/sprite/${hourKey}.webp?v=${sprite.version}) -${x}px -${y}px no-repeat`;
+        } else {
+            img.style.background = '';
+            img.style.width = '';
+            img.style.height = '';
+            img.src = `/thumbs/${frame}.webp`;
+            this.loadSprite(hourKey, timestamp);
+        }
+    },
+
+    /**
+     * 后台加载指定小时的雪碧图及其索引
+     *
+     * 已加载的索引不包含该帧时，只有该帧晚于索引中的最后一帧（当前小时又有了新截图）才重新获取，
+     * 缺少缩略图的旧帧不会反复触发请求
+     * @param {string} hourKey 小时键（YYYYMMDDHH）
+     * @param {number} timestamp 需要预览的时间戳
+     */
+    loadSprite: function(hourKey, timestamp) {
+        const sprite = this.data.sprites[hourKey];
+        if (this.data.spritesLoading[hourKey]) return;
+        if (sprite && !(timestamp > sprite.latest)) return;
+        this.data.spritesLoading[hourKey] = true;
+        const done = () => {
+            delete this.data.spritesLoading[hourKey];
+        };
+
+        fetch(`/thumbs/sprite/${hourKey}.json`, { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : null)
+            .then(index => {
+                if (!index || (sprite && index.version === sprite.version)) {
+                    done();
+                    return;
+                }
+                // 雪碧图下载完成后再启用，避免显示空白预览；按索引中的版本请求，保证图片与索引一致
+                const image = new Image();
+                image.onload = () => {
+                    this.data.sprites[hourKey] = index;
+                    done();
+                };
+                image.onerror = done;
+                image.src = `/thumbs/sprite/${hourKey}.webp?v=${index.version}`;
+            })
+            .catch(error => {
+                done();
+                console.error('加载雪碧图失败:', error);
+            });
+    },
+
+    /**
+     * 获取截图名中的时间戳
+     * @param {string} frame 截图名（<时间戳> 或 <时间戳>_<显示器编号>）
+     * @returns {number} 时间戳
+     */
+    frameTimestamp: function(frame) {
+        return parseInt(frame, 10);
+    },
+
+    /**
+     * 获取时间戳所在小时的键（与服务端一致，使用本地时间）
+     * @param {number} timestamp 时间戳
+     * @returns {string} 小时键（YYYYMMDDHH）
+     */
+    getHourKey: function(timestamp) {
+        const date = new Date(timestamp * 1000);
+        const pad = value => String(value).padStart(2, '0');
+        return `${date.getFullYear()}${pad(date.getMonth() + 1)}${pad(date.getDate())}${pad(date.getHours())}`;
+    },
+
     /**
      * 处理滑块鼠标进入事件
      */
@@ -211,12 +311,12 @@ const TimelineController = {
      * 处理滑块输入事件
      */
     handleSliderInput: function() {
-        // 获取当前选中的时间戳
-        const reversedIndex = this.data.timestamps.length - 1 - this.elements.slider.value;
-        const timestamp = this.data.timestamps[reversedIndex];
+        // 获取当前选中的截图
+        const reversedIndex = this.data.frames.length - 1 - this.elements.slider.value;
+        const frame = this.data.frames[reversedIndex];
 
         // 更新时间显示
-        this.elements.sliderValue.textContent = this.formatTimestamp(timestamp);
+        this.elements.sliderValue.textContent = this.formatTimestamp(this.frameTimestamp(frame));
 
         // 清除之前的框线
         const highlights = document.querySelectorAll('.highlight');
@@ -231,7 +331,7 @@ const TimelineController = {
 
         // 设置新的定时器，延迟加载图片
         this.data.timeoutId = setTimeout(() => {
-            this.elements.timestampImage.src = `/pictures/${timestamp}.webp`;
+            this.elements.timestampImage.src = `/pictures/${frame}.webp`;
             // 更新时间节点位置
             this.updateTimeNodePositions();
         }, 200);
@@ -241,8 +341,8 @@ const TimelineController = {
      * 处理图片加载完成事件
      */
     handleImageLoad: function() {
-        const reversedIndex = this.data.timestamps.length - 1 - this.elements.slider.value;
-        const timestamp = this.data.timestamps[reversedIndex];
+        const reversedIndex = this.data.frames.length - 1 - this.elements.slider.value;
+        const frame = this.data.frames[reversedIndex];
 
         // 保存图片尺寸
         this.data.imgWidth = this.elements.timestampImage.naturalWidth;
@@ -250,7 +350,7 @@ const TimelineController = {
 
         // 延时执行，确保图片完全加载
         setTimeout(() => {
-            this.updateText(timestamp);
+            this.updateText(frame);
         }, 500);
     },
 
@@ -280,11 +380,11 @@ const TimelineController = {
      */
     handleTimeNodeClick: function(node) {
         const timestamp = parseInt(node.dataset.timestamp);
-        const timestampIndex = this.data.timestamps.indexOf(timestamp);
+        const timestampIndex = this.findFrameIndex(timestamp);
 
         if (timestampIndex !== -1) {
             // 计算滑块的新值
-            const newSliderValue = this.data.timestamps.length - 1 - timestampIndex;
+            const newSliderValue = this.data.frames.length - 1 - timestampIndex;
 
             // 设置滑块值
             this.elements.slider.value = newSliderValue;
@@ -293,10 +393,19 @@ const TimelineController = {
             this.elements.sliderValue.textContent = this.formatTimestamp(timestamp);
 
             // 加载图片
-            this.elements.timestampImage.src = `/pictures/${timestamp}.webp`;
+            this.elements.timestampImage.src = `/pictures/${this.data.frames[timestampIndex]}.webp`;
         }
     },
 
+    /**
+     * 查找时间戳对应的第一张截图（同一时刻可能有多个显示器的截图）
+     * @param {number} timestamp 时间戳
+     * @returns {number} 截图索引，不存在时返回-1
+     */
+    findFrameIndex: function(timestamp) {
+        return this.data.frames.findIndex(frame => this.frameTimestamp(frame) === timestamp);
+    },
+
     /**
      * 更新时间节点位置
      */
@@ -308,11 +417,11 @@ const TimelineController = {
 
         this.elements.timeNodes.forEach(node => {
             const timestamp = parseInt(node.dataset.timestamp);
-            const timestampIndex = this.data.timestamps.indexOf(timestamp);
+            const timestampIndex = this.findFrameIndex(timestamp);
 
             if (timestampIndex !== -1) {
                 // 计算节点在滑块上的位置百分比
-                const position = ((this.data.timestamps.length - 1 - timestampIndex) / (this.data.timestamps.length - 1)) * 100;
+                const position = ((this.data.frames.length - 1 - timestampIndex) / (this.data.frames.length - 1)) * 100;
 
                 // 设置节点位置
                 node.style.left = `${position}%`;
@@ -396,9 +505,9 @@ const TimelineController = {
 
     /**
      * 更新文本标签
-     * @param {number} timestamp 时间戳
+     * @param {string} frame 截图名
      */
-    updateText: async function(timestamp) {
+    updateText: async function(frame) {
         // 清除现有文本标签
         const textLabels = document.querySelectorAll('.text-label');
         textLabels.forEach(textLabel => textLabel.remove());
@@ -408,7 +517,7 @@ const TimelineController = {
         highlights.forEach(highlight => highlight.remove());
 
         // 获取OCR数据
-        const data = await this.fetchData(timestamp);
+        const data = await this.fetchData(frame);
 
         // 数据为空时，不执行下面的代码
         if (!data || data.length === 0) {
@@ -507,12 +616,12 @@ const TimelineController = {
 
     /**
      * 从后台接口获取OCR数据
-     * @param {number} timestamp 时间戳
+     * @param {string} frame 截图名
      * @returns {Promise<Array>} OCR数据数组
      */
-    fetchData: async function(timestamp) {
+    fetchData: async function(frame) {
         try {
-            const response = await fetch('/get_ocr_text/' + timestamp);
+            const response = await fetch('/get_ocr_text/' + frame);
             if (!response.ok) {
                 const errorMessage = document.body.getAttribute('data-network-error') || '网络响应错误';
                 throw new Error(errorMessage);
@@ -529,11 +638,11 @@ const TimelineController = {
 
 // 当DOM加载完成后初始化时间轴控制器
 document.addEventListener('DOMContentLoaded', function() {
-    // 检查是否存在时间戳数据
-    const timestampsElement = document.getElementById('timestamps-data');
-    if (timestampsElement) {
-        const timestamps = JSON.parse(timestampsElement.dataset.timestamps);
-        TimelineController.init(timestamps);
+    // 检查是否存在截图数据
+    const framesElement = document.getElementById('frames-data');
+    if (framesElement) {
+        const frames = JSON.parse(framesElement.dataset.frames);
+        TimelineController.init(frames);
     }
 
     // 显示闪屏模态框（如果存在）
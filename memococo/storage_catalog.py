@@ -0,0 +1,301 @@
+"""
+存储目录模块
+
+按天记录截图目录的文件数、占用空间、归档状态和OCR积压数（storage_days表），
+供未备份文件夹页面和存储统计接口直接查询，避免每次请求都遍历整个截图目录。
+
+- 截图线程保存截图后调用 record_frame_saved 增量累加
+- 归档（图片转视频）完成后调用 refresh_day 重新统计该天目录
+- 条目数由 entries 表上的触发器维护（见 database.create_schema）
+- 待OCR数在查询时按OCR任务表统计，已失败的OCR任务不计入，与 /api/ocr/stats 的任务统计一致
+- 启动时 sync_storage_catalog 补齐尚未统计过的日期目录
+"""
+
+import os
+import time
+import datetime
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from memococo.config import logger, screenshots_path, appdata_folder
+from memococo.database import DatabaseManager
+from memococo.utils import archive_mapping_files
+from memococo.frame_store import FRAME_EXTENSION, INDEX_NAME, INDEX_RECORD_SIZE
+from memococo.ocr_jobs import count_pending_jobs, count_pending_jobs_by_day
+
+# 保证同一天的增量更新和重新统计不会交错执行
+_lock = threading.Lock()
+
+
+def day_key(timestamp: int) -> str:
+    """获取时间戳对应的日期键（YYYY/MM/DD，与截图目录结构一致）
+
+    Args:
+        timestamp: 时间戳
+
+    Returns:
+        日期键
+    """
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y/%m/%d")
+
+
+def day_key_from_folder(folder: str) -> str:
+    """从截图日期目录路径中解析日期键
+
+    Args:
+        folder: 日期目录路径，例如 screenshots/2025/04/16
+
+    Returns:
+        日期键
+    """
+    parts = os.path.normpath(folder).split(os.sep)
+    return "/".join(parts[-3:])
+
+
+def get_day_folder(day: str) -> str:
+    """获取日期键对应的截图目录
+
+    Args:
+        day: 日期键
+
+    Returns:
+        日期目录路径
+    """
+    return os.path.join(screenshots_path, *day.split("/"))
+
+
+def format_size(size_bytes: int) -> str:
+    """格式化字节数，小于1GB时以MB显示
+
+    Args:
+        size_bytes: 字节数
+
+    Returns:
+        格式化后的大小，例如 "12.5MB"、"1.2GB"
+    """
+    size_in_gb = round(size_bytes / (1024 ** 3), 2)
+    if size_in_gb < 1:
+        return f"{round(size_bytes / (1024 ** 2), 2)}MB"
+    return f"{size_in_gb}GB"
+
+
+def scan_day_folder(folder: str) -> Tuple[int, int, bool]:
+    """统计日期目录的截图数量、占用空间和归档状态
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        (截图数量, 占用字节数, 是否已归档)
+    """
+    frame_count = 0
+    total_bytes = 0
+    mapping_files = archive_mapping_files(folder)
+    archived = bool(mapping_files)
+
+    pending_dirs = [folder]
+    while pending_dirs:
+        current = pending_dirs.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total_bytes += entry.stat(follow_symlinks=False).st_size
+                            if current == folder and entry.name.endswith(FRAME_EXTENSION):
+                                frame_count += 1
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+    # 打包存储的截图数量等于索引记录数
+    index_path = os.path.join(folder, INDEX_NAME)
+    if os.path.exists(index_path):
+        frame_count += os.path.getsize(index_path) // INDEX_RECORD_SIZE
+
+    # 每个显示器一个映射文件
+    for mapping_file in mapping_files:
+        try:
+            with open(mapping_file, "r") as f:
+                # 第一行为表头
+                frame_count += max(0, sum(1 for _ in f) - 1)
+        except OSError as e:
+            logger.warning(f"读取归档映射文件失败 {mapping_file}: {e}")
+
+    return frame_count, total_bytes, archived
+
+
+def record_frame_saved(timestamp: int, size: int) -> None:
+    """记录新保存的截图（截图线程在写入截图和缩略图后调用）
+
+    Args:
+        timestamp: 截图时间戳
+        size: 本次写入的字节数
+    """
+    try:
+        with _lock:
+            DatabaseManager.execute(
+                """INSERT INTO storage_days (day, file_count, bytes, updated_at) VALUES (?, 1, ?, ?)
+                   ON CONFLICT(day) DO UPDATE SET
+                       file_count = file_count + 1,
+                       bytes = bytes + excluded.bytes,
+                       updated_at = excluded.updated_at""",
+                (day_key(timestamp), size, int(time.time()))
+            )
+    except Exception as e:
+        logger.warning(f"更新存储目录失败 {timestamp}: {e}")
+
+
+def refresh_day(folder: str) -> Optional[Dict[str, Any]]:
+    """重新统计某一天的目录并写入存储目录（归档完成后调用）
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        统计结果，失败时返回None
+    """
+    day = day_key_from_folder(folder)
+    try:
+        with _lock:
+            frame_count, total_bytes, archived = scan_day_folder(folder)
+            DatabaseManager.execute(
+                """INSERT INTO storage_days (day, file_count, bytes, archived, scanned, updated_at)
+                   VALUES (?, ?, ?, ?, 1, ?)
+                   ON CONFLICT(day) DO UPDATE SET
+                       file_count = excluded.file_count,
+                       bytes = excluded.bytes,
+                       archived = excluded.archived,
+                       scanned = 1,
+                       updated_at = excluded.updated_at""",
+                (day, frame_count, total_bytes, int(archived), int(time.time()))
+            )
+    except Exception as e:
+        logger.warning(f"统计日期目录失败 {folder}: {e}")
+        return None
+    return {"day": day, "file_count": frame_count, "bytes": total_bytes, "archived": archived}
+
+
+def list_day_folders() -> List[str]:
+    """列出截图目录下所有 YYYY/MM/DD 日期目录"""
+    folders = []
+    try:
+        years = [e for e in os.scandir(screenshots_path) if e.is_dir() and e.name.isdigit()]
+    except OSError:
+        return folders
+    for year in years:
+        for month in (e for e in os.scandir(year.path) if e.is_dir() and e.name.isdigit()):
+            for day in (e for e in os.scandir(month.path) if e.is_dir() and e.name.isdigit()):
+                folders.append(day.path)
+    return folders
+
+
+def sync_storage_catalog() -> int:
+    """统计所有尚未统计过的日期目录（启动时在后台线程中调用）
+
+    Returns:
+        本次统计的目录数量
+    """
+    try:
+        rows = DatabaseManager.execute("SELECT day FROM storage_days WHERE scanned = 1")
+    except Exception as e:
+        logger.warning(f"读取存储目录失败: {e}")
+        return 0
+    scanned_days = {row["day"] for row in rows}
+
+    count = 0
+    for folder in list_day_folders():
+        if day_key_from_folder(folder) in scanned_days:
+            continue
+        if refresh_day(folder) is not None:
+            count += 1
+    if count:
+        logger.info(f"存储目录已补充统计 {count} 个日期目录")
+    return count
+
+
+def get_storage_days(days_ago_max: Optional[int] = None) -> List[Dict[str, Any]]:
+    """查询按天的存储统计
+
+    Args:
+        days_ago_max: 只返回最近若干天，None表示全部
+
+    Returns:
+        按日期升序排列的统计列表
+    """
+    sql = """SELECT day, file_count, bytes, archived, entry_count, updated_at
+             FROM storage_days"""
+    params = ()
+    start_timestamp = None
+    if days_ago_max is not None:
+        start_date = (datetime.datetime.now() - datetime.timedelta(days=days_ago_max)).date()
+        sql += " WHERE day >= ?"
+        params = (start_date.strftime("%Y/%m/%d"),)
+        start_timestamp = int(datetime.datetime.combine(start_date, datetime.time()).timestamp())
+    sql += " ORDER BY day"
+    try:
+        rows = DatabaseManager.execute(sql, params)
+    except Exception as e:
+        logger.error(f"查询存储目录失败: {e}")
+        return []
+    pending = count_pending_jobs_by_day(start_timestamp)
+    return [dict(row, archived=bool(row["archived"]), ocr_pending=pending.get(row["day"], 0)) for row in rows]
+
+
+def get_unbacked_up_days(days_ago_max: int = 30) -> List[Dict[str, Any]]:
+    """查询最近未归档的日期目录（未备份文件夹页面使用）
+
+    Args:
+        days_ago_max: 最近的天数
+
+    Returns:
+        目录信息列表，字段与原 utils.get_unbacked_up_folders 保持一致，并附带OCR积压数
+    """
+    today = datetime.datetime.now().strftime("%Y/%m/%d")
+    folder_info = []
+    for day in get_storage_days(days_ago_max):
+        if day["archived"] or day["file_count"] <= 0:
+            continue
+        folder_info.append({
+            "folder": get_day_folder(day["day"]),
+            "image_count": day["file_count"],
+            "folder_size": format_size(day["bytes"]),
+            "ocr_pending": day["ocr_pending"],
+            "is_today": day["day"] == today,
+        })
+    return folder_info
+
+
+def get_storage_summary() -> Dict[str, Any]:
+    """汇总存储统计
+
+    Returns:
+        包含天数、截图数、占用空间、待OCR数等信息的字典
+    """
+    try:
+        rows = DatabaseManager.execute(
+            """SELECT COUNT(*) AS days, COALESCE(SUM(file_count), 0) AS file_count,
+                      COALESCE(SUM(bytes), 0) AS bytes, COALESCE(SUM(archived), 0) AS archived_days,
+                      COALESCE(SUM(entry_count), 0) AS entry_count
+               FROM storage_days"""
+        )
+        summary = dict(rows[0], ocr_pending=count_pending_jobs())
+    except Exception as e:
+        logger.error(f"汇总存储目录失败: {e}")
+        summary = {"days": 0, "file_count": 0, "bytes": 0, "archived_days": 0, "entry_count": 0, "ocr_pending": 0}
+
+    # 数据库、配置等位于数据目录顶层的文件单独统计，只需一次scandir
+    other_bytes = 0
+    try:
+        with os.scandir(appdata_folder) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    other_bytes += entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        pass
+    summary["other_bytes"] = other_bytes
+    summary["total_bytes"] = summary["bytes"] + other_bytes
+    return summary
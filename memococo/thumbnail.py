@@ -0,0 +1,353 @@
+"""
+缩略图模块
+
+为时间轴预览和搜索结果卡片生成缩略图和按小时拼接的雪碧图（sprite sheet），
+避免前端为了显示一张小预览图而加载数MB的原始截图。
+
+缩略图存放在截图所在日期目录下的 thumbs 子目录中（截图名见frame_store模块）：
+    screenshots/YYYY/MM/DD/thumbs/<截图名>.webp
+每小时的雪碧图及其索引文件（雪碧图文件名带有版本，即生成时该小时的帧数和最后一帧的时间戳，
+索引和雪碧图由同一次生成写入，按索引中的版本请求雪碧图时不会拿到布局不同的图片）：
+    screenshots/YYYY/MM/DD/thumbs/sprite_HH_<版本>.webp
+    screenshots/YYYY/MM/DD/thumbs/sprite_HH.json
+"""
+
+import os
+import io
+import json
+import math
+import datetime
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from memococo.config import logger, screenshots_path
+from memococo.database import get_frames_in_range
+from memococo.frame_store import frame_name, load_frame_image
+
+# 缩略图目录名
+THUMB_DIR_NAME = "thumbs"
+# 缩略图最大边长（像素），时间轴预览放大1.5倍后约300px高，480足够清晰
+THUMB_MAX_SIZE = 480
+# 缩略图WebP质量
+THUMB_QUALITY = 70
+# 雪碧图单元格宽度（像素）
+SPRITE_CELL_WIDTH = 240
+# 雪碧图WebP质量
+SPRITE_QUALITY = 60
+# WebP格式支持的最大边长
+_WEBP_MAX_DIMENSION = 16383
+
+# 防止同一小时的雪碧图被并发重复生成（每小时一把锁，不同小时可以同时生成）
+_sprite_locks: Dict[str, threading.Lock] = {}
+_sprite_locks_guard = threading.Lock()
+
+
+def get_day_folder(timestamp: int) -> str:
+    """获取时间戳对应的截图日期目录
+
+    Args:
+        timestamp: 时间戳
+
+    Returns:
+        日期目录路径
+    """
+    return os.path.join(screenshots_path, datetime.datetime.fromtimestamp(timestamp).strftime("%Y/%m/%d"))
+
+
+def get_thumbnail_folder(timestamp: int) -> str:
+    """获取时间戳对应的缩略图目录
+
+    Args:
+        timestamp: 时间戳
+
+    Returns:
+        缩略图目录路径
+    """
+    return os.path.join(get_day_folder(timestamp), THUMB_DIR_NAME)
+
+
+def get_thumbnail_path(timestamp: int, monitor: int = 0) -> str:
+    """获取截图对应的缩略图路径
+
+    Args:
+        timestamp: 时间戳
+        monitor: 显示器编号
+
+    Returns:
+        缩略图文件路径
+    """
+    return os.path.join(get_thumbnail_folder(timestamp), f"{frame_name(timestamp, monitor)}.webp")
+
+
+def parse_hour_key(hour_key: str) -> datetime.datetime:
+    """解析小时键（YYYYMMDDHH）
+
+    Args:
+        hour_key: 小时键，例如 "2025041614"
+
+    Returns:
+        该小时起始时间
+
+    Raises:
+        ValueError: 小时键格式错误时抛出
+    """
+    return datetime.datetime.strptime(hour_key, "%Y%m%d%H")
+
+
+def get_hour_key(timestamp: int) -> str:
+    """获取时间戳所在小时的键（YYYYMMDDHH）
+
+    Args:
+        timestamp: 时间戳
+
+    Returns:
+        小时键
+    """
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y%m%d%H")
+
+
+def _sprite_paths(hour_start: datetime.datetime):
+    """获取雪碧图目录、雪碧图文件名前缀及索引文件路径"""
+    folder = os.path.join(screenshots_path, hour_start.strftime("%Y/%m/%d"), THUMB_DIR_NAME)
+    name = f"sprite_{hour_start.strftime('%H')}"
+    return folder, name, os.path.join(folder, f"{name}.json")
+
+
+def _sprite_image_path(folder: str, name: str, version: str) -> str:
+    """获取指定版本的雪碧图路径"""
+    return os.path.join(folder, f"{name}_{version}.webp")
+
+
+def _sprite_version(frames) -> str:
+    """雪碧图版本：帧数和最后一帧的时间戳，该小时有新截图时变化"""
+    return f"{len(frames)}-{max(timestamp for timestamp, _ in frames)}"
+
+
+def _hour_lock(hour_key: str) -> threading.Lock:
+    with _sprite_locks_guard:
+        return _sprite_locks.setdefault(hour_key, threading.Lock())
+
+
+def save_thumbnail(image: Union[Image.Image, np.ndarray], timestamp: int, monitor: int = 0) -> Optional[str]:
+    """根据已在内存中的截图生成缩略图
+
+    截图线程在保存原图后调用，直接复用内存中的图像，无需再次解码
+
+    Args:
+        image: PIL图像或RGB格式的numpy数组
+        timestamp: 截图时间戳
+        monitor: 显示器编号
+
+    Returns:
+        缩略图路径，失败时返回None
+    """
+    try:
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        thumb = image.copy()
+        thumb.thumbnail((THUMB_MAX_SIZE, THUMB_MAX_SIZE), Image.BILINEAR)
+        if thumb.mode not in ("RGB", "RGBA"):
+            thumb = thumb.convert("RGB")
+
+        thumb_path = get_thumbnail_path(timestamp, monitor)
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        # 先写临时文件再重命名，避免前端读到写了一半的文件
+        tmp_path = f"{thumb_path}.tmp"
+        thumb.save(tmp_path, format="webp", quality=THUMB_QUALITY)
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+    except Exception as e:
+        logger.warning(f"生成缩略图失败 {frame_name(timestamp, monitor)}: {e}")
+        return None
+
+
+def ensure_thumbnail(timestamp: int, monitor: int = 0) -> Optional[str]:
+    """确保缩略图存在，不存在时从原图懒生成
+
+    Args:
+        timestamp: 截图时间戳
+        monitor: 显示器编号
+
+    Returns:
+        缩略图路径，原图不存在时返回None
+    """
+    thumb_path = get_thumbnail_path(timestamp, monitor)
+    if os.path.exists(thumb_path):
+        return thumb_path
+
+    try:
+        image = load_frame_image(timestamp, monitor=monitor)
+    except Exception as e:
+        logger.warning(f"加载原图失败，无法生成缩略图 {frame_name(timestamp, monitor)}: {e}")
+        return None
+    if image is None:
+        return None
+    return save_thumbnail(image, timestamp, monitor)
+
+
+def _load_sprite_index(folder: str, name: str, index_path: str) -> Optional[Dict[str, Any]]:
+    """读取已有的雪碧图索引，索引或其雪碧图不存在时返回None"""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    version = index.get("version")
+    if not version or not os.path.exists(_sprite_image_path(folder, name, version)):
+        return None
+    # 旧版本的雪碧图把缩略图拉伸到单元格尺寸，没有内容区域，需要重新生成
+    if "boxes" not in index:
+        return None
+    return index
+
+
+def _remove_old_sprites(folder: str, name: str, keep) -> None:
+    """删除该小时 keep 以外的雪碧图（包括旧版本不带版本号的雪碧图）
+
+    调用方保留上一个版本，正在按旧索引下载雪碧图的页面仍能拿到对应的图片
+    """
+    kept = {os.path.basename(_sprite_image_path(folder, name, version)) for version in keep if version}
+    for filename in os.listdir(folder):
+        if filename.startswith(name) and filename.endswith(".webp") and filename not in kept:
+            try:
+                os.remove(os.path.join(folder, filename))
+            except OSError:
+                pass
+
+
+def build_hour_sprite(hour_key: str) -> Optional[Dict[str, Any]]:
+    """生成（或复用）指定小时的缩略图雪碧图
+
+    雪碧图将该小时内所有截图的缩略图按网格拼接成一张图片，
+    前端拖动时间轴时只需下载一次即可显示该小时内任意一帧的预览。
+    该小时结束后生成的雪碧图不会再变化，直接复用；否则与数据库中该小时的帧数和最后一帧比较，
+    有新截图时才重新生成。
+
+    Args:
+        hour_key: 小时键（YYYYMMDDHH）
+
+    Returns:
+        雪碧图索引信息（frames 为截图名到单元格序号的映射，boxes 为截图在单元格中的内容区域
+        [左, 上, 宽, 高]，version 为雪碧图版本，latest 为最后一帧的时间戳），该小时没有截图时返回None
+    """
+    hour_start = parse_hour_key(hour_key)
+    hour_end = hour_start + datetime.timedelta(hours=1)
+    folder, name, index_path = _sprite_paths(hour_start)
+
+    with _hour_lock(hour_key):
+        previous = _load_sprite_index(folder, name, index_path)
+        if previous is not None and os.path.getmtime(index_path) >= hour_end.timestamp():
+            return previous
+
+        frames = get_frames_in_range(int(hour_start.timestamp()), int(hour_end.timestamp()) - 1)
+        if not frames:
+            return None
+        frames.sort()
+        version = _sprite_version(frames)
+        if previous is not None and previous["version"] == version:
+            return previous
+
+        thumbs = []
+        for ts, monitor in frames:
+            thumb_path = ensure_thumbnail(ts, monitor)
+            if thumb_path:
+                thumbs.append((frame_name(ts, monitor), thumb_path))
+        if not thumbs:
+            return None
+
+        # 同一小时内可能有宽高比不同的显示器（如横屏和竖屏），以帧数最多的宽高比确定单元格尺寸，
+        # 其他缩略图等比缩放后居中放入单元格，内容区域记录在索引中
+        sizes = {}
+        for frame, thumb_path in thumbs:
+            try:
+                with Image.open(thumb_path) as thumb:
+                    sizes[frame] = thumb.size
+            except Exception as e:
+                logger.warning(f"拼接雪碧图时读取缩略图失败 {thumb_path}: {e}")
+        thumbs = [(frame, thumb_path) for frame, thumb_path in thumbs if frame in sizes]
+        if not thumbs:
+            return None
+        aspects = [height / max(width, 1) for width, height in sizes.values()]
+        common = Counter(round(aspect, 2) for aspect in aspects).most_common(1)[0][0]
+        aspect = next(aspect for aspect in aspects if round(aspect, 2) == common)
+        cell_width = SPRITE_CELL_WIDTH
+        cell_height = max(1, int(round(cell_width * aspect)))
+
+        # 尽量接近正方形，同时不超过WebP的尺寸上限
+        columns = max(1, math.ceil(math.sqrt(len(thumbs) * cell_height / cell_width)))
+        columns = min(columns, _WEBP_MAX_DIMENSION // cell_width)
+        max_rows = _WEBP_MAX_DIMENSION // cell_height
+        thumbs = thumbs[:columns * max_rows]
+        rows = math.ceil(len(thumbs) / columns)
+
+        sprite = Image.new("RGB", (columns * cell_width, rows * cell_height))
+        cells = {}
+        boxes = {}
+        for i, (frame, thumb_path) in enumerate(thumbs):
+            width, height = sizes[frame]
+            scale = min(cell_width / width, cell_height / height)
+            box_width, box_height = max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+            left, top = (cell_width - box_width) // 2, (cell_height - box_height) // 2
+            try:
+                with Image.open(thumb_path) as thumb:
+                    cell = thumb.convert("RGB").resize((box_width, box_height), Image.BILINEAR)
+                sprite.paste(cell, ((i % columns) * cell_width + left, (i // columns) * cell_height + top))
+                cells[frame] = i
+                boxes[frame] = [left, top, box_width, box_height]
+            except Exception as e:
+                logger.warning(f"拼接雪碧图时读取缩略图失败 {thumb_path}: {e}")
+
+        index = {
+            "hour": hour_key,
+            "version": version,
+            "latest": frames[-1][0],
+            "cell_width": cell_width,
+            "cell_height": cell_height,
+            "columns": columns,
+            "frames": cells,
+            "boxes": boxes,
+        }
+
+        os.makedirs(folder, exist_ok=True)
+        sprite_path = _sprite_image_path(folder, name, version)
+        buffer = io.BytesIO()
+        sprite.save(buffer, format="webp", quality=SPRITE_QUALITY)
+        with open(f"{sprite_path}.tmp", "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(f"{sprite_path}.tmp", sprite_path)
+        # 索引文件最后写入，其修改时间用于判断该小时结束后雪碧图是否还需要重新生成
+        with open(f"{index_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(f"{index_path}.tmp", index_path)
+        _remove_old_sprites(folder, name, (version, previous["version"] if previous else None))
+
+        logger.debug(f"生成雪碧图 {hour_key}: {len(cells)} 帧, {columns}x{rows}")
+        return index
+
+
+def get_sprite_image_path(hour_key: str, version: Optional[str] = None) -> Optional[str]:
+    """获取指定小时的雪碧图路径
+
+    指定的版本存在时直接返回，不重新生成，保证与请求方持有的索引一致；
+    未指定版本或该版本已被删除时返回最新的雪碧图（必要时生成）
+
+    Args:
+        hour_key: 小时键（YYYYMMDDHH）
+        version: 索引中的雪碧图版本
+
+    Returns:
+        雪碧图路径，该小时没有截图时返回None
+    """
+    folder, name, _ = _sprite_paths(parse_hour_key(hour_key))
+    if version:
+        path = _sprite_image_path(folder, name, os.path.basename(version))
+        if os.path.exists(path):
+            return path
+    index = build_hour_sprite(hour_key)
+    if index is None:
+        return None
+    return _sprite_image_path(folder, name, index["version"])
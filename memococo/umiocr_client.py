@@ -11,12 +11,17 @@ import numpy as np
 import time
 from typing import List, Dict, Any, Optional, Tuple
 from memococo.config import logger
+from memococo.ocr_watchdog import ocr_timeout
+from memococo.common.error_handler import OCREngineError
 
 # UmiOCR API配置
 UMIOCR_API_URLS = [
     "http://127.0.0.1:1224/api/ocr",  # 默认UmiOCR API地址
     "http://localhost:1224/api/ocr",  # 使用localhost
 ]
+# UmiOCR API返回码：100为成功，101为图像中没有文字
+UMIOCR_CODE_OK = 100
+UMIOCR_CODE_NO_TEXT = 101
 
 class UmiOcrClient:
     """UmiOCR API客户端"""
@@ -24,6 +29,8 @@ class UmiOcrClient:
     def __init__(self):
         """初始化UmiOCR API客户端"""
         self.api_url = None
+        # 检查可用性时访问成功的地址，健康检查时使用
+        self.health_url = None
         self.available = self._check_availability()
 
     def _check_availability(self) -> bool:
@@ -47,6 +54,7 @@ class UmiOcrClient:
 
                 if response.status_code == 200:
                     self.api_url = api_url
+                    self.health_url = ping_url
                     elapsed_time = time.time() - start_time
                     logger.info(f"[OCR] UmiOCR API可用: {api_url}, 响应时间: {ping_time:.4f} 秒, 总检测时间: {elapsed_time:.4f} 秒")
                     return True
@@ -65,6 +73,7 @@ class UmiOcrClient:
 
                 if response.status_code == 200:
                     self.api_url = f"{base_url}/api/ocr"
+                    self.health_url = base_url
                     elapsed_time = time.time() - start_time
                     logger.info(f"[OCR] UmiOCR主页可访问: {base_url}, 响应时间: {home_time:.4f} 秒, 总检测时间: {elapsed_time:.4f} 秒")
                     return True
@@ -85,6 +94,22 @@ class UmiOcrClient:
         """
         return self.available and self.api_url is not None
 
+    def ping(self) -> bool:
+        """重新检查UmiOCR API是否可用（OCR引擎管理器定期健康检查时调用）
+
+        Returns:
+            bool: API是否可用
+        """
+        if self.health_url is None:
+            self.available = self._check_availability()
+            return self.available
+        try:
+            self.available = requests.get(self.health_url, timeout=2).status_code == 200
+        except Exception as e:
+            logger.debug(f"[OCR] UmiOCR健康检查失败: {e}")
+            self.available = False
+        return self.available
+
     def recognize(self, image: np.ndarray) -> List[Dict[str, Any]]:
         """识别图像中的文本
 
@@ -92,57 +117,65 @@ class UmiOcrClient:
             image: 要处理的图像
 
         Returns:
-            识别结果列表，每个结果包含文本、位置和置信度
+            识别结果列表，每个结果包含文本、位置和置信度；图像中没有文字时为空列表
+
+        Raises:
+            OCREngineError: API不可用、请求失败或返回错误
         """
         if not self.is_available():
-            logger.error("UmiOCR API不可用")
-            return []
-
-        try:
-            # 将图像编码为base64
-            _, buffer = cv2.imencode('.png', cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
-            img_base64 = base64.b64encode(buffer).decode('utf-8')
-
-            # 准备请求数据
-            data = {
-                "base64": img_base64,
-                "options": {
-                    "cls": True  # 启用文本方向检测
-                }
-            }
+            raise OCREngineError("UmiOCR API不可用")
 
-            # 发送请求
-            logger.debug(f"[OCR] 开始发送请求到UmiOCR API: {self.api_url}")
-            start_time = time.time()
-            response = requests.post(self.api_url, json=data, timeout=30)
-            network_time = time.time() - start_time
-            logger.debug(f"[OCR] UmiOCR API网络请求耗时: {network_time:.4f} 秒")
+        # 将图像编码为base64
+        _, buffer = cv2.imencode('.png', cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        img_base64 = base64.b64encode(buffer).decode('utf-8')
 
-            if response.status_code != 200:
-                logger.error(f"[OCR] UmiOCR API请求失败: {response.status_code}")
-                return []
+        # 准备请求数据
+        data = {
+            "base64": img_base64,
+            "options": {
+                "cls": True  # 启用文本方向检测
+            }
+        }
 
-            # 解析响应
-            parse_start_time = time.time()
+        # 发送请求
+        logger.debug(f"[OCR] 开始发送请求到UmiOCR API: {self.api_url}")
+        start_time = time.time()
+        try:
+            # 与OCR看门狗的时限一致，超时被放弃的调用也会及时结束
+            response = requests.post(self.api_url, json=data, timeout=ocr_timeout())
+        except requests.RequestException as e:
+            logger.error(f"[OCR] UmiOCR API请求出错，耗时: {time.time() - start_time:.4f} 秒, 错误: {e}")
+            raise OCREngineError("UmiOCR API请求出错", cause=e)
+        network_time = time.time() - start_time
+        logger.debug(f"[OCR] UmiOCR API网络请求耗时: {network_time:.4f} 秒")
+
+        if response.status_code != 200:
+            logger.error(f"[OCR] UmiOCR API请求失败: {response.status_code}")
+            raise OCREngineError(f"UmiOCR API请求失败: HTTP {response.status_code}")
+
+        # 解析响应
+        parse_start_time = time.time()
+        try:
             result = response.json()
-            parse_time = time.time() - parse_start_time
-            total_time = time.time() - start_time
-            logger.debug(f"[OCR] UmiOCR API响应解析耗时: {parse_time:.4f} 秒")
-
-            if "code" not in result or result["code"] != 100:
-                logger.error(f"[OCR] UmiOCR API返回错误: {result}")
-                return []
-
-            # 获取识别结果
-            data = result.get("data", [])
-            text_count = len(data)
-            logger.info(f"[OCR] UmiOCR处理完成，识别文本块数: {text_count}, 总耗时: {total_time:.4f} 秒")
-            return data
+        except ValueError as e:
+            raise OCREngineError("UmiOCR API返回的不是JSON", cause=e)
+        parse_time = time.time() - parse_start_time
+        total_time = time.time() - start_time
+        logger.debug(f"[OCR] UmiOCR API响应解析耗时: {parse_time:.4f} 秒")
 
-        except Exception as e:
-            elapsed_time = time.time() - start_time if 'start_time' in locals() else 0
-            logger.error(f"[OCR] UmiOCR API处理出错，耗时: {elapsed_time:.4f} 秒, 错误: {e}")
+        code = result.get("code") if isinstance(result, dict) else None
+        if code == UMIOCR_CODE_NO_TEXT:
+            logger.info(f"[OCR] UmiOCR处理完成，未识别到文本, 总耗时: {total_time:.4f} 秒")
             return []
+        if code != UMIOCR_CODE_OK:
+            logger.error(f"[OCR] UmiOCR API返回错误: {result}")
+            raise OCREngineError("UmiOCR API返回错误", details={"code": code})
+
+        # 获取识别结果
+        data = result.get("data", [])
+        text_count = len(data)
+        logger.info(f"[OCR] UmiOCR处理完成，识别文本块数: {text_count}, 总耗时: {total_time:.4f} 秒")
+        return data
 
     def extract_text(self, image: np.ndarray) -> str:
         """从图像中提取文本
@@ -156,7 +189,11 @@ class UmiOcrClient:
         start_time = time.time()
         logger.debug(f"[OCR] UmiOCR开始提取文本")
 
-        results = self.recognize(image)
+        try:
+            results = self.recognize(image)
+        except OCREngineError as e:
+            logger.error(f"[OCR] UmiOCR提取文本失败: {e}")
+            return ""
         if not results:
             logger.debug(f"[OCR] UmiOCR未识别到文本")
             return ""
@@ -1,6 +1,7 @@
 import sys
 import subprocess
 from memococo.config import logger,screenshots_path,appdata_folder
+from memococo.x11_backend import x11_active_window, x11_idle_seconds, X11Unavailable
 import cv2
 import csv
 import os
@@ -9,6 +10,7 @@ import datetime
 import psutil
 from typing import List, Optional
 import io
+import re
 
 XDOTOOL = "xdotool"
 XPROP = "xprop"
@@ -22,6 +24,8 @@ IOHIDSYSTEM = "IOHIDSystem"
 HID_IDLE_TIME = "HIDIdleTime"
 XPRINTIDLE = "xprintidle"
 RECORD_NAME = "record.mp4"
+# 各显示器的归档映射文件：record.mp4.csv（编号0）和 record_<显示器编号>.mp4.csv
+_ARCHIVE_MAPPING_RE = re.compile(r"^record(_\d+)?\.mp4\.csv$")
 
 def check_port(port, host='localhost', timeout=1):
     """检查指定端口是否被占用
@@ -218,11 +222,16 @@ def get_active_window_title_windows():
 def get_active_app_name_linux():
     """获取Linux系统上当前活动窗口的应用程序名称
 
-    优化版本：增加缓存、错误处理和超时控制
+    优先通过X11后端的持久连接读取，不可用时使用 xdotool 和 xprop 子进程
 
     Returns:
         应用程序名称，如果无法获取则返回None
     """
+    try:
+        window = x11_active_window()
+        return window.app if window else None
+    except X11Unavailable:
+        pass
     try:
         # 使用超时控制运行命令
         def run_command(cmd, timeout=2):
@@ -279,11 +288,16 @@ def get_active_app_name_linux():
 def get_active_window_title_linux():
     """获取Linux系统上当前活动窗口的标题
 
-    优化版本：复用run_command函数，增强错误处理
+    优先通过X11后端的持久连接读取，不可用时使用 xdotool 和 xprop 子进程
 
     Returns:
         窗口标题，如果无法获取则返回None
     """
+    try:
+        window = x11_active_window()
+        return window.title if window else None
+    except X11Unavailable:
+        pass
     try:
         # 定义运行命令的函数，与前面的函数相同
         def run_command(cmd, timeout=2):
@@ -422,6 +436,10 @@ def is_user_active_windows(idle_threshold=5):
 
 
 def is_user_active_linux():
+    idle_time = x11_idle_seconds()
+    if idle_time is not None:
+        logger.debug(f"User idle time: {idle_time} seconds")
+        return idle_time < 5
     try:
         idle_time = int(subprocess.check_output([XPRINTIDLE]).strip()) / 1000  # 转换为秒
         logger.debug(f"User idle time: {idle_time} seconds")
@@ -563,6 +581,37 @@ def get_cpu_temperature():
     return None
 
 
+def archive_record_name(monitor: int = 0) -> str:
+    """显示器的归档视频文件名
+
+    各显示器的分辨率和方向可能不同，而一个视频只有一种画面尺寸，
+    因此每个显示器归档为单独的视频和映射文件，编号0（拼接后的整个屏幕）沿用 record.mp4
+
+    Args:
+        monitor: 显示器编号
+
+    Returns:
+        视频文件名，映射文件名为其后加 .csv
+    """
+    return RECORD_NAME if monitor == 0 else f"record_{monitor}.mp4"
+
+
+def archive_mapping_files(folder: str) -> List[str]:
+    """日期目录中已有的归档映射文件（每个显示器一个）
+
+    Args:
+        folder: 日期目录路径
+
+    Returns:
+        映射文件路径列表，未归档时为空列表
+    """
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return []
+    return sorted(os.path.join(folder, name) for name in names if _ARCHIVE_MAPPING_RE.match(name))
+
+
 def get_unbacked_up_folders():
     # 获取当前日期
     today = datetime.datetime.now().strftime("%Y/%m/%d")
@@ -571,7 +620,7 @@ def get_unbacked_up_folders():
     # 获取 screenshots_path 下的所有文件夹
     all_folders = get_folder_paths(screenshots_path, 0, 30)
     # 筛选出未备份的文件夹
-    unbacked_up_folders = [folder for folder in all_folders if not ImageVideoTool(folder).is_backed_up()]
+    unbacked_up_folders = [folder for folder in all_folders if not archive_mapping_files(folder)]
     # 按照文件夹名排序
     unbacked_up_folders.sort()
     folder_info = []
@@ -618,7 +667,9 @@ class ImageVideoTool:
         return os.path.exists(self.mapping_file)
 
     def get_image_count(self):
-        return len(os.listdir(self.image_folder))
+        # 只统计文件，忽略缩略图等子目录
+        with os.scandir(self.image_folder) as entries:
+            return sum(1 for entry in entries if entry.is_file())
 
     def get_folder_size(self):
         from pathlib import Path
@@ -640,16 +691,19 @@ class ImageVideoTool:
     def images_to_video(self,
                         sort_by: str = "name",
                         image_extensions: List[str] = [".jpg", ".jpeg", ".png",".webp"],
+                        images: Optional[List[str]] = None,
                         ):
         """
         将文件夹内所有图片转为视频（支持多格式、智能排序）
         :param image_folder: 图片文件夹路径
         :param sort_by: 排序方式（"name"/"time"/"custom"）<button class="citation-flag" data-index="8">
         :param image_extensions: 支持的图片格式列表
+        :param images: 要转换的图片文件名列表，默认为文件夹内所有图片（图片尺寸应相同）
         """
         # 1. 收集并过滤图片
+        candidates = os.listdir(self.image_folder) if images is None else images
         images = []
-        for file in os.listdir(self.image_folder):
+        for file in candidates:
             if any(file.lower().endswith(ext) for ext in image_extensions):
                 # 要求文件大小大于0字节
                 if os.path.getsize(os.path.join(self.image_folder, file)) > 0:
@@ -721,9 +775,9 @@ class ImageVideoTool:
                 stderr=subprocess.PIPE,
                 check=True  # 自动检查错误
             )
-            logger.info("STDOUT:", result.stdout.decode())
+            logger.info(f"STDOUT: {result.stdout.decode()}")
         except subprocess.CalledProcessError as e:
-            logger.warning("FFmpeg Error:", e.stderr.decode())
+            logger.warning(f"FFmpeg Error: {e.stderr.decode()}")
             raise
 
         # 7. 删除重命名后的图片
@@ -0,0 +1,199 @@
+"""
+Linux X11后端
+
+通过python-xlib保持一个到X服务器的连接，在一次调用中读取活动窗口（_NET_ACTIVE_WINDOW）的
+WM_CLASS、_NET_WM_NAME和屏幕坐标，以及XScreenSaver扩展提供的用户空闲时间，
+替代每次截图都要启动的 xdotool、xprop 和 xprintidle 子进程（每5秒6～8个）。
+
+同一次截图中先后查询应用名、窗口标题和窗口位置时复用 SNAPSHOT_TTL 秒内的查询结果。
+python-xlib未安装、没有DISPLAY（例如Wayland会话）或连接断开时 get_x11_backend 返回None，
+调用者改用原来的子进程方式；服务器不支持MIT-SCREEN-SAVER扩展时 idle_seconds 返回None。
+"""
+
+import os
+import time
+import threading
+from typing import NamedTuple, Optional
+
+from memococo.config import logger
+
+try:
+    from Xlib import X, display as xdisplay
+    from Xlib.error import XError, ConnectionClosedError
+    _xlib_imported = True
+except ImportError:
+    _xlib_imported = False
+
+try:
+    from Xlib.ext import screensaver
+    _screensaver_imported = True
+except ImportError:
+    _screensaver_imported = False
+
+# 活动窗口查询结果的复用时间（秒），覆盖同一次截图中的多次查询
+SNAPSHOT_TTL = 0.5
+# 连接失败后再次尝试连接的间隔（秒）
+RECONNECT_INTERVAL = 60
+
+
+class X11Unavailable(Exception):
+    """X11后端不可用或与X服务器的连接已断开"""
+
+
+class ActiveWindow(NamedTuple):
+    """活动窗口信息，坐标为窗口内容区域在根窗口中的位置"""
+    window_id: int
+    app: Optional[str]
+    title: Optional[str]
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class X11Backend:
+    """到X服务器的持久连接（多个线程共用，内部加锁）"""
+
+    def __init__(self, display_name: Optional[str] = None):
+        """
+        Args:
+            display_name: X显示名，默认使用环境变量DISPLAY
+
+        Raises:
+            Xlib.error.DisplayError: 无法连接X服务器
+        """
+        self.display = xdisplay.Display(display_name)
+        self.root = self.display.screen().root
+        self._lock = threading.Lock()
+        self._atoms = {
+            name: self.display.intern_atom(name)
+            for name in ("_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "UTF8_STRING", "WM_CLASS")
+        }
+        self.has_screensaver = _screensaver_imported and self.display.has_extension("MIT-SCREEN-SAVER")
+        self._snapshot: Optional[ActiveWindow] = None
+        self._snapshot_time = 0.0
+
+    def close(self):
+        with self._lock:
+            self.display.close()
+
+    def active_window(self, max_age: float = SNAPSHOT_TTL) -> Optional[ActiveWindow]:
+        """读取活动窗口的应用名、标题和位置
+
+        Args:
+            max_age: 可以复用的上一次查询结果的最长时间（秒），0表示总是重新查询
+
+        Returns:
+            活动窗口信息，没有活动窗口时返回None
+        """
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_time <= max_age:
+                return self._snapshot
+            snapshot = self._query_active_window()
+            self._snapshot, self._snapshot_time = snapshot, time.monotonic()
+            return snapshot
+
+    def _query_active_window(self) -> Optional[ActiveWindow]:
+        prop = self.root.get_full_property(self._atoms["_NET_ACTIVE_WINDOW"], X.AnyPropertyType)
+        if prop is None or not len(prop.value) or not prop.value[0]:
+            return None
+        window_id = int(prop.value[0])
+        window = self.display.create_resource_object("window", window_id)
+        try:
+            title = self._window_title(window)
+            wm_class = window.get_wm_class()
+            geometry = window.get_geometry()
+            origin = window.translate_coords(self.root, 0, 0)
+        except XError as e:
+            # 活动窗口在查询过程中关闭
+            logger.debug(f"读取活动窗口 {window_id:#x} 失败: {e}")
+            return None
+        # 与 xprop WM_CLASS 的第一个值（实例名）一致，没有WM_CLASS时使用窗口标题
+        app = wm_class[0] if wm_class and wm_class[0] else title
+        # translate_coords 把根窗口坐标转换到窗口坐标，窗口原点在根窗口中的位置为其相反数
+        return ActiveWindow(window_id, app, title, -origin.x, -origin.y, geometry.width, geometry.height)
+
+    def _window_title(self, window) -> Optional[str]:
+        prop = window.get_full_property(self._atoms["_NET_WM_NAME"], self._atoms["UTF8_STRING"])
+        if prop is not None and prop.value:
+            value = prop.value
+            return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value)
+        # 不支持EWMH的旧程序只设置WM_NAME
+        name = window.get_wm_name()
+        if isinstance(name, bytes):
+            name = name.decode("utf-8", errors="replace")
+        return name or None
+
+    def idle_seconds(self) -> Optional[float]:
+        """用户空闲时间（秒），X服务器不支持MIT-SCREEN-SAVER扩展时返回None"""
+        if not self.has_screensaver:
+            return None
+        with self._lock:
+            return self.root.screensaver_query_info().idle / 1000
+
+
+_backend: Optional[X11Backend] = None
+_backend_lock = threading.Lock()
+_last_attempt: Optional[float] = None
+
+
+def get_x11_backend() -> Optional[X11Backend]:
+    """获取到X服务器的持久连接，不可用时返回None（之后每隔 RECONNECT_INTERVAL 秒重试一次）"""
+    global _backend, _last_attempt
+    if _backend is not None or not _xlib_imported or not os.environ.get("DISPLAY"):
+        return _backend
+    with _backend_lock:
+        if _backend is None and (_last_attempt is None or time.monotonic() - _last_attempt >= RECONNECT_INTERVAL):
+            _last_attempt = time.monotonic()
+            try:
+                _backend = X11Backend()
+                logger.info(f"已连接X服务器 {os.environ.get('DISPLAY')}，"
+                            f"XScreenSaver扩展{'可用' if _backend.has_screensaver else '不可用'}")
+            except Exception as e:
+                logger.warning(f"无法连接X服务器，改用xdotool/xprop子进程: {e}")
+    return _backend
+
+
+def reset_x11_backend():
+    """丢弃当前连接（连接断开时调用），下次使用时重新连接"""
+    global _backend, _last_attempt
+    with _backend_lock:
+        backend, _backend, _last_attempt = _backend, None, None
+    if backend is not None:
+        try:
+            backend.close()
+        except Exception:
+            pass
+
+
+def x11_active_window() -> Optional[ActiveWindow]:
+    """读取活动窗口信息
+
+    Returns:
+        活动窗口信息；没有活动窗口时返回None
+
+    Raises:
+        X11Unavailable: X11后端不可用或连接断开，调用者应改用子进程方式
+    """
+    backend = get_x11_backend()
+    if backend is None:
+        raise X11Unavailable("X11后端不可用")
+    try:
+        return backend.active_window()
+    except (ConnectionClosedError, OSError) as e:
+        logger.warning(f"与X服务器的连接已断开: {e}")
+        reset_x11_backend()
+        raise X11Unavailable(str(e))
+
+
+def x11_idle_seconds() -> Optional[float]:
+    """用户空闲时间（秒），X11后端或XScreenSaver扩展不可用时返回None"""
+    backend = get_x11_backend()
+    if backend is None:
+        return None
+    try:
+        return backend.idle_seconds()
+    except (ConnectionClosedError, OSError) as e:
+        logger.warning(f"与X服务器的连接已断开: {e}")
+        reset_x11_backend()
+        return None
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+截图抓取基准测试脚本
+
+比较原来的截图方式（每次创建 mss.mss()，np.array 复制后用 [:, :, [2, 1, 0]] 转换为RGB）
+和持久截图器（复用mss句柄，转换到预分配缓冲区）每帧的耗时和新分配的内存。
+内存用 tracemalloc 统计（numpy的数组分配会计入），为每帧截图期间的内存峰值增量。
+
+用法：
+    python scripts/benchmark_frame_grabber.py                     # 截取实际屏幕
+    python scripts/benchmark_frame_grabber.py --frames 200
+    python scripts/benchmark_frame_grabber.py --synthetic 3840x2160 # 没有显示器时使用模拟的4K画面
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mss
+
+from memococo.config import build_arg_parser
+from memococo.frame_grabber import FrameGrabber, RING_SIZE
+
+
+class SyntheticMss:
+    """返回固定BGRA画面的mss替身，只测量转换和内存分配"""
+
+    def __init__(self, width: int, height: int):
+        self.monitors = [{"left": 0, "top": 0, "width": width, "height": height}] * 2
+        raw = np.random.default_rng(0).integers(0, 255, (height, width, 4), dtype=np.uint8)
+        self._shot = mss.screenshot.ScreenShot(bytearray(raw.tobytes()), self.monitors[1])
+
+    def grab(self, monitor):
+        return self._shot
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def legacy_grab(sct_factory, primary_only):
+    """原来的截图方式"""
+    frames = []
+    with sct_factory() as sct:
+        for index, monitor in enumerate(sct.monitors):
+            if primary_only and index != 1:
+                continue
+            frame = np.array(sct.grab(monitor))
+            frames.append(frame[:, :, [2, 1, 0]])
+    return frames
+
+
+def measure(grab, frames: int):
+    """返回 (每帧毫秒数, 每帧新分配的内存峰值MB)"""
+    # 预热，持久截图器在这里分配全部缓冲区
+    for _ in range(RING_SIZE):
+        grab()
+    elapsed, peaks = 0.0, 0
+    tracemalloc.start()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        grab()
+        elapsed += time.perf_counter() - start_time
+        peaks += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return elapsed / frames * 1000, peaks / frames / 1024 / 1024
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = build_arg_parser(prog="benchmark_frame_grabber", description="比较截图方式的耗时和内存分配")
+    parser.add_argument("--frames", type=int, default=50, help="每种方式截图的次数")
+    parser.add_argument("--synthetic", default=None, help="使用指定分辨率的模拟画面，例如 3840x2160")
+    parser.add_argument("--all-monitors", action="store_true", help="截取全部显示器（默认只截取主显示器）")
+    options = parser.parse_args(argv)
+
+    if options.synthetic:
+        width, height = (int(value) for value in options.synthetic.lower().split("x"))
+        sct_factory = lambda: SyntheticMss(width, height)  # noqa: E731
+    else:
+        sct_factory = mss.mss
+    primary_only = not options.all_monitors
+
+    grabber = FrameGrabber(sct_factory=sct_factory)
+    methods = {
+        "legacy": lambda: legacy_grab(sct_factory, primary_only),
+        "grabber": lambda: grabber.grab_all(primary_only),
+    }
+    print(f"{'method':<10}{'ms/frame':>10}{'MB/frame':>10}")
+    for name, grab in methods.items():
+        milliseconds, megabytes = measure(grab, options.frames)
+        print(f"{name:<10}{milliseconds:>10.2f}{megabytes:>10.2f}")
+    grabber.reset()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
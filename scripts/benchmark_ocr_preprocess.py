@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+OCR预处理基准测试脚本
+
+比较整图缩放（resize）和按内容裁剪（content）两种预处理方式的OCR耗时和召回率。
+召回率以原始分辨率逐块OCR整张截图得到的文本为参照，按字符计算：
+    召回率 = 两者共有的字符数 / 参照文本的字符数
+
+用法：
+    python scripts/benchmark_ocr_preprocess.py                   # 最近保存的20张截图
+    python scripts/benchmark_ocr_preprocess.py --frames 50
+    python scripts/benchmark_ocr_preprocess.py --dir ~/frames     # 目录中的图片
+    python scripts/benchmark_ocr_preprocess.py --synthetic 5      # 生成带小字的4K截图
+"""
+
+import os
+import sys
+import time
+import random
+from collections import Counter
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo.config import build_arg_parser
+from memococo.ocr_factory import (
+    create_rapidocr_engine, perform_ocr, extract_text_from_ocr_result,
+    preprocess_image_for_ocr, OCR_ENGINE_RAPIDOCR
+)
+from memococo.ocr_preprocess import prepare_content_tiles, _split_region
+
+IMAGE_EXTENSIONS = (".webp", ".png", ".jpg", ".jpeg")
+
+
+def synthetic_frame(seed: int, size=(2160, 3840)) -> np.ndarray:
+    """生成一张4K模拟截图：壁纸、照片区域、小字编辑器（偶数编号）和终端窗口"""
+    rng = random.Random(seed)
+    height, width = size
+    gradient = np.linspace(60, 160, width, dtype=np.uint8)
+    image = np.dstack([np.tile(gradient, (height, 1))] * 3)
+    # 照片区域
+    photo = np.random.default_rng(seed).integers(0, 255, (600, 900, 3), dtype=np.uint8)
+    image[200:800, 2700:3600] = cv2.GaussianBlur(photo, (9, 9), 0)
+    words = ["memory", "timeline", "screenshot", "search", "recall", "window", "python", "index", "frame"]
+    # 编辑器窗口（浅色，小字），奇数编号的截图只有终端窗口和大片空白
+    if seed % 2 == 0:
+        image[100:1500, 100:2000] = 250
+        for line in range(60):
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 9)))
+            cv2.putText(image, text, (130, 140 + line * 22), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (30, 30, 30), 1,
+                        cv2.LINE_AA)
+    # 终端窗口（深色）
+    image[1600:2100, 2300:3700] = 25
+    for line in range(20):
+        text = "$ " + " ".join(rng.choice(words) for _ in range(rng.randint(2, 6)))
+        cv2.putText(image, text, (2330, 1640 + line * 22), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (220, 220, 220), 1, cv2.LINE_AA)
+    return image
+
+
+def load_saved_frames(count: int):
+    """读取最近保存的截图"""
+    from memococo.database import get_timestamps
+    from memococo.frame_store import load_frame_image
+
+    for timestamp in get_timestamps():
+        if count <= 0:
+            return
+        image = load_frame_image(timestamp)
+        if image is None:
+            continue
+        count -= 1
+        yield str(timestamp), np.array(image.convert("RGB"))
+
+
+def load_directory(path: str):
+    """读取目录中的图片"""
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with Image.open(os.path.join(path, name)) as image:
+                yield name, np.array(image.convert("RGB"))
+
+
+def recognize(engine, images) -> str:
+    return "\n".join(extract_text_from_ocr_result(perform_ocr(engine, OCR_ENGINE_RAPIDOCR, image), OCR_ENGINE_RAPIDOCR)
+                     for image in images)
+
+
+def native_tiles(image):
+    """按原始分辨率把整张截图切成图块（参照）"""
+    height, width = image.shape[:2]
+    return [image[y:y + h, x:x + w] for x, y, w, h in _split_region((0, 0, width, height))]
+
+
+def content_images(image):
+    tiles = prepare_content_tiles(image)
+    return tiles if tiles is not None else [preprocess_image_for_ocr(image)]
+
+
+def char_recall(text: str, reference: str) -> float:
+    reference_chars = Counter(reference.replace(" ", "").replace("\n", ""))
+    if not reference_chars:
+        return 1.0
+    chars = Counter(text.replace(" ", "").replace("\n", ""))
+    return sum((chars & reference_chars).values()) / sum(reference_chars.values())
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = build_arg_parser(prog="benchmark_ocr_preprocess", description="比较OCR预处理方式的耗时和召回率")
+    parser.add_argument("--frames", type=int, default=20, help="使用最近保存的截图数量")
+    parser.add_argument("--dir", default=None, help="使用指定目录中的图片")
+    parser.add_argument("--synthetic", type=int, default=0, help="生成指定数量的4K模拟截图")
+    options = parser.parse_args(argv)
+
+    if options.synthetic:
+        frames = ((f"synthetic-{i}", synthetic_frame(i)) for i in range(options.synthetic))
+    elif options.dir:
+        frames = load_directory(os.path.expanduser(options.dir))
+    else:
+        frames = load_saved_frames(options.frames)
+
+    engine = create_rapidocr_engine()
+    if engine is None:
+        print("RapidOCR不可用")
+        return 1
+
+    strategies = {"resize": lambda image: [preprocess_image_for_ocr(image)], "content": content_images}
+    totals = {name: [0.0, 0.0] for name in strategies}
+    count = 0
+    print(f"{'frame':<24}{'strategy':<10}{'images':>7}{'seconds':>9}{'recall':>8}")
+    for name, image in frames:
+        reference = recognize(engine, native_tiles(image))
+        for strategy, prepare in strategies.items():
+            start_time = time.time()
+            images = prepare(image)
+            text = recognize(engine, images)
+            elapsed = time.time() - start_time
+            recall = char_recall(text, reference)
+            totals[strategy][0] += elapsed
+            totals[strategy][1] += recall
+            print(f"{name:<24}{strategy:<10}{len(images):>7}{elapsed:>9.2f}{recall:>8.1%}")
+        count += 1
+
+    if count:
+        print()
+        for strategy, (seconds, recall) in totals.items():
+            print(f"{strategy:<10} 平均耗时 {seconds / count:.2f} 秒, 平均召回率 {recall / count:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+OCR配置档基准测试脚本
+
+在自己保存的截图上按应用比较各OCR配置档的耗时和召回率，用于决定某个应用使用哪个配置档。
+召回率以默认参数在原始分辨率下逐块OCR整张截图得到的文本为参照，按字符计算（见benchmark_ocr_preprocess.py）。
+
+用法：
+    python scripts/benchmark_ocr_profiles.py                              # 截图最多的5个应用，每个10张
+    python scripts/benchmark_ocr_profiles.py --app gnome-terminal-server --frames 20
+    python scripts/benchmark_ocr_profiles.py --profiles default terminal fast
+    python scripts/benchmark_ocr_profiles.py --dir ~/frames               # 目录中的图片，不区分应用
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from memococo.config import build_arg_parser
+from memococo.ocr_factory import create_rapidocr_engine, recognize_image_text, profile_engine_params, OCR_ENGINE_RAPIDOCR
+from memococo.ocr_profiles import list_ocr_profiles, get_ocr_profile, DEFAULT_ENGINE_PARAMS
+from benchmark_ocr_preprocess import native_tiles, char_recall, recognize, load_directory
+
+
+def load_app_frames(apps, count):
+    """按应用读取最近保存的截图
+
+    Returns:
+        {应用: [(名称, 截图), ...]}
+    """
+    from memococo.common.db_manager import DatabaseManager
+    from memococo.frame_store import load_frame_image
+
+    if not apps:
+        rows = DatabaseManager.execute(
+            "SELECT app, COUNT(*) AS frames FROM entries WHERE app IS NOT NULL AND app != '' "
+            "GROUP BY app ORDER BY frames DESC LIMIT 5"
+        )
+        apps = [row["app"] for row in rows]
+
+    frames = {}
+    for app in apps:
+        rows = DatabaseManager.execute(
+            "SELECT timestamp FROM entries WHERE app = ? ORDER BY timestamp DESC LIMIT ?", (app, count * 2)
+        )
+        loaded = []
+        for row in rows:
+            if len(loaded) >= count:
+                break
+            image = load_frame_image(row["timestamp"])
+            if image is not None:
+                loaded.append((str(row["timestamp"]), np.array(image.convert("RGB"))))
+        if loaded:
+            frames[app] = loaded
+    return frames
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = build_arg_parser(prog="benchmark_ocr_profiles", description="按应用比较OCR配置档的耗时和召回率")
+    parser.add_argument("--app", action="append", default=[], help="只测试指定应用，可重复指定")
+    parser.add_argument("--frames", type=int, default=10, help="每个应用使用的截图数量")
+    parser.add_argument("--profiles", nargs="*", default=None, help="要比较的配置档，默认所有需要OCR的配置档")
+    parser.add_argument("--dir", default=None, help="使用指定目录中的图片")
+    options = parser.parse_args(argv)
+
+    profiles = [profile for profile in list_ocr_profiles()
+                if not profile.skip and (options.profiles is None or profile.name in options.profiles)]
+    if not profiles:
+        print("没有可比较的配置档")
+        return 1
+
+    if options.dir:
+        frames = {"(dir)": list(load_directory(os.path.expanduser(options.dir)))}
+    else:
+        frames = load_app_frames(options.app, options.frames)
+    if not frames:
+        print("没有找到截图")
+        return 1
+
+    reference_engine = create_rapidocr_engine(dict(DEFAULT_ENGINE_PARAMS))
+    engines = {profile.name: create_rapidocr_engine(profile_engine_params(profile)) for profile in profiles}
+    if reference_engine is None or None in engines.values():
+        print("RapidOCR不可用")
+        return 1
+
+    print(f"{'app':<28}{'profile':<12}{'frames':>7}{'sec/frame':>11}{'recall':>8}")
+    for app, app_frames in frames.items():
+        references = [recognize(reference_engine, native_tiles(image)) for _, image in app_frames]
+        current = get_ocr_profile(app).name
+        for profile in profiles:
+            elapsed = recall = 0.0
+            for (_, image), reference in zip(app_frames, references):
+                start_time = time.time()
+                text = recognize_image_text(engines[profile.name], OCR_ENGINE_RAPIDOCR, image, profile)
+                elapsed += time.time() - start_time
+                recall += char_recall(text, reference)
+            marker = " *" if profile.name == current else ""
+            print(f"{app[:27]:<28}{profile.name + marker:<12}{len(app_frames):>7}"
+                  f"{elapsed / len(app_frames):>11.2f}{recall / len(app_frames):>8.1%}")
+    print("\n* 当前使用的配置档")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,13 +22,14 @@ install_requires = [
     "psutil>=5.8.0",
     "babel>=2.14.0",  # 添加国际化支持
     "markupsafe>=2.1.5",  # 添加模板安全支持
+    "sortedcontainers>=2.4.0",  # OCR调度器的有序集合
 ]
 
 # 操作系统特定依赖
 OS_DEPENDENCIES = {
     "windows": ["pywin32", "psutil"],
     "darwin": ["pyobjc>=10.3"],
-    "linux": []
+    "linux": ["python-xlib>=0.33"]
 }
 
 # 获取当前操作系统并添加对应依赖
@@ -50,6 +51,8 @@ setup(
     entry_points={
         "console_scripts":[
             'memococo=memococo.app:main',
+            'memococo-pack=memococo.pack_tool:main',
+            'memococo-ocr-backfill=memococo.ocr_backfill:main',
         ],
     },
     # data_files=[
@@ -0,0 +1,128 @@
+"""
+测试截图触发器
+
+使用模拟时钟验证窗口切换立即触发、输入停顿后触发、空闲时只定时处理OCR积压，
+截图间隔按变化率和OCR积压调整，以及错过的窗口变化统计
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import capture_trigger
+from memococo.capture_trigger import (
+    CaptureTrigger, TRIGGER_FOCUS, TRIGGER_INPUT, TRIGGER_INTERVAL, TRIGGER_IDLE_FLOOR, TRIGGER_IDLE_TICK
+)
+
+
+class _Desktop:
+    """模拟时钟、活动窗口和最后一次输入时间"""
+
+    def __init__(self, window=(1, "a")):
+        self.now = 0.0
+        self.window = window
+        self.last_input = 0.0
+        self.has_x11 = True
+        # 按时间安排的窗口切换 {时间: 窗口}
+        self.switches = {}
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now = round(self.now + seconds, 3)
+        for at in sorted(self.switches):
+            if at <= self.now:
+                self.window = self.switches.pop(at)
+
+    def window_fn(self):
+        return self.window if self.has_x11 else None
+
+    def idle_fn(self):
+        return self.now - self.last_input if self.has_x11 else None
+
+
+class TestCaptureTrigger(unittest.TestCase):
+    """测试截图触发器"""
+
+    def setUp(self):
+        self.patcher = patch.object(capture_trigger, "get_settings",
+                                    return_value={"capture_min_interval": 1, "capture_idle_floor": 60})
+        self.patcher.start()
+        self.desktop = _Desktop()
+        self.backlog = 0
+        self.trigger = CaptureTrigger(5, window_fn=self.desktop.window_fn, idle_fn=self.desktop.idle_fn,
+                                      backlog_fn=lambda: self.backlog, clock=self.desktop.clock,
+                                      sleep=self.desktop.sleep)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_focus_change(self):
+        """测试切换窗口后立即截图，停留不到最小间隔的窗口计为错过"""
+        self.desktop.now = 0.5
+        self.assertEqual(self.trigger.wait(), TRIGGER_FOCUS)
+        self.assertEqual(self.desktop.now, 1.0)
+
+        self.desktop.last_input = 1.0
+        self.desktop.switches = {1.5: (2, "b")}
+        self.assertEqual(self.trigger.wait(), TRIGGER_FOCUS)
+        self.assertEqual(self.desktop.now, 2.0)
+
+        # 窗口c只停留了0.25秒，截图时已经切到窗口d
+        self.desktop.switches = {2.25: (3, "c"), 2.5: (4, "d")}
+        self.assertEqual(self.trigger.wait(), TRIGGER_FOCUS)
+        self.assertEqual(self.desktop.now, 3.0)
+        self.assertEqual(self.trigger.stats()["missed_changes"], 1)
+
+    def test_input_debounce_and_idle(self):
+        """测试有输入时等输入停顿后截图，空闲时只定时唤醒处理OCR积压，超过空闲间隔后截图"""
+        self.trigger.wait()
+        # 持续输入到第6秒，停顿1秒后截图
+        self.desktop.last_input = 6.0
+        self.assertEqual(self.trigger.wait(), TRIGGER_INPUT)
+        self.assertEqual(self.desktop.now, 7.0)
+
+        reasons = []
+        while not reasons or reasons[-1] == TRIGGER_IDLE_TICK:
+            reasons.append(self.trigger.wait())
+        self.assertEqual(reasons[-1], TRIGGER_IDLE_FLOOR)
+        self.assertEqual(self.desktop.now, 67.0)
+        self.assertGreaterEqual(reasons.count(TRIGGER_IDLE_TICK), 10)
+
+        stats = self.trigger.stats()
+        self.assertEqual(stats["captures_per_hour"], 3)
+        self.assertEqual(stats["triggers"][TRIGGER_INPUT], 1)
+
+    def test_interval_without_x11(self):
+        """测试没有窗口和输入事件时按间隔定时截图"""
+        self.desktop.has_x11 = False
+        self.assertEqual(self.trigger.wait(), TRIGGER_INTERVAL)
+        self.assertEqual(self.desktop.now, 5.0)
+        self.assertFalse(self.trigger.stats()["window_events"])
+
+    def test_adaptive_interval(self):
+        """测试截图大多相似时加长间隔，大多变化时缩短，OCR积压较多时不低于基础间隔"""
+        for _ in range(20):
+            self.trigger.record_result(False)
+        self.assertEqual(self.trigger.interval, 20)
+
+        for _ in range(30):
+            self.trigger.record_result(True)
+        self.assertEqual(self.trigger.interval, 2.5)
+
+        self.backlog = 500
+        self.desktop.has_x11 = False
+        self.trigger.wait()
+        self.assertEqual(self.trigger.interval, 5)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
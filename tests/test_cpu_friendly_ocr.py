@@ -15,66 +15,66 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from memococo.ocr_processor import process_batch_ocr, process_ocr_task
+from memococo.resource_governor import ResourceGovernor
+
+
+def _governor(cpu_percent, temperature):
+    """构造一个已记录指定负载的资源调度器"""
+    governor = ResourceGovernor(alpha=1.0)
+    # 避免测试中触发真实采样
+    governor._updated_at = float("inf")
+    governor.record([cpu_percent], temperature, 40)
+    return governor
 
 class TestCpuFriendlyOcr(unittest.TestCase):
     """测试CPU友好型OCR处理"""
     
-    @patch('psutil.cpu_percent')
-    @patch('memococo.utils.get_cpu_temperature')
-    def test_skip_on_high_cpu(self, mock_get_temp, mock_cpu_percent):
+    @patch('memococo.resource_governor.get_settings', return_value={"ocr_cpu_threshold": 50, "ocr_temp_threshold": 70})
+    def test_skip_on_high_cpu(self, mock_settings):
         """测试CPU占用率高时跳过OCR处理"""
         # 模拟高CPU占用率
-        mock_cpu_percent.return_value = 60  # 设置为60%，超过新的50%阈值
-        mock_get_temp.return_value = 60
-        
-        # 创建一个模拟的数据库条目
         mock_entry = MagicMock()
         mock_entry.id = 1
         mock_entry.timestamp = int(time.time())
         
-        # 调用处理函数
-        result = process_ocr_task(mock_entry)
+        with patch('memococo.ocr_processor.get_resource_governor', return_value=_governor(60, 60)):
+            # 调用处理函数
+            result = process_ocr_task(mock_entry)
         
         # 验证结果
         self.assertEqual(result, "SKIPPED", "当CPU占用率高时应该跳过处理并返回SKIPPED")
         print("CPU占用率高时成功跳过OCR处理")
     
-    @patch('psutil.cpu_percent')
-    @patch('memococo.utils.get_cpu_temperature')
-    @patch('memococo.ocr_processor.get_batch_empty_text')
-    def test_batch_skip_on_high_cpu(self, mock_get_entries, mock_get_temp, mock_cpu_percent):
+    @patch('memococo.resource_governor.get_settings', return_value={"ocr_cpu_threshold": 50, "ocr_temp_threshold": 70})
+    @patch('memococo.ocr_processor.find_optimal_entries_for_ocr')
+    def test_batch_skip_on_high_cpu(self, mock_get_entries, mock_settings):
         """测试批处理时CPU占用率高时跳过OCR处理"""
-        # 模拟高CPU占用率
-        mock_cpu_percent.return_value = 60  # 设置为60%，超过新的50%阈值
-        mock_get_temp.return_value = 60
-        
-        # 调用批处理函数
-        result = process_batch_ocr(batch_size=3)
+        # 模拟高CPU占用率（超过配置的50%阈值）
+        with patch('memococo.ocr_processor.get_resource_governor', return_value=_governor(60, 60)):
+            # 调用批处理函数
+            result = process_batch_ocr(batch_size=3)
         
         # 验证结果
         self.assertEqual(result, 0, "当CPU占用率高时应该跳过处理并返回0")
-        # 验证get_batch_empty_text没有被调用，说明在CPU检查阶段就跳过了
+        # 验证没有选择条目，说明在负载检查阶段就跳过了
         mock_get_entries.assert_not_called()
         print("批处理时CPU占用率高时成功跳过OCR处理")
     
-    @patch('psutil.cpu_percent')
-    @patch('memococo.utils.get_cpu_temperature')
-    @patch('memococo.ocr_processor.get_batch_empty_text')
-    def test_batch_proceed_on_normal_load(self, mock_get_entries, mock_get_temp, mock_cpu_percent):
+    @patch('memococo.resource_governor.get_settings', return_value={"ocr_cpu_threshold": 50, "ocr_temp_threshold": 70})
+    @patch('memococo.ocr_processor.find_optimal_entries_for_ocr')
+    def test_batch_proceed_on_normal_load(self, mock_get_entries, mock_settings):
         """测试批处理时正常负载下继续OCR处理"""
-        # 模拟正常CPU负载
-        mock_cpu_percent.return_value = 30  # 设置为30%，低于50%阈值
-        mock_get_temp.return_value = 50
-        
         # 模拟空数据库（没有条目需要处理）
         mock_get_entries.return_value = []
         
-        # 调用批处理函数
-        result = process_batch_ocr(batch_size=3)
+        # 模拟正常CPU负载
+        with patch('memococo.ocr_processor.get_resource_governor', return_value=_governor(30, 50)):
+            # 调用批处理函数
+            result = process_batch_ocr(batch_size=3)
         
         # 验证结果
         self.assertEqual(result, 0, "当没有条目需要处理时应该返回0")
-        # 验证get_batch_empty_text被调用，说明CPU检查通过
+        # 验证选择了条目，说明负载检查通过
         mock_get_entries.assert_called_once()
         print("正常负载时成功继续OCR处理流程")
 
@@ -0,0 +1,91 @@
+"""
+测试截图去重
+
+验证切换回没有变化的窗口时找到之前保存的截图，窗口内的小改动、窗口外的大片变化不视为相同，
+只闪烁的光标和面板时钟不影响判断，以及按窗口记录的截图数量上限
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo.frame_dedup import RecentFrameCache, near_identical
+from memococo.monitor_tracker import frame_signature
+
+
+def _screen(seed, size=(480, 640)):
+    """随机色块组成的画面"""
+    blocks = np.random.default_rng(seed).integers(0, 255, (size[0] // 16, size[1] // 16, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((16, 16, 1), dtype=np.uint8))
+
+
+class TestFrameDedup(unittest.TestCase):
+    """测试最近截图缓存"""
+
+    def setUp(self):
+        self.cache = RecentFrameCache(frames_per_window=2, max_windows=2)
+        self.screen = _screen(1)
+
+    def _signatures(self, screen):
+        # 活动窗口为画面左上方 320×240 的区域
+        return frame_signature(screen[:240, :320]), frame_signature(screen)
+
+    def test_revisit(self):
+        """测试切换回没有变化的窗口时返回之前保存的截图"""
+        key = (1, "editor", "main.py")
+        self.assertIsNone(self.cache.find(key, *self._signatures(self.screen)))
+        self.cache.add(key, *self._signatures(self.screen), 100)
+        self.cache.add(key, *self._signatures(_screen(2)), 110)
+        self.assertEqual(self.cache.find(key, *self._signatures(self.screen.copy())), 100)
+        self.assertIsNone(self.cache.find((1, "editor", "other.py"), *self._signatures(self.screen)))
+        self.assertEqual(self.cache.stats()["references"], 1)
+
+        # 每个窗口只记住最近的截图
+        self.cache.add(key, *self._signatures(_screen(3)), 120)
+        self.assertIsNone(self.cache.find(key, *self._signatures(self.screen)))
+
+    def test_max_windows(self):
+        """测试只记住最近使用的窗口"""
+        for index, title in enumerate(["a", "b", "c"]):
+            self.cache.add((1, "app", title), *self._signatures(self.screen), index)
+        self.assertIsNone(self.cache.find((1, "app", "a"), *self._signatures(self.screen)))
+        self.assertEqual(self.cache.find((1, "app", "c"), *self._signatures(self.screen)), 2)
+
+    def test_near_identical(self):
+        """测试窗口内改动一个单词时不同，光标闪烁和窗口外的时钟变化视为相同，窗口外大片变化时不同"""
+        base = self._signatures(self.screen)
+
+        word = self.screen.copy()
+        word[100:112, 100:140] = 255 - word[100:112, 100:140]
+        window, monitor = self._signatures(word)
+        self.assertFalse(near_identical(window, base[0], monitor, base[1]))
+
+        cursor = self.screen.copy()
+        cursor[100:118, 100:102] = 255 - cursor[100:118, 100:102]
+        window, monitor = self._signatures(cursor)
+        self.assertTrue(near_identical(window, base[0], monitor, base[1]))
+
+        clock = self.screen.copy()
+        clock[460:476, 560:620] = 255 - clock[460:476, 560:620]
+        window, monitor = self._signatures(clock)
+        self.assertTrue(near_identical(window, base[0], monitor, base[1]))
+
+        outside = self.screen.copy()
+        outside[240:, 320:] = _screen(4)[240:, 320:]
+        window, monitor = self._signatures(outside)
+        self.assertFalse(near_identical(window, base[0], monitor, base[1]))
+
+        # 窗口大小变化
+        self.assertFalse(near_identical(frame_signature(self.screen[:200, :320]), base[0], base[1], base[1]))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+测试截图抓取
+
+验证mss句柄在多次截图间复用、画面转换为RGB后写入轮流使用的预分配缓冲区、
+分辨率变化时重新分配，以及截图出错后重新创建句柄
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo.frame_grabber import FrameGrabber
+
+
+class _FakeMss:
+    """返回BGRA画面的mss句柄，蓝、绿、红通道分别为1、2、3"""
+
+    created = 0
+
+    def __init__(self, width=8, height=6):
+        _FakeMss.created += 1
+        self.monitors = [{"left": 0, "top": 0, "width": width, "height": height}] * 2
+        self.fail = False
+        self.close = MagicMock()
+
+    def grab(self, monitor):
+        if self.fail:
+            raise OSError("XGetImage failed")
+        bgra = np.empty((monitor["height"], monitor["width"], 4), dtype=np.uint8)
+        bgra[...] = (1, 2, 3, 255)
+        return MagicMock(raw=bytearray(bgra.tobytes()), width=monitor["width"], height=monitor["height"])
+
+
+class TestFrameGrabber(unittest.TestCase):
+    """测试截图器"""
+
+    def setUp(self):
+        _FakeMss.created = 0
+        self.sct = _FakeMss()
+        self.grabber = FrameGrabber(ring_size=3, sct_factory=lambda: self.sct)
+
+    def test_reuses_handle_and_buffers(self):
+        """测试复用mss句柄和缓冲区，画面为RGB顺序"""
+        frames = [self.grabber.grab(1) for _ in range(7)]
+        self.assertEqual(frames[0].shape, (6, 8, 3))
+        self.assertEqual(frames[0][0, 0].tolist(), [3, 2, 1])
+        self.assertIs(frames[3], frames[0])
+        self.assertIs(frames[6], frames[0])
+        self.assertIsNot(frames[1], frames[0])
+        self.assertEqual(self.grabber.allocations, 3)
+        self.assertEqual(_FakeMss.created, 1)
+
+        monitor_ids, frames, monitors = self.grabber.grab_all(primary_only=True)
+        self.assertEqual(monitor_ids, [1])
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(self.grabber.allocations, 3)
+
+    def test_resolution_change(self):
+        """测试分辨率变化时重新分配缓冲区"""
+        self.grabber.grab(1)
+        self.sct.monitors = [{"left": 0, "top": 0, "width": 4, "height": 2}] * 2
+        frame = self.grabber.grab(1)
+        self.assertEqual(frame.shape, (2, 4, 3))
+        self.assertEqual(self.grabber.allocations, 2)
+
+    def test_reset_after_error(self):
+        """测试截图出错时关闭句柄，下次截图重新创建"""
+        self.grabber.grab(1)
+        self.sct.fail = True
+        with self.assertRaises(OSError):
+            self.grabber.grab(1)
+        self.sct.close.assert_called_once()
+        self.sct = _FakeMss()
+        self.grabber.grab(1)
+        self.assertEqual(_FakeMss.created, 2)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+测试截图存储
+
+验证单文件和打包两种存储后端的读写、索引增量加载、转换、归档前的导出、按显示器分别归档，以及对已有截图的引用
+"""
+
+import io
+import os
+import sys
+import shutil
+import datetime
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import cv2
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import frame_store
+from memococo import utils
+
+
+def _encode(color, size=(64, 48)):
+    """生成一张WebP截图数据"""
+    return frame_store.encode_frame(Image.new("RGB", size, color))
+
+
+def _fake_ffmpeg(command, **kwargs):
+    """代替ffmpeg把 %03d.webp 图片序列编码为视频：与ffmpeg相同，整个视频使用第一帧的尺寸"""
+    pattern, output = command[command.index("-i") + 1], command[-1]
+    frames = []
+    while os.path.exists(pattern % (len(frames) + 1)):
+        frames.append(cv2.imread(pattern % (len(frames) + 1)))
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*"mp4v"), 30, (width, height))
+    for frame in frames:
+        writer.write(cv2.resize(frame, (width, height)))
+    writer.release()
+    return subprocess.CompletedProcess(command, 0, b"", b"")
+
+
+class TestFrameStore(unittest.TestCase):
+    """测试截图存储模块"""
+
+    def setUp(self):
+        """使用临时截图目录"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path_patcher = patch.object(frame_store, "screenshots_path", self.temp_dir)
+        self.path_patcher.start()
+        self.timestamp = int(datetime.datetime(2025, 4, 16, 10).timestamp())
+        self.folder = frame_store.get_day_folder(self.timestamp)
+
+    def tearDown(self):
+        """清理临时目录"""
+        self.path_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_file_store_round_trip(self):
+        """测试单文件存储的读写"""
+        store = frame_store.FrameStore()
+        data = _encode((255, 0, 0))
+        path = store.save_frame(self.timestamp, data)
+
+        self.assertEqual(path, frame_store.get_frame_file_path(self.timestamp))
+        self.assertEqual(store.get_frame_path(self.timestamp), path)
+        self.assertEqual(bytes(store.read_frame(self.timestamp)[0]), data)
+
+    def test_pack_store_round_trip(self):
+        """测试打包存储追加写入和mmap读取，新追加的记录可以被已打开的读取方看到"""
+        store = frame_store.PackFrameStore()
+        first = _encode((255, 0, 0))
+        store.save_frame(self.timestamp, first)
+        self.assertEqual(bytes(store.read_frame(self.timestamp)[0]), first)
+
+        second = _encode((0, 255, 0))
+        store.save_frame(self.timestamp + 5, second)
+        data, version = store.read_frame(self.timestamp + 5)
+        self.assertEqual(bytes(data), second)
+        self.assertTrue(version.startswith("p-"))
+
+        # 单独的读取对象同样可以从索引文件加载
+        reader = frame_store.PackFrameStore()
+        self.assertEqual(reader.list_day(self.folder), [(self.timestamp, 0), (self.timestamp + 5, 0)])
+        self.assertIsNone(reader.get_frame_path(self.timestamp))
+        self.assertFalse(os.path.exists(frame_store.get_frame_file_path(self.timestamp)))
+
+    def test_truncated_index_record_ignored(self):
+        """测试写入中断留下的半条索引记录被忽略"""
+        store = frame_store.PackFrameStore()
+        store.save_frame(self.timestamp, _encode((1, 2, 3)))
+        with open(os.path.join(self.folder, frame_store.INDEX_NAME), "ab") as f:
+            f.write(b"\x00" * 7)
+
+        reader = frame_store.PackFrameStore()
+        self.assertEqual(reader.list_day(self.folder), [(self.timestamp, 0)])
+
+    def test_dangling_index_records(self):
+        """测试崩溃后超出打包文件末尾的索引记录被忽略，下次写入前从索引中删除"""
+        store = frame_store.PackFrameStore()
+        first = _encode((1, 2, 3))
+        store.save_frame(self.timestamp, first)
+        store.save_frame(self.timestamp + 5, _encode((4, 5, 6)))
+        # 模拟崩溃：第二张截图的数据没有落盘，索引记录和半条记录留了下来
+        with open(os.path.join(self.folder, frame_store.PACK_NAME), "r+b") as f:
+            f.truncate(len(first))
+        with open(os.path.join(self.folder, frame_store.INDEX_NAME), "ab") as f:
+            f.write(b"\x00" * 7)
+
+        store = frame_store.PackFrameStore()
+        self.assertEqual(store.list_day(self.folder), [(self.timestamp, 0)])
+        third = _encode((7, 8, 9), size=(200, 100))
+        store.save_frame(self.timestamp + 10, third)
+
+        reader = frame_store.PackFrameStore()
+        self.assertEqual(reader.list_day(self.folder), [(self.timestamp, 0), (self.timestamp + 10, 0)])
+        self.assertIsNone(reader.read_frame(self.timestamp + 5))
+        self.assertEqual(bytes(reader.read_frame(self.timestamp + 10)[0]), third)
+        self.assertEqual(os.path.getsize(os.path.join(self.folder, frame_store.INDEX_NAME)),
+                         2 * frame_store.INDEX_RECORD_SIZE)
+
+    def test_convert_between_formats(self):
+        """测试单文件截图转换为打包文件后再还原"""
+        files = frame_store.FrameStore()
+        payloads = {self.timestamp + i: _encode((i * 40, 0, 0)) for i in range(3)}
+        for timestamp, data in payloads.items():
+            files.save_frame(timestamp, data)
+
+        with patch.object(frame_store, "get_frame_store", return_value=files):
+            self.assertEqual(frame_store.convert_day_to_pack(self.folder), 3)
+            self.assertEqual(sorted(os.listdir(self.folder)), sorted([frame_store.INDEX_NAME, frame_store.PACK_NAME]))
+            for timestamp, data in payloads.items():
+                self.assertEqual(bytes(frame_store.read_frame(timestamp)[0]), data)
+                self.assertTrue(frame_store.frame_exists(timestamp))
+
+            self.assertEqual(frame_store.convert_day_to_files(self.folder), 3)
+        for timestamp, data in payloads.items():
+            path = frame_store.get_frame_file_path(timestamp)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data)
+            # 导出的文件修改时间与截图时间一致，归档时按时间排序
+            self.assertEqual(int(os.path.getmtime(path)), timestamp)
+        self.assertFalse(os.path.exists(os.path.join(self.folder, frame_store.PACK_NAME)))
+
+    def test_load_frame_image(self):
+        """测试通过统一接口加载截图图像"""
+        store = frame_store.PackFrameStore()
+        store.save_frame(self.timestamp, _encode((10, 20, 30)))
+        with patch.object(frame_store, "get_frame_store", return_value=store):
+            image = frame_store.load_frame_image(self.timestamp)
+            self.assertEqual(image.size, (64, 48))
+            self.assertEqual(image.getpixel((0, 0)), (10, 20, 30))
+            self.assertIsNone(frame_store.load_frame_image(self.timestamp + 1))
+
+    def test_frame_refs(self):
+        """测试引用已有截图：读取接口返回被引用的截图，引用不会形成链，跨日期引用同样有效"""
+        files = frame_store.FrameStore()
+        data = _encode((10, 20, 30))
+        files.save_frame(self.timestamp, data)
+        next_day = self.timestamp + 86400
+        with patch.object(frame_store, "get_frame_store", return_value=files):
+            frame_store.save_frame_ref(self.timestamp + 10, self.timestamp)
+            frame_store.save_frame_ref(next_day, self.timestamp + 10)
+            self.assertEqual(frame_store.resolve_frame(next_day), (self.timestamp, 0))
+            self.assertEqual(frame_store.resolve_frame(self.timestamp + 20), (self.timestamp + 20, 0))
+            for timestamp in (self.timestamp + 10, next_day):
+                self.assertEqual(bytes(frame_store.read_frame(timestamp)[0]), data)
+                self.assertEqual(frame_store.get_frame_path(timestamp), frame_store.get_frame_file_path(self.timestamp))
+                self.assertTrue(frame_store.frame_exists(timestamp))
+                self.assertEqual(frame_store.load_frame_image(timestamp).getpixel((0, 0)), (10, 20, 30))
+            self.assertFalse(os.path.exists(frame_store.get_frame_file_path(next_day)))
+
+            # 转换为打包文件时引用原样保留
+            frame_store.convert_day_to_pack(self.folder)
+            self.assertIn(frame_store.REF_NAME, os.listdir(self.folder))
+            self.assertEqual(bytes(frame_store.read_frame(self.timestamp + 10)[0]), data)
+
+    def test_frame_refs_after_archive(self):
+        """测试被引用的截图归档为视频后，引用从视频中读取被引用的帧"""
+        files = frame_store.FrameStore()
+        files.save_frame(self.timestamp, _encode((10, 20, 30)))
+        frame_store.save_frame_ref(self.timestamp + 10, self.timestamp)
+        # 模拟归档：截图文件编码为视频后删除，留下映射文件
+        os.remove(frame_store.get_frame_file_path(self.timestamp))
+        open(os.path.join(self.folder, f"{frame_store.RECORD_NAME}.csv"), "w").close()
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 48), (10, 20, 30)).save(buffer, format="JPEG")
+        tool = MagicMock()
+        tool.return_value.query_image.return_value = io.BytesIO(buffer.getvalue())
+        with patch.object(frame_store, "get_frame_store", return_value=files), \
+                patch.object(frame_store, "ImageVideoTool", tool):
+            self.assertTrue(frame_store.frame_exists(self.timestamp + 10))
+            self.assertEqual(frame_store.load_frame_image(self.timestamp + 10).size, (64, 48))
+        tool.return_value.query_image.assert_called_once_with(f"{self.timestamp}.webp")
+
+    def test_monitor_frames(self):
+        """测试同一时刻多个显示器的截图互不覆盖：单文件、打包文件、引用和两种格式之间的转换"""
+        self.assertEqual(frame_store.frame_name(self.timestamp, 2), f"{self.timestamp}_2")
+        self.assertEqual(frame_store.parse_frame_name(f"{self.timestamp}_2.webp"), (self.timestamp, 2))
+        self.assertEqual(frame_store.parse_frame_name(f"{self.timestamp}.webp"), (self.timestamp, 0))
+        self.assertRaises(ValueError, frame_store.parse_frame_name, "abc.webp")
+
+        files = frame_store.FrameStore()
+        payloads = {monitor: _encode((monitor * 60, 0, 0)) for monitor in (1, 2)}
+        for monitor, data in payloads.items():
+            files.save_frame(self.timestamp, data, monitor)
+        with patch.object(frame_store, "get_frame_store", return_value=files):
+            frame_store.save_frame_ref(self.timestamp + 10, self.timestamp, 2)
+            self.assertEqual(frame_store.resolve_frame(self.timestamp + 10, 2), (self.timestamp, 2))
+            self.assertEqual(frame_store.resolve_frame(self.timestamp + 10, 1), (self.timestamp + 10, 1))
+            self.assertEqual(frame_store.convert_day_to_pack(self.folder), 2)
+            reader = frame_store.PackFrameStore()
+            self.assertEqual(reader.list_day(self.folder), [(self.timestamp, 1), (self.timestamp, 2)])
+            for monitor, data in payloads.items():
+                self.assertEqual(bytes(frame_store.read_frame(self.timestamp, monitor)[0]), data)
+            self.assertIsNone(frame_store.read_frame(self.timestamp))
+            self.assertEqual(bytes(frame_store.read_frame(self.timestamp + 10, 2)[0]), payloads[2])
+
+            self.assertEqual(frame_store.convert_day_to_files(self.folder), 2)
+        self.assertTrue(os.path.exists(frame_store.get_frame_file_path(self.timestamp, 2)))
+        self.assertTrue(frame_store.get_frame_file_path(self.timestamp, 2).endswith(f"{self.timestamp}_2.webp"))
+
+    def test_archive_monitors_separately(self):
+        """测试分辨率和方向不同的显示器分别归档为视频，从视频中读取的截图保持原来的尺寸"""
+        packs = frame_store.PackFrameStore()
+        sizes = {1: (64, 48), 2: (32, 64)}
+        for monitor, size in sizes.items():
+            for offset in (0, 5):
+                packs.save_frame(self.timestamp + offset, _encode((monitor * 100, 0, 0), size), monitor)
+        with patch.object(frame_store, "get_frame_store", return_value=packs), \
+                patch.object(utils.subprocess, "run", side_effect=_fake_ffmpeg):
+            frame_store.save_frame_ref(self.timestamp + 10, self.timestamp + 5, 2)
+            self.assertEqual(frame_store.archive_day(self.folder), 2)
+            self.assertEqual(sorted(os.path.basename(path) for path in utils.archive_mapping_files(self.folder)),
+                             ["record_1.mp4.csv", "record_2.mp4.csv"])
+            self.assertFalse(any(name.endswith(".webp") for name in os.listdir(self.folder)))
+            self.assertFalse(os.path.exists(os.path.join(self.folder, frame_store.PACK_NAME)))
+            self.assertTrue(frame_store.is_day_archived(self.folder))
+
+            for monitor, size in sizes.items():
+                for offset in (0, 5, 10):
+                    image = frame_store.load_frame_image(self.timestamp + offset, monitor=monitor)
+                    if offset == 10 and monitor == 1:
+                        self.assertIsNone(image)
+                        continue
+                    self.assertEqual(image.size, size)
+                    self.assertAlmostEqual(image.convert("RGB").getpixel((size[0] // 2, size[1] // 2))[0],
+                                           monitor * 100, delta=20)
+
+    def test_encode_frame_compresses_to_target(self):
+        """测试超过目标大小时改为有损压缩"""
+        noise = Image.frombytes("RGB", (400, 300), os.urandom(400 * 300 * 3))
+        lossless = frame_store.encode_frame(noise)
+        compressed = frame_store.encode_frame(noise, target_size_kb=50)
+        self.assertLess(len(compressed), len(lossless))
+        with Image.open(io.BytesIO(compressed)) as image:
+            self.assertEqual(image.size, (400, 300))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
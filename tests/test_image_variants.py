@@ -0,0 +1,155 @@
+"""
+测试图片变体生成和磁盘LRU缓存
+
+验证变体参数解析、缩放转码、磁盘缓存复用以及按容量淘汰
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import image_variants
+from memococo.common.lru_cache import DiskLRUCache
+
+
+class TestVariantParams(unittest.TestCase):
+    """测试变体参数解析"""
+
+    def test_no_params(self):
+        """测试没有变体参数时返回None"""
+        self.assertIsNone(image_variants.parse_variant_params({}))
+
+    def test_normalize_params(self):
+        """测试宽度取整、格式别名和质量范围"""
+        params = image_variants.parse_variant_params({"w": "801", "fmt": "JPG", "q": "150"})
+        self.assertEqual(params.width, 816)
+        self.assertEqual(params.fmt, "jpeg")
+        self.assertEqual(params.quality, 100)
+        self.assertEqual(params.mimetype, "image/jpeg")
+
+        params = image_variants.parse_variant_params({"fmt": "png", "q": "10"})
+        self.assertIsNone(params.width)
+        self.assertEqual(params.quality, 100)
+
+    def test_invalid_params(self):
+        """测试非法参数抛出ValueError"""
+        for args in ({"w": "abc"}, {"w": "-5"}, {"fmt": "gif"}, {"q": "x"}):
+            with self.assertRaises(ValueError):
+                image_variants.parse_variant_params(args)
+
+
+class TestEnsureVariant(unittest.TestCase):
+    """测试变体生成和缓存"""
+
+    def setUp(self):
+        """创建临时缓存目录并替换原图加载函数"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.patchers = [
+            patch.object(image_variants, "VARIANT_CACHE_DIR", self.temp_dir),
+            patch.object(image_variants, "_disk_cache", DiskLRUCache(self.temp_dir, 10 * 1024 * 1024)),
+            patch.object(image_variants, "load_frame_image", side_effect=self._load_image),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.load_count = 0
+
+    def tearDown(self):
+        """清理临时目录"""
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _load_image(self, timestamp, draft_size=None, monitor=0):
+        self.load_count += 1
+        if timestamp == 0:
+            return None
+        return Image.new("RGB", (1920, 1080), (10, 20, 30))
+
+    def test_generate_and_reuse(self):
+        """测试变体生成后重复请求直接复用磁盘文件"""
+        params = image_variants.parse_variant_params({"w": "640", "fmt": "jpeg", "q": "60"})
+        path = image_variants.ensure_variant(1713250000, params)
+
+        self.assertTrue(os.path.exists(path))
+        with Image.open(path) as variant:
+            self.assertEqual(variant.format, "JPEG")
+            self.assertEqual(variant.size, (640, 360))
+
+        self.assertEqual(image_variants.ensure_variant(1713250000, params), path)
+        self.assertEqual(self.load_count, 1)
+
+    def test_no_upscale(self):
+        """测试请求宽度大于原图时不放大"""
+        params = image_variants.parse_variant_params({"w": "4000"})
+        path = image_variants.ensure_variant(1713250000, params)
+        with Image.open(path) as variant:
+            self.assertEqual(variant.size, (1920, 1080))
+
+    def test_missing_original(self):
+        """测试原图不存在时返回None"""
+        params = image_variants.parse_variant_params({"w": "640"})
+        self.assertIsNone(image_variants.ensure_variant(0, params))
+
+
+class TestDiskLRUCache(unittest.TestCase):
+    """测试磁盘LRU缓存"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, size):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return path
+
+    def test_evicts_least_recently_used(self):
+        """测试超出容量时删除最久未使用的文件"""
+        cache = DiskLRUCache(self.temp_dir, 250)
+        a = self._write("a", 100)
+        cache.add(a)
+        b = self._write("b", 100)
+        cache.add(b)
+        self.assertTrue(cache.get(a))
+
+        c = self._write("c", 100)
+        cache.add(c)
+
+        self.assertTrue(os.path.exists(a))
+        self.assertFalse(os.path.exists(b))
+        self.assertTrue(os.path.exists(c))
+        self.assertEqual(cache.stats()["bytes"], 200)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_restore_order_from_disk(self):
+        """测试重启后根据文件修改时间恢复使用顺序"""
+        old = self._write("old", 100)
+        new = self._write("new", 100)
+        now = time.time()
+        os.utime(old, (now - 100, now - 100))
+
+        cache = DiskLRUCache(self.temp_dir, 250)
+        self.assertTrue(cache.get(new))
+        cache.add(self._write("newer", 100))
+
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
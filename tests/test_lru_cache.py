@@ -0,0 +1,69 @@
+"""
+测试按字节数限制容量的LRU缓存
+
+验证缓存的淘汰顺序、容量限制和命中统计
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo.common.lru_cache import ByteLRUCache
+
+
+class TestByteLRUCache(unittest.TestCase):
+    """测试ByteLRUCache"""
+
+    def test_evicts_least_recently_used(self):
+        """测试超过容量时淘汰最久未使用的条目"""
+        cache = ByteLRUCache(max_bytes=30, max_item_bytes=30)
+        cache.put("a", b"x" * 10)
+        cache.put("b", b"x" * 10)
+        cache.put("c", b"x" * 10)
+
+        # 访问a后，b成为最久未使用的条目
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("d", b"x" * 10)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertIn("d", cache)
+        self.assertEqual(cache.stats()["bytes"], 30)
+
+    def test_rejects_oversized_items(self):
+        """测试超过单条上限的条目不会被缓存"""
+        cache = ByteLRUCache(max_bytes=100)
+        self.assertFalse(cache.put("big", b"x" * 26))
+        self.assertNotIn("big", cache)
+        self.assertTrue(cache.put("small", b"x" * 25))
+
+    def test_replace_updates_size(self):
+        """测试覆盖写入时正确更新占用大小"""
+        cache = ByteLRUCache(max_bytes=100, max_item_bytes=100)
+        cache.put("a", b"x" * 40)
+        cache.put("a", b"x" * 10)
+        self.assertEqual(cache.stats()["bytes"], 10)
+        self.assertEqual(cache.pop("a"), b"x" * 10)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_hit_rate(self):
+        """测试命中率统计"""
+        cache = ByteLRUCache(max_bytes=100)
+        cache.put("a", b"1")
+        cache.get("a")
+        cache.get("missing")
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
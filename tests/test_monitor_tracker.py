@@ -0,0 +1,121 @@
+"""
+测试多显示器变化跟踪
+
+验证每个显示器分别与自己上一次保存的画面比较、只保存有变化的显示器，镜像显示不重复保存，
+以及数据库按显示器编号记录截图（旧数据库自动增加显示器编号列）
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import database
+from memococo.monitor_tracker import MonitorTracker
+from memococo.common.db_manager import DatabaseManager
+
+
+def _screen(seed, size=(360, 640)):
+    """随机色块组成的画面"""
+    blocks = np.random.default_rng(seed).integers(0, 255, (size[0] // 40, size[1] // 40, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((40, 40, 1), dtype=np.uint8))
+
+
+class TestMonitorTracker(unittest.TestCase):
+    """测试显示器变化跟踪"""
+
+    def setUp(self):
+        self.tracker = MonitorTracker()
+
+    def _save(self, ids, frames, force=()):
+        changed = self.tracker.changed_monitors(ids, frames, force)
+        for monitor_id, signature in changed.items():
+            self.tracker.mark_saved(monitor_id, signature)
+        return sorted(changed)
+
+    def test_only_changed_monitors(self):
+        """测试第一次保存全部显示器，之后只保存画面变化的显示器"""
+        left, right = _screen(1), _screen(2)
+        self.assertEqual(self._save([1, 2], [left, right]), [1, 2])
+        self.assertEqual(self._save([1, 2], [left.copy(), right.copy()]), [])
+        self.assertEqual(self._save([1, 2], [left, _screen(3)]), [2])
+        # 切换到显示器1上的窗口时即使画面相同也保存
+        self.assertEqual(self._save([1, 2], [left, _screen(3)], force=[1]), [1])
+
+    def test_small_change_accumulates(self):
+        """测试签名只在保存后更新，缓慢的变化累积到超过阈值后保存"""
+        frame = _screen(4)
+        self._save([1], [frame])
+        results = []
+        for step in range(1, 41):
+            changed = frame.copy()
+            changed[:, : step * 8] = 255 - changed[:, : step * 8]
+            results.append(self._save([1], [changed]))
+            if results[-1]:
+                break
+        self.assertEqual(results[0], [])
+        self.assertEqual(results[-1], [1])
+
+    def test_mirrored_and_unplugged(self):
+        """测试镜像显示只保存一次，拔掉后重新接入的显示器作为新显示器保存，分辨率变化视为变化"""
+        frame = _screen(5)
+        self.assertEqual(self._save([1, 2], [frame, frame.copy()]), [1])
+        self.assertEqual(self._save([1, 2], [frame, frame.copy()]), [])
+        self.assertEqual(self._save([1], [frame]), [])
+        self.assertEqual(self._save([1, 2], [frame, _screen(6)]), [2])
+        self.assertEqual(self._save([1], [_screen(5, size=(720, 1280))]), [1])
+
+
+class TestMonitorEntries(unittest.TestCase):
+    """测试数据库中的显示器编号"""
+
+    def setUp(self):
+        """使用临时数据库"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = DatabaseManager.db_path
+        self.listeners = list(database._entry_listeners)
+        database._entry_listeners[:] = []
+
+    def tearDown(self):
+        database._entry_listeners[:] = self.listeners
+        DatabaseManager._local = threading.local()
+        DatabaseManager.db_path = self.db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _use_db(self, path):
+        DatabaseManager._local = threading.local()
+        DatabaseManager.initialize(path)
+        database.create_db()
+
+    def test_old_database_migrated(self):
+        """测试旧数据库增加显示器编号列，已有截图编号为0"""
+        path = os.path.join(self.temp_dir, "old.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE entries (id INTEGER PRIMARY KEY AUTOINCREMENT, app TEXT, title TEXT, "
+                         "text TEXT, timestamp INTEGER, jsontext TEXT)")
+            conn.execute("INSERT INTO entries (app, title, text, timestamp, jsontext) VALUES ('a', 't', 'x', 100, '')")
+        self._use_db(path)
+        self.assertEqual(database.get_monitor_frames(200), [(0, 100)])
+
+    def test_latest_frame_per_monitor(self):
+        """测试每个显示器在指定时刻之前最近的一张截图"""
+        self._use_db(os.path.join(self.temp_dir, "test.db"))
+        for timestamp, monitor in [(100, 1), (101, 2), (110, 1), (120, 2), (130, 1)]:
+            database.insert_entry("", timestamp, "text", "app", "title", monitor=monitor)
+        self.assertEqual(database.get_monitor_frames(125), [(1, 110), (2, 120)])
+        self.assertEqual(database.get_monitor_frames(100), [(1, 100)])
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
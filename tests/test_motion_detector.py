@@ -0,0 +1,140 @@
+"""
+测试持续变化检测
+
+使用模拟时钟和合成签名验证持续变化区域的检测、持续变化时限制保存频率、
+应用例外和强制保存，以及OCR时遮盖变化区域
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import motion_detector
+from memococo.motion_detector import MotionDetector, mask_region, region_area, changed_cells
+
+
+class TestMotionDetector(unittest.TestCase):
+    """测试持续变化检测器"""
+
+    def setUp(self):
+        self.patcher = patch.object(motion_detector, "get_settings", return_value={
+            "motion_capture_interval": 30, "motion_exempt_apps": ["obs"], "motion_apps": ["mpv"]})
+        self.patcher.start()
+        self.now = 0.0
+        self.detector = MotionDetector(clock=lambda: self.now)
+        self.rng = np.random.default_rng(0)
+        # 签名为 160×256（画面 640×1024），右下角 64×128 的区域播放视频
+        self.background = self.rng.integers(0, 255, (160, 256)).astype(np.float32)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def _tick(self, video=True, seconds=5):
+        self.now += seconds
+        signature = self.background.copy()
+        if video:
+            signature[96:160, 128:256] = self.rng.integers(0, 255, (64, 128))
+        self.detector.update({1: signature})
+
+    def test_sustained_region(self):
+        """测试连续多次变化的区域被识别为持续变化，停止变化后恢复"""
+        for _ in range(4):
+            self._tick()
+            self.assertIsNone(self.detector.region(1))
+        self._tick()
+        self.assertEqual(self.detector.region(1), (0.5, 0.6, 1.0, 1.0))
+        self.assertIsNone(self.detector.region(1, app="obs"))
+        # 停止变化后的第一张截图仍与视频画面不同
+        for _ in range(3):
+            self._tick(video=False)
+        self.assertIsNone(self.detector.region(1))
+
+    def test_single_change_not_sustained(self):
+        """测试偶尔的变化（切换页面）和很小的变化区域（打字）不视为持续变化"""
+        for index in range(10):
+            self._tick(video=index % 4 == 0)
+            self.assertIsNone(self.detector.region(1))
+        for _ in range(6):
+            self.now += 5
+            signature = self.background.copy()
+            signature[0:16, 0:16] = self.rng.integers(0, 255, (16, 16))
+            self.detector.update({1: signature})
+        self.assertIsNone(self.detector.region(1))
+
+    def test_throttle(self):
+        """测试持续变化时每个间隔只保存一次，强制保存和例外应用不受限制，并估计节省的资源"""
+        for _ in range(5):
+            self._tick()
+        self.assertTrue(self.detector.should_save(1))
+        self.detector.record_saved(1, 2 * 1024 * 1024, 0.5, "masked")
+        self.assertFalse(self.detector.should_save(1))
+        self.assertTrue(self.detector.should_save(1, forced=True))
+        self.assertTrue(self.detector.should_save(1, app="obs"))
+        self._tick()
+        self.assertFalse(self.detector.should_save(1))
+        for _ in range(5):
+            self._tick()
+        self.assertTrue(self.detector.should_save(1))
+
+        stats = self.detector.stats()
+        self.assertEqual(stats["skipped_frames"], 2)
+        self.assertEqual(stats["saved_bytes_estimate"], 4 * 1024 * 1024)
+        self.assertEqual(stats["saved_cpu_seconds_estimate"], 1.0)
+        self.assertEqual(stats["masked_ocr"], 1)
+        self.assertEqual(stats["monitors"], {"1": [0.5, 0.6, 1.0, 1.0]})
+
+    def test_motion_apps(self):
+        """测试视频播放器在前台时没有检测到持续变化也限制保存频率"""
+        self._tick(video=False)
+        self.assertTrue(self.detector.should_save(1, app="mpv"))
+        self.detector.record_saved(1, 1000, 0.1)
+        self.assertFalse(self.detector.should_save(1, app="mpv"))
+        self.assertTrue(self.detector.should_save(1, app="firefox"))
+
+    def test_unplugged_and_resolution_change(self):
+        """测试拔掉显示器或分辨率变化后重新开始检测"""
+        for _ in range(5):
+            self._tick()
+        self.assertIsNotNone(self.detector.region(1))
+        self.detector.update({1: np.zeros((40, 64), dtype=np.float32)})
+        self.assertIsNone(self.detector.region(1))
+        self.detector.update({})
+        self.assertEqual(self.detector.stats()["monitors"], {})
+
+
+class TestMaskRegion(unittest.TestCase):
+    """测试变化区域的辅助函数"""
+
+    def test_mask_region(self):
+        """测试遮盖变化区域时不修改原画面"""
+        frame = np.zeros((100, 200, 3), dtype=np.uint8)
+        masked = mask_region(frame, (0.5, 0.0, 1.0, 0.5))
+        self.assertTrue((masked[:50, 100:] == 255).all())
+        self.assertTrue((masked[50:, :] == 0).all())
+        self.assertTrue((masked[:, :100] == 0).all())
+        self.assertTrue((frame == 0).all())
+        self.assertAlmostEqual(region_area((0.5, 0.0, 1.0, 0.5)), 0.25)
+
+    def test_changed_cells_edges(self):
+        """测试签名尺寸不是格子整数倍时边缘并入最后一行/列"""
+        first = np.zeros((40, 50), dtype=np.float32)
+        second = first.copy()
+        second[38:, 48:] = 255
+        cells = changed_cells(first, second)
+        self.assertEqual(cells.shape, (2, 3))
+        self.assertEqual(cells.sum(), 0)
+        second[32:, 32:] = 255
+        self.assertTrue(changed_cells(first, second)[1, 2])
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+测试OCR积压批量补录工具
+
+验证按应用和日期筛选、多个工作线程不重复处理、--limit 后从中断处继续、回收已退出进程的任务，
+以及启动时不执行VACUUM
+"""
+
+import io
+import os
+import sys
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+import datetime
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import database
+from memococo import ocr_backfill
+from memococo import ocr_jobs
+from memococo.common.db_manager import DatabaseManager
+
+
+def _day(text):
+    return int(datetime.datetime.strptime(text, "%Y-%m-%d").timestamp())
+
+
+class TestOCRBackfill(unittest.TestCase):
+    """测试OCR积压批量补录"""
+
+    def setUp(self):
+        """使用临时数据库，插入两天、两个应用的未OCR截图"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = DatabaseManager.db_path
+        DatabaseManager._local = threading.local()
+        DatabaseManager.initialize(os.path.join(self.temp_dir, "test.db"))
+        database.create_db()
+        for day in ("2025-04-10", "2025-04-11"):
+            for index in range(10):
+                database.insert_entry("", _day(day) + 3600 + index * 60, "", "editor" if index % 2 else "browser", "Title")
+
+        self.processed = []
+        self.lock = threading.Lock()
+        self.patcher = patch.object(ocr_backfill, "process_ocr_task", side_effect=self._recognize)
+        self.patcher.start()
+
+    def tearDown(self):
+        """清理临时目录"""
+        self.patcher.stop()
+        DatabaseManager._local = threading.local()
+        DatabaseManager.db_path = self.db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _recognize(self, entry, check_load=True):
+        self.assertFalse(check_load)
+        with self.lock:
+            self.processed.append(entry.id)
+        return f"text {entry.id}"
+
+    def _run(self, *argv):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            code = ocr_backfill.main(list(argv))
+        return code, output.getvalue()
+
+    def test_filters_and_workers(self):
+        """测试只处理指定日期和应用的截图，多个工作线程不重复处理"""
+        code, output = self._run("--workers", "3", "--since", "2025-04-11", "--until", "2025-04-11", "--app", "editor")
+        self.assertEqual(code, 0)
+        self.assertEqual(len(self.processed), 5)
+        self.assertEqual(len(set(self.processed)), 5)
+        self.assertIn("识别成功: 5", output)
+        self.assertIn("剩余积压: 0 张", output)
+        self.assertEqual(database.get_empty_text_count(), 15)
+
+    def test_limit_and_resume(self):
+        """测试达到 --limit 后停止，再次运行从剩余的截图继续"""
+        self._run("--workers", "2", "--limit", "7")
+        self.assertEqual(len(self.processed), 7)
+        code, output = self._run("--workers", "2")
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(self.processed), sorted(set(self.processed)))
+        self.assertEqual(len(self.processed), 20)
+        self.assertEqual(database.get_empty_text_count(), 0)
+        code, output = self._run()
+        self.assertIn("没有需要补录的截图", output)
+
+    def test_reclaim_dead_worker(self):
+        """测试被杀的进程持有的任务在下次运行时回收"""
+        entry_ids = ocr_jobs.claim_next_jobs(f"{socket.gethostname()}:999999999:backfill-1", 3)
+        self.assertEqual(len(entry_ids), 3)
+        code, output = self._run("--workers", "2")
+        self.assertIn("回收了 3 个", output)
+        self.assertEqual(len(self.processed), 20)
+        attempts = DatabaseManager.execute(
+            f"SELECT attempts FROM ocr_jobs WHERE entry_id IN ({','.join('?' * 3)})", tuple(entry_ids)
+        )
+        self.assertEqual([row["attempts"] for row in attempts], [2, 2, 2])
+
+    def test_no_vacuum(self):
+        """测试启动时只补齐表结构，不执行会独占数据库、阻塞应用写入的VACUUM"""
+        statements = []
+        DatabaseManager.get_connection().set_trace_callback(statements.append)
+        try:
+            code, output = self._run("--workers", "2", "--limit", "2")
+        finally:
+            DatabaseManager.get_connection().set_trace_callback(None)
+        self.assertEqual(code, 0)
+        self.assertEqual(len(self.processed), 2)
+        self.assertTrue(any("CREATE TABLE IF NOT EXISTS ocr_jobs" in sql for sql in statements))
+        self.assertFalse(any(sql.strip().upper().startswith("VACUUM") for sql in statements))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+测试OCR结果缓存
+
+验证感知哈希对近似画面的稳定性、BK树查找、LRU淘汰、持久化以及命中统计
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import database
+from memococo import ocr_cache
+from memococo.ocr_cache import OCRCache, BKTree, compute_phash, hamming_distance, cached_ocr
+from memococo.common.db_manager import DatabaseManager
+
+
+def _screen(lines, seed=0, size=(720, 1280)):
+    """生成一张带文字行的模拟截图"""
+    image = np.full(size + (3,), 245, dtype=np.uint8)
+    cv2.rectangle(image, (0, 0), (size[1], 60), (40, 60, 90), -1)
+    for i, line in enumerate(lines):
+        cv2.putText(image, line, (40, 120 + i * 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (20, 20, 20), 2)
+    return image
+
+
+class TestPerceptualHash(unittest.TestCase):
+    """测试感知哈希和BK树"""
+
+    def test_similar_screens_close(self):
+        """测试轻微噪声的同一画面距离很小，不同画面距离很大"""
+        editor = _screen([f"def function_{i}(value):" for i in range(12)])
+        noise = np.random.default_rng(1).integers(-3, 4, editor.shape)
+        noisy = np.clip(editor.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        browser = _screen(["Search results", "", "News", "Images"] * 3)
+        browser[60:, 800:] = 30
+
+        self.assertLessEqual(hamming_distance(compute_phash(editor), compute_phash(noisy)), ocr_cache.DEFAULT_MAX_DISTANCE)
+        self.assertGreater(hamming_distance(compute_phash(editor), compute_phash(browser)), 32)
+        # RGBA截图与RGB截图哈希相同
+        rgba = np.dstack([editor, np.full(editor.shape[:2], 255, dtype=np.uint8)])
+        self.assertEqual(compute_phash(rgba), compute_phash(editor))
+
+    def test_bk_tree_matches_brute_force(self):
+        """测试BK树返回的最近哈希与逐个比较的结果一致"""
+        rng = random.Random(7)
+        values = [rng.getrandbits(64) for _ in range(300)]
+        tree = BKTree()
+        for value in values:
+            tree.add(value)
+        for _ in range(50):
+            base = rng.choice(values)
+            query = base ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+            found = tree.search(query, 3)
+            best = min(hamming_distance(query, value) for value in values)
+            self.assertIsNotNone(found)
+            self.assertEqual(found[1], best)
+
+
+class TestOCRCache(unittest.TestCase):
+    """测试缓存的淘汰、持久化和统计"""
+
+    def setUp(self):
+        """使用临时数据库"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = DatabaseManager.db_path
+        DatabaseManager._local = threading.local()
+        DatabaseManager.initialize(os.path.join(self.temp_dir, "test.db"))
+        database.create_db()
+
+    def tearDown(self):
+        """清理临时目录"""
+        DatabaseManager._local = threading.local()
+        DatabaseManager.db_path = self.db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_lru_eviction_and_reload(self):
+        """测试超过容量时淘汰最久未命中的条目，重新加载后保持一致"""
+        cache = OCRCache(max_entries=2, max_distance=2)
+        cache.put(0b0000, "first", 1.0)
+        cache.put(0b1111 << 8, "second", 1.0)
+        self.assertEqual(cache.lookup(0b0001), "first")
+        cache.put(0b1111 << 16, "third", 1.0)
+
+        self.assertIsNone(cache.lookup(0b1111 << 8))
+        reloaded = OCRCache(max_entries=2, max_distance=2)
+        self.assertEqual(reloaded.lookup(0), "first")
+        self.assertEqual(reloaded.lookup(0b1111 << 16), "third")
+        self.assertEqual(reloaded.stats()["entries"], 2)
+
+    def test_cached_ocr_reuses_text(self):
+        """测试回到之前的画面时不再调用OCR，并统计节省的耗时"""
+        cache = OCRCache()
+        editor = _screen([f"line {i}" for i in range(10)])
+        browser = _screen(["other window"] * 3)
+        browser[60:, 600:] = 0
+        calls = []
+
+        def recognize(image):
+            calls.append(image)
+            return f"text {len(calls)}"
+
+        with patch.object(ocr_cache, "get_ocr_cache", return_value=cache):
+            texts = cached_ocr([editor, browser, editor.copy()], recognize)
+        self.assertEqual(texts, ["text 1", "text 2", "text 1"])
+        self.assertEqual(len(calls), 2)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertGreaterEqual(stats["saved_seconds"], 0)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+测试OCR引擎管理
+
+验证熔断器的状态转换、UmiOCR启动后才可用或中途失效时的切换和恢复，
+识别出错的图块改用RapidOCR而不是当作没有文字，引擎出错时抛出异常而不是返回空文本，以及负载均衡时按吞吐量分配请求
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import ocr_engines
+from memococo import ocr_factory
+from memococo.ocr_engines import (
+    CircuitBreaker, OCREngineManager, OCR_ENGINE_RAPIDOCR, OCR_ENGINE_UMIOCR,
+    BREAKER_CLOSED, BREAKER_OPEN, BREAKER_HALF_OPEN
+)
+from memococo.common.error_handler import OCREngineError
+
+
+class _FakeUmiOcr:
+    """可用性由测试控制的UmiOCR客户端"""
+
+    healthy = False
+
+    def is_available(self):
+        return _FakeUmiOcr.healthy
+
+    def ping(self):
+        return _FakeUmiOcr.healthy
+
+    def recognize(self, image):
+        if not _FakeUmiOcr.healthy:
+            raise OCREngineError("connection refused")
+        return [{"text": "umi"}]
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """测试熔断器"""
+
+    def test_transitions(self):
+        """测试连续失败后熔断，健康检查通过后半开，成功后恢复，半开时失败立即熔断"""
+        breaker = CircuitBreaker("umiocr", failure_threshold=3)
+        breaker.record_failure("e1")
+        breaker.record_success(0.5)
+        breaker.record_failure("e2")
+        breaker.record_failure("e3")
+        self.assertEqual(breaker.state, BREAKER_CLOSED)
+        self.assertTrue(breaker.record_failure("e4"))
+        self.assertEqual(breaker.state, BREAKER_OPEN)
+        self.assertFalse(breaker.allow())
+
+        self.assertTrue(breaker.record_probe(True))
+        self.assertEqual(breaker.state, BREAKER_HALF_OPEN)
+        self.assertTrue(breaker.record_failure("e5"))
+        self.assertEqual(breaker.state, BREAKER_OPEN)
+        breaker.record_probe(True)
+        self.assertTrue(breaker.record_success(1.5))
+        self.assertEqual(breaker.state, BREAKER_CLOSED)
+        self.assertAlmostEqual(breaker.latency, 0.7)
+
+
+class TestOCREngineManager(unittest.TestCase):
+    """测试OCR引擎管理器"""
+
+    def setUp(self):
+        _FakeUmiOcr.healthy = False
+        self.settings = {}
+        self.patcher = patch.object(ocr_engines, "get_settings", side_effect=lambda: self.settings)
+        self.patcher.start()
+        self.manager = OCREngineManager(umiocr_factory=_FakeUmiOcr, interval=3600)
+
+    def tearDown(self):
+        self.manager.stop()
+        self.patcher.stop()
+
+    def test_failover_and_recovery(self):
+        """测试UmiOCR启动后才可用时切换过去，连续失败后改用RapidOCR，恢复后切换回来"""
+        self.assertEqual(self.manager.select(), OCR_ENGINE_RAPIDOCR)
+        _FakeUmiOcr.healthy = True
+        self.assertTrue(self.manager.probe())
+        # 健康检查通过后先半开，第一次识别成功后恢复
+        self.assertEqual(self.manager.select(), OCR_ENGINE_UMIOCR)
+        self.manager.record_success(OCR_ENGINE_UMIOCR, 0.2)
+        self.assertEqual(self.manager.breakers[OCR_ENGINE_UMIOCR].state, BREAKER_CLOSED)
+
+        for _ in range(ocr_engines.FAILURE_THRESHOLD):
+            self.manager.record_failure(OCR_ENGINE_UMIOCR, OCREngineError("timeout"))
+        self.assertEqual(self.manager.select(), OCR_ENGINE_RAPIDOCR)
+        _FakeUmiOcr.healthy = True
+        self.manager.probe()
+        self.assertEqual(self.manager.select(), OCR_ENGINE_UMIOCR)
+
+        stats = self.manager.stats()
+        self.assertEqual(stats["active"], OCR_ENGINE_UMIOCR)
+        self.assertEqual(stats["failovers"], 3)
+        self.assertEqual([(event["from"], event["to"]) for event in stats["events"]],
+                         [(OCR_ENGINE_RAPIDOCR, OCR_ENGINE_UMIOCR), (OCR_ENGINE_UMIOCR, OCR_ENGINE_RAPIDOCR),
+                          (OCR_ENGINE_RAPIDOCR, OCR_ENGINE_UMIOCR)])
+        self.assertEqual(stats["engines"][OCR_ENGINE_UMIOCR]["latency"], 0.2)
+
+    def test_rapidocr_only(self):
+        """测试配置只使用RapidOCR时不探测UmiOCR"""
+        _FakeUmiOcr.healthy = True
+        self.settings = {"ocr_engine": "rapidocr"}
+        self.assertEqual(self.manager.select(), OCR_ENGINE_RAPIDOCR)
+        self.assertIsNone(self.manager.umiocr_client())
+
+    def test_failed_tiles_fall_back_to_rapidocr(self):
+        """测试UmiOCR识别出错时改用RapidOCR，两者都不可用时抛出异常而不是返回空文本"""
+        _FakeUmiOcr.healthy = True
+        self.manager.probe()
+        umiocr = self.manager.umiocr_client()
+        _FakeUmiOcr.healthy = False
+        rapidocr = MagicMock(return_value=([[None, "rapid", 0.9]], 0.1))
+        image = np.zeros((20, 20, 3), dtype=np.uint8)
+        with patch.object(ocr_factory, "get_engine_manager", return_value=self.manager), \
+                patch.object(ocr_factory, "prepare_ocr_images", return_value=[image, image]), \
+                patch.object(ocr_factory, "get_profile_engine", return_value=(rapidocr, OCR_ENGINE_RAPIDOCR)) as fallback:
+            text = ocr_factory.recognize_image_text(umiocr, OCR_ENGINE_UMIOCR, image)
+            self.assertEqual(text, "rapid\nrapid")
+            self.assertEqual(fallback.call_count, 1)
+            self.assertEqual(self.manager.breakers[OCR_ENGINE_UMIOCR].failures, 1)
+            self.assertEqual(self.manager.breakers[OCR_ENGINE_RAPIDOCR].successes, 2)
+
+            fallback.return_value = (None, OCR_ENGINE_RAPIDOCR)
+            with self.assertRaises(OCREngineError):
+                ocr_factory.recognize_image_text(umiocr, OCR_ENGINE_UMIOCR, image)
+
+    def test_engine_errors_are_not_empty_text(self):
+        """测试引擎运行时出错（按行识别时内存不足）抛出异常交给调用者重试，引擎正常运行但没有文字时才返回空文本"""
+        engine = MagicMock()
+        engine.text_rec.side_effect = MemoryError("onnxruntime out of memory")
+        image = np.zeros((20, 20, 3), dtype=np.uint8)
+        terminal = ocr_factory.get_ocr_profile("kitty")
+        with patch.object(ocr_factory, "get_engine_manager", return_value=self.manager), \
+                patch.object(ocr_factory, "get_profile_engine", return_value=(engine, OCR_ENGINE_RAPIDOCR)), \
+                patch.object(ocr_factory, "get_ocr_profile", return_value=terminal), \
+                patch.object(ocr_factory, "slice_text_lines", return_value=[image]), \
+                patch.object(ocr_factory, "cached_ocr", side_effect=lambda images, recognize: [recognize(i) for i in images]):
+            with self.assertRaises(OCREngineError):
+                ocr_factory.extract_text_from_image(image, app="kitty")
+            with self.assertRaises(OCREngineError):
+                ocr_factory.extract_text_from_images_batch([image], apps=["kitty"])
+            engine.text_rec.side_effect = None
+            engine.text_rec.return_value = ([], 0.1)
+            self.assertEqual(ocr_factory.extract_text_from_image(image, app="kitty"), "")
+
+
+class TestLoadBalancing(unittest.TestCase):
+    """测试同时使用UmiOCR和RapidOCR时的请求分配"""
+
+    def setUp(self):
+        _FakeUmiOcr.healthy = True
+        self.settings = {"ocr_umiocr_concurrency": 2, "ocr_rapidocr_concurrency": 2}
+        self.patcher = patch.object(ocr_engines, "get_settings", side_effect=lambda: self.settings)
+        self.patcher.start()
+        self.manager = OCREngineManager(umiocr_factory=_FakeUmiOcr, interval=3600, load_balance=True)
+
+    def tearDown(self):
+        self.manager.stop()
+        self.patcher.stop()
+
+    def test_weighted_by_throughput(self):
+        """测试没有耗时数据的引擎先使用，之后按耗时分配，工作量与吞吐量成正比"""
+        self.settings = {"ocr_umiocr_concurrency": 100, "ocr_rapidocr_concurrency": 100}
+        self.assertEqual(self.manager.acquire(), OCR_ENGINE_UMIOCR)
+        self.manager.record_success(OCR_ENGINE_UMIOCR, 1.0)
+        self.assertEqual(self.manager.acquire(), OCR_ENGINE_RAPIDOCR)
+        self.manager.record_success(OCR_ENGINE_RAPIDOCR, 3.0)
+        self.manager.release(OCR_ENGINE_UMIOCR)
+        self.manager.release(OCR_ENGINE_RAPIDOCR)
+
+        engines = [self.manager.acquire() for _ in range(40)]
+        self.assertEqual(engines.count(OCR_ENGINE_UMIOCR), 30)
+        self.assertEqual(engines.count(OCR_ENGINE_RAPIDOCR), 10)
+
+    def test_concurrency_limits(self):
+        """测试每个引擎不超过并发数，都满负荷时等待释放，熔断的引擎不再分配"""
+        self.manager.record_success(OCR_ENGINE_UMIOCR, 0.5)
+        self.manager.record_success(OCR_ENGINE_RAPIDOCR, 2.0)
+        engines = [self.manager.acquire() for _ in range(4)]
+        self.assertEqual(engines, [OCR_ENGINE_UMIOCR, OCR_ENGINE_UMIOCR, OCR_ENGINE_RAPIDOCR, OCR_ENGINE_RAPIDOCR])
+
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(self.manager.acquire()))
+        waiter.start()
+        waiter.join(0.2)
+        self.assertEqual(acquired, [])
+        self.manager.release(OCR_ENGINE_RAPIDOCR)
+        waiter.join(5)
+        self.assertEqual(acquired, [OCR_ENGINE_RAPIDOCR])
+
+        for _ in range(ocr_engines.FAILURE_THRESHOLD):
+            self.manager.record_failure(OCR_ENGINE_UMIOCR, OCREngineError("down"))
+        self.manager.release(OCR_ENGINE_UMIOCR)
+        self.manager.release(OCR_ENGINE_RAPIDOCR)
+        self.assertEqual(self.manager.acquire(), OCR_ENGINE_RAPIDOCR)
+
+    def test_slot_released_on_error(self):
+        """测试识别出错时也释放并发名额"""
+        image = np.zeros((20, 20, 3), dtype=np.uint8)
+        with patch.object(ocr_factory, "get_engine_manager", return_value=self.manager), \
+                patch.object(ocr_factory, "get_profile_engine", return_value=(None, OCR_ENGINE_RAPIDOCR)):
+            with self.assertRaises(OCREngineError):
+                ocr_factory._recognize_image(image)
+        self.assertEqual([breaker.in_flight for breaker in self.manager.breakers.values()], [0, 0])
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+测试OCR任务队列
+
+验证触发器维护的任务记录、多个工作者互斥领取、失败后的退避和重试上限、
+租约过期后的回收，以及OCR处理器失败时保留截图
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import database
+from memococo import ocr_jobs
+from memococo import ocr_processor
+from memococo.ocr_jobs import claim_jobs, claim_next_jobs, release_job, fail_job, take_due_jobs, job_stats
+from memococo.ocr_scheduler import OCRScheduler
+from memococo.common.db_manager import DatabaseManager
+
+
+def _job(entry_id):
+    rows = DatabaseManager.execute("SELECT * FROM ocr_jobs WHERE entry_id = ?", (entry_id,))
+    return rows[0] if rows else None
+
+
+def _entry_id(timestamp):
+    return DatabaseManager.execute("SELECT id FROM entries WHERE timestamp = ?", (timestamp,))[0]["id"]
+
+
+class TestOCRJobs(unittest.TestCase):
+    """测试OCR任务队列"""
+
+    def setUp(self):
+        """使用临时数据库"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = DatabaseManager.db_path
+        DatabaseManager._local = threading.local()
+        DatabaseManager.initialize(os.path.join(self.temp_dir, "test.db"))
+        database.create_db()
+        self.listeners = list(database._entry_listeners)
+        self.settings_patcher = patch.object(ocr_jobs, "get_settings", return_value={"ocr_max_attempts": 3})
+        self.settings_patcher.start()
+
+    def tearDown(self):
+        """清理临时目录"""
+        self.settings_patcher.stop()
+        database._entry_listeners[:] = self.listeners
+        DatabaseManager._local = threading.local()
+        DatabaseManager.db_path = self.db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_triggers_follow_entries(self):
+        """测试插入未OCR条目时创建任务，写入文本后完成，文本清空后重新创建，删除条目时删除"""
+        database.insert_entry("", 1000, "", "App", "Title")
+        database.insert_entry("", 1010, "already recognized", "App", "Title")
+        entry_id = _entry_id(1000)
+        self.assertEqual(_job(entry_id)["state"], ocr_jobs.JOB_PENDING)
+        self.assertIsNone(_job(_entry_id(1010)))
+
+        database.update_entry_text(entry_id, "text", "")
+        self.assertEqual(_job(entry_id)["state"], ocr_jobs.JOB_DONE)
+        database.update_entry_text(entry_id, "", "")
+        self.assertEqual(_job(entry_id)["state"], ocr_jobs.JOB_PENDING)
+        database.remove_entry(entry_id)
+        self.assertIsNone(_job(entry_id))
+
+    def test_claim_is_exclusive(self):
+        """测试同一任务只能被一个工作者领取，放回后不计入尝试次数"""
+        for timestamp in range(1000, 1050, 10):
+            database.insert_entry("", timestamp, "", "App", "Title")
+        first = claim_next_jobs("worker-a", 3)
+        second = claim_next_jobs("worker-b", 3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(claim_jobs(first, "worker-b"), [])
+
+        # 只有持有者可以放回
+        self.assertFalse(release_job(first[0], "worker-b"))
+        self.assertTrue(release_job(first[0], "worker-a"))
+        self.assertEqual(_job(first[0])["attempts"], 0)
+        self.assertEqual(claim_jobs([first[0]], "worker-b"), [first[0]])
+
+    def test_backoff_and_max_attempts(self):
+        """测试失败后退避重试，尝试次数用完后标记为失败并不再调度"""
+        database.insert_entry("", 1000, "", "App", "Title")
+        database.insert_entry("", 1010, "", "App", "Title")
+        entry_id = _entry_id(1000)
+
+        for attempt in range(1, 4):
+            self.assertEqual(claim_jobs([entry_id], "worker"), [entry_id])
+            state = fail_job(entry_id, "worker", f"error {attempt}")
+            if attempt < 3:
+                self.assertEqual(state, ocr_jobs.JOB_PENDING)
+                # 退避期间不能领取
+                self.assertEqual(claim_jobs([entry_id], "worker"), [])
+                self.assertGreater(_job(entry_id)["next_attempt_at"], time.time() + ocr_jobs.BACKOFF_BASE - 5)
+                DatabaseManager.execute("UPDATE ocr_jobs SET next_attempt_at = 0 WHERE entry_id = ?", (entry_id,))
+
+        job = _job(entry_id)
+        self.assertEqual(job["state"], ocr_jobs.JOB_FAILED)
+        self.assertEqual(job["last_error"], "error 3")
+        self.assertEqual(claim_jobs([entry_id], "worker", ignore_backoff=True), [])
+        # 失败的条目保留，但不计入待OCR数量，调度器不再载入
+        self.assertEqual(database.get_empty_text_count(), 1)
+        self.assertEqual([row[1] for row in database.get_pending_ocr_runs()], [1010])
+
+    def test_expired_lease_requeued(self):
+        """测试持有者崩溃后租约到期的任务重新变为可领取，并返回给调度器"""
+        database.insert_entry("", 1000, "", "App", "Title")
+        entry_id = _entry_id(1000)
+        self.assertEqual(claim_jobs([entry_id], "crashed-worker", lease_seconds=-1), [entry_id])
+        self.assertIn((entry_id, 1000), take_due_jobs())
+        job = _job(entry_id)
+        self.assertEqual(job["state"], ocr_jobs.JOB_PENDING)
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(claim_next_jobs("worker", 1), [entry_id])
+        self.assertEqual(job_stats()[ocr_jobs.JOB_LEASED], 1)
+
+    def test_separate_processes_share_queue(self):
+        """测试两个各自有调度器的工作者（模拟两个进程）不会处理同一条目，失败时截图保留"""
+        for timestamp in range(1000, 1200, 10):
+            database.insert_entry("", timestamp, "", "App", "Title")
+        processed = []
+        lock = threading.Lock()
+
+        def recognize(entry, check_load=True):
+            with lock:
+                processed.append(entry.id)
+            return None if entry.timestamp == 1100 else f"text {entry.id}"
+
+        def drain(worker):
+            while ocr_processor.process_batch_ocr(batch_size=4, worker=worker):
+                pass
+
+        governor = MagicMock()
+        governor.ocr_allowed.return_value = True
+        governor.ocr_concurrency.return_value = 2
+        # 每个线程使用自己的调度器
+        schedulers = {"worker-0": OCRScheduler(), "worker-1": OCRScheduler()}
+        for scheduler in schedulers.values():
+            database.add_entry_listener(scheduler.on_entry_event)
+        with patch.object(ocr_processor, "process_ocr_task", side_effect=recognize), \
+                patch.object(ocr_processor, "frame_exists", return_value=True), \
+                patch.object(ocr_processor, "get_resource_governor", return_value=governor), \
+                patch.object(ocr_processor, "get_ocr_scheduler",
+                             side_effect=lambda: schedulers[threading.current_thread().name]), \
+                patch.object(ocr_processor.time, "sleep"):
+            threads = [threading.Thread(target=drain, args=(name,), name=name) for name in schedulers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(30)
+
+        self.assertEqual(sorted(processed), sorted(set(processed)))
+        self.assertEqual(len(processed), 20)
+        self.assertEqual(job_stats()[ocr_jobs.JOB_DONE], 19)
+        failed = _job(_entry_id(1100))
+        self.assertEqual((failed["state"], failed["attempts"]), (ocr_jobs.JOB_PENDING, 1))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
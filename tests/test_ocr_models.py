@@ -0,0 +1,174 @@
+"""
+测试OCR模型档位
+
+验证按耗时目标选择档位、基准测试结果的保存和复用、指定档位、档位不可用时的回退，
+以及基准测试在后台进行、完成前使用移动端模型
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import ocr_models
+from memococo.ocr_models import choose_tier, current_model_tier, select_model_tier, model_params, tier_model_params
+
+
+class _FakeEngine:
+    """按模型路径区分档位的引擎，识别耗时由测试指定"""
+
+    def __init__(self, params, clock):
+        self.tier = os.path.basename(os.path.dirname(params.get("det_model_path", "/mobile/det.onnx")))
+        self.clock = clock
+
+    def __call__(self, image):
+        self.clock.now += self.clock.timings[self.tier]
+        return [], 0.0
+
+
+class _Clock:
+    def __init__(self, timings):
+        self.timings = timings
+        self.now = 0.0
+        self.created = []
+
+    def time(self):
+        return self.now
+
+    def create_engine(self, params):
+        engine = _FakeEngine(params, self)
+        self.created.append(engine.tier)
+        return engine
+
+
+class TestOCRModels(unittest.TestCase):
+    """测试OCR模型档位"""
+
+    def setUp(self):
+        """使用临时模型目录和空配置"""
+        self.folder = tempfile.mkdtemp()
+        self.settings = {}
+        self.patchers = [
+            patch.object(ocr_models, "models_folder", self.folder),
+            patch.object(ocr_models, "get_settings", side_effect=lambda: self.settings),
+            patch.object(ocr_models, "_quantize_bundled_models", return_value=False),
+            patch.object(ocr_models, "_selected_tier", None),
+            patch.object(ocr_models, "_selection_thread", None),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """恢复模块状态并删除临时目录"""
+        for patcher in reversed(self.patchers):
+            patcher.stop()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _install(self, tier):
+        os.makedirs(os.path.join(self.folder, tier))
+        for name in ("det", "rec"):
+            open(os.path.join(self.folder, tier, f"{name}.onnx"), "wb").close()
+
+    def _select(self, clock):
+        with patch.object(ocr_models.time, "time", clock.time):
+            return select_model_tier(clock.create_engine)
+
+    def test_choose_tier(self):
+        """测试选择满足目标的最准确档位，都不满足时选择最快的档位"""
+        results = {"server": 5.0, "mobile": 2.0, "int8": 1.2}
+        self.assertEqual(choose_tier(results, 6.0), "server")
+        self.assertEqual(choose_tier(results, 3.0), "mobile")
+        self.assertEqual(choose_tier(results, 0.5), "int8")
+        self.assertIsNone(choose_tier({}, 3.0))
+
+    def test_benchmark_saved_and_reused(self):
+        """测试首次运行时测试可用档位并保存结果，之后直接读取"""
+        self._install("server")
+        clock = _Clock({"server": 4.0, "mobile": 1.5})
+        self.assertEqual(self._select(clock), "mobile")
+        self.assertEqual(sorted(clock.created), ["mobile", "server"])
+        with open(os.path.join(self.folder, ocr_models.BENCHMARK_FILE), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["results"], {"server": 4.0, "mobile": 1.5})
+
+        # 放宽耗时目标后按保存的结果重新选择，不再测试
+        ocr_models._selected_tier = None
+        self.settings = {"ocr_latency_target": 5.0}
+        clock = _Clock({"server": 4.0, "mobile": 1.5})
+        self.assertEqual(self._select(clock), "server")
+        self.assertEqual(clock.created, [])
+        self.assertEqual(model_params()["det_model_path"], os.path.join(self.folder, "server", "det.onnx"))
+
+    def test_signature_change_reruns_benchmark(self):
+        """测试线程配置变化后重新测试"""
+        clock = _Clock({"mobile": 1.0})
+        self._select(clock)
+        ocr_models._selected_tier = None
+        self.settings = {"ocr_intra_op_threads": 2}
+        clock = _Clock({"mobile": 1.0})
+        self._select(clock)
+        self.assertEqual(clock.created, ["mobile"])
+        self.assertEqual(ocr_models.session_params()["intra_op_num_threads"], 2)
+
+    def test_configured_tier(self):
+        """测试指定的档位可用时不做基准测试，不可用时改为自动选择"""
+        self._install("int8")
+        self.settings = {"ocr_model_tier": "int8"}
+        clock = _Clock({"mobile": 1.0, "int8": 0.5})
+        self.assertEqual(self._select(clock), "int8")
+        self.assertEqual(clock.created, [])
+
+        self.settings = {"ocr_model_tier": "server"}
+        self.assertIsNone(tier_model_params("server"))
+        self.assertEqual(self._select(clock), "mobile")
+        self.assertEqual(sorted(clock.created), ["int8", "mobile"])
+
+    def test_missing_models_fall_back_to_mobile(self):
+        """测试保存的结果指向已删除的模型时重新测试，没有结果时使用移动端模型"""
+        self._install("server")
+        clock = _Clock({"server": 1.0, "mobile": 0.5})
+        self.assertEqual(self._select(clock), "server")
+        shutil.rmtree(os.path.join(self.folder, "server"))
+        ocr_models._selected_tier = None
+        clock = _Clock({"mobile": 0.5})
+        self.assertEqual(self._select(clock), "mobile")
+        self.assertEqual(clock.created, ["mobile"])
+
+        ocr_models._selected_tier = None
+        os.remove(os.path.join(self.folder, ocr_models.BENCHMARK_FILE))
+        self.assertEqual(select_model_tier(None), "mobile")
+
+    def test_benchmark_in_background(self):
+        """测试需要基准测试时不阻塞调用方：完成前返回移动端档位，完成后使用选择的档位"""
+        self._install("server")
+        started, release = threading.Event(), threading.Event()
+        selected = []
+
+        def create_engine(params):
+            started.set()
+            release.wait(5)
+            return lambda image: ([], 0.0)
+
+        self.assertEqual(current_model_tier(create_engine, lambda: selected.append(True)), "mobile")
+        self.assertTrue(started.wait(5))
+        self.assertEqual(current_model_tier(create_engine), "mobile")
+        self.assertIsNone(ocr_models._selected_tier)
+
+        release.set()
+        ocr_models._selection_thread.join(5)
+        self.assertEqual(selected, [True])
+        self.assertEqual(current_model_tier(create_engine), "server")
+        self.assertEqual(model_params()["det_model_path"], os.path.join(self.folder, "server", "det.onnx"))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
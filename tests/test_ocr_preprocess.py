@@ -0,0 +1,99 @@
+"""
+测试按内容的OCR预处理
+
+验证文字区域查找（丢弃空白和照片区域）、按原始分辨率排入图块以及预处理方式的配置
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import ocr_factory
+from memococo import ocr_preprocess
+from memococo.ocr_preprocess import find_text_regions, pack_regions, prepare_content_tiles
+
+
+def _frame(size=(2160, 3840)):
+    """生成一张4K截图：灰色背景、左上角小字窗口、右侧照片区域"""
+    image = np.full(size + (3,), 120, dtype=np.uint8)
+    image[100:700, 100:1300] = 250
+    for line in range(20):
+        cv2.putText(image, f"line {line} of the editor window", (130, 140 + line * 24),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (30, 30, 30), 1, cv2.LINE_AA)
+    photo = np.random.default_rng(3).integers(0, 255, (800, 1000, 3), dtype=np.uint8)
+    image[1000:1800, 2500:3500] = cv2.GaussianBlur(photo, (7, 7), 0)
+    return image
+
+
+def _contains(outer, inner):
+    ox, oy, ow, oh = outer
+    ix, iy, iw, ih = inner
+    return ox <= ix and oy <= iy and ox + ow >= ix + iw and oy + oh >= iy + ih
+
+
+class TestOCRPreprocess(unittest.TestCase):
+    """测试按内容的OCR预处理"""
+
+    def test_find_text_regions(self):
+        """测试只找到文字区域，空白背景和照片区域被丢弃"""
+        regions = find_text_regions(_frame())
+        self.assertTrue(regions)
+        # 所有区域都在文字窗口内，并覆盖第一行和最后一行文字
+        for region in regions:
+            self.assertTrue(_contains((80, 80, 1240, 640), region), region)
+        self.assertTrue(any(y <= 125 for _, y, _, _ in regions))
+        self.assertTrue(any(y + h >= 140 + 19 * 24 for _, y, _, h in regions))
+
+    def test_blank_frame(self):
+        """测试没有文字的截图不需要OCR"""
+        self.assertEqual(prepare_content_tiles(np.full((1080, 1920, 3), 40, dtype=np.uint8)), [])
+
+    def test_tiles_keep_native_resolution(self):
+        """测试图块中的文字区域保持原始分辨率"""
+        image = _frame()
+        tiles = prepare_content_tiles(image)
+        self.assertEqual(len(tiles), 1)
+        tile = tiles[0]
+        self.assertLessEqual(max(tile.shape[:2]), ocr_preprocess.TILE_MAX_SIDE)
+        self.assertGreaterEqual(min(tile.shape[:2]), ocr_preprocess.TILE_MIN_SIDE)
+        x, y, w, h = find_text_regions(image)[0]
+        np.testing.assert_array_equal(tile[:h, :w], image[y:y + h, x:x + w])
+
+    def test_large_regions_split_into_tiles(self):
+        """测试超过图块大小的区域被切开，且相邻部分重叠"""
+        image = np.zeros((3000, 3000), dtype=np.uint8)
+        tiles = pack_regions(image, [(0, 0, 3000, 3000)])
+        self.assertEqual(len(tiles), 4)
+        parts = ocr_preprocess._split_region((0, 0, 3000, 100))
+        self.assertEqual(len(parts), 2)
+        self.assertLess(parts[1][0], parts[0][0] + parts[0][2])
+
+    def test_full_text_frame_falls_back(self):
+        """测试文字铺满画面时改用整图缩放"""
+        image = np.full((1080, 1920, 3), 255, dtype=np.uint8)
+        for line in range(45):
+            cv2.putText(image, "dense text " * 30, (0, 20 + line * 24), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+        self.assertIsNone(prepare_content_tiles(image))
+        with patch.object(ocr_factory, "get_settings", return_value={"ocr_preprocess": "content"}):
+            self.assertEqual([i.shape for i in ocr_factory.prepare_ocr_images(image)], [image.shape])
+
+    def test_resize_setting(self):
+        """测试配置为resize时整图缩放"""
+        with patch.object(ocr_factory, "get_settings", return_value={"ocr_preprocess": "resize"}):
+            images = ocr_factory.prepare_ocr_images(_frame())
+        self.assertEqual(len(images), 1)
+        self.assertEqual(max(images[0].shape[:2]), 2000)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
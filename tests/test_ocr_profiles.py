@@ -0,0 +1,116 @@
+"""
+测试OCR配置档
+
+验证按应用选择配置档、配置文件覆盖、终端按行切片识别、不做OCR的应用以及配置档引擎的复用
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch, MagicMock
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import ocr_factory
+from memococo import ocr_profiles
+from memococo.ocr_profiles import get_ocr_profile, engine_params_for, slice_text_lines
+
+
+def _terminal(lines=12):
+    """生成一张深色背景的终端截图"""
+    image = np.full((600, 900, 3), 30, dtype=np.uint8)
+    for i in range(lines):
+        cv2.putText(image, f"$ command number {i}", (10, 30 + i * 28), cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                    (220, 220, 220), 1, cv2.LINE_AA)
+    return image
+
+
+class TestOCRProfiles(unittest.TestCase):
+    """测试OCR配置档"""
+
+    def setUp(self):
+        """使用空配置"""
+        self.settings = {}
+        self.patcher = patch.object(ocr_profiles, "get_settings", side_effect=lambda: self.settings)
+        self.patcher.start()
+
+    def tearDown(self):
+        """恢复配置"""
+        self.patcher.stop()
+
+    def test_builtin_app_profiles(self):
+        """测试终端应用默认使用终端配置档，其他应用使用默认配置档"""
+        self.assertEqual(get_ocr_profile("gnome-terminal-server").name, "terminal")
+        self.assertFalse(engine_params_for(get_ocr_profile("konsole"))["use_cls"])
+        self.assertEqual(get_ocr_profile("firefox").name, "default")
+        self.assertEqual(get_ocr_profile(None).name, "default")
+
+    def test_settings_override(self):
+        """测试配置文件中的配置档继承默认参数，应用对应关系覆盖内置对应关系"""
+        self.settings = {
+            "ocr_profiles": {"fast": {"engine_params": {"det_limit_side_len": 736}},
+                             "terminal": {"line_mode": False}},
+            "ocr_app_profiles": {"vlc": "skip", "remmina": "fast", "kitty": "missing"},
+        }
+        self.assertTrue(get_ocr_profile("vlc").skip)
+        params = engine_params_for(get_ocr_profile("remmina"))
+        self.assertEqual(params["det_limit_side_len"], 736)
+        self.assertTrue(params["use_cls"])
+        # 覆盖内置配置档时未指定的字段保持不变
+        terminal = get_ocr_profile("konsole")
+        self.assertFalse(terminal.line_mode)
+        self.assertFalse(terminal.engine_params["use_cls"])
+        self.assertEqual(get_ocr_profile("kitty").name, "default")
+
+    def test_slice_text_lines(self):
+        """测试按行切片终端截图，非单一背景的画面不切片"""
+        lines = slice_text_lines(_terminal(12))
+        self.assertEqual(len(lines), 12)
+        self.assertTrue(all(line.shape[0] < ocr_profiles.LINE_MAX_HEIGHT for line in lines))
+
+        photo = np.random.default_rng(0).integers(0, 255, (400, 400, 3), dtype=np.uint8)
+        self.assertIsNone(slice_text_lines(photo))
+
+    def test_line_mode_skips_detection(self):
+        """测试终端配置档只运行识别模型"""
+        engine = MagicMock()
+        engine.text_score = 0.5
+        engine.text_rec.side_effect = lambda lines: ([("line", 0.9)] * (len(lines) - 1) + [("noise", 0.1)], 0.0)
+        text = ocr_factory.recognize_image_text(engine, ocr_factory.OCR_ENGINE_RAPIDOCR, _terminal(3),
+                                                get_ocr_profile("kitty"))
+        self.assertEqual(text, "line\nline")
+        engine.assert_not_called()
+
+    def test_skip_profile(self):
+        """测试不做OCR的应用以窗口标题作为文本"""
+        self.settings = {"ocr_app_profiles": {"vlc": "skip"}}
+        with patch.object(ocr_factory, "get_ocr_engine") as get_engine:
+            self.assertEqual(ocr_factory.extract_text_from_image(_terminal(), app="vlc", title="movie.mkv"), "movie.mkv")
+            texts = ocr_factory.extract_text_from_images_batch([_terminal()], apps=["vlc"], titles=[None])
+        self.assertEqual(texts, ["vlc"])
+        get_engine.assert_not_called()
+
+    def test_profile_engines(self):
+        """测试参数与默认配置档相同的配置档共用全局引擎，不同的各自创建一次"""
+        self.settings = {"ocr_profiles": {"same": {}}}
+        default_engine = object()
+        with patch.object(ocr_factory, "get_ocr_engine", return_value=(default_engine, ocr_factory.OCR_ENGINE_RAPIDOCR)), \
+                patch.object(ocr_factory, "create_rapidocr_engine", side_effect=lambda params: object()) as create, \
+                patch.object(ocr_factory, "model_params", return_value={}), \
+                patch.dict(ocr_factory._profile_engines, clear=True):
+            self.assertIs(ocr_factory.get_profile_engine(ocr_profiles.get_profile_by_name("same"))[0], default_engine)
+            terminal_engine = ocr_factory.get_profile_engine(get_ocr_profile("kitty"))[0]
+            self.assertIsNot(terminal_engine, default_engine)
+            self.assertIs(ocr_factory.get_profile_engine(get_ocr_profile("konsole"))[0], terminal_engine)
+        self.assertEqual(create.call_count, 1)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+测试OCR调度器
+
+验证未覆盖区间的中点选择、随条目插入/完成/删除的增量更新，以及从数据库载入
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import database
+from memococo import ocr_processor
+from memococo.ocr_scheduler import OCRScheduler
+from memococo.common.db_manager import DatabaseManager
+
+
+def _seeded(timestamps, done=()):
+    """按时间戳构造调度器，done中的时间戳为已OCR条目"""
+    rows = []
+    run = 0
+    last_done = None
+    for entry_id, timestamp in enumerate(sorted(set(timestamps) | set(done)), start=1):
+        if timestamp in done:
+            run += 1
+            last_done = timestamp
+        else:
+            rows.append((entry_id, timestamp, run))
+    scheduler = OCRScheduler()
+    scheduler.seed(rows, last_done)
+    return scheduler
+
+
+class TestOCRScheduler(unittest.TestCase):
+    """测试调度器的区间维护"""
+
+    def test_pick_midpoint_of_largest_gap(self):
+        """测试依次选择最大区间的中点"""
+        scheduler = _seeded(range(0, 101, 10))
+        self.assertEqual([key[0] for key in scheduler.pick(1)], [50])
+        # 剩下的两个区间 0-40 和 60-100 跨度相同，各取中点
+        self.assertEqual(sorted(key[0] for key in scheduler.pick(2)), [20, 80])
+
+    def test_done_entries_split_gaps(self):
+        """测试已OCR条目把未OCR条目分成多个区间"""
+        scheduler = _seeded(list(range(0, 31, 10)) + list(range(100, 401, 10)), done=(50,))
+        self.assertEqual(scheduler.stats()["gaps"], 2)
+        self.assertEqual(scheduler.pick(1)[0][0], 250)
+
+    def test_insert_extends_last_gap(self):
+        """测试新截图并入最后一个区间，OCR完成后区间断开"""
+        scheduler = _seeded([0, 10])
+        for timestamp in range(20, 201, 10):
+            scheduler.add_pending(timestamp, timestamp)
+        self.assertEqual(scheduler.stats(), {"pending": 21, "gaps": 1, "in_progress": 0, "priority": 0, "largest_gap_seconds": 200})
+
+        # 其他线程完成了时间戳150的OCR
+        scheduler.complete(150)
+        self.assertEqual(scheduler.stats()["gaps"], 2)
+        scheduler.add_pending(210, 210)
+        self.assertEqual(scheduler.stats()["gaps"], 2)
+        self.assertEqual(scheduler.pick(1)[0][0], 70)
+
+    def test_release_restores_gap(self):
+        """测试跳过的条目放回后区间恢复原状"""
+        scheduler = _seeded(range(0, 101, 10))
+        key = scheduler.pick(1)[0]
+        self.assertEqual(scheduler.stats()["gaps"], 2)
+        scheduler.release(key[1])
+        self.assertEqual(scheduler.stats(), {"pending": 11, "gaps": 1, "in_progress": 0, "priority": 0, "largest_gap_seconds": 100})
+        self.assertEqual(scheduler.pick(1), [key])
+
+    def test_remove_entries(self):
+        """测试删除处理中和未处理的条目"""
+        scheduler = _seeded(range(0, 101, 10))
+        key = scheduler.pick(1)[0]
+        # 处理中的条目被删除（截图不存在），两侧区间重新连接
+        scheduler.remove(key[1])
+        self.assertEqual(scheduler.stats()["gaps"], 1)
+        # 删除区间端点
+        scheduler.remove(1)
+        scheduler.remove(11)
+        self.assertEqual(scheduler.stats()["largest_gap_seconds"], 80)
+        self.assertEqual(scheduler.stats()["pending"], 8)
+
+    def test_pick_all(self):
+        """测试请求数量超过未OCR条目时全部选出且不重复"""
+        scheduler = _seeded(range(0, 50, 10))
+        keys = scheduler.pick(10)
+        self.assertEqual(sorted(key[0] for key in keys), [0, 10, 20, 30, 40])
+        self.assertEqual(scheduler.pick(1), [])
+
+    def test_large_backlog(self):
+        """测试大量积压时混合插入、完成、删除、放回和选择后，每个条目恰好被选出一次"""
+        rng = random.Random(0)
+        scheduler = _seeded(range(0, 200000, 10))
+        alive = set(range(1, 20001))
+        picked = set()
+        for step in range(3000):
+            action = rng.random()
+            if action < 0.3:
+                entry_id = 20001 + step
+                scheduler.add_pending(entry_id, 200000 + step * 10)
+                alive.add(entry_id)
+            elif action < 0.5:
+                entry_id = rng.choice(sorted(alive - picked))
+                scheduler.complete(entry_id)
+                alive.discard(entry_id)
+            elif action < 0.6:
+                entry_id = rng.choice(sorted(alive - picked))
+                scheduler.remove(entry_id)
+                alive.discard(entry_id)
+            else:
+                for _, entry_id in scheduler.pick(3):
+                    self.assertNotIn(entry_id, picked)
+                    picked.add(entry_id)
+                if picked and rng.random() < 0.3:
+                    entry_id = picked.pop()
+                    scheduler.release(entry_id)
+        remaining = {entry_id for _, entry_id in scheduler.pick(len(alive))}
+        self.assertEqual(remaining, alive - picked)
+        self.assertEqual(scheduler.stats()["pending"], 0)
+
+    def test_priority_before_gaps(self):
+        """测试优先队列中的条目先于区间中点被选出，距离越近越优先"""
+        scheduler = _seeded(range(0, 101, 10))
+        keys = scheduler.prioritize(92, radius=10, limit=2)
+        self.assertEqual([key[0] for key in keys], [90, 100])
+        self.assertEqual([key[0] for key in scheduler.pick(3)], [90, 100, 40])
+        self.assertEqual(scheduler.stats()["priority"], 0)
+
+    def test_priority_skips_finished_entries(self):
+        """测试加入优先队列后已完成的条目不会被重复选出"""
+        scheduler = _seeded(range(0, 101, 10))
+        key = scheduler.prioritize(50)[0]
+        scheduler.complete(key[1])
+        self.assertEqual(scheduler.pick_priority(1), [])
+
+    def test_wait_done(self):
+        """测试等待条目完成"""
+        scheduler = _seeded(range(0, 101, 10))
+        entry_id = scheduler.pick(1)[0][1]
+        self.assertFalse(scheduler.wait_done(entry_id, 0.01))
+        timer = threading.Timer(0.05, scheduler.complete, args=(entry_id,))
+        timer.start()
+        self.assertTrue(scheduler.wait_done(entry_id, 5))
+        timer.join()
+
+
+class TestOCRSchedulerDatabase(unittest.TestCase):
+    """测试从数据库载入和监听数据库变化"""
+
+    def setUp(self):
+        """使用临时数据库"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = DatabaseManager.db_path
+        DatabaseManager._local = threading.local()
+        DatabaseManager.initialize(os.path.join(self.temp_dir, "test.db"))
+        database.create_db()
+        self.listeners = list(database._entry_listeners)
+
+    def tearDown(self):
+        """清理临时目录"""
+        database._entry_listeners[:] = self.listeners
+        DatabaseManager._local = threading.local()
+        DatabaseManager.db_path = self.db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_seed_and_follow_database(self):
+        """测试载入数据库中的区间并随数据库更新"""
+        for timestamp in range(1000, 1100, 10):
+            database.insert_entry("", timestamp, "text" if timestamp == 1050 else "", "App", "Title")
+
+        scheduler = OCRScheduler()
+        database.add_entry_listener(scheduler.on_entry_event)
+        scheduler.ensure_seeded()
+        self.assertEqual(scheduler.stats()["pending"], 9)
+        self.assertEqual(scheduler.stats()["gaps"], 2)
+
+        # 新截图并入最后一个区间
+        database.insert_entry("", 1100, "", "App", "Title")
+        database.insert_entry("", 1110, "", "App", "Title")
+        self.assertEqual(scheduler.stats()["pending"], 11)
+        self.assertEqual(scheduler.stats()["gaps"], 2)
+
+        timestamp, entry_id = scheduler.pick(1)[0]
+        self.assertEqual(timestamp, 1080)
+        database.update_entry_text(entry_id, "done", "")
+        self.assertEqual(scheduler.stats()["in_progress"], 0)
+        self.assertEqual(scheduler.stats()["pending"], 10)
+        self.assertEqual(scheduler.stats()["gaps"], 3)
+
+    def test_wait_for_ocr_text(self):
+        """测试长轮询时未OCR的截图被优先识别"""
+        database.insert_entry("", 2000, "", "App", "Title")
+        scheduler = OCRScheduler()
+        database.add_entry_listener(scheduler.on_entry_event)
+        with patch.object(ocr_processor, "get_ocr_scheduler", return_value=scheduler), \
+                patch.object(ocr_processor, "process_ocr_task", return_value="recognized text") as task:
+            self.assertEqual(ocr_processor.wait_for_ocr_text(2000, 5), "recognized text")
+        self.assertFalse(task.call_args.kwargs["check_load"])
+        self.assertEqual(database.get_empty_text_count(), 0)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
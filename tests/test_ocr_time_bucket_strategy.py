@@ -123,10 +123,11 @@ class TestOcrTimeBucketStrategy(unittest.TestCase):
             self.assertGreater(hours_span, 1.0, 
                              "Selected entries should span across multiple time buckets")
     
+    @patch('memococo.ocr_processor.frame_exists', return_value=True)
     @patch('memococo.ocr_processor.process_ocr_task')
-    def test_process_batch_ocr(self, mock_process_ocr_task):
+    def test_process_batch_ocr(self, mock_process_ocr_task, mock_frame_exists):
         """测试批量处理OCR任务"""
-        # 模拟OCR处理成功
+        # 模拟OCR处理成功，测试数据没有对应的截图文件
         mock_process_ocr_task.return_value = "Mocked OCR text"
         
         # 测试批量处理
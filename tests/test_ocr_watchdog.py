@@ -0,0 +1,120 @@
+"""
+测试OCR看门狗
+
+验证OCR调用超时后调用者立即返回、卡住的工作线程被放弃并重置引擎、
+卡住的线程过多时直接超时，以及超时的截图保留并重新排队
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import database
+from memococo import ocr_jobs
+from memococo import ocr_processor
+from memococo.ocr_watchdog import OCRWatchdog
+from memococo.common.error_handler import OCRTimeoutError
+from memococo.common.db_manager import DatabaseManager
+
+
+class TestOCRWatchdog(unittest.TestCase):
+    """测试OCR看门狗"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.on_restart = MagicMock()
+        self.watchdog = OCRWatchdog(name="TestOCRWatchdog", max_abandoned=1, on_restart=self.on_restart)
+
+    def tearDown(self):
+        # 让卡住的工作线程结束
+        self.release.set()
+
+    def _hang(self):
+        self.release.wait(10)
+        return "late"
+
+    def test_result_and_exception(self):
+        """测试正常返回结果、原样抛出异常，工作线程被复用"""
+        self.assertEqual(self.watchdog.run(lambda x, y=0: x + y, 1, y=2, timeout=5), 3)
+        with self.assertRaises(ValueError):
+            self.watchdog.run(self._raise, timeout=5)
+        self.assertEqual(self.watchdog.run(threading.current_thread, timeout=5).name, "TestOCRWatchdog-1")
+        stats = self.watchdog.stats()
+        self.assertEqual((stats["calls"], stats["timeouts"]), (3, 0))
+
+    def _raise(self):
+        raise ValueError("bad image")
+
+    def test_timeout_abandons_worker(self):
+        """测试超时后调用者立即收到OCRTimeoutError，之后的调用使用新的工作线程"""
+        start = time.time()
+        with self.assertRaises(OCRTimeoutError):
+            self.watchdog.run(self._hang, timeout=0.2)
+        self.assertLess(time.time() - start, 5)
+        self.on_restart.assert_called_once()
+        stats = self.watchdog.stats()
+        self.assertEqual((stats["timeouts"], stats["restarts"], stats["stuck_workers"]), (1, 1, 1))
+
+        # 卡住的线程达到上限，不再启动新的OCR
+        with self.assertRaises(OCRTimeoutError):
+            self.watchdog.run(lambda: "ok", timeout=5)
+        self.assertEqual(self.watchdog.stats()["rejected"], 1)
+
+        # 卡住的调用结束后线程退出，恢复OCR
+        self.release.set()
+        for _ in range(100):
+            if self.watchdog.stats()["stuck_workers"] == 0:
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.watchdog.run(threading.current_thread, timeout=5).name, "TestOCRWatchdog-2")
+
+
+class TestOCRTimeoutRequeue(unittest.TestCase):
+    """测试超时的截图保留并由OCR任务队列重试"""
+
+    def setUp(self):
+        """使用临时数据库"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = DatabaseManager.db_path
+        DatabaseManager._local = threading.local()
+        DatabaseManager.initialize(os.path.join(self.temp_dir, "test.db"))
+        database.create_db()
+
+    def tearDown(self):
+        """清理临时目录"""
+        DatabaseManager._local = threading.local()
+        DatabaseManager.db_path = self.db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_timeout_requeues_entry(self):
+        """测试OCR超时时返回TIMEOUT，条目保留，任务退避后重试"""
+        database.insert_entry("", 1000, "", "App", "Title")
+        entry_id = ocr_jobs.claim_next_jobs("worker", 1)[0]
+        entry = database.get_entries_by_ids([entry_id])[0]
+        with patch.object(ocr_processor, "load_frame_image", return_value=Image.new("RGB", (32, 32))), \
+                patch.object(ocr_processor, "extract_text_from_image", side_effect=OCRTimeoutError("stuck")):
+            result = ocr_processor.process_ocr_task(entry, check_load=False)
+        self.assertEqual(result, "TIMEOUT")
+        self.assertFalse(ocr_processor.store_ocr_result(None, entry, result, "worker"))
+
+        self.assertEqual(len(database.get_entries_by_ids([entry_id])), 1)
+        job = DatabaseManager.execute("SELECT * FROM ocr_jobs WHERE entry_id = ?", (entry_id,))[0]
+        self.assertEqual((job["state"], job["attempts"], job["last_error"]),
+                         (ocr_jobs.JOB_PENDING, 1, "OCR timed out"))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+测试资源调度器
+
+验证采样值的EWMA平滑、按配置阈值判断过载，以及OCR并发数的AIMD调整
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import resource_governor
+from memococo.resource_governor import ResourceGovernor
+
+
+class TestResourceGovernor(unittest.TestCase):
+    """测试资源调度器"""
+
+    def setUp(self):
+        """固定负载阈值"""
+        self.settings_patcher = patch.object(
+            resource_governor, "get_settings",
+            return_value={"ocr_cpu_threshold": 70, "ocr_temp_threshold": 80}
+        )
+        self.settings_patcher.start()
+        self.governor = ResourceGovernor(max_ocr_concurrency=4, alpha=0.5)
+        # 避免测试中触发真实采样
+        self.governor._updated_at = float("inf")
+
+    def tearDown(self):
+        self.settings_patcher.stop()
+
+    def test_ewma_smoothing(self):
+        """测试采样值按EWMA平滑，单次尖峰不会立即判定为过载"""
+        self.governor.record([20, 40], 50, 40)
+        self.assertEqual(self.governor.snapshot().cpu_percent, 30)
+        self.governor.record([100, 100], 50, 40)
+        snapshot = self.governor.snapshot()
+        self.assertEqual(snapshot.cpu_percent, 65)
+        self.assertEqual(snapshot.per_core, [60, 70])
+        self.assertFalse(self.governor.is_overloaded())
+        self.governor.record([100, 100], 50, 40)
+        self.assertTrue(self.governor.is_overloaded())
+        # 调用方可以指定更宽松的阈值
+        self.assertFalse(self.governor.is_overloaded(cpu_threshold=90))
+
+    def test_temperature_and_memory(self):
+        """测试温度和内存超出预算时同样视为过载"""
+        self.governor.record([10], 90, 40)
+        self.assertTrue(self.governor.is_overloaded())
+        governor = ResourceGovernor(alpha=1.0)
+        governor._updated_at = float("inf")
+        governor.record([10], None, 95)
+        self.assertTrue(governor.is_overloaded())
+
+    def test_aimd_concurrency(self):
+        """测试预算内每次加1直到上限，超出预算时减半直到暂停"""
+        self.assertEqual(self.governor.ocr_concurrency(), 1)
+        for _ in range(5):
+            self.governor.record([10], 40, 40)
+        self.assertEqual(self.governor.ocr_concurrency(), 4)
+
+        governor = ResourceGovernor(max_ocr_concurrency=4, alpha=1.0)
+        governor._updated_at = float("inf")
+        for _ in range(5):
+            governor.record([10], 40, 40)
+        governor.record([95], 40, 40)
+        self.assertEqual(governor.ocr_concurrency(), 2)
+        governor.record([95], 40, 40)
+        governor.record([95], 40, 40)
+        self.assertEqual(governor.ocr_concurrency(), 0)
+        self.assertFalse(governor.ocr_allowed())
+        governor.record([10], 40, 40)
+        self.assertTrue(governor.ocr_allowed())
+
+    def test_battery(self):
+        """测试电池状态"""
+        self.governor.record([10], None, 40, on_battery=True, battery_percent=55)
+        self.assertTrue(self.governor.on_battery())
+        self.assertEqual(self.governor.snapshot().battery_percent, 55)
+
+    def test_sample_without_thread(self):
+        """测试采样线程未启动时按需进行一次不阻塞的采样"""
+        governor = ResourceGovernor()
+        with patch.object(resource_governor.psutil, "cpu_percent", return_value=[50.0, 70.0]) as cpu_percent, \
+                patch.object(resource_governor, "get_cpu_temperature", return_value=None):
+            self.assertEqual(governor.snapshot().cpu_percent, 60)
+        self.assertIsNone(cpu_percent.call_args.kwargs["interval"])
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+测试活动窗口裁剪
+
+验证活动窗口直接从已截取的显示器画面中裁剪（不复制像素、不再单独截图），
+以及窗口跨越或超出显示器、高分屏缩放时的裁剪区域
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import screenshot
+from memococo.screenshot import crop_window
+from memococo.frame_grabber import FrameGrabber
+
+# 两个并排的显示器，mss的第0项为拼接后的整个屏幕
+MONITORS = [
+    {"left": 0, "top": 0, "width": 300, "height": 100},
+    {"left": 0, "top": 0, "width": 200, "height": 100},
+    {"left": 200, "top": 0, "width": 100, "height": 100},
+]
+
+
+def _frame(monitor, scale=1):
+    """每个像素的值为其在屏幕中的横坐标，便于检查裁剪位置"""
+    xs = np.arange(monitor["left"] * scale, (monitor["left"] + monitor["width"]) * scale) // scale
+    frame = np.repeat(xs[np.newaxis, :, np.newaxis], monitor["height"] * scale, axis=0)
+    return np.repeat(frame, 3, axis=2).astype(np.int32)
+
+
+class TestCropWindow(unittest.TestCase):
+    """测试从显示器画面中裁剪活动窗口"""
+
+    def test_view_of_monitor_frame(self):
+        """测试裁剪结果是显示器画面的视图"""
+        frames = [_frame(monitor) for monitor in MONITORS]
+        window = crop_window(frames, MONITORS, (150, 10, 100, 50))
+        self.assertEqual(window.shape, (50, 100, 3))
+        self.assertTrue(np.shares_memory(window, frames[0]))
+        self.assertEqual((window[0, 0, 0], window[0, -1, 0]), (150, 249))
+
+    def test_single_monitor_and_clipping(self):
+        """测试只截取了部分显示器时使用包含窗口的画面，超出画面的部分被裁掉，完全不在画面中时返回None"""
+        frames = [_frame(monitor) for monitor in MONITORS[1:]]
+        window = crop_window(frames, MONITORS[1:], (250, -20, 100, 50))
+        self.assertEqual(window.shape, (30, 50, 3))
+        self.assertEqual((window[0, 0, 0], window[0, -1, 0]), (250, 299))
+        self.assertTrue(np.shares_memory(window, frames[1]))
+
+        self.assertIsNone(crop_window(frames[:1], MONITORS[1:2], (250, 10, 40, 40)))
+
+    def test_hidpi_scaling(self):
+        """测试画面像素数为显示器逻辑尺寸两倍时按比例裁剪"""
+        frames = [_frame(MONITORS[1], scale=2)]
+        window = crop_window(frames, MONITORS[1:2], (20, 10, 30, 40))
+        self.assertEqual(window.shape, (80, 60, 3))
+        self.assertEqual((window[0, 0, 0], window[0, -1, 0]), (20, 49))
+
+
+class TestCaptureScreen(unittest.TestCase):
+    """测试截图时不再单独截取活动窗口"""
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "只有Linux从显示器画面中裁剪活动窗口")
+    def test_no_second_capture(self):
+        """测试只截取每个显示器（不截取拼接后的整个屏幕），活动窗口从同一次截图中裁剪，不调用 pyautogui"""
+        sct = MagicMock()
+        sct.monitors = MONITORS
+        sct.grab.side_effect = lambda monitor: MagicMock(
+            raw=bytearray(np.dstack([_frame(monitor)[:, :, 0]] * 4).astype(np.uint8).tobytes()),
+            width=monitor["width"], height=monitor["height"])
+        with patch.object(screenshot, "get_frame_grabber", return_value=FrameGrabber(sct_factory=lambda: sct)), \
+                patch.object(screenshot, "get_active_window_geometry_linux", return_value=(210, 10, 50, 50)), \
+                patch.object(screenshot, "grab_region") as grab_region, \
+                patch.object(screenshot.args, "primary_monitor_only", False):
+            capture = screenshot.capture_screen()
+        grab_region.assert_not_called()
+        self.assertEqual(sct.grab.call_count, 2)
+        self.assertEqual(capture.monitor_ids, [1, 2])
+        self.assertEqual(capture.window_monitor, 2)
+        self.assertEqual(capture.window.shape, (50, 50, 3))
+        self.assertEqual(capture.window[0, 0, 0], 210)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+测试滚动增量OCR
+
+用合成的文档画面（每行文字用各自的灰度绘制，模拟识别时按灰度还原行号）验证滚动距离和滚动区域的估计、
+固定的工具栏、窗口外的变化和内容整体变化时不视为滚动，以及连续滚动时只识别新出现的区域、
+合并后的文本与整屏识别的结果一致
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import scroll_ocr
+from memococo.monitor_tracker import frame_signature
+from memococo.scroll_ocr import ScrollOCR, ScrollShift, estimate_scroll, merge_scrolled_lines, window_gray
+
+LINE_HEIGHT = 24
+BACKGROUND = 250
+
+
+def _document(lines=200, width=600, seed=0):
+    """高度为 lines 行的文档，第i行的文字灰度为 (i * 7) % 180 + 20（不同的行灰度不同）"""
+    rng = np.random.default_rng(seed)
+    page = np.full((lines * LINE_HEIGHT, width), BACKGROUND, dtype=np.uint8)
+    for index in range(lines):
+        top = index * LINE_HEIGHT + 6
+        ink = (index * 7) % 180 + 20
+        for left in rng.choice(np.arange(10, width - 40, 20), size=rng.integers(3, 20), replace=False):
+            page[top:top + 12, left:left + 14] = ink
+    return page
+
+
+def _gray_to_line(value):
+    """由文字灰度还原行号（前180行的灰度各不相同）"""
+    return [index for index in range(180) if (index * 7) % 180 + 20 == value]
+
+
+class _Screen:
+    """窗口位于画面 (100, 50) 处、高480像素，顶部有固定的工具栏"""
+
+    box = (100, 50, 700, 530)
+
+    def __init__(self):
+        self.page = _document()
+        self.toolbar = np.full((40, 600), 230, dtype=np.uint8)
+        self.toolbar[10:30, 20:200] = 30
+
+    def frame(self, offset):
+        gray = np.full((720, 900), 200, dtype=np.uint8)
+        gray[50:90, 100:700] = self.toolbar
+        gray[90:530, 100:700] = self.page[offset:offset + 440]
+        return np.repeat(gray[:, :, None], 3, axis=2)
+
+    def visible_lines(self, offset):
+        """整屏识别时应得到的文本：完整出现在窗口中的行"""
+        return [f"line{index}" for index in range(180)
+                if index * LINE_HEIGHT + 6 >= offset and index * LINE_HEIGHT + 18 <= offset + 440]
+
+
+def _recognize_lines(image, app=None):
+    """模拟带位置的识别：按文字灰度还原行号，只返回完整的行"""
+    gray = image[:, :, 0]
+    lines = []
+    ink_rows = np.flatnonzero(((gray < 200) & (gray >= 20)).any(axis=1))
+    for rows in np.split(ink_rows, np.flatnonzero(np.diff(ink_rows) > 1) + 1):
+        if len(rows) == 0:
+            continue
+        top, bottom = int(rows[0]), int(rows[-1]) + 1
+        values = gray[top:bottom][(gray[top:bottom] < 200) & (gray[top:bottom] >= 20)]
+        value = int(np.bincount(values).argmax())
+        # 工具栏（灰度30，高20像素）和被截断的行（不足12像素高）
+        if bottom - top != 12:
+            if value == 30 and bottom - top == 20:
+                lines.append((0, top, gray.shape[1], bottom, "toolbar"))
+            continue
+        candidates = _gray_to_line(value)
+        lines.append((0, top, gray.shape[1], bottom, f"ink{value}" if len(candidates) != 1 else f"line{candidates[0]}"))
+    return lines
+
+
+class TestEstimateScroll(unittest.TestCase):
+    """测试滚动距离估计"""
+
+    def setUp(self):
+        self.screen = _Screen()
+
+    def _estimate(self, first, second):
+        return estimate_scroll(window_gray(self.screen.frame(first), _Screen.box),
+                               window_gray(self.screen.frame(second), _Screen.box))
+
+    def test_scroll_down_and_up(self):
+        """测试向下滚动（内容上移）为负，向上滚动为正，固定的工具栏不在滚动区域内"""
+        scroll = self._estimate(0, 100)
+        self.assertEqual(scroll.shift, -50)
+        self.assertGreaterEqual(scroll.top, 20)
+        scroll = self._estimate(100, 40)
+        self.assertEqual(scroll.shift, 30)
+        self.assertGreaterEqual(scroll.top, 20)
+
+    def test_not_scroll(self):
+        """测试没有变化、内容整体变化和滚动同时有其他变化时不视为滚动"""
+        self.assertIsNone(self._estimate(0, 0))
+        self.assertIsNone(self._estimate(0, 2400))
+        first = window_gray(self.screen.frame(0), _Screen.box)
+        changed = self.screen.frame(100)
+        changed[300:320, 150:400] = 0
+        self.assertIsNone(estimate_scroll(first, window_gray(changed, _Screen.box)))
+
+
+class TestMergeLines(unittest.TestCase):
+    """测试文字行合并"""
+
+    def test_merge(self):
+        """测试滚动区域之外的行不变，滚动区域内的行平移，重叠部分以中线为界"""
+        box = (0, 0, 100, 300)
+        previous = [(0, 10, 100, 20, "toolbar"), (0, 50, 100, 60, "a"), (0, 200, 100, 210, "b"),
+                    (0, 280, 100, 290, "c"), (200, 100, 300, 110, "outside")]
+        strip = [(0, 220, 100, 230, "c"), (0, 260, 100, 270, "d")]
+        merged = merge_scrolled_lines(previous, strip, box, ScrollShift(-60, 40, 300))
+        self.assertEqual([line[4] for line in merged], ["toolbar", "outside", "b", "c", "d"])
+        self.assertEqual(merged[2][1], 140)
+
+
+class TestScrollOCR(unittest.TestCase):
+    """测试滚动增量OCR"""
+
+    def setUp(self):
+        self.patcher = patch.object(scroll_ocr, "get_settings", return_value={})
+        self.patcher.start()
+        self.screen = _Screen()
+        self.calls = []
+
+        def recognize_text(image, app=None, title=None):
+            self.calls.append(("text", image.shape[0]))
+            return "\n".join(line[4] for line in _recognize_lines(image))
+
+        def recognize_lines(image, app=None):
+            self.calls.append(("lines", image.shape[0]))
+            return _recognize_lines(image)
+
+        self.ocr = ScrollOCR(recognize_text=recognize_text, recognize_lines=recognize_lines)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def _extract(self, offset, key=("editor", "doc")):
+        frame = self.screen.frame(offset)
+        return self.ocr.extract_text(frame, key, _Screen.box, frame_signature(frame), app="editor", title="doc")
+
+    def test_incremental(self):
+        """测试连续滚动时只识别新出现的区域，文本与整屏识别一致"""
+        self._extract(0)
+        for offset in (100, 220, 400, 330, 336):
+            text = self._extract(offset)
+            self.assertEqual(text.split("\n"), ["toolbar"] + self.screen.visible_lines(offset))
+        self.assertEqual(self.calls[0], ("text", 720))
+        self.assertEqual(self.calls[1], ("lines", 720))
+        self.assertTrue(all(kind == "lines" and height < 300 for kind, height in self.calls[2:]))
+        stats = self.ocr.stats()
+        self.assertEqual((stats["full"], stats["line_frames"], stats["incremental"]), (1, 1, 4))
+        self.assertLess(stats["recognized_ratio"], 0.5)
+
+    def test_not_scrolled(self):
+        """测试内容整体变化、换了窗口或窗口外有变化时使用正常OCR流程"""
+        self._extract(0)
+        self._extract(2400)
+        self._extract(2450, key=("editor", "other"))
+        frame = self.screen.frame(2500)
+        frame[600:700, 0:900] = 0
+        self.ocr.extract_text(frame, ("editor", "other"), _Screen.box, frame_signature(frame), app="editor")
+        self.assertEqual([kind for kind, _ in self.calls], ["text"] * 4)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
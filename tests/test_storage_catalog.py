@@ -0,0 +1,177 @@
+"""
+测试存储目录
+
+验证按天的截图数、占用空间、归档状态的增量更新，由触发器维护的条目数，以及按OCR任务统计的OCR积压数
+"""
+
+import os
+import sys
+import shutil
+import datetime
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import database
+from memococo import storage_catalog
+from memococo import ocr_jobs
+from memococo.common.db_manager import DatabaseManager
+
+
+class TestStorageCatalog(unittest.TestCase):
+    """测试存储目录模块"""
+
+    def setUp(self):
+        """使用临时数据库和截图目录"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.screenshots = os.path.join(self.temp_dir, "screenshots")
+        os.makedirs(self.screenshots)
+        self.db_path = DatabaseManager.db_path
+        DatabaseManager._local = threading.local()
+        DatabaseManager.initialize(os.path.join(self.temp_dir, "test.db"))
+        self.patchers = [
+            patch.object(storage_catalog, "screenshots_path", self.screenshots),
+            patch.object(storage_catalog, "appdata_folder", self.temp_dir),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+        self.timestamp = int(datetime.datetime(2025, 4, 16, 10).timestamp())
+        self.day = "2025/04/16"
+        self.folder = os.path.join(self.screenshots, "2025", "04", "16")
+        os.makedirs(self.folder)
+
+    def tearDown(self):
+        """清理临时目录"""
+        for patcher in self.patchers:
+            patcher.stop()
+        DatabaseManager._local = threading.local()
+        DatabaseManager.db_path = self.db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_frame(self, timestamp, size=1000):
+        path = os.path.join(self.folder, f"{timestamp}.webp")
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return path
+
+    def _day(self):
+        days = {d["day"]: d for d in storage_catalog.get_storage_days()}
+        return days.get(self.day)
+
+    def test_ocr_backlog_maintained_by_triggers(self):
+        """测试条目插入、OCR完成和删除时自动更新条目数和待OCR数"""
+        database.create_db()
+        database.insert_entry("", self.timestamp, "", "app", "title")
+        database.insert_entry("", self.timestamp + 5, "done", "app", "title")
+        self.assertEqual(self._day()["entry_count"], 2)
+        self.assertEqual(self._day()["ocr_pending"], 1)
+
+        entry = database.get_newest_empty_text()
+        database.update_entry_text(entry.id, "text", "")
+        self.assertEqual(self._day()["ocr_pending"], 0)
+
+        database.remove_entry(entry.id)
+        self.assertEqual(self._day()["entry_count"], 1)
+
+    def test_failed_jobs_not_pending(self):
+        """测试OCR任务失败后不再计入待OCR数，与OCR任务统计一致"""
+        database.create_db()
+        database.insert_entry("", self.timestamp, "", "app", "title")
+        database.insert_entry("", self.timestamp + 5, "", "app", "title")
+        worker = ocr_jobs.worker_id("test")
+        entry_id = ocr_jobs.claim_next_jobs(worker, 1)[0]
+        self.assertEqual(self._day()["ocr_pending"], 2)
+        ocr_jobs.fail_job(entry_id, worker, "OCR returned empty text", permanent=True)
+        self.assertEqual(self._day()["ocr_pending"], 1)
+        self.assertEqual(storage_catalog.get_storage_summary()["ocr_pending"], database.get_empty_text_count())
+
+    def test_migrate_old_triggers(self):
+        """测试重新创建旧版本维护待OCR数的触发器"""
+        DatabaseManager.execute(
+            "CREATE TABLE storage_days (day TEXT PRIMARY KEY, file_count INTEGER NOT NULL DEFAULT 0, "
+            "bytes INTEGER NOT NULL DEFAULT 0, archived INTEGER NOT NULL DEFAULT 0, "
+            "scanned INTEGER NOT NULL DEFAULT 0, entry_count INTEGER NOT NULL DEFAULT 0, "
+            "ocr_pending INTEGER NOT NULL DEFAULT 0, updated_at INTEGER)"
+        )
+        DatabaseManager.execute(
+            "CREATE TABLE entries (id INTEGER PRIMARY KEY AUTOINCREMENT, app TEXT, title TEXT, "
+            "text TEXT, timestamp INTEGER, jsontext TEXT)"
+        )
+        DatabaseManager.execute(
+            "CREATE TRIGGER trg_storage_days_insert AFTER INSERT ON entries BEGIN "
+            "UPDATE storage_days SET ocr_pending = ocr_pending + 1; END"
+        )
+        database.create_db()
+        database.insert_entry("", self.timestamp, "", "app", "title")
+        rows = DatabaseManager.execute("SELECT sql FROM sqlite_master WHERE name = 'trg_storage_days_insert'")
+        self.assertNotIn("ocr_pending", rows[0]["sql"])
+        self.assertEqual(self._day()["entry_count"], 1)
+        self.assertEqual(self._day()["ocr_pending"], 1)
+
+    def test_seed_backlog_from_existing_entries(self):
+        """测试首次创建触发器时根据已有条目初始化统计"""
+        DatabaseManager.execute(
+            "CREATE TABLE entries (id INTEGER PRIMARY KEY AUTOINCREMENT, app TEXT, title TEXT, "
+            "text TEXT, timestamp INTEGER, jsontext TEXT)"
+        )
+        DatabaseManager.execute_many(
+            "INSERT INTO entries (app, title, text, timestamp, jsontext) VALUES ('a', 't', ?, ?, '')",
+            [("", self.timestamp), (None, self.timestamp + 1), ("ok", self.timestamp + 2)]
+        )
+        database.create_db()
+        self.assertEqual(self._day()["entry_count"], 3)
+        self.assertEqual(self._day()["ocr_pending"], 2)
+
+    def test_record_and_refresh(self):
+        """测试截图增量累加以及归档后重新统计"""
+        database.create_db()
+        self._write_frame(self.timestamp)
+        storage_catalog.record_frame_saved(self.timestamp, 1000)
+        self._write_frame(self.timestamp + 5)
+        storage_catalog.record_frame_saved(self.timestamp + 5, 1000)
+        day = self._day()
+        self.assertEqual(day["file_count"], 2)
+        self.assertEqual(day["bytes"], 2000)
+        self.assertFalse(day["archived"])
+
+        unbacked = storage_catalog.get_unbacked_up_days(days_ago_max=100000)
+        self.assertEqual(unbacked[0]["folder"], self.folder)
+        self.assertEqual(unbacked[0]["image_count"], 2)
+
+        # 模拟归档：图片被视频和映射文件替代
+        for name in os.listdir(self.folder):
+            os.remove(os.path.join(self.folder, name))
+        with open(os.path.join(self.folder, "record.mp4"), "wb") as f:
+            f.write(b"v" * 300)
+        with open(os.path.join(self.folder, "record.mp4.csv"), "w") as f:
+            f.write("filename,timestamp,frame_number\na.webp,0,1\nb.webp,0,2\n")
+
+        storage_catalog.refresh_day(self.folder)
+        day = self._day()
+        self.assertTrue(day["archived"])
+        self.assertEqual(day["file_count"], 2)
+        self.assertEqual(storage_catalog.get_unbacked_up_days(days_ago_max=100000), [])
+
+    def test_sync_scans_unscanned_days_once(self):
+        """测试启动同步只统计尚未统计过的目录"""
+        database.create_db()
+        self._write_frame(self.timestamp, size=500)
+        self.assertEqual(storage_catalog.sync_storage_catalog(), 1)
+        self.assertEqual(self._day()["bytes"], 500)
+        self.assertEqual(storage_catalog.sync_storage_catalog(), 0)
+
+        summary = storage_catalog.get_storage_summary()
+        self.assertEqual(summary["file_count"], 1)
+        self.assertGreaterEqual(summary["total_bytes"], 500)
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
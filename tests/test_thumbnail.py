@@ -0,0 +1,174 @@
+"""
+测试缩略图和雪碧图生成
+
+验证截图缩略图的尺寸、懒生成逻辑、按小时拼接的雪碧图索引、不同宽高比的截图在雪碧图中不变形，
+以及当前小时有新截图时才重新生成雪碧图
+"""
+
+import os
+import sys
+import json
+import shutil
+import datetime
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import thumbnail, frame_store
+
+
+class TestThumbnail(unittest.TestCase):
+    """测试缩略图模块"""
+
+    def setUp(self):
+        """创建临时截图目录"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path_patchers = [
+            patch.object(thumbnail, "screenshots_path", self.temp_dir),
+            patch.object(frame_store, "screenshots_path", self.temp_dir),
+        ]
+        for patcher in self.path_patchers:
+            patcher.start()
+        # 固定在某个小时内的时间戳
+        self.hour_start = datetime.datetime(2025, 4, 16, 14)
+        self.timestamps = [int(self.hour_start.timestamp()) + i * 5 for i in range(7)]
+
+    def tearDown(self):
+        """清理临时目录"""
+        for patcher in self.path_patchers:
+            patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_original(self, timestamp, size=(1920, 1080), monitor=0, value=None):
+        """写入一张原始截图（纯色，灰度默认由时间戳决定）"""
+        folder = thumbnail.get_day_folder(timestamp)
+        os.makedirs(folder, exist_ok=True)
+        array = np.full((size[1], size[0], 3), timestamp % 255 if value is None else value, dtype=np.uint8)
+        Image.fromarray(array).save(frame_store.get_frame_file_path(timestamp, monitor), format="webp")
+
+    def test_save_thumbnail_limits_size(self):
+        """测试缩略图不超过最大边长并保持宽高比"""
+        image = np.zeros((2160, 3840, 3), dtype=np.uint8)
+        path = thumbnail.save_thumbnail(image, self.timestamps[0])
+
+        self.assertTrue(os.path.exists(path))
+        with Image.open(path) as thumb:
+            self.assertEqual(thumb.width, thumbnail.THUMB_MAX_SIZE)
+            self.assertEqual(thumb.height, 270)
+
+    def test_ensure_thumbnail_generates_lazily(self):
+        """测试缩略图不存在时从原图懒生成"""
+        timestamp = self.timestamps[0]
+        self._write_original(timestamp)
+        self.assertFalse(os.path.exists(thumbnail.get_thumbnail_path(timestamp)))
+
+        path = thumbnail.ensure_thumbnail(timestamp)
+        self.assertEqual(path, thumbnail.get_thumbnail_path(timestamp))
+        self.assertTrue(os.path.exists(path))
+
+    def test_ensure_thumbnail_missing_original(self):
+        """测试原图不存在时返回None"""
+        self.assertIsNone(thumbnail.ensure_thumbnail(self.timestamps[0]))
+
+    def test_build_hour_sprite(self):
+        """测试雪碧图包含该小时内所有帧（同一时刻多个显示器的截图各占一格）并生成索引文件"""
+        frames = [(ts, 0) for ts in self.timestamps] + [(self.timestamps[0], 2)]
+        for ts, monitor in frames:
+            self._write_original(ts, monitor=monitor)
+
+        hour_key = self.hour_start.strftime("%Y%m%d%H")
+        with patch.object(thumbnail, "get_frames_in_range", return_value=list(frames)):
+            index = thumbnail.build_hour_sprite(hour_key)
+
+        self.assertEqual(index["hour"], hour_key)
+        self.assertEqual(sorted(index["frames"].values()), list(range(len(frames))))
+        self.assertIn(f"{self.timestamps[0]}_2", index["frames"])
+        self.assertTrue(os.path.exists(thumbnail.get_thumbnail_path(self.timestamps[0], 2)))
+
+        sprite_path = thumbnail.get_sprite_image_path(hour_key, index["version"])
+        with Image.open(sprite_path) as sprite:
+            rows = -(-len(frames) // index["columns"])
+            self.assertEqual(sprite.width, index["columns"] * index["cell_width"])
+            self.assertEqual(sprite.height, rows * index["cell_height"])
+
+        # 已结束的小时生成的雪碧图直接复用，不再查询数据库
+        with patch.object(thumbnail, "get_frames_in_range") as mock_query:
+            cached = thumbnail.build_hour_sprite(hour_key)
+            mock_query.assert_not_called()
+        self.assertEqual(cached, json.loads(json.dumps(index)))
+
+    def test_sprite_mixed_aspect(self):
+        """测试横屏和竖屏显示器的缩略图等比缩放后居中放入单元格，索引记录内容区域，旧版本的索引重新生成"""
+        frames = [(ts, 1) for ts in self.timestamps[:3]] + [(self.timestamps[0], 2)]
+        for ts, monitor in frames:
+            self._write_original(ts, size=(1920, 1080) if monitor == 1 else (1080, 1920), monitor=monitor, value=200)
+
+        hour_key = self.hour_start.strftime("%Y%m%d%H")
+        with patch.object(thumbnail, "get_frames_in_range", return_value=list(frames)):
+            index = thumbnail.build_hour_sprite(hour_key)
+        self.assertEqual((index["cell_width"], index["cell_height"]), (240, 135))
+        self.assertEqual(index["boxes"][f"{self.timestamps[1]}_1"], [0, 0, 240, 135])
+        left, top, width, height = index["boxes"][f"{self.timestamps[0]}_2"]
+        self.assertEqual((top, height), (0, 135))
+        self.assertAlmostEqual(width / height, 1080 / 1920, delta=0.02)
+        self.assertEqual(left, (240 - width) // 2)
+
+        cell = index["frames"][f"{self.timestamps[0]}_2"]
+        x, y = (cell % index["columns"]) * 240, (cell // index["columns"]) * 135
+        with Image.open(thumbnail.get_sprite_image_path(hour_key, index["version"])) as sprite:
+            sprite = sprite.convert("L")
+            self.assertAlmostEqual(sprite.getpixel((x + left + width // 2, y + 60)), 200, delta=10)
+            self.assertLess(sprite.getpixel((x + 5, y + 60)), 10)
+
+        # 旧版本生成的索引没有内容区域，即使该小时已结束也重新生成
+        _, _, index_path = thumbnail._sprite_paths(self.hour_start)
+        legacy = dict(index)
+        del legacy["boxes"]
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+        with patch.object(thumbnail, "get_frames_in_range", return_value=list(frames)):
+            self.assertIn("boxes", thumbnail.build_hour_sprite(hour_key))
+
+    def test_current_hour_sprite(self):
+        """测试当前小时没有新截图时复用雪碧图，有新截图时重新生成，旧索引仍能取到对应的雪碧图"""
+        hour_start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+        timestamps = [int(hour_start.timestamp()) + i for i in range(3)]
+        for ts in timestamps:
+            self._write_original(ts)
+        hour_key = hour_start.strftime("%Y%m%d%H")
+
+        with patch.object(thumbnail, "get_frames_in_range", side_effect=lambda start, end: [(ts, 0) for ts in timestamps]):
+            first = thumbnail.build_hour_sprite(hour_key)
+            with patch.object(thumbnail, "ensure_thumbnail") as mock_thumb:
+                self.assertEqual(thumbnail.build_hour_sprite(hour_key), first)
+                mock_thumb.assert_not_called()
+
+            self._write_original(timestamps[-1] + 1)
+            timestamps.append(timestamps[-1] + 1)
+            second = thumbnail.build_hour_sprite(hour_key)
+
+        self.assertNotEqual(second["version"], first["version"])
+        self.assertEqual(second["latest"], timestamps[-1])
+        self.assertEqual(len(second["frames"]), 4)
+        old_path = thumbnail.get_sprite_image_path(hour_key, first["version"])
+        new_path = thumbnail.get_sprite_image_path(hour_key, second["version"])
+        self.assertNotEqual(old_path, new_path)
+        self.assertTrue(os.path.exists(old_path))
+
+    def test_build_hour_sprite_empty_hour(self):
+        """测试没有截图的小时返回None"""
+        with patch.object(thumbnail, "get_frames_in_range", return_value=[]):
+            self.assertIsNone(thumbnail.build_hour_sprite("2025041615"))
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+测试Linux X11后端
+
+验证X11后端可用时读取活动窗口和空闲时间不再启动子进程、不可用时改用子进程，
+以及在Xvfb中读取活动窗口的应用名、标题和位置（没有安装Xvfb时跳过）
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from memococo import utils
+from memococo import x11_backend
+from memococo.x11_backend import ActiveWindow, X11Backend, X11Unavailable
+
+
+class _FakeBackend:
+    """记录查询次数的X11后端"""
+
+    def __init__(self, window, idle=1.0):
+        self.window = window
+        self.idle = idle
+        self.queries = 0
+
+    def active_window(self):
+        self.queries += 1
+        return self.window
+
+    def idle_seconds(self):
+        return self.idle
+
+
+class TestSubprocessFallback(unittest.TestCase):
+    """测试X11后端与子进程方式的切换"""
+
+    def test_backend_avoids_subprocesses(self):
+        """测试后端可用时应用名、标题和空闲时间都不启动子进程"""
+        backend = _FakeBackend(ActiveWindow(0x400001, "code", "main.py - VS Code", 10, 20, 800, 600), idle=12.0)
+        with patch.object(x11_backend, "get_x11_backend", return_value=backend), \
+                patch.object(utils.subprocess, "check_output") as check_output:
+            self.assertEqual(utils.get_active_app_name_linux(), "code")
+            self.assertEqual(utils.get_active_window_title_linux(), "main.py - VS Code")
+            self.assertFalse(utils.is_user_active_linux())
+            check_output.assert_not_called()
+
+            backend.window = None
+            self.assertIsNone(utils.get_active_app_name_linux())
+            check_output.assert_not_called()
+
+    def test_fallback_without_backend(self):
+        """测试后端不可用时使用 xdotool/xprop/xprintidle 子进程"""
+        outputs = {
+            "getactivewindow": b"4194305\n",
+            "WM_CLASS": b'WM_CLASS(STRING) = "code", "Code"\n',
+        }
+
+        def check_output(cmd, timeout=None):
+            if cmd[0] == utils.XPRINTIDLE:
+                return b"1000\n"
+            return next(value for key, value in outputs.items() if key in cmd)
+
+        with patch.object(x11_backend, "get_x11_backend", return_value=None), \
+                patch.object(utils.subprocess, "check_output", side_effect=check_output) as mocked:
+            self.assertEqual(utils.get_active_app_name_linux(), "code")
+            self.assertTrue(utils.is_user_active_linux())
+            self.assertEqual(mocked.call_count, 3)
+
+    def test_connection_lost(self):
+        """测试连接断开时丢弃连接并抛出 X11Unavailable"""
+        class _ClosedBackend:
+            def active_window(self):
+                raise OSError("broken pipe")
+
+        with patch.object(x11_backend, "get_x11_backend", return_value=_ClosedBackend()), \
+                patch.object(x11_backend, "reset_x11_backend") as reset:
+            with self.assertRaises(X11Unavailable):
+                x11_backend.x11_active_window()
+            reset.assert_called_once()
+
+
+@unittest.skipUnless(x11_backend._xlib_imported and shutil.which("Xvfb"), "需要python-xlib和Xvfb")
+class TestXvfb(unittest.TestCase):
+    """在Xvfb中测试X11后端"""
+
+    DISPLAY = ":97"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = subprocess.Popen(["Xvfb", cls.DISPLAY, "-screen", "0", "1024x768x24"],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            try:
+                cls.backend = X11Backend(cls.DISPLAY)
+                break
+            except Exception:
+                time.sleep(0.1)
+        else:
+            cls.server.terminate()
+            raise unittest.SkipTest("Xvfb启动失败")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend.close()
+        cls.server.terminate()
+        cls.server.wait()
+
+    def test_active_window(self):
+        """测试读取活动窗口的应用名、UTF-8标题和位置"""
+        from Xlib import X, Xatom
+
+        # 使用另一个连接模拟窗口管理器和应用程序
+        client = x11_backend.xdisplay.Display(self.DISPLAY)
+        root = client.screen().root
+        window = root.create_window(40, 30, 320, 240, 0, client.screen().root_depth)
+        window.set_wm_class("code", "Code")
+        window.change_property(client.intern_atom("_NET_WM_NAME"), client.intern_atom("UTF8_STRING"),
+                               8, "笔记.md - VS Code".encode("utf-8"))
+        window.map()
+        root.change_property(client.intern_atom("_NET_ACTIVE_WINDOW"), Xatom.WINDOW, 32,
+                             [window.id], X.PropModeReplace)
+        client.sync()
+        try:
+            active = self.backend.active_window(max_age=0)
+            self.assertEqual(active.window_id, window.id)
+            self.assertEqual(active.app, "code")
+            self.assertEqual(active.title, "笔记.md - VS Code")
+            self.assertEqual((active.x, active.y, active.width, active.height), (40, 30, 320, 240))
+            # 同一次截图中的后续查询复用结果
+            self.assertIs(self.backend.active_window(), active)
+
+            if self.backend.has_screensaver:
+                self.assertGreaterEqual(self.backend.idle_seconds(), 0)
+        finally:
+            window.destroy()
+            client.close()
+
+
+def main():
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()